@@ -0,0 +1,234 @@
+# animation.py
+
+import random
+import threading
+import time
+from collections import deque
+import config as c
+import display
+
+# --- Animations ---
+# An animation is a list of keyframes: (frame, hold) pairs, where `frame` is a
+# packed display frame (or a function returning one, called when the keyframe is
+# reached) and `hold` is how many seconds it stays up. The frame functions in
+# display.py return cached frames, so rendering is usually a dictionary lookup.
+
+class Animation:
+    def __init__(self, name, keyframes, loop=False):
+        self.name = name
+        self.keyframes = list(keyframes)
+        self.loop = loop
+        self.duration = sum(hold for _, hold in self.keyframes)
+
+    def keyframe_at(self, elapsed):
+        """Returns the index of the keyframe showing `elapsed` seconds in, or None once it's over."""
+        if self.loop and self.duration > 0:
+            elapsed %= self.duration
+        for index, (_, hold) in enumerate(self.keyframes):
+            if elapsed < hold:
+                return index
+            elapsed -= hold
+        return None
+
+def blink_animation():
+    """Closes the eyes for BLINK_DURATION, then opens them."""
+    return Animation("blink", [
+        (lambda: display.eyes_frame(blink=True), display.BLINK_DURATION),
+        (display.eyes_frame, display.BLINK_DURATION),
+    ])
+
+def look_around_animation(steps=5, hold=0.5):
+    """The same random glances as display.look_around(), without blocking."""
+    keyframes = []
+    for _ in range(steps):
+        offsets = [random.randint(-display.EYE_RADIUS, display.EYE_RADIUS) for _ in range(4)]
+        keyframes.append((lambda offsets=offsets: display.eyes_frame(*offsets), hold))
+    return Animation("look_around", keyframes)
+
+def face_animation(name, hold=1.0):
+    """Shows one of display.FACES for `hold` seconds."""
+    return Animation(f"face_{name}", [(lambda: display.face_frame(name), hold)])
+
+def idle_animation(interval=display.LOOK_AROUND_INTERVAL):
+    """Open eyes with a blink every `interval` seconds, forever."""
+    return Animation("idle", [
+        (display.eyes_frame, interval),
+        (lambda: display.eyes_frame(blink=True), display.BLINK_DURATION),
+    ], loop=True)
+
+# --- Engine ---
+
+class AnimationEngine:
+    """
+    Plays animations on a background thread at a fixed frame rate.
+
+    Each tick works out which keyframe is due and pushes it only when it changes,
+    so a held frame costs nothing. Ticks run on absolute deadlines; a tick that
+    comes round too late to be shown on time is counted as dropped and skipped,
+    rather than making every later frame late too. Callers only queue, replace or
+    cancel animations, which never blocks them.
+    """
+
+    def __init__(self, push=None, fps=c.ANIMATION["FPS"], frame_budget=c.ANIMATION["FRAME_BUDGET"],
+                 clock=time.perf_counter):
+        self.push = push or display.show_frame
+        self.period = 1.0 / fps
+        self.frame_budget = frame_budget
+        self.clock = clock
+
+        self.queue = deque()
+        self.current = None
+        self.started_at = 0.0
+        self.shown = None  # (animation, keyframe index) last pushed
+
+        # --- Statistics ---
+        self.frames_pushed = 0
+        self.frames_dropped = 0
+        self.over_budget = 0
+        self.render_times = deque(maxlen=c.ANIMATION["STATS_WINDOW"])
+        self.push_times = deque(maxlen=c.ANIMATION["STATS_WINDOW"])
+
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    # --- Control ---
+
+    def play(self, animation):
+        """Queues an animation to play after the ones already queued."""
+        with self._condition:
+            self.queue.append(animation)
+            self._condition.notify()
+
+    def replace(self, animation):
+        """Drops the queue and the current animation and plays this one now."""
+        with self._condition:
+            self.queue.clear()
+            self.current = None
+            self.queue.append(animation)
+            self._condition.notify()
+
+    def cancel(self):
+        """Stops the current animation and clears the queue. The last frame stays up."""
+        with self._condition:
+            self.queue.clear()
+            self.current = None
+
+    def is_playing(self):
+        with self._condition:
+            return self.current is not None or bool(self.queue)
+
+    def start(self):
+        """Starts the animation thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="animation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the animation thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- Frames ---
+
+    def _due(self, now):
+        """Returns the keyframe due now as (animation, index), moving through the queue as animations end."""
+        with self._condition:
+            while True:
+                if self.current is None:
+                    if not self.queue:
+                        return None
+                    self.current = self.queue.popleft()
+                    self.started_at = now
+                index = self.current.keyframe_at(now - self.started_at)
+                if index is not None:
+                    return self.current, index
+                self.current = None
+
+    def tick(self, now=None):
+        """
+        Shows whichever keyframe is due, if it isn't already showing.
+
+        The thread calls this every frame; it can also be driven from a control loop
+        instead of starting the thread.
+        """
+        now = self.clock() if now is None else now
+        due = self._due(now)
+        if due is None or due == self.shown:
+            return
+        animation, index = due
+        frame, _ = animation.keyframes[index]
+
+        start = self.clock()
+        if callable(frame):
+            frame = frame()
+        rendered = self.clock()
+        self.push(frame)
+        pushed = self.clock()
+
+        self.shown = due
+        self.frames_pushed += 1
+        self.render_times.append(rendered - start)
+        self.push_times.append(pushed - rendered)
+        if pushed - start > self.frame_budget:
+            self.over_budget += 1
+
+    def _run(self):
+        next_tick = self.clock()
+        while True:
+            with self._condition:
+                # Sleep until there is something to play
+                while self._running and self.current is None and not self.queue:
+                    self._condition.wait()
+                    next_tick = self.clock()
+                if not self._running:
+                    return
+
+            self.tick()
+
+            next_tick += self.period
+            late = self.clock() - next_tick
+            if late > 0:
+                # Missed deadlines: drop those frames and carry on from the next one
+                missed = int(late / self.period) + 1
+                self.frames_dropped += missed
+                next_tick += missed * self.period
+            with self._condition:
+                if self._running:
+                    self._condition.wait(max(0.0, next_tick - self.clock()))
+
+    def stats(self):
+        """Returns frame counts and render/push times (ms) over the last STATS_WINDOW frames."""
+        def summary(times):
+            if not times:
+                return 0.0, 0.0
+            return sum(times) / len(times) * 1000, max(times) * 1000
+
+        render_mean, render_max = summary(self.render_times)
+        push_mean, push_max = summary(self.push_times)
+        return {
+            "frames_pushed": self.frames_pushed,
+            "frames_dropped": self.frames_dropped,
+            "over_budget": self.over_budget,
+            "render_ms_mean": render_mean,
+            "render_ms_max": render_max,
+            "push_ms_mean": push_mean,
+            "push_ms_max": push_max,
+        }
+
+# Declare the engine as a global variable
+engine = None
+
+def initialize_animation():
+    """Starts the animation engine on the display. Call display.initialize_display() first."""
+    global engine
+    if display.display is None:
+        print("Display not initialized, animations disabled.")
+        return None
+    engine = AnimationEngine()
+    engine.start()
+    return engine
@@ -0,0 +1,97 @@
+# animation_bench.py
+# Runs a 50 Hz control loop while the face animates, once with the old blocking
+# display.look_around()/blink() called from the loop and once with the
+# AnimationEngine thread, and reports how late the loop's ticks ran and how the
+# engine kept up. Uses the simulated SSD1306, with each push also taking as long
+# as its bytes would on a 400 kHz I2C bus.
+# Runs anywhere - no robot hardware needed.
+
+import time
+import hal
+
+hal.use("sim")
+
+import config as c
+import display as d
+import animation
+
+RUN_TIME = 6.0
+I2C_SECONDS_PER_BYTE = 9 / 400_000
+WORK = 0.002  # Seconds of sensor reading and control work per tick
+
+def timed_push(frame):
+    """Pushes through the partial-update driver, then waits out the simulated bus time."""
+    sent = d.panel.push(frame)
+    time.sleep(sent * I2C_SECONDS_PER_BYTE)
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def control_loop(on_tick):
+    """A fixed-rate loop; returns how late each tick started and the longest gap between ticks, in seconds."""
+    period = c.CONTROL_LOOP["TICK"]
+    lateness = []
+    starts = []
+    start = time.perf_counter()
+    next_tick = start
+    tick = 0
+    while time.perf_counter() - start < RUN_TIME:
+        starts.append(time.perf_counter())
+        lateness.append(max(0.0, starts[-1] - next_tick))
+        busy(WORK)
+        on_tick(tick)
+        tick += 1
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return lateness, max(b - a for a, b in zip(starts, starts[1:]))
+
+def report(name, result):
+    lateness, longest_gap = result
+    lateness = sorted(lateness)
+    p99 = lateness[int(len(lateness) * 0.99)]
+    print(f"{name:<10} | {len(lateness):5} ticks | late p99 {p99 * 1000:8.2f} ms | worst {lateness[-1] * 1000:8.1f} ms | "
+          f"longest gap {longest_gap * 1000:7.1f} ms")
+
+def blocking_tick(tick):
+    # The old way: the loop itself runs the animation, sleeping in real time
+    if tick % 100 == 0:
+        d.look_around()
+    elif tick % 100 == 50:
+        d.blink()
+
+if __name__ == "__main__":
+    d.initialize_display()
+    d.prerender()
+    print(f"{RUN_TIME:.0f} s of a {1 / c.CONTROL_LOOP['TICK']:.0f} Hz control loop "
+          f"with {WORK * 1000:.0f} ms of work per tick\n")
+
+    d.time = time  # Let the blocking animations really sleep
+    report("blocking", control_loop(blocking_tick))
+
+    engine = animation.AnimationEngine(push=timed_push)
+    engine.start()
+    engine.play(animation.idle_animation())
+
+    def engine_tick(tick):
+        if tick % 100 == 0:
+            engine.replace(animation.look_around_animation())
+            engine.play(animation.idle_animation())
+        elif tick % 100 == 50:
+            engine.play(animation.face_animation("happy", 0.5))
+        elif tick % 100 == 75:
+            engine.cancel()
+            engine.play(animation.blink_animation())
+
+    report("engine", control_loop(engine_tick))
+    engine.stop()
+
+    stats = engine.stats()
+    print(f"\nengine at {c.ANIMATION['FPS']} FPS: {stats['frames_pushed']} frames pushed, "
+          f"{stats['frames_dropped']} dropped, {stats['over_budget']} over the "
+          f"{c.ANIMATION['FRAME_BUDGET'] * 1000:.0f} ms budget")
+    print(f"render {stats['render_ms_mean']:.3f} ms mean / {stats['render_ms_max']:.3f} ms max, "
+          f"push {stats['push_ms_mean']:.2f} ms mean / {stats['push_ms_max']:.2f} ms max")
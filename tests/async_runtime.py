@@ -0,0 +1,284 @@
+# async_runtime.py
+
+import asyncio
+import random
+import time
+import config as c
+import servo_control as sc
+
+# --- Sound Effects ---
+# (frequency, duration) pairs; a frequency of 0 is a rest. These match the
+# blocking Buzzer.play_obstacle_sound / play_edge_sound helpers.
+OBSTACLE_SOUND = [(200, 0.1), (0, 0.1), (200, 0.1)]
+EDGE_SOUND = [(800, 0.1), (0, 0.1), (300, 0.2)]
+TOUCH_SOUND = [(500, 0.1)]
+
+# asyncio.sleep() waits on the event loop's clock, time.monotonic, even on the
+# simulated backend, where nothing advances hal.clock while the runtime runs. The
+# runtime and the Movement it drives must both time things with it, or ramps
+# started by one never finish by the other: Movement(pca, clock=async_runtime.CLOCK).
+CLOCK = time.monotonic
+
+class Sensors:
+    """The sensor read functions the runtime polls once per tick.
+
+    Passing functions in (rather than importing robot.py here) lets the runtime
+    run against simulated sensors as well as the real GPIO ones.
+    """
+
+    def __init__(self, get_distance, read_edge_sensors, is_touched, is_sound_detected):
+        self.get_distance = get_distance
+        self.read_edge_sensors = read_edge_sensors
+        self.is_touched = is_touched
+        self.is_sound_detected = is_sound_detected
+
+class AsyncRuntime:
+    """Runs Gismo's sensing, motion and reactions as separate asyncio coroutines.
+
+    Sensors are read every tick no matter what the robot is doing. Each reaction
+    runs as its own task and only awaits, never sleeps, so an edge reading can
+    cancel whatever reaction is in progress and stop the motors on the same tick.
+    """
+
+    def __init__(self, movement, sensors, rgb_led=None, buzzer=None, pca=None, sound_tune=(),
+                 tick=c.CONTROL_LOOP["TICK"], clock=CLOCK):
+        if movement.ramp.clock != clock:
+            raise ValueError("movement must ramp on the runtime's clock (Movement(pca, clock=CLOCK))")
+        self.movement = movement
+        self.sensors = sensors
+        self.rgb_led = rgb_led
+        self.buzzer = buzzer
+        self.pca = pca  # For the servos; arm and head moves are skipped when None
+        self.sound_tune = sound_tune
+        self.tick = tick
+        self.clock = clock
+
+        self.readings = {
+            "time": 0.0,
+            "distance": 999.99,
+            "left_edge": 0,
+            "right_edge": 0,
+            "touched": False,
+            "sound": False,
+        }
+        self.reaction = None
+        self.reaction_name = None
+        self.led_task = None
+        self.last_turn = clock()
+        self.running = False
+
+        # Edge-to-stop latency in seconds, measured from the sensor read that saw the edge
+        self.edge_latencies = []
+
+    # --- Main Coroutines ---
+
+    async def run(self):
+        """Runs the sensing, motion and behavior coroutines until stop() is called."""
+        self.running = True
+        try:
+            await asyncio.gather(self.sense(), self.motion(), self.behave())
+        finally:
+            self.cancel_reaction()
+            self.movement.drive(0, 0, ramp_time=0)
+            if self.buzzer is not None:
+                self.buzzer.stop_tone()
+
+    def stop(self):
+        """Asks every coroutine to finish at the end of its current tick."""
+        self.running = False
+
+    async def sense(self):
+        """Reads every sensor once per tick and pre-empts the current reaction on an edge."""
+        while self.running:
+            read_time = self.clock()
+            left_edge, right_edge = self.sensors.read_edge_sensors()
+            self.readings.update(
+                time=read_time,
+                distance=self.sensors.get_distance(),
+                left_edge=left_edge,
+                right_edge=right_edge,
+                touched=self.sensors.is_touched(),
+                sound=self.sensors.is_sound_detected(),
+            )
+
+            if (left_edge == 1 or right_edge == 1) and not self.reacting_to("edge"):
+                self.cancel_reaction()
+                self.movement.drive(0, 0, ramp_time=0)  # Stop now, don't ramp towards the edge
+                self.edge_latencies.append(self.clock() - read_time)
+                self.start_reaction("edge", self.escape_edge(left_edge, right_edge))
+
+            await asyncio.sleep(self.tick)
+
+    async def motion(self):
+        """Advances the motor ramps once per tick."""
+        while self.running:
+            self.movement.update()
+            await asyncio.sleep(self.tick)
+
+    async def behave(self):
+        """Starts a new reaction when the robot is idle or only wandering.
+
+        Priority follows main_0.35.py: sound > touch > obstacle > wander. Edges are
+        handled straight from sense() so they never wait for this coroutine.
+        """
+        while self.running:
+            idle = self.reaction is None or self.reaction.done()
+            readings = self.readings
+            at_edge = readings["left_edge"] == 1 or readings["right_edge"] == 1
+            if (idle or self.reaction_name == "wander") and not at_edge:
+                if readings["sound"]:
+                    self.start_reaction("sound", self.react_to_sound())
+                elif readings["touched"]:
+                    self.start_reaction("touch", self.react_to_touch())
+                elif readings["distance"] < c.MOVEMENT_SETTINGS["OBSTACLE_DISTANCE"]:
+                    self.start_reaction("obstacle", self.avoid_obstacle())
+                elif idle:
+                    self.start_reaction("wander", self.wander())
+            await asyncio.sleep(self.tick)
+
+    # --- Reaction Management ---
+
+    def start_reaction(self, name, coro):
+        """Cancels the reaction in progress (if any) and starts a new one."""
+        self.cancel_reaction()
+        self.reaction_name = name
+        self.reaction = asyncio.ensure_future(self._run_reaction(coro))
+
+    def reacting_to(self, name):
+        """Returns True while the named reaction is still running."""
+        return self.reaction_name == name and self.reaction is not None and not self.reaction.done()
+
+    def cancel_reaction(self):
+        """Cancels the reaction in progress, if any."""
+        if self.reaction is not None and not self.reaction.done():
+            self.reaction.cancel()
+        self.reaction = None
+        self.reaction_name = None
+
+    async def _run_reaction(self, coro):
+        try:
+            await coro
+        finally:
+            # Whatever interrupted us, don't leave the buzzer sounding
+            if self.buzzer is not None:
+                self.buzzer.stop_tone()
+
+    # --- Building Blocks ---
+
+    async def wait_for_ramp(self):
+        """Waits until both motors have reached their target speeds."""
+        while self.movement.is_ramping():
+            await asyncio.sleep(self.tick)
+
+    async def drive_for(self, right_speed, left_speed, duration):
+        """Ramps to the given speeds, holds them for `duration`, then ramps to a stop."""
+        self.movement.drive(right_speed, left_speed)
+        await self.wait_for_ramp()
+        await asyncio.sleep(duration)
+        self.movement.drive(0, 0)
+        await self.wait_for_ramp()
+
+    async def turn(self, left, duration=c.MOVEMENT_SETTINGS["TURN_DURATION"], speed=c.MOVEMENT_SETTINGS["TURN_SPEED"]):
+        """Turns in place, left or right."""
+        if left:
+            await self.drive_for(speed, -speed, duration)
+        else:
+            await self.drive_for(-speed, speed, duration)
+
+    async def play_notes(self, notes, gap=0.0):
+        """Plays (frequency, duration) pairs on the buzzer without blocking the loop."""
+        if self.buzzer is None:
+            return
+        try:
+            for frequency, duration in notes:
+                if frequency > 0:
+                    self.buzzer.start_tone(frequency)
+                await asyncio.sleep(duration)
+                self.buzzer.stop_tone()
+                if gap:
+                    await asyncio.sleep(gap)
+        finally:
+            self.buzzer.stop_tone()
+
+    def show_emotion(self, emotion):
+        """Sets the LED emotion on its own task so flashing never holds up a reaction."""
+        if self.rgb_led is None:
+            return
+        if self.led_task is not None and not self.led_task.done():
+            self.led_task.cancel()
+        self.led_task = asyncio.ensure_future(self._show_emotion(emotion))
+
+    async def _show_emotion(self, emotion):
+        if emotion == "surprised":
+            # Same flash pattern as RGBLed.set_emotion("surprised"), without the sleeps
+            cyan, off = self.rgb_led.colors["CYAN"], self.rgb_led.colors["OFF"]
+            for color, hold in ((cyan, 0.5), (off, 0.2), (cyan, 0.5), (off, 0.2)):
+                self.rgb_led.set_color(*color)
+                await asyncio.sleep(hold)
+            self.rgb_led.set_color(*cyan)
+        else:
+            self.rgb_led.set_emotion(emotion)
+
+    def move_servos(self, action):
+        """Runs a servo_control helper if the servos are available."""
+        if self.pca is not None:
+            action(self.pca)
+
+    # --- Reactions ---
+
+    async def react_to_sound(self):
+        """Turns, moves, and plays a tune, like react_to_sound() in main_0.35.py."""
+        print("Sound detected! Reacting...")
+        await self.turn(left=True, duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 2)
+        await self.drive_for(c.MOVEMENT_SETTINGS["FORWARD_SPEED"], c.MOVEMENT_SETTINGS["FORWARD_SPEED"],
+                             c.MOVEMENT_SETTINGS["MOVE_DURATION"])
+        self.show_emotion("surprised")
+        await self.play_notes(self.sound_tune, gap=0.05)
+        await asyncio.sleep(0.5)
+        self.show_emotion("neutral")
+
+    async def react_to_touch(self):
+        """Wiggles and chirps when touched."""
+        print("Touched! Wiggling...")
+        await self.turn(left=True, duration=0.25)
+        await self.turn(left=False, duration=0.25)
+        self.show_emotion("happy")
+        await self.play_notes(TOUCH_SOUND)
+        await asyncio.sleep(0.5)
+        self.show_emotion("neutral")
+
+    async def avoid_obstacle(self):
+        """Stops, raises the arms and looks up, then turns a random way."""
+        print("Obstacle detected!")
+        self.movement.drive(0, 0)
+        await self.wait_for_ramp()
+        self.move_servos(sc.raise_arms)
+        await asyncio.sleep(0.5)
+        self.move_servos(sc.move_head_up)
+        self.show_emotion("surprised")
+        await self.play_notes(OBSTACLE_SOUND)
+        await asyncio.sleep(0.5)
+        self.move_servos(sc.move_head_center)
+        self.move_servos(sc.lower_arms)
+        await self.turn(left=random.choice([True, False]))
+
+    async def escape_edge(self, left_edge, right_edge):
+        """Turns away from the edge that was seen."""
+        if left_edge == 1:
+            print("Left edge detected! Turning right...")
+            await self.turn(left=False)
+        else:
+            print("Right edge detected! Turning left...")
+            await self.turn(left=True)
+        self.show_emotion("angry")
+        await self.play_notes(EDGE_SOUND)
+
+    async def wander(self):
+        """Moves forward, turning a random way every 5 seconds."""
+        self.show_emotion("searching")
+        if self.clock() - self.last_turn > 5:
+            await self.turn(left=random.choice([True, False]))
+            self.last_turn = self.clock()
+        else:
+            await self.drive_for(c.MOVEMENT_SETTINGS["FORWARD_SPEED"], c.MOVEMENT_SETTINGS["FORWARD_SPEED"],
+                                 c.MOVEMENT_SETTINGS["MOVE_DURATION"])
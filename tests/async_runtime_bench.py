@@ -0,0 +1,110 @@
+# async_runtime_bench.py
+# Measures edge-to-stop latency of the asyncio runtime with simulated sensors.
+# A table edge appears part way through the sound reaction (the Imperial March),
+# which in the blocking main_0.35.py loop would not be seen until the tune ended.
+# Runs anywhere - no robot hardware needed.
+
+import asyncio
+import random
+import time
+import config as c
+import movement as m
+import async_runtime as ar
+
+TRIALS = 10
+# Stand-in for buzzer.TUNE_IMPERIAL_MARCH (buzzer.py needs RPi.GPIO to import)
+SOUND_TUNE = [(440, 0.5)] * 14
+
+class RecordingChannel:
+    """A fake PCA9685 channel that tells its PCA whenever it is written."""
+
+    def __init__(self, pca):
+        self.pca = pca
+        self._duty_cycle = 0
+
+    @property
+    def duty_cycle(self):
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        self._duty_cycle = value
+        self.pca.on_write()
+
+class FakePCA:
+    """Records the first time all motor channels are zero after the edge appears."""
+
+    def __init__(self, world):
+        self.world = world
+        self.channels = [RecordingChannel(self) for _ in range(16)]
+        self.stop_time = None
+
+    def on_write(self):
+        now = time.monotonic()
+        if self.stop_time is None and now >= self.world.edge_time and self.motors_stopped():
+            self.stop_time = now
+
+    def motors_stopped(self):
+        return all(self.channels[pin].duty_cycle == 0 for pin in c.MOTOR_DRIVER_PINS.values())
+
+class FakeBuzzer:
+    def start_tone(self, frequency):
+        pass
+
+    def stop_tone(self):
+        pass
+
+class SimulatedWorld:
+    """Sound is heard at the start; an edge appears once place_edge() is called."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.edge_time = float("inf")
+
+    def place_edge(self):
+        self.edge_time = time.monotonic()
+
+    def read_edge_sensors(self):
+        return (1, 0) if time.monotonic() >= self.edge_time else (0, 0)
+
+    def get_distance(self):
+        return 999.99
+
+    def is_touched(self):
+        return False
+
+    def is_sound_detected(self):
+        return time.monotonic() - self.start < 0.1
+
+async def run_trial(edge_delay):
+    world = SimulatedWorld()
+    pca = FakePCA(world)
+    sensors = ar.Sensors(world.get_distance, world.read_edge_sensors, world.is_touched, world.is_sound_detected)
+    runtime = ar.AsyncRuntime(m.Movement(pca, clock=ar.CLOCK), sensors, buzzer=FakeBuzzer(), sound_tune=SOUND_TUNE)
+
+    task = asyncio.ensure_future(runtime.run())
+    # Place the edge after `edge_delay`, at a moment when the wheels are turning
+    while time.monotonic() - world.start < edge_delay or pca.motors_stopped():
+        await asyncio.sleep(0.001)
+    world.place_edge()
+    while not runtime.edge_latencies:
+        await asyncio.sleep(0.001)
+    runtime.stop()
+    await task
+    return pca.stop_time - world.edge_time
+
+async def main():
+    latencies = []
+    for _ in range(TRIALS):
+        # Land the edge while the robot is turning or driving during the sound reaction
+        latencies.append(await run_trial(random.uniform(0.2, 2.0)))
+
+    latencies.sort()
+    tune_length = sum(duration + 0.05 for _, duration in SOUND_TUNE)
+    print(f"Control tick: {c.CONTROL_LOOP['TICK'] * 1000:.0f} ms, trials: {TRIALS}")
+    print(f"Edge-to-stop latency: mean {sum(latencies) / len(latencies) * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms")
+    print(f"Blocking loop worst case (sound reaction): over {tune_length:.1f} s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
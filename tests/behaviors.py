@@ -0,0 +1,428 @@
+# behaviors.py
+
+import random
+import time
+from collections import deque
+import numpy as np
+from hal import clock as hal_clock
+import config as c
+import servo_control as sc
+
+# --- Behavior Arbitration ---
+# main_0.35.py chose what to do with an if/elif cascade and then ran the chosen
+# reaction to the end, blocking, so nothing else was looked at until it finished.
+# Here each reaction is a Behavior with a priority, and an Arbiter ticks them:
+#
+#   1. read every sensor once into `readings`;
+#   2. ask the behaviors, highest priority first, whether they want control - the
+#      one in control keeps it by saying yes until its plan is done;
+#   3. step the winner's plan, which gives this tick's motor speeds, and send them
+#      to the Movement if they changed.
+#
+# A behavior's plan is a list of timed Segments (wheel speeds held for a while,
+# with an optional action such as a sound or a servo move at the start), so
+# stepping one never blocks. A higher priority behavior that wants control wins
+# the very next tick, and the one it interrupted is told so and dropped.
+#
+# The arbiter times every behavior's share of each tick in thread CPU time and
+# counts activations and pre-emptions. It also holds step 2 to a budget: if the
+# checks run over, the behavior already in control keeps it for the tick.
+
+SETTINGS = c.BEHAVIORS
+PRIORITIES = SETTINGS["PRIORITIES"]
+MOVE = c.MOVEMENT_SETTINGS
+
+class Segment:
+    """Part of a behavior's plan: wheel speeds held for `duration` seconds."""
+
+    __slots__ = ("right", "left", "duration", "ramp_time", "action")
+
+    def __init__(self, right, left, duration, ramp_time=MOVE["RAMP_TIME"], action=None):
+        self.right = right
+        self.left = left
+        self.duration = duration
+        self.ramp_time = ramp_time  # 0 to change speed at once
+        self.action = action  # Called with no arguments when the segment starts
+
+    def command(self):
+        return self.right, self.left, self.ramp_time
+
+class Behavior:
+    """
+    Something the robot can do, run a tick at a time by an Arbiter.
+
+    Subclasses override wants_control() (is this behavior's trigger there now?) and
+    plan() (the Segments to run once it has control). Both must be quick: they run
+    inside the arbiter's tick.
+    """
+
+    name = "behavior"
+
+    def __init__(self, priority=None):
+        self.priority = PRIORITIES.get(self.name, 0) if priority is None else priority
+        self.segments = None  # The plan being run, None when idle
+        self.index = 0
+        self.segment_end = 0.0
+
+        # --- Statistics ---
+        self.activations = 0  # Times it took control
+        self.preempted = 0  # Times a higher priority behavior took control from it
+        self.ticks = 0  # Ticks in control
+        self.cpu_time = 0.0  # Thread CPU seconds spent in its checks and steps
+
+    def wants_control(self, readings, now):
+        """True if the behavior should run now, given this tick's sensor readings."""
+        return False
+
+    def plan(self, readings, now):
+        """Returns the list of Segments to run, starting now."""
+        return []
+
+    def stopped(self, preempted):
+        """Called when the behavior loses control, either finished or pre-empted."""
+
+    # --- Running ---
+
+    def is_running(self):
+        return self.segments is not None
+
+    def start(self, readings, now):
+        self.segments = self.plan(readings, now)
+        self.index = -1
+        self.segment_end = now
+        self.activations += 1
+
+    def step(self, now):
+        """Returns this tick's (right, left, ramp_time), or None once the plan is done."""
+        while now >= self.segment_end:
+            self.index += 1
+            if self.index >= len(self.segments):
+                return None
+            segment = self.segments[self.index]
+            self.segment_end += segment.duration
+            if segment.action is not None:
+                segment.action()
+        return self.segments[self.index].command()
+
+    def stop(self, preempted):
+        self.segments = None
+        if preempted:
+            self.preempted += 1
+        self.stopped(preempted)
+
+# --- Behaviors ---
+# The main_0.35.py reactions as plans. Their LED, sound and servo moves go through
+# Effects, where any of the three can be left out (None).
+
+class Effects:
+    """The LED, sounds and servos behaviors use for show, any of which may be missing."""
+
+    def __init__(self, rgb_led=None, sequencer=None, pca=None):
+        self.rgb_led = rgb_led
+        self.sequencer = sequencer
+        self.pca = pca
+
+    def emotion(self, emotion):
+        def action():
+            if self.rgb_led is not None:
+                # set_emotion("surprised") flashes with sleeps; the color alone doesn't block
+                if emotion == "surprised":
+                    self.rgb_led.set_color(*self.rgb_led.colors["CYAN"])
+                else:
+                    self.rgb_led.set_emotion(emotion)
+        return action
+
+    def sound(self, notes, priority, tune=False):
+        def action():
+            if self.sequencer is not None:
+                if tune:
+                    self.sequencer.play_tune(notes, priority)
+                else:
+                    self.sequencer.play(notes, priority)
+        return action
+
+    def servos(self, *moves):
+        def action():
+            if self.pca is not None:
+                for move in moves:
+                    move(self.pca)
+        return action
+
+def _turn(left, duration=MOVE["TURN_DURATION"], speed=MOVE["TURN_SPEED"], action=None):
+    """A Segment turning in place."""
+    if left:
+        return Segment(speed, -speed, duration, action=action)
+    return Segment(-speed, speed, duration, action=action)
+
+def _stop(duration, action=None, ramp_time=MOVE["RAMP_TIME"]):
+    return Segment(0.0, 0.0, duration, ramp_time, action)
+
+class EdgeEscape(Behavior):
+    """Stops at once at a table edge and turns away from it."""
+
+    name = "edge_escape"
+
+    def __init__(self, effects, sounds=(), priority=None):
+        super().__init__(priority)
+        self.effects = effects
+        self.sounds = sounds  # (notes, priority) of the edge sound
+
+    def wants_control(self, readings, now):
+        return readings["left_edge"] == 1 or readings["right_edge"] == 1
+
+    def plan(self, readings, now):
+        left = readings["left_edge"] != 1  # Turn away: right for a left edge
+        turn = _turn(left, action=self.effects.emotion("angry"))
+        turn.ramp_time = 0  # Straight into the turn; no ramping down towards the edge first
+        return [turn, _stop(0.0, self.effects.sound(*self.sounds) if self.sounds else None)]
+
+class ReactToSound(Behavior):
+    """Turns, moves forward and plays a tune, like react_to_sound() in main_0.35.py."""
+
+    name = "sound"
+
+    def __init__(self, effects, tune=(), tune_priority=0, priority=None):
+        super().__init__(priority)
+        self.effects = effects
+        self.tune = tune
+        self.tune_priority = tune_priority
+        self.taken = None  # Time of the readings last reacted to
+
+    def wants_control(self, readings, now):
+        # is_sound_detected() latches until read, so a reading is one trigger: not again once reacted to
+        return bool(readings["sound"]) and readings["time"] != self.taken
+
+    def plan(self, readings, now):
+        self.taken = readings["time"]
+        return [_turn(True, MOVE["TURN_DURATION"] * 2),
+                Segment(MOVE["FORWARD_SPEED"], MOVE["FORWARD_SPEED"], MOVE["MOVE_DURATION"] + MOVE["RAMP_TIME"]),
+                _stop(0.5, self.effects.emotion("surprised")),
+                _stop(0.0, self.effects.sound(self.tune, self.tune_priority, tune=True)),
+                _stop(0.5),
+                _stop(0.0, self.effects.emotion("neutral"))]
+
+class ReactToTouch(Behavior):
+    """Wiggles, looks happy and chirps when touched."""
+
+    name = "touch"
+
+    def __init__(self, effects, sounds=(), priority=None):
+        super().__init__(priority)
+        self.effects = effects
+        self.sounds = sounds
+        self.taken = None
+
+    def wants_control(self, readings, now):
+        # is_touched() latches until read, so a reading is one trigger: not again once reacted to
+        return bool(readings["touched"]) and readings["time"] != self.taken
+
+    def plan(self, readings, now):
+        self.taken = readings["time"]
+        return [_turn(True, 0.25), _turn(False, 0.25),
+                _stop(0.5, self.effects.emotion("happy")),
+                _stop(0.0, self.effects.sound(*self.sounds) if self.sounds else None),
+                _stop(0.5),
+                _stop(0.0, self.effects.emotion("neutral"))]
+
+class AvoidObstacle(Behavior):
+    """Stops, raises the arms and looks up, then turns a random way."""
+
+    name = "avoid_obstacle"
+
+    def __init__(self, effects, sounds=(), distance=MOVE["OBSTACLE_DISTANCE"], priority=None):
+        super().__init__(priority)
+        self.effects = effects
+        self.sounds = sounds
+        self.distance = distance
+
+    def wants_control(self, readings, now):
+        return readings["distance"] < self.distance
+
+    def plan(self, readings, now):
+        effects = self.effects
+        alarm = effects.sound(*self.sounds) if self.sounds else None
+        return [_stop(0.5, effects.servos(sc.raise_arms)),
+                _stop(0.5, effects.servos(sc.move_head_up)),
+                _stop(0.0, effects.emotion("surprised")),
+                _stop(0.0, alarm),
+                _turn(random.choice([True, False]), action=effects.servos(sc.move_head_center, sc.lower_arms))]
+
+class Wander(Behavior):
+    """Drives forward, turning a random way every WANDER_TURN_EVERY seconds. Always wants control."""
+
+    name = "wander"
+
+    def __init__(self, effects, turn_every=SETTINGS["WANDER_TURN_EVERY"], priority=None):
+        super().__init__(priority)
+        self.effects = effects
+        self.turn_every = turn_every
+        self.last_turn = None
+
+    def wants_control(self, readings, now):
+        return True
+
+    def plan(self, readings, now):
+        if self.last_turn is None:
+            self.last_turn = now
+        # Drive until the next turn is due, then turn; anything more important interrupts
+        segments = []
+        remaining = self.last_turn + self.turn_every - now
+        if remaining > 0:
+            segments.append(Segment(MOVE["FORWARD_SPEED"], MOVE["FORWARD_SPEED"], remaining,
+                                    action=self.effects.emotion("searching")))
+        segments.append(_turn(random.choice([True, False]), action=self._turned))
+        return segments
+
+    def _turned(self):
+        self.last_turn += self.turn_every
+
+def default_behaviors(rgb_led=None, sequencer=None, pca=None, sounds=None, tune=()):
+    """
+    The main_0.35.py reactions as behaviors.
+
+    Args:
+        sounds: Dict of "edge", "touch" and "obstacle" -> (notes, sequencer priority).
+        tune: The tune react-to-sound plays, as (notes, sequencer priority).
+    """
+    effects = Effects(rgb_led, sequencer, pca)
+    sounds = sounds or {}
+    tune_notes, tune_priority = tune if tune else ((), 0)
+    return [EdgeEscape(effects, sounds.get("edge", ())), ReactToSound(effects, tune_notes, tune_priority),
+            ReactToTouch(effects, sounds.get("touch", ())), AvoidObstacle(effects, sounds.get("obstacle", ())),
+            Wander(effects)]
+
+# --- Arbiter ---
+
+class Arbiter:
+    """Gives control of the motors to the highest priority behavior that wants it, one tick at a time."""
+
+    def __init__(self, movement, sensors, behaviors=(), budget=SETTINGS["BUDGET"], clock=hal_clock.monotonic):
+        """
+        Args:
+            movement: The Movement to drive.
+            sensors: An async_runtime.Sensors (the four sensor read functions).
+            behaviors: Behaviors to register.
+            budget: Seconds of each tick the behavior checks may take.
+        """
+        self.movement = movement
+        self.sensors = sensors
+        self.behaviors = []
+        self.budget = budget
+        self.clock = clock
+        self.current = None
+        self.command = None  # The (right, left, ramp_time) last sent
+        self.readings = {"time": 0.0, "distance": c.ULTRASONIC["NO_READING"], "left_edge": 0, "right_edge": 0,
+                         "touched": False, "sound": False}
+        self.listeners = []  # Called with (now, previous, winner) whenever control changes hands
+
+        # --- Statistics ---
+        self.tick_count = 0
+        self.over_budget = 0  # Ticks whose checks ran out of budget before every behavior was asked
+        self.decision_times = deque(maxlen=SETTINGS["STATS_WINDOW"])  # Seconds spent choosing and stepping
+        for behavior in behaviors:
+            self.add(behavior)
+
+    def add(self, behavior):
+        """Registers a behavior. Equal priorities go in the order they were added."""
+        self.behaviors.append(behavior)
+        self.behaviors.sort(key=lambda b: -b.priority)
+        return behavior
+
+    def read_sensors(self, now):
+        readings = self.readings
+        left_edge, right_edge = self.sensors.read_edge_sensors()
+        readings.update(time=now, distance=self.sensors.get_distance(), left_edge=left_edge, right_edge=right_edge,
+                        touched=self.sensors.is_touched(), sound=self.sensors.is_sound_detected())
+        return readings
+
+    def tick(self, now=None):
+        """Reads the sensors, picks the behavior in control and sends its motor command. Returns the behavior."""
+        if now is None:
+            now = self.clock()
+        readings = self.read_sensors(now)
+        started = time.perf_counter()
+        self.tick_count += 1
+
+        restarted = set()
+        finished = set()
+        while True:
+            winner = self._choose(readings, now, started, skip=finished)
+            if winner is not self.current:
+                self._hand_over(winner, readings, now)
+            if winner is None:
+                command = (0.0, 0.0, MOVE["RAMP_TIME"])
+                break
+            cpu = time.thread_time()
+            command = winner.step(now)
+            winner.cpu_time += time.thread_time() - cpu
+            if command is not None:
+                winner.ticks += 1
+                break
+            # Finished its plan: choose again this tick. It may start over if it still
+            # wants control, but only once, so an empty plan can't hold up the tick
+            winner.stop(preempted=False)
+            self.current = None
+            (finished if winner in restarted else restarted).add(winner)
+
+        if command != self.command:
+            self.movement.drive(*command)
+            self.command = command
+        self.movement.update(now)
+        self.decision_times.append(time.perf_counter() - started)
+        return self.current
+
+    def _choose(self, readings, now, started, skip=()):
+        """The highest priority behavior that wants control (or the one that has it, if out of budget)."""
+        for behavior in self.behaviors:
+            if behavior in skip:
+                continue
+            if behavior is self.current:
+                return behavior  # Keeps control until its plan is done; nothing above it wanted in
+            cpu = time.thread_time()
+            wants = behavior.wants_control(readings, now)
+            behavior.cpu_time += time.thread_time() - cpu
+            if wants:
+                return behavior
+            if self.current is not None and time.perf_counter() - started > self.budget:
+                self.over_budget += 1
+                return self.current
+        return None
+
+    def _hand_over(self, winner, readings, now):
+        previous = self.current
+        if previous is not None:
+            previous.stop(preempted=winner is not None and winner.priority > previous.priority)
+        self.current = winner
+        if winner is not None:
+            cpu = time.thread_time()
+            winner.start(readings, now)
+            winner.cpu_time += time.thread_time() - cpu
+        for listener in self.listeners:
+            listener(now, previous, winner)
+
+    def stop(self):
+        """Drops the behavior in control and stops the motors."""
+        if self.current is not None:
+            self.current.stop(preempted=False)
+            self.current = None
+        self.movement.drive(0, 0, ramp_time=0)
+        self.command = None
+
+    # --- Statistics ---
+
+    def report(self):
+        """Per-behavior activations, pre-emptions, ticks and CPU time, as a list of dicts, highest priority first."""
+        return [{"behavior": b.name, "priority": b.priority, "activations": b.activations, "preempted": b.preempted,
+                 "ticks": b.ticks, "cpu_time": b.cpu_time,
+                 "cpu_per_tick": b.cpu_time / self.tick_count if self.tick_count else 0.0} for b in self.behaviors]
+
+    def print_report(self):
+        times = np.array(self.decision_times) if self.decision_times else np.zeros(1)
+        print(f"Arbiter: {self.tick_count} ticks, decision median {np.median(times) * 1e6:.0f} us, "
+              f"99th percentile {np.percentile(times, 99) * 1e6:.0f} us, max {times.max() * 1e6:.0f} us "
+              f"(budget {self.budget * 1e6:.0f} us, {self.over_budget} ticks over)")
+        print(f"  {'behavior':15} {'prio':>4} {'activations':>11} {'preempted':>9} {'ticks':>7} {'cpu ms':>8} "
+              f"{'us/tick':>8}")
+        for row in self.report():
+            print(f"  {row['behavior']:15} {row['priority']:4d} {row['activations']:11d} {row['preempted']:9d} "
+                  f"{row['ticks']:7d} {row['cpu_time'] * 1e3:8.2f} {row['cpu_per_tick'] * 1e6:8.1f}")
@@ -0,0 +1,146 @@
+# behaviors_bench.py
+# Runs the behavior Arbiter against scripted sensors in virtual time and checks
+# that a higher priority trigger takes over within one tick, whatever is running.
+# For comparison it also works out when the main_0.35.py if/elif loop would have
+# reacted: only once the blocking reaction it was in the middle of had finished.
+# Reports per-behavior CPU time and activations and the arbiter's decision time
+# against its budget. Runs anywhere - no robot hardware needed.
+
+import random
+import config as c
+import movement as m
+import behaviors as bh
+from async_runtime import Sensors
+
+TICK = c.CONTROL_LOOP["TICK"]
+DURATION = 120.0  # Virtual seconds
+SPACING = 4.0  # Seconds between scenarios, long enough for any reaction to finish
+LENGTHS = {"left_edge": 0.3, "right_edge": 0.3, "obstacle": 0.1, "touch": 0.1, "sound": 0.1}
+OLD_LOOP_PAUSE = 0.1  # main_0.35.py's time.sleep(0.1) between passes
+
+class FakeChannel:
+    def __init__(self):
+        self.duty_cycle = 0
+
+class FakePCA:
+    def __init__(self):
+        self.channels = [FakeChannel() for _ in range(16)]
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ScriptedWorld:
+    """Sensor readings from a list of (start, end, sensor) pulses."""
+
+    def __init__(self, clock, pulses):
+        self.clock = clock
+        self.pulses = pulses
+        self.latched = {"touch": set(), "sound": set()}  # Pulses already reported, like the GPIO event latches
+
+    def _active(self, sensor):
+        now = self.clock()
+        return [p for p in self.pulses if p[2] == sensor and p[0] <= now < p[1]]
+
+    def get_distance(self):
+        return 5.0 if self._active("obstacle") else 100.0
+
+    def read_edge_sensors(self):
+        return (1 if self._active("left_edge") else 0, 1 if self._active("right_edge") else 0)
+
+    def _latched(self, sensor):
+        fresh = [p for p in self._active(sensor) if p not in self.latched[sensor]]
+        self.latched[sensor].update(fresh)
+        return bool(fresh)
+
+    def is_touched(self):
+        return self._latched("touch")
+
+    def is_sound_detected(self):
+        return self._latched("sound")
+
+def make_scenarios(rng):
+    """Every SPACING seconds, a trigger, then maybe a higher priority one while the first is being reacted to."""
+    pulses, owed = [], []
+    order = ["obstacle", "touch", "sound", "left_edge", "right_edge"]  # Lowest priority first
+    for k in range(int(DURATION / SPACING) - 1):
+        start = 2.0 + k * SPACING
+        first = rng.randrange(len(order))
+        pulses.append((start, start + LENGTHS[order[first]], order[first]))
+        if first < 3:
+            second = order[rng.randrange(first + 1, len(order))]
+            start += round(rng.uniform(0.05, 0.8), 3)
+            pulses.append((start, start + LENGTHS[second], second))
+        owed.append(pulses[-1])
+    return pulses, owed
+
+def run():
+    rng = random.Random(7)
+    random.seed(7)
+    clock = VirtualClock()
+    pulses, owed = make_scenarios(rng)
+    world = ScriptedWorld(clock, pulses)
+    sensors = Sensors(world.get_distance, world.read_edge_sensors, world.is_touched, world.is_sound_detected)
+    movement = m.Movement(FakePCA(), clock=clock)
+    arbiter = bh.Arbiter(movement, sensors, bh.default_behaviors(), clock=clock)
+    names = {"left_edge": "edge_escape", "right_edge": "edge_escape", "obstacle": "avoid_obstacle",
+             "touch": "touch", "sound": "sound"}
+
+    handovers = []  # (time, winner, when the winner's plan would end if left alone)
+    def on_handover(now, previous, winner):
+        if winner is not None:
+            handovers.append((now, winner, now + sum(segment.duration for segment in winner.segments)))
+    arbiter.listeners.append(on_handover)
+
+    ticks = int(DURATION / TICK)
+    outranked = 0  # Ticks that ended with a behavior wanting control above the one that had it
+    for i in range(ticks):
+        clock.now = round(i * TICK, 6)
+        current = arbiter.tick()
+        readings = arbiter.readings
+        if current is None or any(b.priority > current.priority and b.wants_control(readings, clock.now) for b in arbiter.behaviors):
+            outranked += 1
+    arbiter.stop()
+
+    # --- Reaction latency ---
+    # The last trigger of each scenario is the highest priority, so its behavior is owed control
+    arbiter_latency = []  # Pulse start to its behavior taking control
+    preempt_latency = []  # The same, for pulses that arrived while another reaction ran
+    blocked_latency = []  # When the old loop would have noticed: the end of the reaction in progress
+    for start, end, sensor in owed:
+        name = names[sensor]
+        running = None
+        for when, winner, plan_end in handovers:
+            if when >= start:
+                break
+            running = (winner, plan_end)
+        if running is not None and running[0].name == name:
+            continue  # Still reacting to an earlier pulse
+        taken = next(when for when, winner, _ in handovers if when >= start and winner.name == name)
+        arbiter_latency.append(taken - start)
+        if running is not None and running[0].name != "wander" and running[1] > start:
+            preempt_latency.append(taken - start)
+            blocked_latency.append(running[1] - start + OLD_LOOP_PAUSE)
+
+    print(f"{len(pulses)} triggers in {len(owed)} scenarios over {DURATION:.0f} virtual seconds, {ticks} ticks of {TICK * 1e3:.0f} ms")
+    print(f"Arbiter trigger to control: worst {max(arbiter_latency) * 1e3:.0f} ms "
+          f"over {len(arbiter_latency)} fresh triggers; {outranked} ticks ended outranked")
+    if preempt_latency:
+        print(f"  pre-empting a running reaction: {len(preempt_latency)} times, "
+              f"worst {max(preempt_latency) * 1e3:.0f} ms")
+        print(f"  the if/elif loop would have waited for that reaction: "
+              f"mean {sum(blocked_latency) / len(blocked_latency) * 1e3:.0f} ms, "
+              f"worst {max(blocked_latency) * 1e3:.0f} ms")
+    arbiter.print_report()
+
+    assert outranked == 0, f"{outranked} ticks left a higher priority behavior waiting"
+    assert max(arbiter_latency) <= TICK + 1e-9, "a trigger waited longer than one tick"
+    assert preempt_latency, "the script never interrupted a running reaction"
+    for row in arbiter.report():
+        assert row["activations"] > 0, f"{row['behavior']} never ran"
+
+if __name__ == "__main__":
+    run()
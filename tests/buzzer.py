@@ -1,8 +1,12 @@
 # buzzer.py
 
-import RPi.GPIO as GPIO
-import time
+import heapq
+import threading
+from time import monotonic
+from hal import GPIO
+from hal import clock as time
 import config as c
+import tunes
 
 class Buzzer:
     def __init__(self, pin):
@@ -18,17 +22,37 @@ class Buzzer:
             duration: The duration of the tone in seconds.
         """
         if frequency > 0:  # Check if frequency is greater than 0
-            if self.pwm is None:
-                self.pwm = GPIO.PWM(self.buzzer_pin, frequency)
-            else:
-                self.pwm.ChangeFrequency(frequency)
-            self.pwm.start(50)  # 50% duty cycle
+            self.start_tone(frequency)
         else:
-            self.pwm.stop()
-            self.pwm = None
+            self.stop_tone()
 
         time.sleep(duration)
 
+        self.stop_tone()
+
+    def start_tone(self, frequency):
+        """Starts a tone on the buzzer and returns without waiting.
+
+        The PWM object is created on the first tone and then kept, so each note is
+        just a frequency and duty cycle change.
+
+        Args:
+            frequency: The frequency of the tone in Hz.
+        """
+        if self.pwm is None:
+            self.pwm = GPIO.PWM(self.buzzer_pin, frequency)
+            self.pwm.start(50)  # 50% duty cycle
+        else:
+            self.pwm.ChangeFrequency(frequency)
+            self.pwm.ChangeDutyCycle(50)
+
+    def stop_tone(self):
+        """Silences the buzzer, keeping the PWM object for the next tone."""
+        if self.pwm is not None:
+            self.pwm.ChangeDutyCycle(0)
+
+    def close(self):
+        """Stops the PWM output and releases it."""
         if self.pwm is not None:
             self.pwm.stop()
             self.pwm = None
@@ -61,22 +85,188 @@ class Buzzer:
         time.sleep(0.1)
         self.play_tone(262, 0.2)  # Middle C
 
-    def play_custom_tune(self, notes):
+    def play_custom_tune(self, notes, gap=c.TUNES["NOTE_GAP"]):
         """Plays a custom tune defined by a list of (frequency, duration) tuples.
 
         Args:
             notes: A list of tuples, where each tuple contains the frequency (in Hz)
                     and the duration (in seconds) of a note.
+            gap: The pause between notes, in seconds.
         """
         for frequency, duration in notes:
             self.play_tone(frequency, duration)
-            time.sleep(0.05)  # Short pause between notes
+            time.sleep(gap)  # Short pause between notes
+
+# --- Tune Sequencer ---
+
+# Request priorities: a higher priority request interrupts a lower one that is playing
+PRIORITY_MUSIC = 0
+PRIORITY_STATUS = 1
+PRIORITY_ALERT = 2
+
+NOTE_GAP = c.TUNES["NOTE_GAP"]  # Pause between the notes of a tune, as in play_custom_tune
+
+class TuneSequencer:
+    """
+    Plays tunes and sound effects on a worker thread, so callers never wait for audio.
+
+    Requests are queued by priority, first come first served within a priority. A
+    request with a higher priority than the one playing (or any request with
+    preempt=True) cuts it off and plays at once, so an obstacle or edge sound
+    never waits behind a long tune. Notes are timed against absolute deadlines
+    from the start of the request, and the buzzer's single PWM object is kept
+    alive between notes.
+
+    Notes are compiled into a tunes.CompiledTune (cached, so a tune played again
+    isn't rebuilt), and every note's deadline is the request's start time plus
+    the note's precomputed offset, so no drift builds up over a long tune.
+    """
+
+    def __init__(self, buzzer, clock=monotonic):
+        self.buzzer = buzzer
+        self.clock = clock
+
+        self.queue = []  # heap of (-priority, sequence, request)
+        self.current = None  # The request playing: (priority, name, tune)
+        self._next = None  # A pre-empting request, played before the queue
+        self._interrupted = False
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.played = 0
+        self.preempted = 0
+        self.max_lateness = 0.0  # Worst delay of a note start past its deadline, in seconds
+
+    # --- Requests ---
+
+    def play(self, notes, priority=PRIORITY_MUSIC, preempt=False, gap=0.0, name=None, tempo=1.0):
+        """
+        Queues (frequency, duration) notes and returns at once. Frequency 0 is a rest.
+
+        Args:
+            notes: The notes to play, or a tunes.CompiledTune (played as compiled).
+            priority: PRIORITY_MUSIC, PRIORITY_STATUS or PRIORITY_ALERT.
+            preempt: Interrupt whatever is playing, whatever its priority.
+            gap: Silence added after every note.
+            name: For the statistics and debugging.
+            tempo: Speed factor; 2.0 plays twice as fast.
+        """
+        tune = tunes.compile_tune(notes, gap, tempo, name)
+        request = (priority, name or tune.name, tune)
+
+        with self._condition:
+            if self.current is not None and (preempt or priority > self.current[0]):
+                if self._next is not None:
+                    self._queue(self._next)  # An earlier pre-empting request still waiting
+                self._next = request
+                self._interrupted = True
+                self.preempted += 1
+            else:
+                self._queue(request)
+            self._condition.notify()
+
+    def play_tune(self, notes, priority=PRIORITY_MUSIC, tempo=1.0):
+        """Queues a tune with the usual pause between notes, like play_custom_tune."""
+        self.play(notes, priority, gap=NOTE_GAP, tempo=tempo)
+
+    def play_rtttl(self, text, priority=PRIORITY_MUSIC, tempo=1.0):
+        """Queues a tune written in RTTTL (see tunes.parse_rtttl)."""
+        self.play(tunes.parse_rtttl(text, tempo), priority)
+
+    def cancel(self):
+        """Silences the buzzer and drops everything queued."""
+        with self._condition:
+            self.queue.clear()
+            self._next = None
+            if self.current is not None:
+                self._interrupted = True
+            self._condition.notify()
+
+    def is_playing(self):
+        with self._condition:
+            return self.current is not None or self._next is not None or bool(self.queue)
+
+    def _queue(self, request):
+        self._sequence += 1
+        heapq.heappush(self.queue, (-request[0], self._sequence, request))
+
+    # --- Worker ---
+
+    def start(self):
+        """Starts the sequencer thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="tune-sequencer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the sequencer thread and releases the buzzer's PWM."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.buzzer.close()
+
+    def _take_request(self):
+        """Waits for the next request to play, or returns None when stopping."""
+        with self._condition:
+            self.current = None
+            while self._running and self._next is None and not self.queue:
+                self._condition.wait()
+            if not self._running:
+                return None
+            if self._next is not None:
+                request, self._next = self._next, None
+            else:
+                request = heapq.heappop(self.queue)[2]
+            self.current = request
+            self._interrupted = False
+            return request
+
+    def _run(self):
+        while True:
+            request = self._take_request()
+            if request is None:
+                return
+            self._play(request)
+            self.buzzer.stop_tone()
+
+    def _play(self, request):
+        _, _, tune = request
+        start = self.clock()
+        for frequency, offset, duration in tune.steps():
+            if frequency > 0:
+                self.buzzer.start_tone(frequency)
+            else:
+                self.buzzer.stop_tone()
+            self.max_lateness = max(self.max_lateness, self.clock() - (start + offset))
+
+            # Wait until this note's deadline, waking early if interrupted
+            deadline = start + offset + duration
+            with self._condition:
+                while self._running and not self._interrupted:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if not self._running or self._interrupted:
+                    return
+        self.played += 1
 
 # Example usage (you'll likely call this from your main.py):
+# initialize_buzzer() sets these up
+buzzer = None
+sequencer = None
+
 def initialize_buzzer():
-    """Initializes the buzzer."""
-    global buzzer
+    """Initializes the buzzer and starts its tune sequencer."""
+    global buzzer, sequencer
     buzzer = Buzzer(c.BUZZER_PIN)
+    sequencer = TuneSequencer(buzzer)
+    sequencer.start()
 
 # Define some common musical notes (you can add more)
 NOTE_C4 = 262
@@ -106,4 +296,12 @@ TUNE_IMPERIAL_MARCH = [
     (NOTE_A4, 0.65), (NOTE_E5, 0.5), (NOTE_E5, 0.5), (NOTE_E5, 0.5),
     (NOTE_F5, 0.35), (NOTE_C5, 0.15), (NOTE_G4, 0.5), (NOTE_F4, 0.35),
     (NOTE_C5, 0.15), (NOTE_A4, 0.65)
-]
\ No newline at end of file
+]
+
+# --- Sound Effects ---
+# The play_*_sound() sounds as notes for the sequencer; frequency 0 is a rest.
+SOUND_STARTUP = [(262, 0.2), (0, 0.1), (330, 0.2), (0, 0.1), (392, 0.2)]
+SOUND_OBSTACLE = [(200, 0.1), (0, 0.1), (200, 0.1)]
+SOUND_EDGE = [(800, 0.1), (0, 0.1), (300, 0.2)]
+SOUND_SHUTDOWN = [(392, 0.2), (0, 0.1), (330, 0.2), (0, 0.1), (262, 0.2)]
+SOUND_TOUCH = [(500, 0.1)]
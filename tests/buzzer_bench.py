@@ -0,0 +1,109 @@
+# buzzer_bench.py
+# Measures the TuneSequencer against playing tunes inline: how long the caller is
+# blocked, how quickly an alert cuts into a long tune, how closely notes keep to
+# their deadlines and how many PWM objects get created.
+# Runs anywhere - no robot hardware needed.
+
+import time
+import hal
+
+hal.use("sim")
+
+import buzzer as b
+
+class RecordingGPIO:
+    """Wraps the simulated GPIO to count PWM objects and timestamp tone changes in real time."""
+
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.pwms_created = 0
+        self.events = []  # (real time, frequency or 0)
+
+    def __getattr__(self, name):
+        return getattr(self.gpio, name)
+
+    def PWM(self, pin, frequency):
+        self.pwms_created += 1
+        pwm = self.gpio.PWM(pin, frequency)
+        recorder = self
+
+        class RecordingPWM:
+            def start(self, duty):
+                pwm.start(duty)
+                recorder.events.append((time.perf_counter(), pwm.frequency))
+
+            def stop(self):
+                pwm.stop()
+
+            def ChangeFrequency(self, frequency):
+                pwm.ChangeFrequency(frequency)
+
+            def ChangeDutyCycle(self, duty):
+                pwm.ChangeDutyCycle(duty)
+                recorder.events.append((time.perf_counter(), pwm.frequency if duty else 0))
+
+        return RecordingPWM()
+
+def tune_length(notes, gap):
+    return sum(duration + gap for _, duration in notes)
+
+if __name__ == "__main__":
+    backend = hal.backend()
+    recorder = RecordingGPIO(backend.gpio)
+    backend.gpio = recorder
+    buzzer = b.Buzzer(18)
+
+    # The old way, in virtual time so it returns at once: count PWM objects and blocked time
+    start = hal.clock.monotonic()
+    buzzer.pwm = None
+    old_pwms = recorder.pwms_created
+    for frequency, duration in b.TUNE_IMPERIAL_MARCH:  # play_custom_tune before the sequencer
+        buzzer.start_tone(frequency)
+        hal.clock.sleep(duration)
+        buzzer.close()
+        hal.clock.sleep(b.NOTE_GAP)
+    blocked = hal.clock.monotonic() - start
+    old_pwms = recorder.pwms_created - old_pwms
+
+    sequencer = b.TuneSequencer(buzzer)
+    sequencer.start()
+
+    # Caller cost and timing of a whole tune
+    recorder.events.clear()
+    new_pwms = recorder.pwms_created
+    call_start = time.perf_counter()
+    sequencer.play_tune(b.TUNE_IMPERIAL_MARCH[:8])
+    call_time = time.perf_counter() - call_start
+    while sequencer.is_playing():
+        time.sleep(0.01)
+    onsets = [t for t, frequency in recorder.events if frequency]
+    expected = [call_start]
+    for _, duration in b.TUNE_IMPERIAL_MARCH[:8]:
+        expected.append(expected[-1] + duration + b.NOTE_GAP)
+    errors = [abs((onset - onsets[0]) - (deadline - expected[0])) for onset, deadline in zip(onsets, expected)]
+    new_pwms = recorder.pwms_created - new_pwms
+
+    # An edge alert cutting into a long tune
+    latencies = []
+    for _ in range(10):
+        sequencer.play_tune(b.TUNE_IMPERIAL_MARCH)
+        time.sleep(0.3)
+        recorder.events.clear()
+        alert_start = time.perf_counter()
+        sequencer.play(b.SOUND_EDGE, b.PRIORITY_ALERT)
+        give_up = alert_start + 1.0
+        while not any(frequency == b.SOUND_EDGE[0][0] for _, frequency in recorder.events[:]):
+            assert time.perf_counter() < give_up, "the alert never sounded"
+            time.sleep(0.0005)
+        latencies.append(next(t for t, f in recorder.events if f == b.SOUND_EDGE[0][0]) - alert_start)
+        sequencer.cancel()
+    sequencer.stop()
+
+    print(f"Imperial March: {tune_length(b.TUNE_IMPERIAL_MARCH, b.NOTE_GAP):.2f} s long\n")
+    print(f"play_custom_tune: caller blocked {blocked:.2f} s, {old_pwms} PWM objects created")
+    print(f"TuneSequencer:    caller blocked {call_time * 1e6:.0f} us, {new_pwms} PWM objects created "
+          f"(8 notes), note onset error mean {sum(errors) / len(errors) * 1000:.2f} ms, "
+          f"max {max(errors) * 1000:.2f} ms")
+    print(f"edge alert into a playing tune: {sum(latencies) / len(latencies) * 1000:.2f} ms mean, "
+          f"{max(latencies) * 1000:.2f} ms max until the alert sounds "
+          f"({sequencer.preempted} pre-emptions)")
@@ -3,10 +3,16 @@
 # --- System Configuration ---
 DEBUG_MODE = True  # Enable/disable debug messages
 
+# --- Hardware Abstraction Layer ---
+# "real" drives the robot; "sim" uses the simulated devices in hal_sim.py.
+# The GISMO_HAL environment variable overrides this.
+HAL_BACKEND = "real"
+
 # --- Hardware ---
 # This section defines the hardware components connected to the robot and their pin/channel assignments.
 
 # --- PCA9685 PWM Servo Driver ---
+PCA_I2C_ADDRESS = 0x40  # PCA9685 default address
 PCA_FREQUENCY = 60  # PWM frequency for the PCA9685 (common value for servos)
 
 # --- L298N Motor Driver ---
@@ -29,9 +35,84 @@ SENSOR_PINS = {
     "SOUND_SENSOR": 21,
 }
 
+# --- Event-Driven Inputs ---
+# Settings for gpio_events.InputManager, which watches the edge, touch and sound
+# sensors with GPIO edge callbacks (robot.start_inputs()).
+GPIO_EVENTS = {
+    "DEFAULT_DEBOUNCE": 0.005,   # Seconds after a change during which further changes are bounce
+    "DEBOUNCE": {                # Per input, seconds
+        "left_edge": 0.005,
+        "right_edge": 0.005,
+        "touch": 0.05,
+        "sound": 0.01,
+    },
+    "QUEUE_LENGTH": 256,         # Events kept for the control loop to drain
+    "OWED_EDGE_TIMEOUT": 0.1,    # Seconds a short pulse's trailing edge callback may lag and still be swallowed
+    "LATENCY_SAMPLES": 1024,     # Recent latencies kept for the percentiles
+}
+
+# --- Safety Reflex ---
+# Settings for safety.SafetyMonitor, which stops the motors on an edge or a close
+# obstacle from outside the control loop (robot.start_safety()).
+SAFETY = {
+    "RATE": 200,                 # Watchdog checks per second
+    "PRIORITY": 50,              # SCHED_FIFO priority of the watchdog thread (needs root or CAP_SYS_NICE)
+    "SWITCH_INTERVAL": 0.001,    # Seconds; how long another thread can hold the GIL while the reflex waits
+    "OBSTACLE_DISTANCE": 10,     # cm; closer than this while driving forward stops the motors
+    "LATENCY_BOUND": 0.005,      # Seconds from trigger to motors stopped that the reflex must stay within
+    "HISTOGRAM_BINS": (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02),  # Upper bin edges, seconds
+    "LATENCY_SAMPLES": 1024,     # Recent latencies kept for the percentiles
+}
+
+# --- HC-SR04 Ultrasonic Ranging ---
+# Settings for the background ranging service (ranging.py).
+ULTRASONIC = {
+    "RATE": 20,             # Pings per second
+    "ECHO_TIMEOUT": 0.04,   # Seconds to wait for an echo before giving up
+    "MAX_DISTANCE": 400,    # cm; longer echoes (the sensor's "nothing in range" pulse) count as missing
+    "MAX_AGE": 0.25,        # Readings older than this (seconds) count as missing
+    "NO_READING": 999.99,   # Distance reported when there is no valid reading
+}
+
 # --- MPU9250 IMU ---
 MPU9250_I2C_ADDRESS = 0x68  # Default I2C address (may vary depending on AD0 pin)
 
+# Settings for imu_sampler.IMUSampler, which reads the IMU at a fixed rate for dead reckoning.
+IMU_SAMPLER = {
+    "RATE": 200,            # Samples per second
+    "BUFFER_SAMPLES": 1024, # Ring buffer length (about 5 s at 200 Hz)
+}
+
+# Settings for gyro_calibration, which caches the gyro biases between boots.
+GYRO_CALIBRATION = {
+    "PATH": "gismo_gyro.json",      # Bias cache, relative to the working directory
+    "RATE": 500,                    # Readings per second while calibrating
+    "CHECK_SAMPLES": 100,           # Readings in the boot-time still check of cached biases
+    "BIAS_TOLERANCE": 0.2,          # deg/s a cached bias may be off before recalibrating
+    "TEMPERATURE_TOLERANCE": 8.0,   # deg C from the calibration temperature before recalibrating
+    "STILL_NOISE": 0.5,             # deg/s gyro standard deviation above which the robot is moving
+    "MIN_SAMPLES": 100,             # Fewest readings in a full calibration
+    "MAX_SAMPLES": 2500,            # Most readings in a full calibration (5 s at 500 Hz)
+    "TARGET_ERROR": 0.01,           # deg/s standard error at which a full calibration stops
+}
+
+# --- Dead Reckoning ---
+DEAD_RECKONING = {
+    "GYRO_FILTER_WINDOW": 5,  # Samples in the gyro z moving average (filters.MovingAverage)
+    "ESTIMATOR": "ekf",       # state_estimation backend: "integrator", "complementary" or "ekf"
+    "MAX_WHEEL_SPEED": 0.3,   # Wheel speed at full duty cycle (m/s), for the commanded wheel speeds
+    "WHEEL_BASE": 0.12,       # Distance between the wheels (m)
+    "COMPLEMENTARY_TAU": 0.5, # Seconds over which the complementary filter trusts the accelerometer over the wheels
+    "EKF": {
+        "INITIAL_VARIANCE": (0.0, 0.0, 0.0, 0.01, 0.01),  # x, y, heading, speed, yaw rate
+        "PROCESS_NOISE": (0.001, 0.001, 0.001, 0.2, 5.0), # Per sqrt(second), same order
+        "GYRO_NOISE": 0.1,          # deg/s
+        "ACCEL_NOISE": 0.2,         # m/s^2, sideways acceleration
+        "WHEEL_SPEED_NOISE": 0.05,  # m/s, commanded against actual speed
+        "WHEEL_RATE_NOISE": 1.0,    # rad/s, commanded against actual yaw rate (wheels slip when turning)
+    },
+}
+
 # --- RGB LED ---
 # Pin mapping for the RGB LED (connected to PCA9685 channels).
 RGB_LED_PINS = {
@@ -51,6 +132,23 @@ DISPLAY = {
     "HEIGHT": 64,
     "I2C_ADDRESS": 0x3C,  # Typically 0x3C or 0x3D, check your display's address
     "CONNECTION": "PCA9685",  # Display is connected via PCA9685
+    "FRAME_CACHE_FRAMES": 512,  # Packed 1 KB frames kept by display.frame_cache (faces, eyes, text)
+}
+
+# --- Tunes ---
+# Settings for buzzer tunes (tunes.py and buzzer.TuneSequencer).
+TUNES = {
+    "NOTE_GAP": 0.05,   # Seconds of silence between the notes of a tune
+    "CACHE_SIZE": 32,   # Compiled tunes kept in memory
+}
+
+# --- Display Animation ---
+# Settings for animation.AnimationEngine, which plays face and eye animations on its
+# own thread.
+ANIMATION = {
+    "FPS": 20,              # Frames the engine tries to show per second
+    "FRAME_BUDGET": 0.015,  # Seconds one frame may take to render and push before it counts as over budget
+    "STATS_WINDOW": 200,    # Frames kept for the render/push time statistics
 }
 
 # --- Servos ---
@@ -95,6 +193,94 @@ MOVEMENT_SETTINGS = {
     "OBSTACLE_DISTANCE": 10,  # in cm
 }
 
+# --- Control Loop ---
+# Timing for the asyncio control loop runtime (async_runtime.py).
+CONTROL_LOOP = {
+    "TICK": 0.02,  # Seconds between sensor reads / control updates (50 Hz)
+}
+
+# --- Behaviors ---
+# Settings for the behavior arbiter (behaviors.py), which ticks at CONTROL_LOOP["TICK"].
+BEHAVIORS = {
+    "BUDGET": 0.002,        # Seconds the arbiter may spend choosing a behavior each tick
+    "PRIORITIES": {         # Higher wins; an edge interrupts anything, as in async_runtime.py
+        "edge_escape": 4,
+        "sound": 3,
+        "touch": 2,
+        "avoid_obstacle": 1,
+        "wander": 0,
+    },
+    "WANDER_TURN_EVERY": 5.0,  # Seconds of driving forward between random wander turns
+    "STATS_WINDOW": 1024,      # Recent ticks kept for the decision time percentiles
+}
+
+# --- Scheduler ---
+# Settings for the fixed-rate loop scheduler (scheduler.py). The display isn't a
+# task: a full-frame push would starve the IMU, so it keeps animation.py's thread.
+SCHEDULER = {
+    "RATES": {              # Runs per second of each task main_0.35.py registers
+        "IMU": 200,
+        "RANGING": 20,
+        "BEHAVIORS": 50,    # 1 / CONTROL_LOOP["TICK"]
+    },
+    "SPIN": 0.0005,         # Seconds before a deadline to stop sleeping and poll the clock (real hardware only)
+    "STARVATION_PERIODS": 3,  # A task that hasn't run for this many of its periods is starving
+    "STATS_WINDOW": 1024,   # Recent runs kept per task for the jitter and execution time percentiles
+}
+
+# --- Occupancy Grid Map ---
+# Settings for mapping.OccupancyGridMap. Distances are in meters.
+MAP_SETTINGS = {
+    "GRID_SIZE_X": 100,          # Cells
+    "GRID_SIZE_Y": 100,          # Cells
+    "CELL_SIZE": 0.05,           # Meters per cell
+    "CHUNK_SIZE": 64,            # Cells per side of a ChunkedOccupancyGridMap chunk
+    "OBSTACLE_THRESHOLD": 0.7,   # Probability above which a cell is shown as an obstacle
+    "REPRESENTATION": "probability",  # "probability" (float64, fixed +0.2/-0.1 steps) or "log_odds"
+    # Sensor model and storage for the "log_odds" representation
+    "LOG_ODDS": {
+        "DTYPE": "int8",         # "int8" (1 byte per cell) or "float32" (4 bytes per cell)
+        "P_HIT": 0.7,            # Probability a cell is occupied when a ray ends in it
+        "P_MISS": 0.4,           # Probability a cell is occupied when a ray passes through it
+        "CLAMP_MIN": -4.0,       # Log-odds limits, so cells can still change their mind
+        "CLAMP_MAX": 4.0,
+        "INT8_RESOLUTION": 0.05, # Log-odds per int8 step
+    },
+}
+
+# --- Map Store ---
+# Settings for map_store.MapStore, which keeps the occupancy grid in a memory-mapped
+# file so it survives restarts.
+MAP_STORE = {
+    "PATH": "gismo_map.bin",     # Map file, relative to the working directory
+    "CHECKPOINT_INTERVAL": 5.0,  # Seconds between background checkpoints
+    "DIRTY_BAND_BYTES": 16384,   # Granularity of dirty tracking; rounded to whole grid rows
+}
+
+# --- I2C Bus ---
+# Settings for i2c_bus.BusManager, which every device on the I2C bus goes through.
+I2C_BUS = {
+    # Lower runs first when several transactions are waiting for the bus
+    "PRIORITIES": {
+        "MOTORS": 0,             # PCA9685: motors, servos and the RGB LED
+        "IMU": 1,
+        "DISPLAY": 2,
+    },
+    "DISPLAY_MAX_WRITE": 129,    # Bytes per display transaction: the control byte and one 128-column page
+    "LATENCY_SAMPLES": 1024,     # Recent queueing delays kept per device for the percentiles
+}
+
+# --- Recorder ---
+# Settings for recorder.Recorder, which logs what the robot sensed and did so a run
+# can be replayed offline (recorder.Replay).
+RECORDER = {
+    "ENABLED": False,            # Record every run of main_0.35.py
+    "PATH": "gismo_run.log",     # Log file, relative to the working directory
+    "BLOCK_RECORDS": 2048,       # Records buffered before a block is written
+    "INDEX_EVERY": 16,           # Data blocks between index blocks
+    "REPLAY_SPEED": 100.0,       # Multiple of real time to replay at; None for as fast as possible
+}
+
 # --- RGB LED Colors ---
 # Predefined colors for the RGB LED.
 LED_COLORS = {
@@ -106,4 +292,21 @@ LED_COLORS = {
     "MAGENTA": (65535, 0, 65535),
     "WHITE": (65535, 65535, 65535),
     "OFF": (0, 0, 0),
-}
\ No newline at end of file
+}
+
+# --- Simulation ---
+# The simulated robot and table used by the "sim" HAL backend (hal_sim.py).
+SIMULATION = {
+    "PHYSICS_STEP": 0.001,               # Seconds of virtual time per physics step
+    "SEED": 1,                           # Random seed for sensor noise
+    "MAX_WHEEL_SPEED": 0.3,              # Wheel speed at full duty cycle (m/s)
+    "WHEEL_BASE": 0.12,                  # Distance between the wheels (m)
+    "TABLE_SIZE": (1.2, 0.8),            # Table width and depth (m), centred on the start
+    "EDGE_SENSOR_OFFSET": (0.06, 0.04),  # Edge sensors: forward and sideways from centre (m)
+    "OBSTACLES": [(0.4, 0.15, 0.05), (-0.3, -0.2, 0.04)],  # (x, y, radius) in m
+    "ULTRASONIC_RANGE": 400,             # HC-SR04 maximum range (cm)
+    "GYRO_BIAS": (0.3, -0.2, 0.5),       # deg/s
+    "GYRO_NOISE": 0.05,                  # deg/s standard deviation
+    "ACCEL_NOISE": 0.02,                 # m/s^2 standard deviation
+    "TEMPERATURE": 25.0,                 # deg C
+}
@@ -1,14 +1,24 @@
-import time
-import board
-import busio
-from mpu6050 import mpu6050
+import hal
+from hal import clock as time
 import config as c
+import imu_sampler as imu
+import filters
+import gyro_calibration
+import state_estimation
 from math import radians, degrees, sin, cos, atan2
 
 class DeadReckoning:
-    def __init__(self):
-        self.i2c = busio.I2C(board.SCL, board.SDA)
-        self.mpu = mpu6050(c.MPU9250_I2C_ADDRESS) # Initialize with I2C address
+    def __init__(self, estimator=c.DEAD_RECKONING["ESTIMATOR"], movement=None, recorder=None):
+        """
+        Args:
+            estimator: The state_estimation backend used with a sampler: "integrator",
+                "complementary" or "ekf".
+            movement: The Movement driving the robot, whose commanded wheel speeds the
+                estimator can fuse with the IMU.
+            recorder: A recorder.Recorder to log the gyro biases and every IMU batch to.
+        """
+        self.recorder = recorder
+        self.mpu = hal.create_mpu(c.MPU9250_I2C_ADDRESS) # Initialize with I2C address
         self.position = (0, 0)  # (x, y) coordinates in meters
         self.heading = 0.0  # Initial heading (degrees)
         self.last_time = time.monotonic()
@@ -19,29 +29,57 @@ class DeadReckoning:
         self.prev_accel_y = 0.0
 
         # --- Moving Average Filter ---
-        self.gyro_z_readings = []  # Store recent gyro readings
-        self.filter_window = 5  # Window size for moving average (adjust as needed)
-
-    def calibrate_gyro(self, num_readings=500, delay=0.01):
-        """Calibrates the gyroscope by taking multiple readings and averaging to find the bias."""
-        print("Calibrating gyroscope. Please keep the robot still.")
-        total_gyro_z = 0
-        start_time = time.time()
-        for i in range(num_readings):
-            gyro_data = self.mpu.get_gyro_data()
-            total_gyro_z += gyro_data['z']
-            current_time = time.time()
-            elapsed_time = current_time - start_time
-            remaining_time = 5 - elapsed_time
-            print(f"Calibrating... {remaining_time:.1f} seconds remaining", end='\r')
-            time.sleep(delay)
-        self.gyro_bias = total_gyro_z / num_readings
-        print(f"Gyroscope calibration complete. Bias: {self.gyro_bias:.2f}")
-
-    def update(self):
-        """Updates the position and heading based on accelerometer and gyroscope readings using RK4."""
-        dt = time.monotonic() - self.last_time
-        self.last_time = time.monotonic()
+        self.filter_window = c.DEAD_RECKONING["GYRO_FILTER_WINDOW"]  # Samples in the gyro moving average
+        self.gyro_filter = filters.MovingAverage(self.filter_window)
+
+        # --- Batch Integration (with an IMUSampler) ---
+        self.sampler = None
+        self.estimator = state_estimation.create(estimator)
+        self.movement = movement  # For the commanded wheel speeds
+        self.velocity = (0.0, 0.0)  # World-frame velocity in m/s
+        self.samples_integrated = 0
+
+    def calibrate_gyro(self, force=False):
+        """Sets the gyroscope biases, from the calibration cache when they still hold (see gyro_calibration)."""
+        calibration = gyro_calibration.calibrate(self.mpu, force=force)
+        self.gyro_biases = calibration.bias
+        self.gyro_bias = calibration.bias[2]
+        if self.recorder is not None:
+            self.recorder.record("gyro_bias", time.monotonic(), *calibration.bias)
+        print(f"Gyroscope calibration complete ({calibration.source}). Bias: {self.gyro_bias:.2f}")
+
+    def start_sampler(self, rate=c.IMU_SAMPLER["RATE"], scheduled=False):
+        """Samples the IMU at a fixed rate in the background; update() then feeds whole batches to the estimator.
+
+        With `scheduled` the sampler has no thread of its own: call self.sampler.poll() from a scheduler task.
+        """
+        self.sampler = imu.IMUSampler(self.mpu, rate)
+        self.sampler.start(scheduled)
+        return self.sampler
+
+    def stop_sampler(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+    def update(self, dt=None):
+        """Updates the position and heading based on accelerometer and gyroscope readings using RK4.
+
+        With a sampler running this integrates every sample taken since the last call instead.
+
+        Args:
+            dt: Seconds since the last update. A fixed-rate caller (a scheduler.Scheduler task)
+                passes the time between its deadlines, so the step doesn't vary with when the
+                loop woke up; by default it is measured.
+        """
+        if self.sampler is not None:
+            self.integrate(self.sampler.read_new())
+            return
+
+        now = time.monotonic()
+        if dt is None:
+            dt = now - self.last_time
+        self.last_time = now
 
         # Read accelerometer and gyroscope data
         accel_data = self.mpu.get_accel_data()
@@ -52,11 +90,7 @@ class DeadReckoning:
         gyro_z = gyro_data['z'] - self.gyro_bias # Subtract the bias
 
         # --- Apply Moving Average Filter to Gyroscope Z ---
-        self.gyro_z_readings.append(gyro_z)
-        if len(self.gyro_z_readings) > self.filter_window:
-            self.gyro_z_readings.pop(0)  # Remove oldest reading
-
-        gyro_z_filtered = sum(self.gyro_z_readings) / len(self.gyro_z_readings) if len(self.gyro_z_readings) == self.filter_window else gyro_z
+        gyro_z_filtered = self.gyro_filter.update(gyro_z)
 
         # --- Fourth-Order Runge-Kutta (RK4) Integration ---
 
@@ -90,6 +124,28 @@ class DeadReckoning:
         # Update position
         self.position = (self.position[0] + dx, self.position[1] + dy)
 
+    def integrate(self, samples):
+        """
+        Feeds a batch of IMU samples (columns as in imu_sampler.COLUMNS) to the state estimator.
+
+        The gyro rate is bias-corrected and filtered first. If a Movement was given,
+        the wheel speeds it commanded at each sample time go in too.
+        """
+        if len(samples) == 0:
+            return
+        if self.recorder is not None:
+            self.recorder.record_imu(samples)
+        times = samples[:, imu.TIME]
+        rates = self.gyro_filter.process(samples[:, imu.GZ] - self.gyro_bias)
+        wheels = self.movement.wheel_speeds(times) if self.movement is not None else None
+        self.estimator.update(times, rates, samples[:, imu.AX], samples[:, imu.AY], wheels)
+
+        self.position = self.estimator.position
+        self.heading = self.estimator.heading
+        self.velocity = self.estimator.velocity
+        self.last_time = times[-1]
+        self.samples_integrated += len(samples)
+
     def get_position(self):
         """Returns the current estimated position (x, y)."""
         return self.position
@@ -1,12 +1,14 @@
 # display.py
 
-import time
-import board
-import busio
+from collections import OrderedDict
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-import adafruit_ssd1306
 import random
+import hal
+from hal import clock as time
 import config as c
+import display_driver
+import map_render
 
 # --- Eye Parameters (adjust as you like) ---
 EYE_RADIUS = 10
@@ -14,81 +16,165 @@ EYE_DISTANCE = 40
 IRIS_RADIUS = 4
 BLINK_DURATION = 0.1
 LOOK_AROUND_INTERVAL = 3  # Seconds
+EYE_OFFSET_STEP = 2  # Iris offsets are rounded to this many pixels, so every eye position can be cached
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_SIZE = 14
 
 # --- Initialize Display ---
-# Initialize I2C bus
-i2c = busio.I2C(board.SCL, board.SDA)
-
 # Declare display as a global variable
 display = None
+panel = None  # display_driver.PartialSSD1306 sending only the changed parts of each frame
+BLANK_FRAME = bytes(c.DISPLAY["WIDTH"] * c.DISPLAY["HEIGHT"] // 8)
 
 def initialize_display():
     """Initializes the OLED display."""
-    global display
+    global display, panel
     try:
-        display = adafruit_ssd1306.SSD1306_I2C(c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"], i2c, addr=c.DISPLAY["I2C_ADDRESS"])
+        display = hal.create_display(c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"], c.DISPLAY["I2C_ADDRESS"])
+        panel = display_driver.PartialSSD1306(display)
         # Clear the display
-        display.fill(0)
-        display.show()
+        panel.push(BLANK_FRAME)
     except ValueError:
         print("Error initializing display. Check I2C address and wiring.")
         display = None
+        panel = None
+
+# --- Frame Cache ---
+# Faces and eyes are drawn once with PIL, packed into the SSD1306's own page layout
+# and kept in an LRU. Showing one again is then a copy into the driver's buffer and
+# a push, with no drawing or pixel-by-pixel conversion.
+
+def pack_image(image):
+    """
+    Packs a 1-bit image into SSD1306 page order.
+
+    Each byte is a column of 8 vertical pixels, least significant bit at the top,
+    and the 8 pages of 128 bytes run top to bottom - the layout of the driver's
+    buffer.
+    """
+    pixels = np.asarray(image.convert("1"), dtype=bool)
+    height, width = pixels.shape
+    return np.packbits(pixels.reshape(height // 8, 8, width), axis=1, bitorder="little").tobytes()
+
+def render(draw_function, *args):
+    """Draws on a blank display-sized image and returns it packed."""
+    image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
+    draw_function(ImageDraw.Draw(image), *args)
+    return pack_image(image)
+
+class FrameCache:
+    """An LRU of packed frames, keyed by what was drawn."""
+
+    def __init__(self, max_frames=c.DISPLAY["FRAME_CACHE_FRAMES"]):
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, make_frame):
+        """Returns the frame for `key`, calling make_frame() to build it if it isn't cached."""
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = make_frame()
+        self.frames[key] = frame
+        if len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+        return frame
+
+    def clear(self):
+        self.frames.clear()
+
+frame_cache = FrameCache()
+font = None
+
+def get_font():
+    """Returns the text font, loading it from disk only the first time."""
+    global font
+    if font is None:
+        # Load a font (make sure you have the font file in your project directory)
+        try:
+            font = ImageFont.truetype(FONT_PATH, FONT_SIZE)
+        except OSError:
+            print("Font not found, using default font.")
+            font = ImageFont.load_default()
+    return font
+
+def show_frame(frame):
+    """Pushes a packed frame to the display, sending only what changed since the last one."""
+    if display:
+        panel.push(frame)
 
 # --- Functions ---
 
 def clear_display():
     """Clears the OLED display."""
     if display:
-        display.fill(0)
-        display.show()
+        show_frame(BLANK_FRAME)
 
-def draw_eyes(x_offset_left=0, y_offset_left=0, x_offset_right=0, y_offset_right=0, blink=False):
-    """Draws a pair of eyes on the display."""
-    if not display:
+# Eye positions
+LEFT_EYE_CENTER = (c.DISPLAY["WIDTH"] // 2 - EYE_DISTANCE // 2, c.DISPLAY["HEIGHT"] // 2)
+RIGHT_EYE_CENTER = (c.DISPLAY["WIDTH"] // 2 + EYE_DISTANCE // 2, c.DISPLAY["HEIGHT"] // 2)
+
+def quantize_offset(offset):
+    """Rounds an iris offset to the cached grid of positions, within the eye."""
+    offset = EYE_OFFSET_STEP * round(offset / EYE_OFFSET_STEP)
+    return max(-EYE_RADIUS, min(EYE_RADIUS, offset))
+
+def _draw_eye(draw, eye_center, x_offset, y_offset, blink):
+    """Draws one eye, open with its iris offset from the centre, or closed."""
+    if blink:
+        # Draw closed eyes (lines)
+        eye_top = eye_center[1] - EYE_RADIUS // 2
+        eye_bottom = eye_center[1] + EYE_RADIUS // 2
+        draw.line((eye_center[0] - EYE_RADIUS, eye_top, eye_center[0] + EYE_RADIUS, eye_top), fill=255)
+        draw.line((eye_center[0] - EYE_RADIUS, eye_bottom, eye_center[0] + EYE_RADIUS, eye_bottom), fill=255)
         return
 
-    # Create a blank image
-    image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-    draw = ImageDraw.Draw(image)
+    # Draw open eyes (circles)
+    draw.ellipse((eye_center[0] - EYE_RADIUS, eye_center[1] - EYE_RADIUS,
+                  eye_center[0] + EYE_RADIUS, eye_center[1] + EYE_RADIUS),
+                 outline=255, fill=0)
 
-    # Eye positions
-    left_eye_center = (c.DISPLAY["WIDTH"] // 2 - EYE_DISTANCE // 2, c.DISPLAY["HEIGHT"] // 2)
-    right_eye_center = (c.DISPLAY["WIDTH"] // 2 + EYE_DISTANCE // 2, c.DISPLAY["HEIGHT"] // 2)
+    # Draw irises
+    iris_center = (eye_center[0] + x_offset, eye_center[1] + y_offset)
+    draw.ellipse((iris_center[0] - IRIS_RADIUS, iris_center[1] - IRIS_RADIUS,
+                  iris_center[0] + IRIS_RADIUS, iris_center[1] + IRIS_RADIUS),
+                 outline=255, fill=255)
 
+def eye_frame(side, x_offset=0, y_offset=0, blink=False):
+    """Returns the packed frame with just one eye ("left" or "right") drawn."""
     if blink:
-        # Draw closed eyes (lines)
-        eye_top = left_eye_center[1] - EYE_RADIUS // 2
-        eye_bottom = left_eye_center[1] + EYE_RADIUS // 2
-        draw.line((left_eye_center[0] - EYE_RADIUS, eye_top, left_eye_center[0] + EYE_RADIUS, eye_top), fill=255)
-        draw.line((left_eye_center[0] - EYE_RADIUS, eye_bottom, left_eye_center[0] + EYE_RADIUS, eye_bottom), fill=255)
-
-        eye_top = right_eye_center[1] - EYE_RADIUS // 2
-        eye_bottom = right_eye_center[1] + EYE_RADIUS // 2
-        draw.line((right_eye_center[0] - EYE_RADIUS, eye_top, right_eye_center[0] + EYE_RADIUS, eye_top), fill=255)
-        draw.line((right_eye_center[0] - EYE_RADIUS, eye_bottom, right_eye_center[0] + EYE_RADIUS, eye_bottom), fill=255)
-    else:
-        # Draw open eyes (circles)
-        draw.ellipse((left_eye_center[0] - EYE_RADIUS, left_eye_center[1] - EYE_RADIUS,
-                      left_eye_center[0] + EYE_RADIUS, left_eye_center[1] + EYE_RADIUS),
-                     outline=255, fill=0)
-        draw.ellipse((right_eye_center[0] - EYE_RADIUS, right_eye_center[1] - EYE_RADIUS,
-                      right_eye_center[0] + EYE_RADIUS, right_eye_center[1] + EYE_RADIUS),
-                     outline=255, fill=0)
-
-        # Draw irises
-        left_iris_center = (left_eye_center[0] + x_offset_left, left_eye_center[1] + y_offset_left)
-        right_iris_center = (right_eye_center[0] + x_offset_right, right_eye_center[1] + y_offset_right)
-
-        draw.ellipse((left_iris_center[0] - IRIS_RADIUS, left_iris_center[1] - IRIS_RADIUS,
-                      left_iris_center[0] + IRIS_RADIUS, left_iris_center[1] + IRIS_RADIUS),
-                     outline=255, fill=255)
-        draw.ellipse((right_iris_center[0] - IRIS_RADIUS, right_iris_center[1] - IRIS_RADIUS,
-                      right_iris_center[0] + IRIS_RADIUS, right_iris_center[1] + IRIS_RADIUS),
-                     outline=255, fill=255)
-
-    # Display the image
-    display.image(image)
-    display.show()
+        x_offset = y_offset = 0
+    eye_center = LEFT_EYE_CENTER if side == "left" else RIGHT_EYE_CENTER
+    return frame_cache.get(("eye", side, x_offset, y_offset, blink),
+                           lambda: render(_draw_eye, eye_center, x_offset, y_offset, blink))
+
+def eyes_frame(x_offset_left=0, y_offset_left=0, x_offset_right=0, y_offset_right=0, blink=False):
+    """
+    Returns the packed frame for a pair of eyes.
+
+    The two eyes never overlap, so a pair is just the two single-eye frames ORed
+    together; with each eye cached on its own, every pair is cheap to build.
+    """
+    offsets = [quantize_offset(offset) for offset in (x_offset_left, y_offset_left, x_offset_right, y_offset_right)]
+
+    def combine():
+        left = np.frombuffer(eye_frame("left", offsets[0], offsets[1], blink), dtype=np.uint8)
+        right = np.frombuffer(eye_frame("right", offsets[2], offsets[3], blink), dtype=np.uint8)
+        return (left | right).tobytes()
+
+    return frame_cache.get(("eyes", *offsets, blink), combine)
+
+def draw_eyes(x_offset_left=0, y_offset_left=0, x_offset_right=0, y_offset_right=0, blink=False):
+    """Draws a pair of eyes on the display."""
+    if not display:
+        return
+    show_frame(eyes_frame(x_offset_left, y_offset_left, x_offset_right, y_offset_right, blink))
 
 def look_around():
     """Makes the eyes look around randomly."""
@@ -125,155 +211,146 @@ def test_display():
             print("Display test stopped.")
             clear_display()
             
+def _draw_face_neutral(draw):
+    # Draw a simple neutral face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+    # Eyes
+    draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
+    draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
+    # Mouth
+    draw.line((40, 45, 90, 45), fill=255)
+
 def draw_face_neutral():
     """Draws a neutral face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple neutral face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-        # Eyes
-        draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
-        draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
-        # Mouth
-        draw.line((40, 45, 90, 45), fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+        show_frame(face_frame("neutral"))
+
+def _draw_face_happy(draw):
+    # Draw a simple happy face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+    # Eyes
+    draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
+    draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
+    # Mouth
+    draw.arc((40, 35, 90, 50), 0, 180, fill=255)
 
 def draw_face_happy():
     """Draws a happy face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple happy face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-        # Eyes
-        draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
-        draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
-        # Mouth
-        draw.arc((40, 35, 90, 50), 0, 180, fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+        show_frame(face_frame("happy"))
+
+def _draw_face_sad(draw):
+    # Draw a simple sad face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+    # Eyes
+    draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
+    draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
+    # Mouth
+    draw.arc((40, 35, 90, 50), 180, 0, fill=255)
 
 def draw_face_sad():
     """Draws a sad face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple sad face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-        # Eyes
-        draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye
-        draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye
-        # Mouth
-        draw.arc((40, 35, 90, 50), 180, 0, fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+        show_frame(face_frame("sad"))
+
+def _draw_face_angry(draw):
+    # Draw a simple angry face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+    # Eyes
+    draw.line((35, 20, 50, 30), fill=255)  # Left eye (slanted)
+    draw.line((50, 20, 35, 30), fill=255)
+    draw.line((80, 20, 95, 30), fill=255)  # Right eye (slanted)
+    draw.line((95, 20, 80, 30), fill=255)
+    # Mouth
+    draw.line((40, 45, 90, 45), fill=255)
 
 def draw_face_angry():
     """Draws an angry face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple angry face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-        # Eyes
-        draw.line((35, 20, 50, 30), fill=255)  # Left eye (slanted)
-        draw.line((50, 20, 35, 30), fill=255)
-        draw.line((80, 20, 95, 30), fill=255)  # Right eye (slanted)
-        draw.line((95, 20, 80, 30), fill=255)
-        # Mouth
-        draw.line((40, 45, 90, 45), fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+        show_frame(face_frame("angry"))
+
+def _draw_face_surprised(draw):
+    # Draw a simple surprised face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+    # Eyes
+    draw.ellipse((35, 20, 50, 30), outline=255, fill=255)  # Left eye
+    draw.ellipse((80, 20, 95, 30), outline=255, fill=255)  # Right eye
+    # Mouth
+    draw.ellipse((55, 40, 75, 50), outline=255, fill=255)
 
 def draw_face_surprised():
     """Draws a surprised face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple surprised face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-        # Eyes
-        draw.ellipse((35, 20, 50, 30), outline=255, fill=255)  # Left eye
-        draw.ellipse((80, 20, 95, 30), outline=255, fill=255)  # Right eye
-        # Mouth
-        draw.ellipse((55, 40, 75, 50), outline=255, fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
-        
+        show_frame(face_frame("surprised"))
+
+def _draw_face_searching(draw):
+    # Draw a simple searching face
+    # Head
+    draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
+
+    # Eyes (looking to the right)
+    draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye (pupil to the right)
+    draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye (pupil to the right)
+    draw.ellipse((45, 23, 48, 27), outline=0, fill=0)  # Left pupil
+    draw.ellipse((90, 23, 93, 27), outline=0, fill=0)  # Right pupil
+    
+    # Mouth (neutral)
+    draw.line((40, 45, 90, 45), fill=255)
+
 def draw_face_searching():
     """Draws a searching face on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
-
-        # Draw a simple searching face
-        # Head
-        draw.ellipse((20, 10, 108, 54), outline=255, fill=0)
-
-        # Eyes (looking to the right)
-        draw.ellipse((35, 20, 50, 30), outline=255, fill=0)  # Left eye (pupil to the right)
-        draw.ellipse((80, 20, 95, 30), outline=255, fill=0)  # Right eye (pupil to the right)
-        draw.ellipse((45, 23, 48, 27), outline=0, fill=0)  # Left pupil
-        draw.ellipse((90, 23, 93, 27), outline=0, fill=0)  # Right pupil
-        
-        # Mouth (neutral)
-        draw.line((40, 45, 90, 45), fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+        show_frame(face_frame("searching"))
+
+FACES = {
+    "neutral": _draw_face_neutral,
+    "happy": _draw_face_happy,
+    "sad": _draw_face_sad,
+    "angry": _draw_face_angry,
+    "surprised": _draw_face_surprised,
+    "searching": _draw_face_searching,
+}
+
+def face_frame(name):
+    """Returns the packed frame for one of the FACES."""
+    return frame_cache.get(("face", name), lambda: render(FACES[name]))
+
+def prerender():
+    """
+    Renders every face and every cached eye position ahead of time, so later
+    expressions and eye movements never wait on drawing.
+    """
+    for name in FACES:
+        face_frame(name)
+    offsets = range(-EYE_RADIUS, EYE_RADIUS + 1, EYE_OFFSET_STEP)
+    for side in ("left", "right"):
+        eye_frame(side, blink=True)
+        for x_offset in offsets:
+            for y_offset in offsets:
+                eye_frame(side, quantize_offset(x_offset), quantize_offset(y_offset))
+    eyes_frame()
+    eyes_frame(blink=True)
+
+def _draw_text(draw, text):
+    # Draw the text
+    draw.text((0, 0), text, font=get_font(), fill=255)
 
 def draw_text(text):
     """Displays text on the OLED display."""
     if display:
-        # Create blank image for drawing
-        image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
-        draw = ImageDraw.Draw(image)
+        show_frame(frame_cache.get(("text", text), lambda: render(_draw_text, text)))
 
-        # Load a font (make sure you have the font file in your project directory)
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 14)
-        except OSError:
-            print("Font not found, using default font.")
-            font = ImageFont.load_default()
-
-        # Draw the text
-        draw.text((0, 0), text, font=font, fill=255)
-
-        # Display the image
-        display.image(image)
-        display.show()
+def draw_map(grid_map, robot_position=None):
+    """Shows a shrunk-down view of an occupancy map on the OLED display."""
+    if display:
+        show_frame(pack_image(map_render.display_image(grid_map, robot_position=robot_position)))
 
 def clear_display():
     """Clears the OLED display."""
     if display:
-        display.fill(0)
-        display.show()
\ No newline at end of file
+        show_frame(BLANK_FRAME)
\ No newline at end of file
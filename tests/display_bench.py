@@ -0,0 +1,72 @@
+# display_bench.py
+# Compares drawing each face, eye position and text from scratch (new PIL image,
+# redraw, display.image()) with showing it from display.frame_cache, on the
+# simulated SSD1306. Its image() converts pixel by pixel like adafruit_ssd1306's.
+# Runs anywhere - no robot hardware needed.
+
+import random
+import time
+import hal
+
+hal.use("sim")
+
+from PIL import Image, ImageDraw, ImageFont
+import config as c
+import display as d
+
+REPEATS = 50
+
+def draw_uncached(draw_function, *args):
+    """The old path: a fresh image, every shape redrawn, converted by the driver."""
+    image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
+    draw_function(ImageDraw.Draw(image), *args)
+    d.display.image(image)
+    d.display.show()
+
+def draw_eyes_uncached(offsets):
+    image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
+    draw = ImageDraw.Draw(image)
+    d._draw_eye(draw, d.LEFT_EYE_CENTER, offsets[0], offsets[1], False)
+    d._draw_eye(draw, d.RIGHT_EYE_CENTER, offsets[2], offsets[3], False)
+    d.display.image(image)
+    d.display.show()
+
+def draw_text_uncached(text):
+    try:
+        font = ImageFont.truetype(d.FONT_PATH, d.FONT_SIZE)  # Reloaded from disk on every call
+    except OSError:
+        font = ImageFont.load_default()
+    image = Image.new("1", (c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"]))
+    ImageDraw.Draw(image).text((0, 0), text, font=font, fill=255)
+    d.display.image(image)
+    d.display.show()
+
+def per_call(function, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        function(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+if __name__ == "__main__":
+    d.initialize_display()
+    random.seed(0)
+    faces = [(name,) for name in d.FACES] * (REPEATS // len(d.FACES) + 1)
+    eyes = [tuple(d.quantize_offset(random.randint(-d.EYE_RADIUS, d.EYE_RADIUS)) for _ in range(4))
+            for _ in range(REPEATS)]
+    texts = [("Obstacle!",), ("Edge!",), ("Hello",)] * (REPEATS // 3)
+
+    start = time.perf_counter()
+    d.prerender()
+    prerender_time = time.perf_counter() - start
+
+    rows = [
+        ("face", per_call(lambda name: draw_uncached(d.FACES[name]), faces), per_call(lambda name: d.show_frame(d.face_frame(name)), faces)),
+        ("eyes", per_call(lambda offsets: draw_eyes_uncached(offsets), [(e,) for e in eyes]), per_call(d.draw_eyes, eyes)),
+        ("text", per_call(draw_text_uncached, texts), per_call(d.draw_text, texts)),
+    ]
+    print(f"prerender(): {prerender_time * 1000:.0f} ms for {len(d.frame_cache.frames)} frames "
+          f"({len(d.frame_cache.frames)} KB)\n")
+    print(f"{'frame':<5} | {'redrawn':>10} | {'cached':>9} | {'speed-up':>8}")
+    for name, uncached, cached in rows:
+        print(f"{name:<5} | {uncached * 1000:7.2f} ms | {cached * 1e6:6.1f} us | {uncached / cached:7.0f}x")
+    print(f"\ncache: {d.frame_cache.hits} hits, {d.frame_cache.misses} misses")
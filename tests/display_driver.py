@@ -0,0 +1,123 @@
+# display_driver.py
+
+import numpy as np
+
+# --- SSD1306 Partial Updates ---
+# The panel keeps its own copy of the frame (GDDRAM). In horizontal addressing mode,
+# which adafruit_ssd1306 sets up, the column and page address commands select a
+# window and the following data bytes fill it page by page. So a frame only needs
+# the windows that differ from the last frame sent, not all 1024 bytes.
+
+SET_COLUMN_ADDRESS = 0x21
+SET_PAGE_ADDRESS = 0x22
+COMMAND_STREAM = 0x00  # Control byte: every byte that follows is a command
+DATA_STREAM = 0x40     # Control byte: every byte that follows is display data
+
+# Bytes on the bus for one window besides its pixel data: the address byte of two
+# transactions, the two control bytes and the six addressing command bytes.
+WINDOW_OVERHEAD = 10
+
+def page_ranges(old, new):
+    """
+    Finds the changed columns of each page.
+
+    Args:
+        old, new: (pages, width) uint8 arrays of packed frames.
+
+    Returns:
+        A list of (page, first_column, last_column) for the pages that changed.
+    """
+    diff = old != new
+    dirty = np.flatnonzero(diff.any(axis=1))
+    first = diff[dirty].argmax(axis=1)
+    last = diff.shape[1] - 1 - diff[dirty, ::-1].argmax(axis=1)
+    return [(int(page), int(f), int(l)) for page, f, l in zip(dirty, first, last)]
+
+def changed_windows(old, new):
+    """
+    Covers the changes between two frames with the windows that cost the fewest bus bytes.
+
+    Neighbouring dirty pages can be sent as one window spanning all their changed
+    columns, or as a window each; each window costs WINDOW_OVERHEAD plus its size.
+    With at most 8 pages, trying every way of grouping consecutive dirty pages is
+    cheap.
+
+    Returns:
+        A list of (first_page, last_page, first_column, last_column) windows.
+    """
+    ranges = page_ranges(old, new)
+    count = len(ranges)
+    best_cost = [0] + [None] * count
+    best_split = [0] * (count + 1)
+    for end in range(1, count + 1):
+        for start in range(end):
+            group = ranges[start:end]
+            pages = group[-1][0] - group[0][0] + 1
+            columns = max(r[2] for r in group) - min(r[1] for r in group) + 1
+            cost = best_cost[start] + WINDOW_OVERHEAD + pages * columns
+            if best_cost[end] is None or cost < best_cost[end]:
+                best_cost[end] = cost
+                best_split[end] = start
+
+    windows = []
+    end = count
+    while end > 0:
+        start = best_split[end]
+        group = ranges[start:end]
+        windows.append((group[0][0], group[-1][0], min(r[1] for r in group), max(r[2] for r in group)))
+        end = start
+    return windows[::-1]
+
+class PartialSSD1306:
+    """
+    Sends frames to an SSD1306 as only the windows that changed since the last one.
+
+    Wraps an adafruit_ssd1306.SSD1306_I2C (or the simulated one) and talks to its
+    i2c_device directly: one transaction with the addressing commands, one with the
+    window's data. The driver's own buffer is kept in step, so a later
+    display.show() still shows the right frame.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.i2c_device = display.i2c_device
+        self.width = display.width
+        self.pages = display.height // 8
+        self.last = None
+
+        self.pushes = 0
+        self.windows_sent = 0
+        self.bytes_sent = 0
+
+    def push(self, frame):
+        """
+        Shows a packed frame, sending only what changed.
+
+        Returns:
+            The number of bytes sent on the bus.
+        """
+        new = np.frombuffer(frame, dtype=np.uint8).reshape(self.pages, self.width)
+        if self.last is None:
+            windows = [(0, self.pages - 1, 0, self.width - 1)]
+        else:
+            windows = changed_windows(self.last, new)
+
+        sent = 0
+        for first_page, last_page, first_column, last_column in windows:
+            window = new[first_page:last_page + 1, first_column:last_column + 1]
+            with self.i2c_device:
+                self.i2c_device.write(bytes([COMMAND_STREAM, SET_COLUMN_ADDRESS, first_column, last_column,
+                                             SET_PAGE_ADDRESS, first_page, last_page]))
+                self.i2c_device.write(bytes([DATA_STREAM]) + window.tobytes())
+            sent += WINDOW_OVERHEAD + window.size
+
+        self.display.buffer[1:] = frame
+        self.last = new
+        self.pushes += 1
+        self.windows_sent += len(windows)
+        self.bytes_sent += sent
+        return sent
+
+    def invalidate(self):
+        """Forgets the last frame, for when something else has drawn on the panel."""
+        self.last = None
@@ -0,0 +1,65 @@
+# display_driver_bench.py
+# Counts the I2C bytes needed for typical display changes, sending the whole frame
+# with show() against display_driver's changed windows. Uses the simulated SSD1306,
+# whose I2C device parses the commands into its GDDRAM, so every partial update is
+# also checked against the frame it was meant to show.
+# Runs anywhere - no robot hardware needed.
+
+import random
+import hal
+
+hal.use("sim")
+
+import display as d
+
+I2C_BITS_PER_BYTE = 9  # 8 data bits plus ACK
+BUS_SPEED = 400_000    # Hz, fast-mode I2C
+
+def bus_bytes(device):
+    """Bytes on the wire so far: each transaction also carries the address byte."""
+    return device.bytes_written + device.transactions
+
+def full_push(frame):
+    d.display.buffer[1:] = frame
+    d.display.show()
+
+def measure(name, steps):
+    """Runs (from_frame, to_frame) changes both ways and prints the average cost."""
+    device = d.display.i2c_device
+    results = []
+    for push in (full_push, d.panel.push):
+        d.panel.invalidate()  # show() drew behind the panel's back
+        total = 0
+        for before, after in steps:
+            push(before)
+            start = bus_bytes(device)
+            push(after)
+            total += bus_bytes(device) - start
+            assert d.display.frame == after, f"{name}: panel shows the wrong frame"
+        results.append(total / len(steps))
+    full, partial = results
+    print(f"{name:<14} | {full:7.0f} B {full * I2C_BITS_PER_BYTE / BUS_SPEED * 1000:5.2f} ms | "
+          f"{partial:7.0f} B {partial * I2C_BITS_PER_BYTE / BUS_SPEED * 1000:5.2f} ms | {partial / full:6.1%}")
+
+if __name__ == "__main__":
+    d.initialize_display()
+    random.seed(0)
+
+    def random_eyes():
+        return d.eyes_frame(*(random.randint(-d.EYE_RADIUS, d.EYE_RADIUS) for _ in range(4)))
+
+    open_eyes = d.eyes_frame()
+    iris_moves = []
+    for _ in range(50):
+        offsets = [random.randint(-8, 8) for _ in range(4)]
+        moved = [offsets[0] + d.EYE_OFFSET_STEP] + offsets[1:]
+        iris_moves.append((d.eyes_frame(*offsets), d.eyes_frame(*moved)))
+
+    faces = list(d.FACES)
+    print(f"I2C bytes per change at {BUS_SPEED // 1000} kHz\n")
+    print(f"{'change':<14} | {'full frame show()':>19} | {'changed windows':>19} | {'of full':>7}")
+    measure("blink", [(open_eyes, d.eyes_frame(blink=True))] * 10)
+    measure("iris step", iris_moves)
+    measure("look around", [(random_eyes(), random_eyes()) for _ in range(50)])
+    measure("face switch", [(d.face_frame(a), d.face_frame(b)) for a in faces for b in faces if a != b])
+    measure("eyes to face", [(open_eyes, d.face_frame(name)) for name in faces])
@@ -0,0 +1,209 @@
+# filters.py
+
+import math
+from bisect import bisect_left, insort
+import numpy as np
+from scipy.signal import lfilter
+
+# --- Streaming Filters ---
+# Filters for sensor streams, each with the same two entry points:
+#   update(x)   filters one sample and returns the output
+#   process(xs) filters a NumPy batch and returns an array of outputs
+# Both advance the same state, so a stream can be fed one sample at a time, in
+# batches, or a mix of the two, and gives the same outputs either way. History is
+# kept in ring buffers allocated once, so the per-sample cost doesn't depend on the
+# window size (except the median's, which is a binary search and a short move).
+#
+# Until a window has filled, the windowed filters work over the samples so far.
+
+class MovingAverage:
+    """The mean of the last `window` samples, kept as a running sum."""
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.ring = np.zeros(self.window)  # Slots not yet filled stay 0, so they leave the sum as nothing
+        self.index = 0  # The slot the next sample goes in
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x):
+        x = float(x)
+        ring = self.ring
+        self.total += x - ring.item(self.index)
+        ring[self.index] = x
+        self.index += 1
+        if self.index == self.window:
+            self.index = 0
+            self.total = math.fsum(ring.tolist())  # Once per window, so rounding errors don't build up
+        if self.count < self.window:
+            self.count += 1
+        return self.total / self.count
+
+    def process(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        n = len(xs)
+        if n == 0:
+            return xs
+        window = self.window
+        # Sample i pushes out the ring slot it lands in, or, once the batch has gone
+        # round the ring, the batch's own sample from a window earlier
+        outgoing = np.empty(n)
+        head = min(n, window)
+        outgoing[:head] = self.ring[(self.index + np.arange(head)) % window]
+        outgoing[head:] = xs[:n - head]
+        totals = self.total + np.cumsum(xs - outgoing)
+        outputs = totals / np.minimum(np.arange(self.count + 1, self.count + n + 1), window)
+
+        tail = xs[-window:]
+        self.ring[(self.index + n - len(tail) + np.arange(len(tail))) % window] = tail
+        self.index = (self.index + n) % window
+        self.count = min(self.count + n, window)
+        self.total = math.fsum(self.ring.tolist()) if n >= window else float(totals[-1])
+        return outputs
+
+    def history(self):
+        """The samples in the window, oldest first."""
+        if self.count < self.window:
+            return self.ring[:self.count].copy()
+        return np.concatenate((self.ring[self.index:], self.ring[:self.index]))
+
+class ExponentialMovingAverage:
+    """y += alpha * (x - y); the first sample sets y."""
+
+    def __init__(self, alpha):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.reset()
+
+    @classmethod
+    def from_cutoff(cls, cutoff, sample_rate):
+        """Builds the filter with a -3 dB cutoff (Hz) at a given sample rate."""
+        rc = 1 / (2 * math.pi * cutoff)
+        dt = 1 / sample_rate
+        return cls(dt / (rc + dt))
+
+    def reset(self):
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = float(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def process(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) == 0:
+            return xs
+        if self.value is None:
+            self.value = float(xs[0])
+        # y[k] = decay^(k+1) y0 + alpha * sum_j decay^(k-j) x[j], worked out in blocks
+        # short enough that decay^-block stays well inside float range
+        decay = 1 - self.alpha
+        outputs = np.empty_like(xs)
+        if decay == 0:
+            outputs[:] = xs
+        else:
+            block = max(1, int(200 / -math.log10(decay))) if decay < 1 else len(xs)
+            for start in range(0, len(xs), block):
+                chunk = xs[start:start + block]
+                powers = decay ** np.arange(1, len(chunk) + 1)
+                outputs[start:start + len(chunk)] = powers * (self.value + self.alpha * np.cumsum(chunk / powers))
+                self.value = float(outputs[start + len(chunk) - 1])
+        return outputs
+
+class MedianFilter:
+    """The median of the last `window` samples, from a sorted copy of the window."""
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.ring = [0.0] * self.window
+        self.index = 0
+        self.count = 0
+        self.sorted = []
+
+    def update(self, x):
+        x = float(x)
+        if self.count == self.window:
+            del self.sorted[bisect_left(self.sorted, self.ring[self.index])]
+        else:
+            self.count += 1
+        self.ring[self.index] = x
+        self.index = (self.index + 1) % self.window
+        insort(self.sorted, x)
+        middle = self.count // 2
+        if self.count % 2:
+            return self.sorted[middle]
+        return (self.sorted[middle - 1] + self.sorted[middle]) / 2
+
+    def process(self, xs):
+        # A sliding np.median partitions every window from scratch, which is slower
+        # than keeping the window sorted from one sample to the next
+        xs = np.asarray(xs, dtype=float)
+        update = self.update
+        return np.array([update(x) for x in xs.tolist()])
+
+class Biquad:
+    """
+    A second-order IIR section (transposed direct form II).
+
+    Use low_pass() for a Butterworth-style low-pass from a cutoff frequency.
+    """
+
+    def __init__(self, b0, b1, b2, a1, a2):
+        self.b0, self.b1, self.b2 = b0, b1, b2
+        self.a1, self.a2 = a1, a2
+        self.reset()
+
+    @classmethod
+    def low_pass(cls, cutoff, sample_rate, q=1 / math.sqrt(2)):
+        """The RBJ audio-EQ-cookbook low-pass; q = 1/sqrt(2) gives a Butterworth response."""
+        w0 = 2 * math.pi * cutoff / sample_rate
+        alpha = math.sin(w0) / (2 * q)
+        cos_w0 = math.cos(w0)
+        a0 = 1 + alpha
+        b1 = (1 - cos_w0) / a0
+        return cls(b1 / 2, b1, b1 / 2, -2 * cos_w0 / a0, (1 - alpha) / a0)
+
+    def reset(self):
+        self.z1 = self.z2 = 0.0
+        self.primed = False
+
+    def _prime(self, x):
+        """Starts the filter at steady state for input x instead of ringing up from zero."""
+        gain = (self.b0 + self.b1 + self.b2) / (1 + self.a1 + self.a2)
+        y = gain * x
+        self.z1 = y - self.b0 * x
+        self.z2 = self.b2 * x - self.a2 * y
+        self.primed = True
+
+    def update(self, x):
+        if not self.primed:
+            self._prime(x)
+        y = self.b0 * x + self.z1
+        self.z1 = self.b1 * x - self.a1 * y + self.z2
+        self.z2 = self.b2 * x - self.a2 * y
+        return y
+
+    def process(self, xs):
+        # lfilter runs the same transposed direct form II, so z1 and z2 are its zi
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) == 0:
+            return xs
+        if not self.primed:
+            self._prime(float(xs[0]))
+        outputs, state = lfilter((self.b0, self.b1, self.b2), (1.0, self.a1, self.a2), xs, zi=(self.z1, self.z2))
+        self.z1, self.z2 = float(state[0]), float(state[1])
+        return outputs
@@ -0,0 +1,239 @@
+# gpio_events.py
+
+import threading
+import time
+from collections import deque
+import numpy as np
+from hal import GPIO, clock as hal_clock
+import config as c
+
+# --- Event-Driven Inputs ---
+# The edge, touch and sound sensors used to be read once per control loop pass,
+# and a pass can take seconds, so a clap or a brief edge crossing between two
+# reads was never seen. Here each pin gets a GPIO edge callback instead. The
+# callback (on RPi.GPIO's event thread) timestamps the change, updates the pin's
+# state and pushes an InputEvent onto a deque - appends and pops on a deque are
+# atomic, so the event thread never takes a lock the control loop holds.
+#
+# The control loop reads each input in O(1):
+#   is_active(name)   the debounced level right now
+#   triggered(name)   True if the input is active or went active since the last call
+# or drains the timestamped events with events().
+#
+# Hooks registered with on_active() run in the callback itself, so an edge can
+# stop the motors without waiting for the loop to come round.
+#
+# A callback reads the pin to learn which way it changed, but a pulse shorter than
+# the callback latency is over by then. An edge on an inactive input that reads
+# inactive is therefore taken as such a pulse and latched (like ranging.py's echo
+# callback, it goes by the edge having happened rather than the level). Its
+# trailing edge is then owed: the next inactive-reading edge is swallowed however
+# late it comes, unless OWED_EDGE_TIMEOUT passes first (the kernel can merge both
+# edges of a pulse into one callback, and then no second one comes).
+
+SETTINGS = c.GPIO_EVENTS
+
+class InputEvent:
+    """A debounced level change on an input."""
+
+    __slots__ = ("time", "name", "active")
+
+    def __init__(self, time, name, active):
+        self.time = time  # hal clock seconds
+        self.name = name
+        self.active = active
+
+    def __repr__(self):
+        return f"InputEvent({self.time:.4f}, {self.name!r}, {'active' if self.active else 'inactive'})"
+
+class Input:
+    """One event-driven input pin and its state."""
+
+    def __init__(self, name, pin, debounce, active_level=1):
+        self.name = name
+        self.pin = pin
+        self.debounce = debounce  # Seconds after an accepted change during which changes count as bounce
+        self.active_level = active_level
+        self.active = False
+        self.latched = False  # Went active since triggered() last cleared it
+        self.changed = float("-inf")  # When the state last changed
+        self.unsettled = False  # A change was ignored as bounce; the next read takes another look
+        self.owed_edge = None  # When a pulse was latched whose trailing edge's callback hasn't run yet
+        self.hooks = []
+        self.changes = 0
+        self.bounces = 0
+
+class InputManager:
+    """Watches input pins with edge callbacks and keeps their debounced, latched state."""
+
+    def __init__(self, gpio=GPIO, clock=hal_clock.monotonic, queue_length=SETTINGS["QUEUE_LENGTH"],
+                 latency_samples=SETTINGS["LATENCY_SAMPLES"], owed_edge_timeout=SETTINGS["OWED_EDGE_TIMEOUT"]):
+        self.gpio = gpio
+        self.clock = clock
+        self.owed_edge_timeout = owed_edge_timeout  # Seconds a latched pulse's trailing edge is waited for
+        self.inputs = {}
+        self.by_pin = {}
+        self.queue = deque(maxlen=queue_length)
+        self.dropped = 0  # Events pushed out of a full queue before the loop drained them
+
+        # --- Latency ---
+        self.hook_latencies = deque(maxlen=latency_samples)  # Callback entry to hooks done, real seconds
+        self.loop_latencies = deque(maxlen=latency_samples)  # Event to the loop draining it, clock seconds
+
+    def add(self, name, pin, debounce=SETTINGS["DEFAULT_DEBOUNCE"], active_level=None):
+        """
+        Starts watching a pin.
+
+        Args:
+            name: What the input is called in reads and events.
+            pin: The BCM pin.
+            debounce: Seconds; changes this soon after the last are ignored as bounce.
+            active_level: The level that means "active"; GPIO.HIGH by default.
+        """
+        if name in self.inputs:
+            raise ValueError(f"Input '{name}' is already registered")
+        gpio = self.gpio
+        state = Input(name, pin, debounce, gpio.HIGH if active_level is None else active_level)
+        gpio.setup(pin, gpio.IN)
+        state.active = gpio.input(pin) == state.active_level
+        state.latched = state.active
+        self.inputs[name] = state
+        self.by_pin[pin] = state
+        # Debouncing here rather than with RPi.GPIO's bouncetime, which would also
+        # swallow the release after a short pulse and leave the input stuck active
+        gpio.add_event_detect(pin, gpio.BOTH, callback=self._on_edge)
+        return state
+
+    def remove(self, name):
+        state = self.inputs.pop(name)
+        del self.by_pin[state.pin]
+        self.gpio.remove_event_detect(state.pin)
+
+    def on_active(self, name, hook):
+        """Calls hook(event) from the GPIO callback whenever the input goes active."""
+        self.inputs[name].hooks.append(hook)
+
+    # --- Callback ---
+
+    def _on_edge(self, pin):
+        entered = time.perf_counter()
+        state = self.by_pin.get(pin)
+        if state is None:
+            return
+        now = self.clock()
+        active = self.gpio.input(pin) == state.active_level
+        owed, state.owed_edge = state.owed_edge, None
+        if active == state.active:
+            if active:
+                return
+            if owed is not None and now - owed < self.owed_edge_timeout:
+                return  # The trailing edge of the pulse latched below
+            if now - state.changed >= state.debounce:
+                self._change(state, True, now, entered)  # A pulse that ended before the callback ran
+                self._change(state, False, now)
+                state.owed_edge = now
+            return
+        if now - state.changed < state.debounce:
+            state.bounces += 1
+            state.unsettled = True
+            return
+        self._change(state, active, now, entered)
+
+    def _change(self, state, active, now, entered=None):
+        state.active = active
+        state.changed = now
+        state.changes += 1
+        state.unsettled = False
+        event = InputEvent(now, state.name, active)
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        if active:
+            state.latched = True
+            if state.hooks:
+                for hook in state.hooks:
+                    hook(event)
+                if entered is not None:
+                    self.hook_latencies.append(time.perf_counter() - entered)
+
+    # --- Control Loop ---
+
+    def _settle(self, state):
+        """
+        Re-reads an input whose last change was ignored as bounce, once the debounce
+        window is over, in case it settled at the other level.
+        """
+        now = self.clock()
+        if now - state.changed >= state.debounce:
+            active = self.gpio.input(state.pin) == state.active_level
+            state.unsettled = False
+            if active != state.active:
+                self._change(state, active, now)
+
+    def is_active(self, name):
+        """The input's debounced level now."""
+        state = self.inputs[name]
+        if state.unsettled:
+            self._settle(state)
+        return state.active
+
+    def triggered(self, name):
+        """True if the input is active or has gone active since the last call; clears the latch."""
+        state = self.inputs[name]
+        if state.unsettled:
+            self._settle(state)
+        latched, state.latched = state.latched, state.active
+        return latched
+
+    def events(self):
+        """Removes and returns the queued InputEvents, oldest first."""
+        now = self.clock()
+        events = []
+        queue = self.queue
+        while queue:
+            event = queue.popleft()
+            self.loop_latencies.append(now - event.time)
+            events.append(event)
+        return events
+
+    # --- Metrics ---
+
+    def latency_report(self):
+        """Median, 99th percentile and maximum of the hook and loop latencies, in seconds."""
+        report = {}
+        for name, latencies in (("hook", self.hook_latencies), ("loop", self.loop_latencies)):
+            values = np.array(latencies) if latencies else np.zeros(1)
+            report[name] = {"count": len(latencies), "median": float(np.median(values)),
+                            "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+        return report
+
+    def print_report(self):
+        for name, stats in self.latency_report().items():
+            print(f"{name} latency: {stats['count']} events, median {stats['median'] * 1e3:.3f} ms, "
+                  f"99th percentile {stats['p99'] * 1e3:.3f} ms, max {stats['max'] * 1e3:.3f} ms")
+        for state in self.inputs.values():
+            print(f"  {state.name}: {state.changes} changes, {state.bounces} bounces ignored")
+        if self.dropped:
+            print(f"  {self.dropped} events dropped from a full queue")
+
+# --- Shared Inputs ---
+# robot.start_inputs() sets this up; touch_sensor, sound_sensor and
+# robot.read_edge_sensors() read from it once it exists.
+
+_inputs = None
+_inputs_lock = threading.Lock()
+
+def start():
+    """Returns the shared InputManager, creating it on first use."""
+    global _inputs
+    with _inputs_lock:
+        if _inputs is None:
+            _inputs = InputManager()
+        return _inputs
+
+def watching(name):
+    """Returns the shared InputManager if it is watching `name`, else None."""
+    inputs = _inputs
+    if inputs is not None and name in inputs.inputs:
+        return inputs
+    return None
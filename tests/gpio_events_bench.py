@@ -0,0 +1,199 @@
+# gpio_events_bench.py
+# Compares polling the edge, touch and sound sensors once per control loop pass
+# with the event-driven inputs of gpio_events, on the simulated robot:
+#   - short, bouncy sound pulses between passes: how many the loop sees
+#   - the wander loop near the table edge: how long from an edge sensor going
+#     off the table to the wheels stopping, and how often the robot falls off
+#   - pulses that are over before their callback runs, as on a busy Pi: each must
+#     still be latched, once
+# Runs anywhere - no robot hardware needed.
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import numpy as np
+import hal
+
+hal.use("sim")
+
+import config as c
+import robot as rc
+import movement as m
+import sound_sensor as s
+import gpio_events
+
+PULSES = 40
+PULSE_LENGTH = 0.03  # Seconds a clap keeps the sound sensor high
+PASS_LENGTH = 1.5  # Seconds per control loop pass, about what main_0.35.py's blocking moves take
+WANDER_TIME = 120.0  # Virtual seconds
+
+class EdgeWatch:
+    """Times each edge detection to the moment the wheels stop, in virtual time."""
+
+    def __init__(self, backend):
+        self.world, self.gpio = backend.world, backend.gpio
+        self.pins = [c.SENSOR_PINS["LEFT_EDGE_SENSOR"], c.SENSOR_PINS["RIGHT_EDGE_SENSOR"]]
+        self.triggered = None
+        self.latencies = []
+        backend.clock.on_advance(self.step)
+
+    def step(self, now):
+        on_edge = any(self.gpio.levels.get(pin) for pin in self.pins)
+        if on_edge and self.triggered is None and self.world.v > 0:
+            self.triggered = now
+        elif self.triggered is not None and self.world.v <= 0:
+            self.latencies.append(now - self.triggered)
+            self.triggered = None
+
+def clap_schedule(clock, gpio, start):
+    """Schedules a bouncy pulse on the sound sensor pin at a random time in each loop pass."""
+    pin = c.SENSOR_PINS["SOUND_SENSOR"]
+    for i in range(PULSES):
+        when = start + i * PASS_LENGTH + random.uniform(0.01, PASS_LENGTH - PULSE_LENGTH - 0.01)
+        # The microphone module chatters for a millisecond at each end
+        for offset, level in ((0, 1), (0.0003, 0), (0.0006, 1), (PULSE_LENGTH, 0), (PULSE_LENGTH + 0.0004, 1),
+                              (PULSE_LENGTH + 0.0008, 0)):
+            clock.call_at(when + offset, lambda level=level: gpio.set_input(pin, level))
+
+class LaggingGPIO:
+    """A GPIO whose edge callbacks run only when deliver() is called, after the pin may have changed again."""
+
+    HIGH, LOW, IN, BOTH = 1, 0, "in", "both"
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+        self.pending = []
+
+    def setup(self, pin, direction):
+        self.levels.setdefault(pin, self.LOW)
+
+    def input(self, pin):
+        return self.levels[pin]
+
+    def add_event_detect(self, pin, edge, callback):
+        self.callbacks[pin] = callback
+
+    def set_input(self, pin, level, coalesce=False):
+        self.levels[pin] = level
+        if not (coalesce and self.pending):
+            self.pending.append(pin)  # The kernel can merge edges that come before the callback thread wakes
+
+    def deliver(self, between=lambda: None):
+        """Runs the queued callbacks, calling between() before each one after the first."""
+        pending, self.pending = self.pending, []
+        for i, pin in enumerate(pending):
+            if i:
+                between()
+            self.callbacks[pin](pin)
+
+def short_pulses():
+    """
+    Pulses shorter than the callback latency: one callback per edge, close together or
+    further apart than the debounce window, or one callback for both edges.
+
+    Returns:
+        (pulses, how many triggered() saw, how many active events were queued, how many times the hook ran)
+    """
+    gpio = LaggingGPIO()
+    now = [0.0]
+    inputs = gpio_events.InputManager(gpio=gpio, clock=lambda: now[0])
+    inputs.add("sound", 1, debounce=0.01)
+    hooks = []
+    inputs.on_active("sound", hooks.append)
+    gaps = (0.0005, 0.02, None)  # Seconds between the two callbacks; None merges them
+    seen = events = 0
+    for i in range(PULSES):
+        gap = gaps[i % len(gaps)]
+        now[0] += 0.1
+        gpio.set_input(1, gpio.HIGH)
+        gpio.set_input(1, gpio.LOW, coalesce=gap is None)
+        now[0] += 0.005  # The callbacks run once the pulse is over
+
+        def wait(gap=gap):
+            now[0] += gap
+        gpio.deliver(wait)
+        now[0] += 0.05
+        seen += inputs.triggered("sound")
+        events += sum(event.active for event in inputs.events())
+        assert not inputs.is_active("sound"), "a latched pulse left the input active"
+    return PULSES, seen, events, len(hooks)
+
+def count_claps(clock, gpio):
+    """Runs loop passes with a clap during each and counts the passes that heard it."""
+    start = clock.monotonic()
+    clap_schedule(clock, gpio, start)
+    inputs = gpio_events.watching("sound")
+    heard, events = 0, []
+    for _ in range(PULSES):
+        clock.sleep(PASS_LENGTH)
+        heard += s.is_sound_detected()
+        if inputs is not None:
+            events += [event for event in inputs.events() if event.name == "sound" and event.active]
+    return PULSES, heard, events
+
+def wander(backend, movement):
+    """The main_0.35.py edge and wander decisions, for WANDER_TIME seconds."""
+    clock = hal.clock
+    world = backend.world
+    world.x = world.y = world.heading = 0.0
+    world.falls = 0
+    watch = EdgeWatch(backend)
+    start = clock.monotonic()
+    while clock.monotonic() - start < WANDER_TIME:
+        left_edge, right_edge = rc.read_edge_sensors()
+        if left_edge == 1:
+            movement.turn_right_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 3)
+        elif right_edge == 1:
+            movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 3)
+        else:
+            movement.move_forward(duration=1.0)
+        if rc.inputs is not None:
+            rc.inputs.events()  # The loop's turn to see what happened, for the loop latency
+        clock.sleep(0.1)
+    backend.clock.listeners.remove(watch.step)
+    return world.falls, np.array(watch.latencies)
+
+if __name__ == "__main__":
+    backend = hal.backend()
+    clock, gpio = backend.clock, backend.gpio
+    random.seed(c.SIMULATION["SEED"])
+    c.GYRO_CALIBRATION["PATH"] = os.path.join(tempfile.mkdtemp(), "gyro.json")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        s.initialize_sound_sensor()
+        movement = m.Movement(rc.pca)
+
+        polled_claps = count_claps(clock, gpio)
+        polled_wander = wander(backend, movement)
+
+        inputs = rc.start_inputs()
+        rc.start_safety(movement)
+        event_claps = count_claps(clock, gpio)
+        sound_events = event_claps[2]
+        event_wander = wander(backend, movement)
+
+    print(f"Sound pulses of {PULSE_LENGTH * 1000:.0f} ms between {PASS_LENGTH} s loop passes:")
+    print(f"  polled: heard {polled_claps[1]} of {polled_claps[0]}")
+    print(f"  events: heard {event_claps[1]} of {event_claps[0]} "
+          f"({len(sound_events)} sound events, {inputs.inputs['sound'].bounces} bounces ignored)")
+
+    pulses, seen, latched_events, hook_runs = short_pulses()
+    print(f"  pulses over before their callback ran: heard {seen} of {pulses} "
+          f"({latched_events} events, hook ran {hook_runs} times)")
+
+    print(f"\nWandering for {WANDER_TIME:.0f} s near the table edge:")
+    for name, (falls, latencies) in (("polled", polled_wander), ("events", event_wander)):
+        print(f"  {name}: {falls} falls, edge to stop median {np.median(latencies) * 1000:.1f} ms, "
+              f"max {latencies.max() * 1000:.1f} ms over {len(latencies)} edges")
+    print()
+    inputs.print_report()
+
+    assert event_claps[1] == event_claps[0] and len(sound_events) == event_claps[0]
+    assert seen == pulses and latched_events == pulses and hook_runs == pulses
+    assert event_wander[0] <= polled_wander[0]
+    assert np.max(event_wander[1]) < np.median(polled_wander[1])
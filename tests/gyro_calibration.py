@@ -0,0 +1,172 @@
+# gyro_calibration.py
+
+import json
+import os
+import numpy as np
+import hal
+from hal import clock as time
+import config as c
+import imu_sampler as imu
+
+# --- Gyro Calibration ---
+# Gyro biases barely change between boots of the same IMU at similar temperatures,
+# so they are measured once and kept in a small JSON cache, one entry per device.
+# At boot a short still window is enough to confirm the cached biases; a full
+# measurement only happens when there is no usable entry, the biases are off or
+# the temperature has moved since they were measured, and
+# even then it stops as soon as the mean is known well enough instead of after a
+# fixed number of readings. Readings are 14-byte burst reads (imu_sampler), so
+# the IMU can be sampled far faster than with get_gyro_data().
+
+SETTINGS = c.GYRO_CALIBRATION
+AXES = ("x", "y", "z")
+
+class Calibration:
+    """Gyro biases (deg/s) for x, y and z, with the noise and temperature they were measured at."""
+
+    def __init__(self, bias, noise, temperature, samples, source):
+        self.bias = tuple(float(b) for b in bias)
+        self.noise = tuple(float(n) for n in noise)
+        self.temperature = temperature
+        self.samples = samples
+        self.source = source  # "cache" or "measured"
+        self.saved = source == "cache"  # Whether the cache holds these biases
+
+    def as_dict(self):
+        return dict(zip(AXES, self.bias))
+
+    def to_json(self):
+        return {"bias": self.bias, "noise": self.noise, "temperature": self.temperature, "samples": self.samples}
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(entry["bias"], entry["noise"], entry.get("temperature"), entry["samples"], "cache")
+
+def device_key(mpu):
+    """The cache entry name for an IMU; simulated IMUs get their own entries."""
+    return f"{hal.backend().name}:mpu@{mpu.address:#04x}"
+
+# --- Cache File ---
+
+def load_cache(path=None):
+    """Returns the cache as a dict of device key -> entry; empty if missing or unreadable."""
+    path = path or SETTINGS["PATH"]
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_calibration(key, calibration, path=None):
+    """Stores one device's calibration, replacing the cache file atomically."""
+    path = path or SETTINGS["PATH"]
+    cache = load_cache(path)
+    cache[key] = calibration.to_json()
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(temporary, path)
+
+# --- Sampling ---
+
+def read_gyro(mpu, count, rate=SETTINGS["RATE"]):
+    """
+    Takes `count` readings at `rate` Hz.
+
+    Returns:
+        (gyro, temperature): an (n, 3) array in deg/s and the mean temperature in deg C.
+    """
+    scales = imu.scales(mpu.read_accel_range(), mpu.read_gyro_range())
+    raw = np.empty((count, imu.WORDS), dtype=np.int16)
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    for i in range(count):
+        raw[i] = np.frombuffer(bytes(imu.read_burst(mpu)), dtype=">i2")
+        deadline += period
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    samples = imu.decode(np.zeros(count), raw, scales)
+    return samples[:, imu.GX:imu.GZ + 1], float(samples[:, imu.TEMP].mean())
+
+def is_still(noise):
+    """True if the gyro noise (std per axis) is low enough for the robot to be standing still."""
+    return max(noise) <= SETTINGS["STILL_NOISE"]
+
+def check(mpu, calibration, samples=SETTINGS["CHECK_SAMPLES"]):
+    """
+    Tests cached biases against a short still window.
+
+    Whether the robot is moving is decided from the noise alone. A quiet window
+    whose mean is off the biases, by however much, means they no longer hold.
+
+    Returns:
+        (passed, still): whether the biases still hold, and whether the robot was still.
+    """
+    gyro, temperature = read_gyro(mpu, samples)
+    if not is_still(gyro.std(axis=0)):
+        return False, False
+    if calibration.temperature is not None and abs(temperature - calibration.temperature) > SETTINGS["TEMPERATURE_TOLERANCE"]:
+        return False, True
+    offset = np.abs(gyro.mean(axis=0) - calibration.bias)
+    return bool(np.all(offset <= SETTINGS["BIAS_TOLERANCE"])), True
+
+def measure(mpu, min_samples=SETTINGS["MIN_SAMPLES"], max_samples=SETTINGS["MAX_SAMPLES"],
+            target_error=SETTINGS["TARGET_ERROR"]):
+    """
+    Measures the biases, stopping once the standard error of every axis's mean is
+    below `target_error` deg/s (or at `max_samples`).
+    """
+    chunks = []
+    temperatures = []
+    count = 0
+    chunk = min_samples
+    while True:
+        gyro, temperature = read_gyro(mpu, chunk)
+        chunks.append(gyro)
+        temperatures.append(temperature * chunk)
+        count += chunk
+
+        readings = np.concatenate(chunks)
+        noise = readings.std(axis=0, ddof=1)
+        if np.all(noise / np.sqrt(count) <= target_error) or count >= max_samples:
+            break
+        # Enough further samples to reach the target at the noise seen so far
+        needed = int(np.max(noise / target_error) ** 2) + 1
+        chunk = min(max(needed - count, min_samples // 4), max_samples - count)
+
+    return Calibration(readings.mean(axis=0), noise, sum(temperatures) / count, count, "measured")
+
+# --- Boot ---
+
+def calibrate(mpu, path=None, force=False):
+    """
+    Returns the gyro biases, from the cache if they pass a still check, else measured and cached.
+    The result's `saved` is False if the robot moved while they were measured and they weren't cached.
+
+    Args:
+        mpu: The IMU (as from hal.create_mpu()).
+        path: The cache file; config.GYRO_CALIBRATION["PATH"] by default.
+        force: Measure even if the cache has an entry.
+    """
+    key = device_key(mpu)
+    entry = load_cache(path).get(key)
+    cached = Calibration.from_json(entry) if entry is not None and not force else None
+
+    if cached is not None:
+        passed, still = check(mpu, cached)
+        if passed:
+            return cached
+        if not still:
+            print("Robot not still; using the cached gyro biases.")
+            return cached
+        print("Cached gyro biases no longer match; recalibrating.")
+
+    print("Calibrating gyroscope. Please keep the robot still.")
+    calibration = measure(mpu)
+    if not is_still(calibration.noise):
+        print("Warning: the robot moved during gyro calibration; the biases may be off.")
+    else:
+        save_calibration(key, calibration, path)
+        calibration.saved = True
+    return calibration
@@ -0,0 +1,97 @@
+# gyro_calibration_bench.py
+# Measures boot-time gyro calibration on the simulated IMU: the old fixed 500
+# readings against a first boot (measured with early stopping), a boot with cached
+# biases, boots after the bias has drifted a little or a lot or the temperature has
+# changed, and boots while the robot is being rocked, which must neither remeasure
+# nor save anything.
+# Times are in virtual seconds, i.e. how long the robot would wait before moving.
+# Runs anywhere - no robot hardware needed.
+
+import contextlib
+import io
+import os
+import tempfile
+import hal
+
+hal.use("sim")
+
+import config as c
+import gyro_calibration as gc
+
+ROCK_PERIOD = 0.04  # Seconds per back-and-forth while the robot is rocked
+
+def old_calibration(mpu, num_readings=500, delay=0.01):
+    """DeadReckoning.calibrate_gyro before the cache: z only, printing every reading."""
+    total_gyro_z = 0
+    for i in range(num_readings):
+        total_gyro_z += mpu.get_gyro_data()['z']
+        print(f"Calibrating... reading {i}", end='\r')
+        hal.clock.sleep(delay)
+    return total_gyro_z / num_readings
+
+def timed(fn, *args, **kwargs):
+    start = hal.clock.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return result, hal.clock.monotonic() - start
+
+def bias_error(calibration):
+    return max(abs(b - t) for b, t in zip(calibration.bias, c.SIMULATION["GYRO_BIAS"]))
+
+if __name__ == "__main__":
+    mpu = hal.create_mpu()
+    path = os.path.join(tempfile.mkdtemp(), "gyro.json")
+
+    bias_z, old_time = timed(old_calibration, mpu)
+    print(f"{'boot':34} {'wait':>7} {'readings':>9} {'bias error':>11} {'source':>9}")
+    print(f"{'old: 500 readings, z only':34} {old_time:5.2f} s {500:9d} "
+          f"{abs(bias_z - c.SIMULATION['GYRO_BIAS'][2]):7.3f} deg/s")
+
+    def report(name, calibration, seconds):
+        print(f"{name:34} {seconds:5.2f} s {calibration.samples:9d} {bias_error(calibration):7.3f} deg/s "
+              f"{calibration.source:>9}")
+
+    cold, cold_time = timed(gc.calibrate, mpu, path)
+    report("first boot (no cache)", cold, cold_time)
+    warm, warm_time = timed(gc.calibrate, mpu, path)
+    report("cached, still check passes", warm, warm_time)
+    assert warm.source == "cache" and warm_time < 0.5 and cold_time < 1.0
+
+    # Rocked back and forth: noisy, so the cached biases are kept rather than remeasured
+    world = hal.backend().world
+    still_wheels = world.wheel_speeds
+    world.wheel_speeds = lambda: (0.1, -0.1) if hal.clock.monotonic() % ROCK_PERIOD < ROCK_PERIOD / 2 else (-0.1, 0.1)
+    hal.clock.sleep(0.1)
+    moving, moving_time = timed(gc.calibrate, mpu, path)
+    report("robot rocked (cache kept)", moving, moving_time)
+    assert moving.source == "cache"
+    forced, _ = timed(gc.calibrate, mpu, path, force=True)
+    assert forced.source == "measured" and not forced.saved, "biases measured while moving were saved"
+    assert timed(gc.calibrate, mpu, path)[0].source == "cache"
+    world.wheel_speeds = still_wheels
+    hal.clock.sleep(0.5)  # Settled
+
+    # The bias drifts past the tolerance: the still check fails and it recalibrates
+    original_bias = c.SIMULATION["GYRO_BIAS"]
+    c.SIMULATION["GYRO_BIAS"] = tuple(b + 0.5 for b in original_bias)
+    drifted, drifted_time = timed(gc.calibrate, mpu, path)
+    report("bias drifted by 0.5 deg/s", drifted, drifted_time)
+    assert drifted.source == "measured" and bias_error(drifted) < 0.05
+
+    # Far past the tolerance but quiet, e.g. a replaced IMU: still, so it recalibrates
+    c.SIMULATION["GYRO_BIAS"] = tuple(b + 5.0 for b in original_bias)
+    jumped, jumped_time = timed(gc.calibrate, mpu, path)
+    report("bias off by 5 deg/s", jumped, jumped_time)
+    assert jumped.source == "measured" and jumped.saved and bias_error(jumped) < 0.05
+    c.SIMULATION["GYRO_BIAS"] = original_bias
+    timed(gc.calibrate, mpu, path)
+
+    # The temperature moves past its tolerance with the bias unchanged: recalibrates anyway
+    original_temperature = c.SIMULATION["TEMPERATURE"]
+    c.SIMULATION["TEMPERATURE"] = original_temperature + 2 * c.GYRO_CALIBRATION["TEMPERATURE_TOLERANCE"]
+    warmed, warmed_time = timed(gc.calibrate, mpu, path)
+    report("temperature changed", warmed, warmed_time)
+    assert warmed.source == "measured" and warmed.saved
+    c.SIMULATION["TEMPERATURE"] = original_temperature
+
+    print(f"\nBoot with cached biases: {old_time / warm_time:.0f}x shorter wait than before")
@@ -1,49 +1,29 @@
 # gyro_test.py
 
 import time
-import board
-import busio
-from mpu6050 import mpu6050
+import hal
 import config as c
+import gyro_calibration as gc
 
-# Initialize I2C communication
-i2c = busio.I2C(board.SCL, board.SDA)
-mpu = mpu6050(c.MPU9250_I2C_ADDRESS)
+mpu = hal.create_mpu(c.MPU9250_I2C_ADDRESS)
 
-def calibrate_gyro(num_readings=500, delay=0.01):
-    """Calibrates the gyroscope by taking multiple readings and averaging to find the bias."""
-    print("Calibrating gyroscope. Please keep the robot still.")
-    total_gyro_x = 0
-    total_gyro_y = 0
-    total_gyro_z = 0
-    start_time = time.time()
+def calibrate_gyro():
+    """Measures the gyroscope biases afresh and stores them in the calibration cache if the robot kept still.
 
-    for i in range(num_readings):
-        gyro_data = mpu.get_gyro_data()
-        total_gyro_x += gyro_data['x']
-        total_gyro_y += gyro_data['y']
-        total_gyro_z += gyro_data['z']
-        current_time = time.time()
-        elapsed_time = current_time - start_time
-        remaining_time = 5 - elapsed_time
-        print(f"Calibrating... {remaining_time:.1f} seconds remaining", end='\r')
-        time.sleep(delay)
+    Returns:
+        (biases, saved): the biases as a dictionary, and whether they were cached.
+    """
+    calibration = gc.calibrate(mpu, force=True)
 
-    gyro_bias_x = total_gyro_x / num_readings
-    gyro_bias_y = total_gyro_y / num_readings
-    gyro_bias_z = total_gyro_z / num_readings
+    print(f"Gyroscope calibration complete ({calibration.samples} readings).")
+    print(f"  Bias X: {calibration.bias[0]:.2f}")
+    print(f"  Bias Y: {calibration.bias[1]:.2f}")
+    print(f"  Bias Z: {calibration.bias[2]:.2f}")
+    if calibration.temperature is not None:
+        print(f"  Temperature: {calibration.temperature:.1f} C")
 
-    print(f"Gyroscope calibration complete.")
-    print(f"  Bias X: {gyro_bias_x:.2f}")
-    print(f"  Bias Y: {gyro_bias_y:.2f}")
-    print(f"  Bias Z: {gyro_bias_z:.2f}")
-
-    # Return the calculated bias values as a dictionary
-    return {
-        "x": gyro_bias_x,
-        "y": gyro_bias_y,
-        "z": gyro_bias_z
-    }
+    # Return the calculated bias values as a dictionary, and whether they were saved
+    return calibration.as_dict(), calibration.saved
 
 def print_gyro_data(gyro_biases):
     """Continuously prints gyroscope data with bias correction."""
@@ -67,10 +47,13 @@ def print_gyro_data(gyro_biases):
 
 if __name__ == "__main__":
     # Run calibration and print results
-    gyro_biases = calibrate_gyro()
+    gyro_biases, calibration_saved = calibrate_gyro()
     print("\nCalibration Results:")
     print(f"  Gyro Bias (X, Y, Z): ({gyro_biases['x']:.2f}, {gyro_biases['y']:.2f}, {gyro_biases['z']:.2f})")
-    print("  Update your config.py with these bias values if they seem reasonable.\n")
+    if calibration_saved:
+        print(f"  Saved to {c.GYRO_CALIBRATION['PATH']}; DeadReckoning will use them at the next boot.\n")
+    else:
+        print("  Not saved: the robot moved during calibration. Run this again with the robot still.\n")
 
     input("Press Enter to start printing gyroscope data with bias correction...")
     print_gyro_data(gyro_biases)
\ No newline at end of file
@@ -0,0 +1,164 @@
+# hal.py
+
+import os
+import time
+import config as c
+import i2c_bus
+
+# --- Hardware Abstraction Layer ---
+# Every module gets its hardware from here instead of importing board, busio,
+# RPi.GPIO, adafruit_pca9685 or mpu6050 directly. The backend is picked once at
+# start-up: "real" talks to the robot, "sim" uses the simulated devices in
+# hal_sim.py with a deterministic virtual clock.
+#
+# Pick the backend with the GISMO_HAL environment variable, config.HAL_BACKEND, or
+# by calling hal.use("sim") before any hardware is touched.
+
+BACKENDS = ("real", "sim")
+
+_backend = None
+_requested = None
+
+def use(name):
+    """Selects the backend. Must be called before any hardware is used."""
+    global _requested
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HAL backend '{name}', expected one of {BACKENDS}")
+    if _backend is not None and _backend.name != name:
+        raise RuntimeError(f"HAL backend already started as '{_backend.name}'")
+    _requested = name
+
+def backend():
+    """Returns the active backend, starting the selected one on first use."""
+    global _backend
+    if _backend is None:
+        name = _requested or os.environ.get("GISMO_HAL", c.HAL_BACKEND)
+        if name == "sim":
+            import hal_sim
+            _backend = hal_sim.SimBackend()
+        elif name == "real":
+            _backend = RealBackend()
+        else:
+            raise ValueError(f"Unknown HAL backend '{name}', expected one of {BACKENDS}")
+    return _backend
+
+def is_simulated():
+    """Returns True when running on the simulated backend."""
+    return backend().name == "sim"
+
+# --- Device Factories ---
+# Each device's I2C handle is swapped for one that goes through the shared
+# i2c_bus.BusManager, so every transaction on the bus is queued and counted there.
+
+PRIORITIES = c.I2C_BUS["PRIORITIES"]
+
+def i2c():
+    """Returns the shared I2C bus."""
+    return backend().i2c()
+
+def bus():
+    """Returns the manager every I2C transaction goes through."""
+    return i2c_bus.manager()
+
+def create_pca(frequency=c.PCA_FREQUENCY):
+    """Creates the PCA9685 PWM driver on the shared I2C bus."""
+    pca = backend().create_pca(frequency)
+    pca.i2c_device = bus().device(pca.i2c_device, c.PCA_I2C_ADDRESS, "pca9685", PRIORITIES["MOTORS"], coalesce=True)
+    return pca
+
+def create_mpu(address=c.MPU9250_I2C_ADDRESS):
+    """Creates the MPU6050/9250 IMU driver."""
+    mpu = backend().create_mpu(address)
+    mpu.bus = bus().smbus(mpu.bus, address, "imu", PRIORITIES["IMU"])
+    return mpu
+
+def create_display(width=c.DISPLAY["WIDTH"], height=c.DISPLAY["HEIGHT"], address=c.DISPLAY["I2C_ADDRESS"]):
+    """Creates the SSD1306 OLED display driver on the shared I2C bus."""
+    display = backend().create_display(width, height, address)
+    display.i2c_device = bus().device(display.i2c_device, address, "display", PRIORITIES["DISPLAY"],
+                                      max_write=c.I2C_BUS["DISPLAY_MAX_WRITE"])
+    return display
+
+# --- Proxies ---
+# These let modules write `from hal import GPIO, clock` at import time while the
+# backend is still chosen later, when the hardware is first used.
+
+class _GPIOProxy:
+    """Forwards attribute access to the backend's RPi.GPIO-compatible module."""
+
+    def __getattr__(self, name):
+        return getattr(backend().gpio, name)
+
+class _ClockProxy:
+    """The time source every module should use instead of the time module.
+
+    On the real backend these are the time module's functions. On the simulated
+    backend they read and advance virtual time, so sleeps return instantly.
+    """
+
+    def time(self):
+        return backend().clock.time()
+
+    def monotonic(self):
+        return backend().clock.monotonic()
+
+    def perf_counter(self):
+        return backend().clock.perf_counter()
+
+    def sleep(self, seconds):
+        backend().clock.sleep(seconds)
+
+GPIO = _GPIOProxy()
+clock = _ClockProxy()
+
+# --- Real Hardware ---
+
+class RealClock:
+    monotonic = staticmethod(time.monotonic)
+    perf_counter = staticmethod(time.perf_counter)
+    sleep = staticmethod(time.sleep)
+    time = staticmethod(time.time)  # Last, as it shadows the time module in this class
+
+class RealBackend:
+    """The robot itself. Each hardware library is only imported when first needed."""
+
+    name = "real"
+
+    def __init__(self):
+        self.clock = RealClock()
+        self._gpio = None
+        self._i2c = None
+
+    @property
+    def gpio(self):
+        if self._gpio is None:
+            import RPi.GPIO
+
+            RPi.GPIO.setmode(RPi.GPIO.BCM)  # All of Gismo's pin numbers are BCM
+            self._gpio = RPi.GPIO
+        return self._gpio
+
+    def i2c(self):
+        if self._i2c is None:
+            import board
+            import busio
+
+            self._i2c = busio.I2C(board.SCL, board.SDA)
+        return self._i2c
+
+    def create_pca(self, frequency):
+        from adafruit_pca9685 import PCA9685
+
+        pca = PCA9685(self.i2c())
+        pca.frequency = frequency
+        return pca
+
+    def create_mpu(self, address):
+        from mpu6050 import mpu6050
+
+        return mpu6050(address)
+
+    def create_display(self, width, height, address):
+        import adafruit_ssd1306
+
+        return adafruit_ssd1306.SSD1306_I2C(width, height, self.i2c(), addr=address)
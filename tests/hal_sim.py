@@ -0,0 +1,608 @@
+# hal_sim.py
+
+import heapq
+import math
+import random
+import threading
+import config as c
+import pca_frame as pf
+
+# --- Simulated Hardware ---
+# Stand-ins for RPi.GPIO, the PCA9685, the MPU6050 and the SSD1306, all driven by
+# one deterministic VirtualClock. A small SimWorld drives the robot around a table
+# from the motor duty cycles and feeds the edge sensors, HC-SR04 and IMU, so the
+# control loop, mapping and dead reckoning can run off the robot much faster than
+# real time. Select it with hal.use("sim") or GISMO_HAL=sim.
+#
+# Virtual time only moves when something sleeps or reads a GPIO pin, so the
+# simulation is meant for single-threaded control loops.
+
+SIM = c.SIMULATION
+
+class VirtualClock:
+    """A clock that only moves when slept on, stepping the physics as it goes."""
+
+    EPOCH = 1_700_000_000.0  # What time() reports at virtual time zero
+
+    def __init__(self, step=SIM["PHYSICS_STEP"]):
+        self.now = 0.0
+        self.step = step
+        self.timers = []  # heap of (when, sequence, callback)
+        self.listeners = []
+        self._sequence = 0
+        self.lock = threading.RLock()
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return self.EPOCH + self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.advance(seconds)
+
+    def on_advance(self, listener):
+        """Calls listener(now) every physics step as virtual time advances."""
+        self.listeners.append(listener)
+
+    def call_at(self, when, callback):
+        """Runs callback() once virtual time reaches `when`."""
+        with self.lock:
+            self._sequence += 1
+            heapq.heappush(self.timers, (when, self._sequence, callback))
+
+    def advance(self, seconds):
+        """Moves virtual time forward, in physics steps, firing due timers."""
+        with self.lock:
+            target = self.now + seconds
+            while self.now < target:
+                next_time = min(target, self.now + self.step)
+                if self.timers and self.timers[0][0] < next_time:
+                    next_time = max(self.timers[0][0], self.now)
+                self.now = next_time
+                for listener in self.listeners:
+                    listener(self.now)
+                while self.timers and self.timers[0][0] <= self.now:
+                    _, _, callback = heapq.heappop(self.timers)
+                    callback()
+
+# --- GPIO ---
+
+class SimPWM:
+    """Stand-in for RPi.GPIO.PWM. Keeps a history of (time, frequency, duty) changes."""
+
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+        self.history = []
+        gpio.pwms[pin] = self
+
+    def _record(self):
+        self.history.append((self.gpio.clock.now, self.frequency if self.running else 0, self.duty_cycle))
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.running = True
+        self._record()
+
+    def stop(self):
+        self.running = False
+        self._record()
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self._record()
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self._record()
+
+class SimGPIO:
+    """Stand-in for the RPi.GPIO module.
+
+    Inputs are driven with set_input(), which fires any edge callbacks straight
+    away (respecting bouncetime in virtual time). Each input() read costs
+    READ_COST seconds of virtual time, so busy-wait loops still make progress.
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    READ_COST = 5e-6  # Roughly one GPIO read on a Pi Zero 2W
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.mode = None
+        self.directions = {}
+        self.levels = {}
+        self.events = {}  # pin -> [edge, [callbacks], bouncetime_s, last_fire_time]
+        self.output_listeners = {}
+        self.pwms = {}
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self.directions[pin] = direction
+        if initial is not None:
+            self.levels[pin] = initial
+        else:
+            self.levels.setdefault(pin, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+
+    def output(self, pin, value):
+        value = self.HIGH if value else self.LOW
+        previous = self.levels.get(pin, self.LOW)
+        self.levels[pin] = value
+        for listener in self.output_listeners.get(pin, ()):
+            listener(previous, value)
+
+    def input(self, pin):
+        self.clock.advance(self.READ_COST)
+        return self.levels.get(pin, self.LOW)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        if pin in self.events:
+            raise RuntimeError(f"Conflicting edge detection already enabled for GPIO {pin}")
+        callbacks = [callback] if callback is not None else []
+        self.events[pin] = [edge, callbacks, (bouncetime or 0) / 1000.0, None]
+
+    def add_event_callback(self, pin, callback):
+        self.events[pin][1].append(callback)
+
+    def remove_event_detect(self, pin):
+        self.events.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        if pin is None:
+            self.directions.clear()
+            self.events.clear()
+        else:
+            self.directions.pop(pin, None)
+            self.events.pop(pin, None)
+
+    def PWM(self, pin, frequency):
+        return SimPWM(self, pin, frequency)
+
+    # --- Simulation Hooks ---
+
+    def set_input(self, pin, level):
+        """Drives an input pin, firing edge callbacks if the level changes."""
+        level = self.HIGH if level else self.LOW
+        previous = self.levels.get(pin, self.LOW)
+        self.levels[pin] = level
+        if level == previous or pin not in self.events:
+            return
+
+        edge, callbacks, bouncetime, last_fire = self.events[pin]
+        rising = level == self.HIGH
+        if edge == self.BOTH or (edge == self.RISING and rising) or (edge == self.FALLING and not rising):
+            now = self.clock.now
+            if last_fire is not None and now - last_fire < bouncetime:
+                return
+            self.events[pin][3] = now
+            for callback in list(callbacks):
+                callback(pin)
+
+    def on_output(self, pin, listener):
+        """Calls listener(previous_level, new_level) whenever the pin is written."""
+        self.output_listeners.setdefault(pin, []).append(listener)
+
+class SimUltrasonic:
+    """An HC-SR04 on the simulated GPIO that measures distances in the SimWorld."""
+
+    ECHO_DELAY = 0.0005  # The burst goes out ~0.5 ms after the trigger
+    NO_ECHO_PULSE = 0.038  # The echo pin stays high this long when nothing is in range
+
+    def __init__(self, gpio, world, trigger_pin=c.SENSOR_PINS["ULTRASONIC_TRIGGER"],
+                 echo_pin=c.SENSOR_PINS["ULTRASONIC_ECHO"]):
+        self.gpio = gpio
+        self.world = world
+        self.echo_pin = echo_pin
+        gpio.on_output(trigger_pin, self._on_trigger)
+
+    def _on_trigger(self, previous, level):
+        if previous == self.gpio.HIGH and level == self.gpio.LOW:
+            distance = self.world.ultrasonic_distance()
+            pulse = self.NO_ECHO_PULSE if distance is None else distance / 17150
+            start = self.gpio.clock.now + self.ECHO_DELAY
+            self.gpio.clock.call_at(start, lambda: self.gpio.set_input(self.echo_pin, 1))
+            self.gpio.clock.call_at(start + pulse, lambda: self.gpio.set_input(self.echo_pin, 0))
+
+# --- I2C Devices ---
+
+class SimI2C:
+    """Stand-in for busio.I2C. The simulated devices don't use it."""
+
+    def try_lock(self):
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self):
+        return [0x40, c.MPU9250_I2C_ADDRESS, c.DISPLAY["I2C_ADDRESS"]]
+
+    def deinit(self):
+        pass
+
+class SimPWMChannel:
+    def __init__(self, pca, index):
+        self.pca = pca
+        self.index = index
+
+    @property
+    def duty_cycle(self):
+        return self.pca.duty(self.index)
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        register = pf.LED0_ON_L + self.index * pf.REGISTERS_PER_CHANNEL
+        self.pca.i2c_device.write(bytes([register]) + pf.pwm_registers(value))
+
+class SimPCAI2CDevice:
+    """The PCA9685's I2C device: register writes land in the chip's register map."""
+
+    def __init__(self, pca):
+        self.pca = pca
+        self.transactions = 0
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        buffer = bytes(buffer[start:end])
+        register = buffer[0]
+        self.pca.registers[register:register + len(buffer) - 1] = buffer[1:]
+        self.transactions += 1
+        self.bytes_written += len(buffer)
+
+class SimPCA9685:
+    """Stand-in for adafruit_pca9685.PCA9685."""
+
+    def __init__(self, frequency=c.PCA_FREQUENCY):
+        self.registers = bytearray(256)
+        self.i2c_device = SimPCAI2CDevice(self)
+        self.channels = [SimPWMChannel(self, i) for i in range(pf.NUM_CHANNELS)]
+        self.frequency = frequency
+
+    def duty(self, channel):
+        """Returns a channel's duty cycle (0-65535) as the chip holds it."""
+        base = pf.LED0_ON_L + channel * pf.REGISTERS_PER_CHANNEL
+        on = self.registers[base] | self.registers[base + 1] << 8
+        off = self.registers[base + 2] | self.registers[base + 3] << 8
+        if off & 0x1000:
+            return 0  # Full off, which wins over full on
+        if on & 0x1000:
+            return 0xFFFF
+        return off << 4
+
+    def deinit(self):
+        pass
+
+class SimMPUBus:
+    """The IMU's smbus.SMBus: block reads from the data registers at 0x3B.
+
+    Registers 0x3B-0x48 hold accel x/y/z, temperature and gyro x/y/z as big-endian
+    16-bit words at the ±2 g and ±250 deg/s ranges the mpu6050 library starts in.
+    """
+
+    def __init__(self, mpu):
+        self.mpu = mpu
+        self.transactions = 0
+        self.bytes_read = 0
+
+    def read_i2c_block_data(self, address, register, length):
+        accel = self.mpu.get_accel_data(count=False)
+        gyro = self.mpu.get_gyro_data(count=False)
+        words = [accel["x"] * SimMPU6050.ACCEL_LSB, accel["y"] * SimMPU6050.ACCEL_LSB,
+                 accel["z"] * SimMPU6050.ACCEL_LSB, (self.mpu.get_temp() - 36.53) * 340,
+                 gyro["x"] * SimMPU6050.GYRO_LSB, gyro["y"] * SimMPU6050.GYRO_LSB, gyro["z"] * SimMPU6050.GYRO_LSB]
+        data = bytearray(0x3B)  # Only the data registers are modelled
+        for word in words:
+            data += max(-32768, min(32767, round(word))).to_bytes(2, "big", signed=True)
+        self.transactions += 1
+        self.bytes_read += length
+        return list(data[register:register + length])
+
+class SimMPU6050:
+    """Stand-in for mpu6050.mpu6050, reading the SimWorld's motion plus noise and bias."""
+
+    ACCEL_LSB = 16384 / 9.80665  # Counts per m/s^2 at ±2 g
+    GYRO_LSB = 131.0  # Counts per deg/s at ±250 deg/s
+    READS_PER_CALL = 7  # get_*_data() reads each data byte and the range register separately
+
+    def __init__(self, world, address=c.MPU9250_I2C_ADDRESS, seed=SIM["SEED"]):
+        self.world = world
+        self.address = address
+        self.rng = random.Random(seed)
+        self.bus = SimMPUBus(self)
+
+    def read_accel_range(self, raw=False):
+        return 0x00 if raw else 2
+
+    def read_gyro_range(self, raw=False):
+        return 0x00 if raw else 250
+
+    def get_accel_data(self, g=False, count=True):
+        if count:
+            self.bus.transactions += self.READS_PER_CALL
+            self.bus.bytes_read += self.READS_PER_CALL
+        ax, ay, az = self.world.body_acceleration()
+        noise = SIM["ACCEL_NOISE"]
+        data = {
+            "x": ax + self.rng.gauss(0, noise),
+            "y": ay + self.rng.gauss(0, noise),
+            "z": az + self.rng.gauss(0, noise),
+        }
+        if g:
+            return {axis: value / 9.80665 for axis, value in data.items()}
+        return data
+
+    def get_gyro_data(self, count=True):
+        if count:
+            self.bus.transactions += self.READS_PER_CALL
+            self.bus.bytes_read += self.READS_PER_CALL
+        bias_x, bias_y, bias_z = SIM["GYRO_BIAS"]
+        noise = SIM["GYRO_NOISE"]
+        return {
+            "x": bias_x + self.rng.gauss(0, noise),
+            "y": bias_y + self.rng.gauss(0, noise),
+            "z": math.degrees(self.world.omega) + bias_z + self.rng.gauss(0, noise),
+        }
+
+    def get_temp(self):
+        return SIM["TEMPERATURE"]
+
+    def get_all_data(self):
+        return [self.get_accel_data(), self.get_gyro_data(), self.get_temp()]
+
+class SimSSD1306I2CDevice:
+    """The SSD1306's I2C device: parses commands and writes data into the panel's GDDRAM.
+
+    Understands the column and page address commands and horizontal addressing,
+    which is all adafruit_ssd1306's show() and display_driver use. Commands may be
+    sent one per transaction (control byte 0x80) or as a stream (0x00).
+    """
+
+    ARGUMENT_COUNTS = {0x21: 2, 0x22: 2}
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.columns = (0, panel.width - 1)
+        self.pages = (0, panel.pages - 1)
+        self.column, self.page = 0, 0
+        self._command = []
+        self.transactions = 0
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        buffer = bytes(buffer[start:end])
+        self.transactions += 1
+        self.bytes_written += len(buffer)
+        if buffer[0] == 0x40:
+            self._data(buffer[1:])
+        else:
+            for byte in buffer[1:]:
+                self._command_byte(byte)
+
+    def _command_byte(self, byte):
+        self._command.append(byte)
+        if len(self._command) <= self.ARGUMENT_COUNTS.get(self._command[0], 0):
+            return
+        command, *arguments = self._command
+        self._command = []
+        if command == 0x21:
+            self.columns = tuple(arguments)
+            self.column = arguments[0]
+        elif command == 0x22:
+            self.pages = tuple(arguments)
+            self.page = arguments[0]
+
+    def _data(self, data):
+        gddram = self.panel.gddram
+        for byte in data:
+            gddram[self.page * self.panel.width + self.column] = byte
+            self.column += 1
+            if self.column > self.columns[1]:
+                self.column = self.columns[0]
+                self.page += 1
+                if self.page > self.pages[1]:
+                    self.page = self.pages[0]
+
+class SimSSD1306:
+    """Stand-in for adafruit_ssd1306.SSD1306_I2C with the panel's own frame memory.
+
+    `frame` is what the panel shows: the GDDRAM as written over I2C, either by
+    show() (sent the same way as the real driver) or by partial updates.
+    """
+
+    def __init__(self, width, height, address):
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.addr = address
+        self.buffer = bytearray(width * height // 8 + 1)
+        self.buffer[0] = 0x40  # Data control byte, as in the real driver
+        self.gddram = bytearray(width * height // 8)
+        self.i2c_device = SimSSD1306I2CDevice(self)
+        self.shows = 0
+
+    @property
+    def frame(self):
+        return bytes(self.gddram)
+
+    def write_cmd(self, cmd):
+        with self.i2c_device:
+            self.i2c_device.write(bytes([0x80, cmd]))
+
+    def fill(self, color):
+        self.buffer[1:] = (b"\xff" if color else b"\x00") * (self.width * self.height // 8)
+
+    def image(self, img):
+        # Same page layout as the real driver: each byte is 8 vertical pixels
+        pixels = img.convert("1").load()
+        pages = bytearray(self.width * self.height // 8)
+        for y in range(self.height):
+            for x in range(self.width):
+                if pixels[x, y]:
+                    pages[(y // 8) * self.width + x] |= 1 << (y % 8)
+        self.buffer[1:] = pages
+
+    def show(self):
+        # The real driver sets the whole-panel window one command per transaction
+        for cmd in (0x21, 0, self.width - 1, 0x22, 0, self.pages - 1):
+            self.write_cmd(cmd)
+        with self.i2c_device:
+            self.i2c_device.write(self.buffer)
+        self.shows += 1
+
+# --- World Model ---
+
+class SimWorld:
+    """A differential-drive robot on a table, driven by the simulated PCA9685.
+
+    The table is centred on the start position. The edge sensors read 1 once they
+    are past the table edge, and the HC-SR04 sees the circular obstacles.
+    """
+
+    def __init__(self, clock, gpio):
+        self.clock = clock
+        self.gpio = gpio
+        self.pca = None
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0  # radians, counter-clockwise
+        self.v = 0.0
+        self.omega = 0.0
+        self.accel = 0.0
+        self.falls = 0
+        self.distance_travelled = 0.0
+        self.last_time = clock.now
+        clock.on_advance(self.step)
+
+    def attach_pca(self, pca):
+        self.pca = pca
+
+    def wheel_speeds(self):
+        """Returns (right, left) wheel speeds in m/s from the motor duty cycles."""
+        if self.pca is None:
+            return 0.0, 0.0
+        pins = c.MOTOR_DRIVER_PINS
+        right = (self.pca.duty(pins["RIGHT_FORWARD"]) - self.pca.duty(pins["RIGHT_BACKWARD"])) / 0xFFFF
+        left = (self.pca.duty(pins["LEFT_FORWARD"]) - self.pca.duty(pins["LEFT_BACKWARD"])) / 0xFFFF
+        return right * SIM["MAX_WHEEL_SPEED"], left * SIM["MAX_WHEEL_SPEED"]
+
+    def step(self, now):
+        dt = now - self.last_time
+        self.last_time = now
+        if dt <= 0:
+            return
+
+        right, left = self.wheel_speeds()
+        v = (right + left) / 2
+        self.omega = (right - left) / SIM["WHEEL_BASE"]
+        self.accel = (v - self.v) / dt
+        self.v = v
+        self.heading += self.omega * dt
+        self.x += v * math.cos(self.heading) * dt
+        self.y += v * math.sin(self.heading) * dt
+        self.distance_travelled += abs(v) * dt
+
+        if self.off_table(self.x, self.y):
+            # Fell off: count it and put the robot back in the middle
+            self.falls += 1
+            self.x = self.y = 0.0
+
+        forward, side = SIM["EDGE_SENSOR_OFFSET"]
+        for pin_name, side_sign in (("LEFT_EDGE_SENSOR", 1), ("RIGHT_EDGE_SENSOR", -1)):
+            sx, sy = self.body_to_world(forward, side * side_sign)
+            self.gpio.set_input(c.SENSOR_PINS[pin_name], 1 if self.off_table(sx, sy) else 0)
+
+    def body_to_world(self, forward, left):
+        cos_h, sin_h = math.cos(self.heading), math.sin(self.heading)
+        return self.x + forward * cos_h - left * sin_h, self.y + forward * sin_h + left * cos_h
+
+    def off_table(self, x, y):
+        width, depth = SIM["TABLE_SIZE"]
+        return abs(x) > width / 2 or abs(y) > depth / 2
+
+    def body_acceleration(self):
+        """Returns (forward, sideways, up) acceleration in m/s^2, as the IMU feels it."""
+        return self.accel, self.v * self.omega, 9.80665
+
+    def ultrasonic_distance(self):
+        """Returns the distance in cm to the nearest obstacle ahead, or None if out of range."""
+        dx, dy = math.cos(self.heading), math.sin(self.heading)
+        nearest = None
+        for ox, oy, radius in SIM["OBSTACLES"]:
+            # Ray/circle intersection
+            fx, fy = self.x - ox, self.y - oy
+            b = fx * dx + fy * dy
+            disc = b * b - (fx * fx + fy * fy - radius * radius)
+            if disc < 0:
+                continue
+            t = -b - math.sqrt(disc)
+            if t >= 0 and (nearest is None or t < nearest):
+                nearest = t
+        if nearest is None or nearest * 100 > SIM["ULTRASONIC_RANGE"]:
+            return None
+        return nearest * 100
+
+# --- Backend ---
+
+class SimBackend:
+    name = "sim"
+
+    def __init__(self):
+        self.clock = VirtualClock()
+        self.gpio = SimGPIO(self.clock)
+        self.world = SimWorld(self.clock, self.gpio)
+        self.ultrasonic = SimUltrasonic(self.gpio, self.world)
+        self._i2c = SimI2C()
+
+    def i2c(self):
+        return self._i2c
+
+    def create_pca(self, frequency):
+        pca = SimPCA9685(frequency)
+        self.world.attach_pca(pca)
+        return pca
+
+    def create_mpu(self, address):
+        return SimMPU6050(self.world, address)
+
+    def create_display(self, width, height, address):
+        return SimSSD1306(width, height, address)
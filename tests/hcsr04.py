@@ -7,6 +7,9 @@ import RPi.GPIO as GPIO
 ECHO_PIN = 23
 TRIGGER_PIN = 22
 
+# Give up waiting on the echo pin after this many seconds.
+ECHO_TIMEOUT = 0.04
+
 # Function to get distance from the HC-SR04 sensor.
 def get_distance(trigger_pin, echo_pin):
   GPIO.setup(trigger_pin, GPIO.OUT)
@@ -18,12 +21,15 @@ def get_distance(trigger_pin, echo_pin):
   time.sleep(10e-6)
   GPIO.output(trigger_pin, GPIO.LOW)
 
+  timeout_start_time = time.time()
   while GPIO.input(echo_pin) == 0:
-    pass
+    if time.time() - timeout_start_time > ECHO_TIMEOUT:
+      return None  # No echo started
   pulse_start_time = time.time()
 
   while GPIO.input(echo_pin) == 1:
-    pass
+    if time.time() - pulse_start_time > ECHO_TIMEOUT:
+      return None  # Echo never ended
   pulse_end_time = time.time()
 
   pulse_duration = pulse_end_time - pulse_start_time
@@ -38,6 +44,9 @@ GPIO.setmode(GPIO.BCM)
 while True:
   distance = get_distance(TRIGGER_PIN, ECHO_PIN)
 
-  print(f"Distance: {distance} cm")
+  if distance is None:
+    print("No echo (timed out)")
+  else:
+    print(f"Distance: {distance} cm")
 
   time.sleep(1)  # Pause between readings
\ No newline at end of file
@@ -0,0 +1,357 @@
+# i2c_bus.py
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+import numpy as np
+import config as c
+
+# --- Shared I2C Bus ---
+# The PCA9685 (motors, servos, LED), the IMU and the OLED display share one I2C
+# bus, and the IMU sampler, the control loop and the display can all want it at
+# once. Every transaction goes through one BusManager, which runs them one at a
+# time in priority order: motor writes, then IMU reads, then display pushes.
+#
+# There is no bus thread. Whoever finds the bus free runs the queued transactions
+# itself, highest priority first, until its own are done; it then hands the bus to
+# a caller still waiting, or finishes off any queued fire-and-forget writes. So a
+# transaction on an idle bus costs no thread switch, and on the simulated backend,
+# where everything runs on one thread, transactions happen exactly when made.
+#
+# Writes to devices set up with coalesce=True (the PCA9685's registers) don't wait
+# for the bus: they are queued, and a later write to the same registers while the
+# first is still queued replaces it. The replacement goes to the back of the queue,
+# not into the old write's place, so it can't go out before a longer write that
+# was queued after the old one and overlaps it. Long writes can be split (the
+# display's frame data), so a display push holds the bus for at most one piece.
+
+PRIORITIES = c.I2C_BUS["PRIORITIES"]
+
+class Transaction:
+    """One queued bus transaction: a call to make on a device."""
+
+    __slots__ = ("priority", "device", "function", "args", "key", "wait", "submitted", "done", "result", "error",
+                 "cancelled")
+
+    def __init__(self, priority, device, function, args, key=None, wait=True):
+        self.priority = priority
+        self.device = device  # The ManagedDevice / ManagedSMBus it belongs to
+        self.function = function
+        self.args = args
+        self.key = key  # Coalescing key for fire-and-forget register writes
+        self.wait = wait
+        self.submitted = time.perf_counter()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.cancelled = False  # Replaced by a newer write before it went out
+
+class DeviceStats:
+    """Traffic and latency counters for one device on the bus."""
+
+    def __init__(self, name, address, samples=c.I2C_BUS["LATENCY_SAMPLES"]):
+        self.name = name
+        self.address = address
+        self.samples = samples
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.coalesced = 0  # Writes dropped because a newer one to the same registers replaced them
+        self.errors = 0
+        self.busy_time = 0.0  # Seconds spent in this device's transactions
+        self.max_wait = 0.0
+        self.waits = deque(maxlen=self.samples)  # Recent queueing delays, seconds
+
+    def summary(self, elapsed):
+        """A dict of the counters, with bandwidth over `elapsed` seconds and wait percentiles."""
+        waits = np.array(self.waits) if self.waits else np.zeros(1)
+        return {
+            "device": self.name,
+            "address": self.address,
+            "transactions": self.transactions,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "bytes_per_second": (self.bytes_read + self.bytes_written) / elapsed if elapsed > 0 else 0.0,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "bus_share": self.busy_time / elapsed if elapsed > 0 else 0.0,
+            "wait_median": float(np.median(waits)),
+            "wait_p99": float(np.percentile(waits, 99)),
+            "wait_max": self.max_wait,
+        }
+
+class BusManager:
+    """Owns the I2C bus: queues every device's transactions and runs them in priority order."""
+
+    def __init__(self):
+        self.queue = []  # Heap of (priority, sequence, Transaction)
+        self.sequence = itertools.count()  # Keeps equal priorities first come, first served
+        self.queued_writes = {}  # Coalescing key -> queued Transaction
+        self.busy = False
+        self.waiting = 0  # Callers blocked on a transaction that hasn't run yet
+        self.condition = threading.Condition()
+        self.devices = []
+        self.started = time.perf_counter()
+
+    # --- Devices ---
+
+    def device(self, i2c_device, address, name, priority, coalesce=False, max_write=None):
+        """Wraps an adafruit_bus_device-style I2CDevice so its transactions go through the bus."""
+        stats = DeviceStats(name, address)
+        self.devices.append(stats)
+        return ManagedDevice(self, i2c_device, stats, priority, coalesce, max_write)
+
+    def smbus(self, bus, address, name, priority):
+        """Wraps an smbus.SMBus (as used by the mpu6050 library) for one device."""
+        stats = DeviceStats(name, address)
+        self.devices.append(stats)
+        return ManagedSMBus(self, bus, stats, priority)
+
+    # --- Scheduling ---
+
+    def submit(self, transactions):
+        """
+        Queues transactions and, if they must be waited for, returns once they have run.
+
+        Returns:
+            The result of the last transaction (None if it doesn't wait).
+        """
+        last = transactions[-1]
+        with self.condition:
+            for transaction in transactions:
+                if transaction.key is not None:
+                    queued = self.queued_writes.get(transaction.key)
+                    if queued is not None:
+                        # Drop the older write rather than updating it in place: an overlapping
+                        # write queued since then must not land after, and over, the newer data
+                        queued.cancelled = True
+                        transaction.device.stats.coalesced += 1
+                    self.queued_writes[transaction.key] = transaction
+                heapq.heappush(self.queue, (transaction.priority, next(self.sequence), transaction))
+            if self.busy:
+                if not last.wait:
+                    return None  # Whoever holds the bus will send it
+                self.waiting += 1
+                while self.busy and not last.done:
+                    self.condition.wait()
+                self.waiting -= 1
+                if last.done:
+                    return self._result(transactions)
+            self.busy = True
+        self._run_until(last)
+        return self._result(transactions)
+
+    def flush(self):
+        """Waits until every queued transaction, fire-and-forget writes included, has gone out."""
+        while True:
+            with self.condition:
+                while self.busy:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                self.busy = True
+            self._run_until(None)
+
+    def _run_until(self, last):
+        """Runs queued transactions until `last` (if any) is done, then hands over or drains the bus."""
+        while True:
+            with self.condition:
+                handover = last is not None and last.done and self.waiting and any(queued.wait for _, _, queued in self.queue)
+                if not self.queue or handover:
+                    self.busy = False
+                    self.condition.notify_all()
+                    return
+                _, _, transaction = heapq.heappop(self.queue)
+                if transaction.cancelled:
+                    continue
+                if transaction.key is not None:
+                    del self.queued_writes[transaction.key]
+            self._run(transaction)
+            if transaction.wait:
+                with self.condition:
+                    self.condition.notify_all()
+
+    def _run(self, transaction):
+        stats = transaction.device.stats
+        start = time.perf_counter()
+        wait = start - transaction.submitted
+        try:
+            transaction.result = transaction.function(*transaction.args)
+        except Exception as e:
+            transaction.error = e
+            stats.errors += 1
+            if not transaction.wait:
+                print(f"I2C write to {stats.name} failed: {e}")
+        finished = time.perf_counter()
+        stats.transactions += 1
+        stats.busy_time += finished - start
+        stats.waits.append(wait)
+        stats.max_wait = max(stats.max_wait, wait)
+        transaction.device.count(transaction)
+        transaction.done = True
+
+    @staticmethod
+    def _result(transactions):
+        for transaction in transactions:
+            if transaction.error is not None and transaction.wait:
+                raise transaction.error
+        return transactions[-1].result
+
+    # --- Counters ---
+
+    def report(self):
+        """Per-device counters since the manager started (or was last reset), as a list of dicts."""
+        elapsed = time.perf_counter() - self.started
+        return [stats.summary(elapsed) for stats in self.devices]
+
+    def reset_counters(self):
+        for stats in self.devices:
+            stats.reset()
+        self.started = time.perf_counter()
+
+    def print_report(self):
+        print(f"{'device':10} {'addr':>5} {'trans':>7} {'bytes/s':>9} {'bus':>6} {'coalesced':>9} "
+              f"{'wait med':>9} {'wait p99':>9} {'wait max':>9}")
+        for row in self.report():
+            print(f"{row['device']:10} {row['address']:#5x} {row['transactions']:7d} {row['bytes_per_second']:9.0f} "
+                  f"{row['bus_share']:6.1%} {row['coalesced']:9d} {row['wait_median'] * 1e3:7.2f}ms "
+                  f"{row['wait_p99'] * 1e3:7.2f}ms {row['wait_max'] * 1e3:7.2f}ms")
+
+class ManagedDevice:
+    """
+    Stands in for a device's I2CDevice, sending each call through the BusManager.
+
+    `with device:` blocks are accepted as before; the manager, not the block,
+    keeps transactions apart. Attributes other than the I/O calls (such as the
+    simulated devices' traffic counters) come from the wrapped device.
+    """
+
+    def __init__(self, manager, i2c_device, stats, priority, coalesce=False, max_write=None):
+        self.manager = manager
+        self.i2c_device = i2c_device
+        self.stats = stats
+        self.priority = priority
+        self.coalesce = coalesce
+        self.max_write = max_write
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self.i2c_device, name)
+
+    def write(self, buffer, start=0, end=None):
+        """
+        Writes `buffer` (first byte a register or control byte).
+
+        Coalescing devices return at once. A write longer than max_write goes out in
+        pieces, each starting with the same first byte.
+        """
+        buffer = bytes(buffer[start:end])
+        if self.coalesce:
+            key = (self.stats.address, buffer[0], len(buffer))
+            self.manager.submit([Transaction(self.priority, self, self._write, (buffer,), key, wait=False)])
+            return
+        if self.max_write is None or len(buffer) <= self.max_write:
+            pieces = [buffer]
+        else:
+            step = self.max_write - 1
+            pieces = [buffer[:1] + buffer[i:i + step] for i in range(1, len(buffer), step)]
+        self.manager.submit([Transaction(self.priority, self, self._write, (piece,)) for piece in pieces])
+
+    def write_now(self, *buffers):
+        """
+        Writes each buffer whole, back to back, and returns once they are on the chip, even on a coalescing device.
+
+        Writes queued before them still go out first, so they can't be overtaken by older data.
+        """
+        self.manager.submit([Transaction(self.priority, self, self._write, (bytes(buffer),)) for buffer in buffers])
+
+    def _write(self, buffer):
+        with self.i2c_device:
+            self.i2c_device.write(buffer)
+
+    def readinto(self, buffer, start=0, end=None):
+        self.manager.submit([Transaction(self.priority, self, self._readinto, (buffer, start, end))])
+
+    def _readinto(self, buffer, start, end):
+        with self.i2c_device:
+            self.i2c_device.readinto(buffer, start=start, end=len(buffer) if end is None else end)
+
+    def write_then_readinto(self, out_buffer, in_buffer, out_start=0, out_end=None, in_start=0, in_end=None):
+        self.manager.submit([Transaction(self.priority, self, self._write_then_readinto,
+                                         (out_buffer, in_buffer, out_start, out_end, in_start, in_end))])
+
+    def _write_then_readinto(self, out_buffer, in_buffer, out_start, out_end, in_start, in_end):
+        with self.i2c_device:
+            self.i2c_device.write_then_readinto(out_buffer, in_buffer, out_start=out_start,
+                                                out_end=len(out_buffer) if out_end is None else out_end,
+                                                in_start=in_start, in_end=len(in_buffer) if in_end is None else in_end)
+
+    def count(self, transaction):
+        """Adds a finished transaction's bytes to the device's counters."""
+        function, args = transaction.function, transaction.args
+        if function == self._write:
+            self.stats.bytes_written += len(args[0])
+        elif function == self._readinto:
+            self.stats.bytes_read += len(args[0][args[1]:args[2]])
+        else:
+            self.stats.bytes_written += len(args[0][args[2]:args[3]])
+            self.stats.bytes_read += len(args[1][args[4]:args[5]])
+
+class ManagedSMBus:
+    """Stands in for an smbus.SMBus used by one device, sending each call through the BusManager."""
+
+    # Bytes each call moves besides the address byte: (written, read)
+    SIZES = {
+        "read_byte": lambda args: (0, 1),
+        "read_byte_data": lambda args: (1, 1),
+        "read_word_data": lambda args: (1, 2),
+        "read_i2c_block_data": lambda args: (1, args[2]),
+        "write_byte": lambda args: (1, 0),
+        "write_byte_data": lambda args: (2, 0),
+        "write_word_data": lambda args: (3, 0),
+        "write_i2c_block_data": lambda args: (1 + len(args[2]), 0),
+    }
+
+    def __init__(self, manager, bus, stats, priority):
+        self.manager = manager
+        self.bus = bus
+        self.stats = stats
+        self.priority = priority
+
+    def __getattr__(self, name):
+        attribute = getattr(self.bus, name)
+        if name not in self.SIZES:
+            return attribute  # Counters and the like, untouched
+
+        def call(*args):
+            return self.manager.submit([Transaction(self.priority, self, attribute, args)])
+
+        return call
+
+    def count(self, transaction):
+        written, read = self.SIZES[transaction.function.__name__](transaction.args)
+        self.stats.bytes_written += written
+        self.stats.bytes_read += read
+
+# --- The Bus ---
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def manager():
+    """Returns the BusManager every device on the I2C bus shares."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BusManager()
+        return _manager
@@ -0,0 +1,189 @@
+# i2c_bus_bench.py
+# Runs the robot's three kinds of I2C traffic at once on real threads - IMU burst
+# reads at 200 Hz, motor ramp writes at 100 Hz and full display frames at 10 Hz -
+# against the simulated devices slowed down to 400 kHz bus timing. First each
+# thread just takes a lock around its transactions, as the separate bus handles
+# did; then everything goes through i2c_bus.BusManager. Compares how long IMU
+# reads and motor writes wait behind the display. Runs anywhere - no robot hardware needed.
+
+import threading
+import time
+import numpy as np
+import hal
+
+hal.use("sim")
+
+import config as c
+import i2c_bus
+import imu_sampler as imu
+
+RUN_TIME = 3.0  # Real seconds per run
+BYTE_TIME = 9 / 400e3  # 8 bits and an ack at 400 kHz
+IMU_RATE, MOTOR_RATE, DISPLAY_RATE = 200, 100, 10
+
+def bus_time(nbytes):
+    """Blocks for as long as `nbytes` (plus the address byte) take on the bus, as the I2C driver's ioctl does."""
+    time.sleep((nbytes + 1) * BYTE_TIME)
+
+class SlowDevice:
+    """An I2CDevice that takes as long as the real bus."""
+
+    def __init__(self, device):
+        self.device = device
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        buffer = bytes(buffer[start:end])
+        bus_time(len(buffer))
+        self.device.write(buffer)
+
+class SlowSMBus:
+    def __init__(self, bus):
+        self.bus = bus
+
+    def read_i2c_block_data(self, address, register, length):
+        bus_time(1 + length)
+        return self.bus.read_i2c_block_data(address, register, length)
+
+class Locked:
+    """The old arrangement: each user takes the bus lock around its own transactions."""
+
+    def __init__(self, target, lock):
+        self.target = target
+        self.lock = lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        with self.lock:
+            self.target.write(buffer, start, end)
+
+    def read_i2c_block_data(self, address, register, length):
+        with self.lock:
+            return self.target.read_i2c_block_data(address, register, length)
+
+def devices(managed):
+    backend = hal.backend()
+    pca = backend.create_pca(c.PCA_FREQUENCY)
+    mpu = backend.create_mpu(c.MPU9250_I2C_ADDRESS)
+    display = backend.create_display(c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"], c.DISPLAY["I2C_ADDRESS"])
+    pca_device, imu_bus, display_device = SlowDevice(pca.i2c_device), SlowSMBus(mpu.bus), SlowDevice(display.i2c_device)
+    if managed:
+        manager = i2c_bus.BusManager()
+        priorities = c.I2C_BUS["PRIORITIES"]
+        pca_device = manager.device(pca_device, c.PCA_I2C_ADDRESS, "pca9685", priorities["MOTORS"], coalesce=True)
+        imu_bus = manager.smbus(imu_bus, mpu.address, "imu", priorities["IMU"])
+        display_device = manager.device(display_device, c.DISPLAY["I2C_ADDRESS"], "display", priorities["DISPLAY"],
+                                        max_write=c.I2C_BUS["DISPLAY_MAX_WRITE"])
+    else:
+        manager = None
+        lock = threading.Lock()
+        pca_device, imu_bus, display_device = Locked(pca_device, lock), Locked(imu_bus, lock), Locked(display_device, lock)
+    mpu.bus = imu_bus
+    return manager, pca, pca_device, mpu, display_device
+
+def periodic(rate, action, latencies, stop):
+    """Calls `action` on a fixed grid of times until `stop`, recording how long each call took."""
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        start = time.perf_counter()
+        action()
+        latencies.append(time.perf_counter() - start)
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+def run(managed):
+    manager, pca, pca_device, mpu, display_device = devices(managed)
+    frame = bytes([0x40]) + bytes(c.DISPLAY["WIDTH"] * c.DISPLAY["HEIGHT"] // 8)
+    speed = [0]
+
+    def read_imu():
+        imu.read_burst(mpu)
+
+    def ramp_motors():
+        # Both motors' forward channels, as a RampScheduler tick sends them
+        speed[0] = (speed[0] + 1024) % 65536
+        pca_device.write(bytes([0x06 + 8 * 4]) + bytes((0, 0, speed[0] & 0xFF, speed[0] >> 8)))
+        pca_device.write(bytes([0x06 + 10 * 4]) + bytes((0, 0, speed[0] & 0xFF, speed[0] >> 8)))
+
+    def push_display():
+        display_device.write(bytes([0x00, 0x21, 0, 127, 0x22, 0, 7]))
+        display_device.write(frame)
+
+    stop = threading.Event()
+    latencies = {"imu": [], "motors": [], "display": []}
+    threads = [threading.Thread(target=periodic, args=(rate, action, latencies[name], stop), daemon=True)
+               for name, rate, action in (("imu", IMU_RATE, read_imu), ("motors", MOTOR_RATE, ramp_motors),
+                                          ("display", DISPLAY_RATE, push_display))]
+    for thread in threads:
+        thread.start()
+    time.sleep(RUN_TIME)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if manager is not None:
+        manager.flush()
+    return manager, {name: np.array(values) for name, values in latencies.items()}, pca
+
+class RecordingDevice:
+    """An I2CDevice that keeps every write, in order."""
+
+    def __init__(self):
+        self.writes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        self.writes.append(bytes(buffer[start:end]))
+
+def check_write_order():
+    """A coalesced write must not overtake an older, longer write to the same registers queued after it."""
+    manager = i2c_bus.BusManager()
+    recorder = RecordingDevice()
+    device = manager.device(recorder, c.PCA_I2C_ADDRESS, "pca9685", c.I2C_BUS["PRIORITIES"]["MOTORS"], coalesce=True)
+    manager.busy = True  # As if another thread held the bus, so the writes queue up
+    device.write(bytes([6, 0xA, 0, 0, 0]))  # Channel 0 = A
+    device.write(bytes([6, 0xB, 0, 0, 0, 0xB, 0, 0, 0]))  # Channels 0 and 1 = B
+    device.write(bytes([6, 0xC, 0, 0, 0]))  # Channel 0 = C, replacing A
+    manager.busy = False
+    manager.flush()
+    assert [w[1] for w in recorder.writes] == [0xB, 0xC], recorder.writes  # A dropped; C lands last
+    print("Coalesced write order: ok")
+
+if __name__ == "__main__":
+    check_write_order()
+    results = {}
+    for managed in (False, True):
+        manager, latencies, pca = run(managed)
+        results[managed] = latencies
+        print(f"\n{'BusManager' if managed else 'One lock per transaction'} ({RUN_TIME:.0f} s)")
+        print(f"{'':10} {'calls':>6} {'median':>9} {'p99':>9} {'max':>9}")
+        for name, values in latencies.items():
+            print(f"{name:10} {len(values):6d} {np.median(values) * 1e3:7.2f}ms "
+                  f"{np.percentile(values, 99) * 1e3:7.2f}ms {values.max() * 1e3:7.2f}ms")
+        if manager is not None:
+            print()
+            manager.print_report()
+            assert pca.duty(10) == pca.duty(8)  # Coalesced writes still leave the last value on the chip
+
+    old, new = results[False], results[True]
+    improvement = np.percentile(old["imu"], 99) / np.percentile(new["imu"], 99)
+    print(f"\nIMU read p99: {improvement:.1f}x shorter with the BusManager")
+    assert np.percentile(new["imu"], 99) < np.percentile(old["imu"], 99)
+    assert np.percentile(new["motors"], 99) < np.percentile(old["motors"], 99)
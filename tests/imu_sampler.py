@@ -0,0 +1,187 @@
+# imu_sampler.py
+
+import threading
+import time
+import numpy as np
+import hal
+import config as c
+
+# --- Burst Reads ---
+# The MPU6050/9250 keeps accel x/y/z, temperature and gyro x/y/z in 14 consecutive
+# registers from ACCEL_XOUT_H, as big-endian signed 16-bit words. One block read
+# gets all of them from the same instant, where mpu6050.get_accel_data() and
+# get_gyro_data() cost seven single-byte I2C transactions each.
+
+ACCEL_XOUT_H = 0x3B
+BURST_LENGTH = 14
+WORDS = BURST_LENGTH // 2
+
+# Columns of the decoded samples
+COLUMNS = ("time", "ax", "ay", "az", "temp", "gx", "gy", "gz")
+TIME, AX, AY, AZ, TEMP, GX, GY, GZ = range(len(COLUMNS))
+
+GRAVITY = 9.80665
+
+def read_burst(mpu):
+    """Reads the 14 data registers in one I2C transaction."""
+    return mpu.bus.read_i2c_block_data(mpu.address, ACCEL_XOUT_H, BURST_LENGTH)
+
+def scales(accel_range=2, gyro_range=250):
+    """Returns the per-word scale factors turning raw counts into m/s^2, deg C and deg/s."""
+    accel = accel_range * GRAVITY / 32768
+    gyro = gyro_range / 32768
+    return np.array([accel, accel, accel, 1 / 340, gyro, gyro, gyro])
+
+TEMP_OFFSET = 36.53  # deg C at a raw reading of 0
+
+def decode(times, raw, word_scales):
+    """
+    Turns timestamps and raw register words into float samples.
+
+    Args:
+        times: (n,) sample times in seconds.
+        raw: (n, 7) int16 register words.
+        word_scales: From scales().
+
+    Returns:
+        An (n, 8) array with the columns in COLUMNS.
+    """
+    samples = np.empty((len(times), len(COLUMNS)))
+    samples[:, TIME] = times
+    samples[:, AX:] = raw * word_scales
+    samples[:, TEMP] += TEMP_OFFSET
+    return samples
+
+# --- Sampler ---
+
+class IMUSampler:
+    """
+    Samples the IMU at a fixed rate into a ring buffer of timestamped raw readings.
+
+    Each sample is one burst read, stored as seven int16 words and a timestamp; the
+    words are only scaled when a consumer reads a batch, so decoding is one NumPy
+    operation per batch. Samples are due on a fixed grid of absolute times, so the
+    rate doesn't drift with the time each read takes. If the sampler falls behind
+    it takes one sample, for the latest deadline, and counts the ones it missed;
+    it never makes up for them with back-to-back reads stamped at grid times they
+    weren't taken at.
+
+    On the real backend start() runs the sampler on its own thread. On the
+    simulated backend virtual time only moves when something sleeps, so it samples
+    from the virtual clock's physics steps instead.
+    """
+
+    def __init__(self, mpu, rate=c.IMU_SAMPLER["RATE"], capacity=c.IMU_SAMPLER["BUFFER_SAMPLES"],
+                 clock=time.monotonic):
+        self.mpu = mpu
+        self.period = 1.0 / rate
+        self.capacity = capacity
+        self.clock = clock
+
+        self.times = np.zeros(capacity)
+        self.raw = np.zeros((capacity, WORDS), dtype=np.int16)
+        self.written = 0  # Samples written since start; the slot is written % capacity
+        self.cursor = 0  # The next sample read_new() returns
+        self.scales = scales(mpu.read_accel_range(), mpu.read_gyro_range())
+
+        self.next_sample = None
+        self.missed = 0  # Deadlines passed without a sample because the sampler fell behind
+        self.overruns = 0  # Samples overwritten before read_new() got to them
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    # --- Sampling ---
+
+    def sample(self, now=None):
+        """Takes one burst reading, timestamped `now` (or the clock's time)."""
+        raw = read_burst(self.mpu)
+        if now is None:
+            now = self.clock()
+        words = np.frombuffer(bytes(raw), dtype=">i2")
+        with self._lock:
+            slot = self.written % self.capacity
+            self.raw[slot] = words
+            self.times[slot] = now
+            self.written += 1
+
+    def poll(self, now=None):
+        """Takes every sample that has come due by `now`."""
+        if not self._running:
+            return
+        if now is None:
+            now = self.clock()
+        if self.next_sample is None:
+            self.next_sample = now
+        if now < self.next_sample:
+            return
+        behind = int((now - self.next_sample) / self.period)  # Deadlines passed before the latest one
+        self.missed += behind
+        self.next_sample += behind * self.period
+        self.sample(self.next_sample)
+        self.next_sample += self.period
+
+    def start(self, scheduled=False):
+        """
+        Starts sampling in the background.
+
+        Args:
+            scheduled: Start no thread; something else (a scheduler.Scheduler task) calls poll() at the rate.
+        """
+        self._running = True
+        self.next_sample = None
+        if scheduled:
+            return
+        if hal.is_simulated():
+            clock = hal.backend().clock
+            self.clock = clock.monotonic
+            clock.on_advance(self.poll)
+            return
+        self._thread = threading.Thread(target=self._run, name="imu-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            self.poll()
+            delay = self.next_sample - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+
+    # --- Reading ---
+
+    def read(self, cursor):
+        """
+        Returns the samples written since `cursor`, decoded, and the new cursor.
+
+        Samples already overwritten are skipped, so at most `capacity` come back.
+        """
+        with self._lock:
+            end = self.written
+            start = max(cursor, end - self.capacity)
+            slots = np.arange(start, end) % self.capacity
+            times = self.times[slots]
+            raw = self.raw[slots]
+        return decode(times, raw, self.scales), end
+
+    def read_new(self):
+        """Returns the samples taken since the last call, for a single consumer."""
+        with self._lock:
+            self.overruns += max(0, self.written - self.capacity - self.cursor)
+        samples, self.cursor = self.read(self.cursor)
+        return samples
+
+    def latest(self):
+        """Returns the most recent sample, or None before the first."""
+        with self._lock:
+            if self.written == 0:
+                return None
+            slot = (self.written - 1) % self.capacity
+            times, raw = self.times[slot:slot + 1].copy(), self.raw[slot:slot + 1].copy()
+        return decode(times, raw, self.scales)[0]
@@ -0,0 +1,115 @@
+# imu_sampler_bench.py
+# Compares dead reckoning from the control loop's own IMU reads (two get_*_data()
+# calls per pass, at whatever rate the loop manages) with the IMUSampler's fixed-rate
+# burst reads integrated in batches: heading and position error against the
+# simulated robot's true pose, I2C transactions and CPU time per sample.
+# Runs anywhere - no robot hardware needed.
+
+import contextlib
+import io
+import math
+import os
+import tempfile
+import random
+import time as real_time
+import hal
+
+hal.use("sim")
+
+import config as c
+import robot as rc
+import movement as m
+import dead_reckoning as dr
+
+RUN_TIME = 60.0  # Virtual seconds
+
+class Timed:
+    """Wraps a function and adds up the real time spent in it."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, *args, **kwargs):
+        start = real_time.perf_counter()
+        result = self.fn(*args, **kwargs)
+        self.seconds += real_time.perf_counter() - start
+        self.calls += 1
+        return result
+
+class TruePath:
+    """Follows the simulated robot's true motion, ignoring the jumps back to the table centre after a fall."""
+
+    def __init__(self, world, clock):
+        self.world = world
+        self.x = self.y = 0.0
+        self.last_time = clock.now
+        clock.on_advance(self.step)
+
+    def step(self, now):
+        dt, self.last_time = now - self.last_time, now
+        self.x += self.world.v * math.cos(self.world.heading) * dt
+        self.y += self.world.v * math.sin(self.world.heading) * dt
+
+def angle_error(a, b):
+    return abs((a - b + 180) % 360 - 180)
+
+if __name__ == "__main__":
+    backend = hal.backend()
+    world, clock = backend.world, hal.clock
+    random.seed(c.SIMULATION["SEED"])
+    c.GYRO_CALIBRATION["PATH"] = os.path.join(tempfile.mkdtemp(), "gyro.json")
+
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        movement = m.Movement(rc.pca)
+        loop_reads = dr.DeadReckoning()
+        batched = dr.DeadReckoning()
+    batched.start_sampler()
+
+    loop_update = Timed(loop_reads.update)
+    batched_update = Timed(batched.update)
+    batched.sampler.sample = Timed(batched.sampler.sample)
+    loop_bus, batched_bus = loop_reads.mpu.bus, batched.mpu.bus
+    calibration_reads = {id(bus): bus.transactions for bus in (loop_bus, batched_bus)}
+
+    # The main_0.35.py loop: read the IMU once a pass, then a blocking move and a short sleep
+    start = clock.monotonic()
+    start_heading = math.degrees(world.heading)
+    true_path = TruePath(world, backend.clock)
+    with quiet:
+        while clock.monotonic() - start < RUN_TIME:
+            loop_update()
+            batched_update()
+            left_edge, right_edge = rc.read_edge_sensors()
+            if left_edge or right_edge:
+                movement.move_backward()
+                movement.turn_right_in_place(duration=0.6)
+            else:
+                random.choice([movement.move_forward, movement.move_forward, movement.turn_left_in_place,
+                               movement.turn_right_in_place])()
+            clock.sleep(0.1)
+    loop_update()
+    batched_update()
+    passes = loop_update.calls
+
+    true_heading = math.degrees(world.heading) - start_heading
+    true_x, true_y = true_path.x, true_path.y
+    samples = batched.samples_integrated
+    print(f"{RUN_TIME:.0f} s of driving, {world.distance_travelled:.1f} m travelled\n")
+    print(f"{'':22} {'updates':>8} {'heading err':>12} {'position err':>13} {'I2C/sample':>11} {'CPU/sample':>11}")
+    for name, reckoning, bus, updates, cpu in (
+            ("loop reads", loop_reads, loop_bus, passes, loop_update.seconds / passes),
+            ("sampler + batches", batched, batched_bus, samples,
+             (batched_update.seconds + batched.sampler.sample.seconds) / samples)):
+        x, y = reckoning.get_position()
+        heading_error = angle_error(reckoning.get_heading(), true_heading)
+        position_error = math.hypot(x - true_x, y - true_y)
+        print(f"{name:22} {updates:8d} {heading_error:9.2f} deg {position_error:11.3f} m "
+              f"{(bus.transactions - calibration_reads[id(bus)]) / updates:11.1f} {cpu * 1e6:8.1f} us")
+    print(f"\nLoop pass length: mean {RUN_TIME / passes * 1000:.0f} ms; sampler period "
+          f"{batched.sampler.period * 1000:.0f} ms, {batched.sampler.missed} missed, {batched.sampler.overruns} overrun")
+    print(f"Batch decode + integrate: {batched_update.seconds / samples * 1e6:.1f} us per sample")
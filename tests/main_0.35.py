@@ -1,6 +1,5 @@
 # main.py (Version 0.35: Removing Mapping and Loop Closure)
 
-import time
 import robot as rc
 import movement as m
 import config as c
@@ -10,7 +9,12 @@ import touch_sensor as t
 import sound_sensor as s
 import servo_control as sc
 import dead_reckoning as dr
-import random
+import recorder as rec
+import behaviors as bh
+import scheduler as sch
+import display as d
+import animation
+from async_runtime import Sensors
 
 # --- Code Functions ---
 # This program controls a robot named Gismo.
@@ -18,27 +22,51 @@ import random
 # The robot can move forward, backward, turn left, and turn right, with a ramp-up/ramp-down
 # feature for smoother movements. It uses the PCA9685 PWM driver to control the L298N motor driver,
 # the HC-SR04 sensor to measure distance to obstacles, and edge sensors to detect edges.
+# What to do each tick is chosen by the behavior arbiter in behaviors.py: wander,
+# avoid obstacles, escape edges and react to touch and sound, in priority order,
+# with a higher priority behavior taking over from a lower one on the next tick.
+# The IMU, the ultrasonic ranger and the behaviors run as tasks of a fixed-rate
+# scheduler (scheduler.py) at SCHEDULER["RATES"], each on its own absolute
+# deadlines, so no task's rate depends on how long the others take. The face stays
+# on the animation engine's own thread: a full-frame push holds the bus for ~24 ms,
+# which would starve the 200 Hz IMU task if it ran in the same loop.
 
 # --- Helper Functions ---
 
-def react_to_sound(pca, rgb_led_instance):
-    """Makes the robot react to sound by turning, moving, and playing a tune."""
-    print("Sound detected! Reacting...")
-    movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 2)
-    movement.move_forward(duration=c.MOVEMENT_SETTINGS["MOVE_DURATION"])
-    rgb_led_instance.set_emotion("surprised")
-    b.buzzer.play_custom_tune(b.TUNE_IMPERIAL_MARCH)  # Play the tune
-    time.sleep(0.5)
-    rgb_led_instance.set_emotion("neutral")
+def announce(now, previous, winner):
+    """Prints each reaction as the arbiter hands it control."""
+    if winner is not None and winner.name != "wander":
+        print(f"{winner.name} taking over from {previous.name if previous else 'nothing'}")
 
-def wiggle(pca, rgb_led_instance, duration=0.5, speed=0.7):
-    """Makes the robot wiggle for a short duration."""
-    movement.turn_left_in_place(duration / 2)
-    movement.turn_right_in_place(duration / 2)
+def control_tick(deadline, dt):
+    """The behaviors task: integrates the IMU samples so far, then lets the arbiter act."""
+    dead_reckoning.update()
+    arbiter.tick(deadline)
+    if recording is not None:
+        readings = arbiter.readings
+        # Stamped with the deadline, like the arbiter's readings and the IMU batches, so a
+        # replay lines them up on the one clock (hal.clock, virtual on the simulator)
+        recording.record_sensors(deadline, readings["distance"], (readings["left_edge"], readings["right_edge"]),
+                                 readings["touched"], readings["sound"])
+        recording.record_motors(movement)
+
+def print_status(deadline, dt):
+    """Prints the dead reckoning position, and any task the scheduler is starving."""
+    position = dead_reckoning.get_position()
+    heading = dead_reckoning.get_heading()
+    print(f"Position (X, Y): ({position[0]:.2f}, {position[1]:.2f}), Heading: {heading:.2f} degrees")
+    for task in loop.starving():
+        if task.last_run is None:
+            print(f"Task {task.name} is starving: it hasn't run yet")
+        else:
+            print(f"Task {task.name} is starving: last ran {loop.clock() - task.last_run:.3f} s ago")
 
 # --- Main Program ---
 
 if __name__ == "__main__":
+    # Bound as start-up gets to them, so a Ctrl-C during the calibration or the servo
+    # and LED tests still shuts down whatever had started
+    rgb_led_instance = movement = recording = dead_reckoning = arbiter = loop = None
     try:
         rc.initialize_pca()
         rc.initialize_edge_sensors()
@@ -48,84 +76,61 @@ if __name__ == "__main__":
         sc.initialize_servos(rc.pca)
         rgb_led_instance = led.RGBLed(rc.pca)
         movement = m.Movement(rc.pca)
-        dead_reckoning = dr.DeadReckoning()
-        b.buzzer.play_startup_sound()
+        rc.movement = movement  # So rc.cleanup() can find it
+        rc.start_inputs()  # Edge, touch and sound by GPIO callbacks
+        rc.start_ranging(scheduled=True)  # Pinged by the scheduler; each echo reaches the loop and the safety reflex
+        rc.start_safety(movement)  # An edge or close obstacle stops the motors at once, whatever the loop is doing
+        recording = rec.Recorder() if c.RECORDER["ENABLED"] else None  # Replay offline with recorder.Replay
+        dead_reckoning = dr.DeadReckoning(movement=movement, recorder=recording)
+        dead_reckoning.start_sampler(scheduled=True)  # Fixed-rate IMU sampling; update() integrates each batch
+        d.initialize_display()
+        if animation.initialize_animation() is not None:
+            animation.engine.play(animation.idle_animation())
+        b.sequencer.play(b.SOUND_STARTUP, b.PRIORITY_STATUS)
         sc.test_servos(rc.pca)
         rgb_led_instance.test()
 
-        last_update = time.time()
-        last_turn = time.time()
-
-        while True:
-            dead_reckoning.update()
-            current_time = time.time()
-
-            distance = rc.get_distance()
-            left_edge, right_edge = rc.read_edge_sensors()
-            touched = t.is_touched()
-            sound_detected = s.is_sound_detected()
-
-            # Print dead reckoning information every second
-            if current_time - last_update >= 1.0:
-                position = dead_reckoning.get_position()
-                heading = dead_reckoning.get_heading()
-                print(f"Position (X, Y): ({position[0]:.2f}, {position[1]:.2f}), Heading: {heading:.2f} degrees")
-                last_update = current_time
-
-            if sound_detected:
-                react_to_sound(rc.pca, rgb_led_instance)
-            elif touched:
-                print("Touched! Wiggling...")
-                wiggle(rc.pca, rgb_led_instance)
-                rgb_led_instance.set_emotion("happy")
-                b.buzzer.play_tone(500, 0.1)
-                time.sleep(0.5)
-                rgb_led_instance.set_emotion("neutral")
-            elif distance < c.MOVEMENT_SETTINGS["OBSTACLE_DISTANCE"]:
-                print("Obstacle detected!")
-                movement.stop_all_motors()
-                sc.raise_arms(rc.pca)
-                time.sleep(0.5)
-                sc.move_head_up(rc.pca)
-                rgb_led_instance.set_emotion("surprised")
-                b.buzzer.play_obstacle_sound()
-                time.sleep(0.5)
-                sc.move_head_center(rc.pca)
-                sc.lower_arms(rc.pca)
-                # Turn to a random direction after encountering an obstacle
-                if random.choice([True, False]):
-                    movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-                else:
-                    movement.turn_right_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-            elif left_edge == 1:
-                print("Left edge detected! Turning right...")
-                movement.turn_right_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-                rgb_led_instance.set_emotion("angry")
-                b.buzzer.play_edge_sound()
-            elif right_edge == 1:
-                print("Right edge detected! Turning left...")
-                movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-                rgb_led_instance.set_emotion("angry")
-                b.buzzer.play_edge_sound()
-            else:
-                # Wander around
-                if current_time - last_turn > 5:  # Turn every 5 seconds
-                    if random.choice([True, False]):
-                        movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-                    else:
-                        movement.turn_right_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"])
-                    last_turn = current_time
-                else:
-                    movement.move_forward(duration=c.MOVEMENT_SETTINGS["MOVE_DURATION"])
-                rgb_led_instance.set_emotion("searching")
+        sensors = Sensors(rc.get_distance, rc.read_edge_sensors, t.is_touched, s.is_sound_detected)
+        arbiter = bh.Arbiter(movement, sensors, bh.default_behaviors(
+            rgb_led_instance, b.sequencer, rc.pca,
+            sounds={"edge": (b.SOUND_EDGE, b.PRIORITY_ALERT), "touch": (b.SOUND_TOUCH, b.PRIORITY_STATUS),
+                    "obstacle": (b.SOUND_OBSTACLE, b.PRIORITY_ALERT)},
+            tune=(b.TUNE_IMPERIAL_MARCH, b.PRIORITY_MUSIC)))
+        arbiter.listeners.append(announce)
 
-            time.sleep(0.1)  # Adjust timing as needed
+        rates = c.SCHEDULER["RATES"]
+        loop = sch.Scheduler()
+        loop.add("imu", lambda deadline, dt: dead_reckoning.sampler.poll(deadline), rates["IMU"])
+        loop.add("ranging", rc.ranger.poll, rates["RANGING"])
+        loop.add("behaviors", control_tick, rates["BEHAVIORS"])
+        loop.add("status", print_status, 1)
+        loop.run()
 
     except KeyboardInterrupt:
         print("Stopping motors and exiting...")
-        movement.stop_all_motors()
-        rgb_led_instance.set_color(*c.LED_COLORS["OFF"])
-        b.buzzer.play_shutdown_sound()
+        if arbiter is not None:
+            arbiter.stop()
+            arbiter.print_report()
+        elif movement is not None:
+            movement.stop_all_motors()
+        if loop is not None:
+            loop.print_report()
+        if animation.engine is not None:
+            animation.engine.stop()
+        if dead_reckoning is not None:
+            dead_reckoning.stop_sampler()
+        if rgb_led_instance is not None:
+            rgb_led_instance.set_color(*c.LED_COLORS["OFF"])
+        if b.sequencer is not None:
+            b.sequencer.stop()
+        if b.buzzer is not None:
+            b.buzzer.play_shutdown_sound()
+            b.buzzer.close()
+        if recording is not None:
+            recording.close()
 
     finally:
-        rc.cleanup(rc.pca, rgb_led_instance)
\ No newline at end of file
+        if rgb_led_instance is not None:
+            rc.cleanup(rc.pca, rgb_led_instance)
+        elif movement is not None:
+            movement.stop_all_motors()
\ No newline at end of file
@@ -0,0 +1,52 @@
+# main_async.py
+# Runs Gismo on the asyncio runtime (async_runtime.py) instead of the blocking
+# loop in main_0.35.py. Sensors are read every tick, even while the robot reacts,
+# and a table edge interrupts whatever the robot is doing. The HC-SR04 is pinged
+# on the ranger's own thread, so reading the distance in sense() never blocks the
+# event loop on an echo.
+
+import asyncio
+import robot as rc
+import movement as m
+import config as c
+import rgb_led as led
+import buzzer as b
+import touch_sensor as t
+import sound_sensor as s
+import servo_control as sc
+import async_runtime as ar
+
+if __name__ == "__main__":
+    rgb_led_instance = None
+    movement = None
+    try:
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        b.initialize_buzzer()
+        t.initialize_touch_sensor()
+        s.initialize_sound_sensor()
+        sc.initialize_servos(rc.pca)
+        rgb_led_instance = led.RGBLed(rc.pca)
+        movement = m.Movement(rc.pca, clock=ar.CLOCK)  # Ramps timed on the event loop's clock
+        rc.movement = movement  # So rc.cleanup() can find it
+        b.buzzer.play_startup_sound()
+        rc.start_ranging()  # Before the runtime, or get_distance() busy-waits inside the event loop
+
+        sensors = ar.Sensors(rc.get_distance, rc.read_edge_sensors, t.is_touched, s.is_sound_detected)
+        runtime = ar.AsyncRuntime(movement, sensors, rgb_led=rgb_led_instance, buzzer=b.buzzer,
+                                  pca=rc.pca, sound_tune=b.TUNE_IMPERIAL_MARCH)
+        asyncio.run(runtime.run())
+
+    except KeyboardInterrupt:
+        print("Stopping motors and exiting...")
+        if movement:
+            movement.stop_all_motors()
+        if rgb_led_instance:
+            rgb_led_instance.set_color(*c.LED_COLORS["OFF"])
+        b.buzzer.play_shutdown_sound()
+
+    finally:
+        if rgb_led_instance:
+            rc.cleanup(rc.pca, rgb_led_instance)  # Also stops the ranger
+        elif rc.ranger is not None:
+            rc.ranger.stop()
@@ -0,0 +1,167 @@
+# map_render.py
+
+import sys
+import numpy as np
+from PIL import Image
+import config as c
+
+# --- Map Rendering ---
+# Turns an occupancy grid into text for the console or a 1-bit image for the OLED,
+# with whole-array NumPy operations instead of a Python loop per cell. Works with
+# any map from mapping.py: it only reads `grid`, `shape` and `cell_index()`.
+#
+# Layout matches OccupancyGridMap.display_map: grid rows (x) run bottom to top,
+# columns (y) left to right, each cell is " X" (obstacle), "  " (free), " ?"
+# (unknown) or " R" (robot), framed by a border.
+
+OBSTACLE, FREE, UNKNOWN, ROBOT = ord("X"), ord(" "), ord("?"), ord("R")
+
+def classify(grid_map, threshold=None):
+    """
+    Sorts every cell into obstacle, free or unknown.
+
+    Returns:
+        (obstacle, free): boolean arrays laid out like grid_map.grid.
+    """
+    threshold = threshold or c.MAP_SETTINGS["OBSTACLE_THRESHOLD"]
+    grid = grid_map.grid
+    return grid > threshold, grid < 1 - threshold
+
+def robot_cell(grid_map, robot_position):
+    """Returns the robot's grid index, or None if there is none or it is off the grid."""
+    if robot_position is None:
+        return None
+    i, j = grid_map.cell_index(robot_position)
+    if 0 <= i < grid_map.shape[0] and 0 <= j < grid_map.shape[1]:
+        return i, j
+    return None
+
+def render_rows(grid_map, robot_position=None):
+    """
+    Renders the map body as a (rows, characters) uint8 array of ASCII codes.
+
+    Row 0 is the top of the printed map (the highest x).
+    """
+    obstacle, free = classify(grid_map)
+    chars = np.where(obstacle, OBSTACLE, np.where(free, FREE, UNKNOWN)).astype(np.uint8)
+    cell = robot_cell(grid_map, robot_position)
+    if cell is not None:
+        chars[cell] = ROBOT
+
+    rows, columns = chars.shape
+    frame = np.full((rows, columns * 2 + 3), ord(" "), dtype=np.uint8)
+    frame[:, 0] = frame[:, -1] = ord("|")
+    frame[:, 2:columns * 2 + 1:2] = chars[::-1]  # Highest x printed first
+    return frame
+
+def border(grid_map):
+    return " " + "-" * (grid_map.shape[1] * 2 + 1) + " "
+
+def rows_to_text(frame):
+    """Decodes a frame from render_rows to a list of strings."""
+    width = frame.shape[1]
+    text = frame.tobytes().decode("ascii")
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+def render_text(grid_map, robot_position=None):
+    """Renders the whole map, border included, as one string."""
+    lines = rows_to_text(render_rows(grid_map, robot_position))
+    edge = border(grid_map)
+    return "\n".join([edge, *lines, edge])
+
+class MapRenderer:
+    """
+    Redraws a map in a terminal, only rewriting the rows that changed.
+
+    The first draw prints the whole map; after that each draw compares the new frame
+    with the last one and moves the cursor (ANSI escapes) to rewrite just the
+    changed rows. If the map grows (ChunkedOccupancyGridMap) the whole map is
+    redrawn.
+    """
+
+    def __init__(self, grid_map, out=None):
+        self.grid_map = grid_map
+        self.out = out or sys.stdout
+        self.previous = None
+
+    def changed_rows(self, robot_position=None):
+        """
+        Renders a frame and works out which rows differ from the last one.
+
+        Returns:
+            (frame, changed): the new frame and the indices of its changed rows, or
+            None for `changed` if everything has to be redrawn.
+        """
+        frame = render_rows(self.grid_map, robot_position)
+        if self.previous is None or self.previous.shape != frame.shape:
+            changed = None
+        else:
+            changed = np.flatnonzero((frame != self.previous).any(axis=1))
+        self.previous = frame
+        return frame, changed
+
+    def draw(self, robot_position=None):
+        """
+        Draws the map, rewriting only the rows that changed since the last draw.
+
+        Returns:
+            The number of map rows written.
+        """
+        frame, changed = self.changed_rows(robot_position)
+        if changed is None:
+            edge = border(self.grid_map)
+            self.out.write("\x1b[H\x1b[2J" + "\n".join([edge, *rows_to_text(frame), edge]) + "\n")
+            self.out.flush()
+            return frame.shape[0]
+
+        lines = rows_to_text(frame[changed]) if changed.size else []
+        # Row r of the frame is terminal line r + 2 (line 1 is the top border)
+        self.out.write("".join(f"\x1b[{r + 2};1H{line}" for r, line in zip(changed, lines)))
+        self.out.write(f"\x1b[{frame.shape[0] + 3};1H")  # Park the cursor below the map
+        self.out.flush()
+        return len(lines)
+
+    def reset(self):
+        """Forgets the last frame, so the next draw redraws everything."""
+        self.previous = None
+
+# --- OLED View ---
+
+def display_pixels(grid_map, width=c.DISPLAY["WIDTH"], height=c.DISPLAY["HEIGHT"], robot_position=None):
+    """
+    Shrinks the map to fit the OLED, keeping cells square.
+
+    Each pixel covers a square block of cells and is lit if any cell in it is an
+    obstacle. The robot is drawn as a small plus sign. The map is centred, with
+    the highest x at the top, as in the text view.
+
+    Returns:
+        A (height, width) boolean array.
+    """
+    obstacle, _ = classify(grid_map)
+    rows, columns = obstacle.shape
+    scale = max(1, -(-rows // height), -(-columns // width))  # Cells per pixel, rounded up
+
+    # Pad to whole blocks, then take the maximum over each block
+    padded = np.zeros((-(-rows // scale) * scale, -(-columns // scale) * scale), dtype=bool)
+    padded[:rows, :columns] = obstacle
+    blocks = padded.reshape(padded.shape[0] // scale, scale, padded.shape[1] // scale, scale).any(axis=(1, 3))
+    blocks = blocks[::-1]  # Highest x at the top
+
+    pixels = np.zeros((height, width), dtype=bool)
+    top = (height - blocks.shape[0]) // 2
+    left = (width - blocks.shape[1]) // 2
+    pixels[top:top + blocks.shape[0], left:left + blocks.shape[1]] = blocks
+
+    cell = robot_cell(grid_map, robot_position)
+    if cell is not None:
+        y = top + blocks.shape[0] - 1 - cell[0] // scale
+        x = left + cell[1] // scale
+        pixels[max(0, y - 2):y + 3, x] = True
+        pixels[y, max(0, x - 2):x + 3] = True
+    return pixels
+
+def display_image(grid_map, width=c.DISPLAY["WIDTH"], height=c.DISPLAY["HEIGHT"], robot_position=None):
+    """Returns the OLED view of the map as a 1-bit PIL image."""
+    pixels = display_pixels(grid_map, width, height, robot_position)
+    return Image.fromarray(pixels.astype(np.uint8) * 255).convert("1")
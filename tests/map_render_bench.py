@@ -0,0 +1,67 @@
+# map_render_bench.py
+# Compares the old cell-by-cell display_map with map_render: a full text render,
+# a differential redraw after one sweep, and the 128x64 OLED view. Also checks the
+# new text output is identical to the old one.
+# Runs anywhere - no robot hardware needed.
+
+import io
+import time
+import numpy as np
+import config as c
+import mapping
+import map_render
+
+GRID_SIZES = [100, 500]
+RAYS = 36
+
+def legacy_display_map(grid_map, robot_position=None):
+    """The display_map loop before map_render, returning its text instead of printing it."""
+    lines = [" " + "-" * (grid_map.grid.shape[1] * 2 + 1) + " "]
+    for i in range(grid_map.grid.shape[0] - 1, -1, -1):
+        line = "|"
+        for j in range(grid_map.grid.shape[1]):
+            cell = grid_map.grid[i, j]
+            if robot_position and i == int(robot_position[0] / grid_map.cell_size) + grid_map.grid.shape[0] // 2 and j == int(robot_position[1] / grid_map.cell_size) + grid_map.grid.shape[1] // 2:
+                char = "R"
+            elif cell > c.MAP_SETTINGS["OBSTACLE_THRESHOLD"]:
+                char = "X"
+            elif cell < 1 - c.MAP_SETTINGS["OBSTACLE_THRESHOLD"]:
+                char = " "
+            else:
+                char = "?"
+            line += f" {char}"
+        lines.append(line + " |")
+    lines.append(lines[0])
+    return "\n".join(lines)
+
+def sweep(rng, x, y):
+    return np.tile((x, y), (RAYS, 1)), rng.uniform(0.3, 3.9, RAYS), np.linspace(0, 360, RAYS, endpoint=False)
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'grid':>9} | {'old display_map':>15} | {'render_text':>11} | {'first draw':>10} | "
+          f"{'redraw':>17} | {'OLED view':>9}")
+    for size in GRID_SIZES:
+        grid_map = mapping.OccupancyGridMap(size, size, 8.0 / size)
+        for _ in range(20):
+            grid_map.update_map_batch(*sweep(rng, *rng.uniform(-1, 1, 2)))
+        robot = (0.3, -0.2)
+
+        legacy_time, legacy = timed(legacy_display_map, grid_map, robot)
+        render_time, text = timed(map_render.render_text, grid_map, robot)
+        assert text == legacy, "map_render output differs from the old display_map"
+
+        renderer = map_render.MapRenderer(grid_map, out=io.StringIO())
+        first_time, _ = timed(renderer.draw, robot)
+        grid_map.update_map_batch(*sweep(rng, 0.3, -0.2))
+        redraw_time, rows = timed(renderer.draw, (0.35, -0.2))
+        oled_time, pixels = timed(map_render.display_pixels, grid_map, robot_position=robot)
+        assert pixels.shape == (c.DISPLAY["HEIGHT"], c.DISPLAY["WIDTH"])
+
+        print(f"{size:>4}x{size:<4} | {legacy_time * 1000:12.1f} ms | {render_time * 1000:8.2f} ms | "
+              f"{first_time * 1000:7.2f} ms | {redraw_time * 1000:5.2f} ms {rows:>3} rows | {oled_time * 1000:6.2f} ms")
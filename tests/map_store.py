@@ -0,0 +1,169 @@
+# map_store.py
+
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+import config as c
+import mapping
+
+# --- File Layout ---
+# One header page, then the grid's cells as a raw row-major array. Keeping the
+# cells page-aligned lets a checkpoint flush just the pages that changed.
+MAGIC = b"GISMOMAP"
+VERSION = 1
+HEADER = struct.Struct("<8sH16s8sIIdd")  # magic, version, representation, dtype, size x, size y, cell size, resolution
+HEADER_SIZE = mmap.ALLOCATIONGRANULARITY
+
+class MapStore:
+    """
+    Keeps an OccupancyGridMap in a memory-mapped file so it survives restarts.
+
+    The map's cells are a numpy.memmap of the file, so updates go straight into the
+    page cache and reopening a saved map is just mapping the file - no reading or
+    rebuilding, however large it is. The map tells the store which rows it touched;
+    checkpoint() then flushes only those bands of rows to disk, so it is cheap
+    enough to run every few seconds, from the loop or from the background thread
+    started by start_autosave().
+    """
+
+    def __init__(self, path=c.MAP_STORE["PATH"], grid_size_x=None, grid_size_y=None, cell_size=None,
+                 representation=None, dtype=None, band_bytes=c.MAP_STORE["DIRTY_BAND_BYTES"]):
+        """
+        Opens the map saved at `path`, or creates a new one there.
+
+        The map settings are only used when creating the file; an existing file
+        keeps the settings it was created with.
+        """
+        self.path = path
+        if os.path.exists(path):
+            self.map = self._load()
+        else:
+            self.map = self._create(grid_size_x, grid_size_y, cell_size, representation, dtype)
+        self.map.store = self
+
+        # --- Dirty Tracking ---
+        self.row_bytes = self.map.shape[1] * self.cells.itemsize
+        self.band_rows = max(1, band_bytes // self.row_bytes)
+        self.dirty = np.zeros(-(-self.map.shape[0] // self.band_rows), dtype=bool)
+
+        self.checkpoints = 0
+        self.bytes_flushed = 0
+        self.last_checkpoint_time = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def cells(self):
+        return self.map.cells
+
+    def _create(self, grid_size_x, grid_size_y, cell_size, representation, dtype):
+        """Creates the file for a new, unknown map."""
+        grid_map = mapping.OccupancyGridMap(1, 1, cell_size, representation, dtype)
+        shape = (grid_size_x or c.MAP_SETTINGS["GRID_SIZE_X"], grid_size_y or c.MAP_SETTINGS["GRID_SIZE_Y"])
+        dtype_name = np.dtype(grid_map.dtype).name
+        header = HEADER.pack(MAGIC, VERSION, grid_map.representation.encode(), dtype_name.encode(),
+                             shape[0], shape[1], grid_map.cell_size, getattr(grid_map, "resolution", 0.0))
+
+        with open(self.path, "wb") as f:
+            f.write(header)
+            f.truncate(HEADER_SIZE + shape[0] * shape[1] * np.dtype(grid_map.dtype).itemsize)  # Sparse, all zeros
+
+        cells = np.memmap(self.path, dtype=grid_map.dtype, mode="r+", offset=HEADER_SIZE, shape=shape)
+        if grid_map.unknown != 0:
+            cells[:] = grid_map.unknown
+            cells.flush()
+        return mapping.OccupancyGridMap(cell_size=grid_map.cell_size, representation=grid_map.representation,
+                                        dtype=dtype_name, cells=cells)
+
+    def _load(self):
+        """Maps an existing map file."""
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a Gismo map file")
+        _, version, representation, dtype_name, size_x, size_y, cell_size, resolution = HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"{self.path} is map file version {version}, expected {VERSION}")
+        representation = representation.rstrip(b"\0").decode()
+        dtype_name = dtype_name.rstrip(b"\0").decode()
+
+        cells = np.memmap(self.path, dtype=dtype_name, mode="r+", offset=HEADER_SIZE, shape=(size_x, size_y))
+        grid_map = mapping.OccupancyGridMap(cell_size=cell_size, representation=representation,
+                                            dtype=dtype_name if representation == "log_odds" else None, cells=cells)
+        if representation == "log_odds" and grid_map.resolution != resolution:
+            raise ValueError(f"{self.path} was saved with log-odds resolution {resolution}, "
+                             f"but INT8_RESOLUTION is now {grid_map.resolution}")
+        return grid_map
+
+    # --- Dirty Tracking ---
+
+    def mark_cells(self, flat_indices):
+        """Marks the bands holding these flat cell indices as changed."""
+        self.dirty[np.asarray(flat_indices) // self.map.shape[1] // self.band_rows] = True
+
+    def mark_rows(self, first, last):
+        """Marks the bands holding grid rows `first` to `last` (inclusive) as changed."""
+        first = max(0, first)
+        last = min(self.map.shape[0] - 1, last)
+        if first <= last:
+            self.dirty[first // self.band_rows:last // self.band_rows + 1] = True
+
+    # --- Checkpointing ---
+
+    def checkpoint(self):
+        """
+        Flushes the changed bands of rows to disk.
+
+        Returns:
+            The number of bytes flushed.
+        """
+        with self._lock:
+            start_time = time.perf_counter()
+            bands = np.flatnonzero(self.dirty)
+            self.dirty[bands] = False  # Cleared first, so changes made during the flush are kept for the next one
+            if bands.size == 0:
+                return 0
+
+            # Merge neighbouring bands, then flush each run as one page-aligned range
+            breaks = np.flatnonzero(np.diff(bands) > 1) + 1
+            band_bytes = self.band_rows * self.row_bytes
+            total_bytes = self.cells.nbytes
+            flushed = 0
+            for run in np.split(bands, breaks):
+                start = int(run[0]) * band_bytes
+                end = min(total_bytes, (int(run[-1]) + 1) * band_bytes)
+                start -= start % mmap.PAGESIZE
+                self.cells.base.flush(start, end - start)
+                flushed += end - start
+
+            self.checkpoints += 1
+            self.bytes_flushed += flushed
+            self.last_checkpoint_time = time.perf_counter() - start_time
+            return flushed
+
+    def start_autosave(self, interval=c.MAP_STORE["CHECKPOINT_INTERVAL"]):
+        """Starts a background thread that checkpoints every `interval` seconds."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._autosave, args=(interval,), name="map-store", daemon=True)
+        self._thread.start()
+
+    def stop_autosave(self):
+        """Stops the background checkpoint thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stops autosaving and writes out any remaining changes."""
+        self.stop_autosave()
+        self.checkpoint()
+        self.map.store = None
+
+    def _autosave(self, interval):
+        while not self._stop.wait(interval):
+            self.checkpoint()
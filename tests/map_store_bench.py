@@ -0,0 +1,79 @@
+# map_store_bench.py
+# Measures MapStore on a large map: the cost of dirty tracking on updates, a
+# dirty-band checkpoint against flushing or saving the whole grid, and reopening
+# the saved map against loading or rebuilding it.
+# Runs anywhere - no robot hardware needed.
+
+import os
+import tempfile
+import time
+import numpy as np
+import mapping
+import map_store
+
+SIZE = 2000  # Cells per side: 100 x 100 m at 5 cm
+SWEEPS_PER_CHECKPOINT = 25  # About 5 s of mapping at 5 sweeps per second
+RAYS = 36
+
+def sweeps(rng, count):
+    """Sweeps from a robot wandering near the middle of the map."""
+    x = y = 0.0
+    for _ in range(count):
+        x, y = x + rng.normal(0, 0.2), y + rng.normal(0, 0.2)
+        yield np.tile((x, y), (RAYS, 1)), rng.uniform(0.3, 3.9, RAYS), np.linspace(0, 360, RAYS, endpoint=False)
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def bench(directory, representation, dtype=None):
+    path = os.path.join(directory, f"{representation}_{dtype}.bin")
+    create_time, store = timed(map_store.MapStore, path, SIZE, SIZE, None, representation, dtype)
+    plain = mapping.OccupancyGridMap(SIZE, SIZE, None, representation, dtype)
+    readings = list(sweeps(np.random.default_rng(0), SWEEPS_PER_CHECKPOINT * 4))
+
+    # Update cost, with and without a store attached
+    plain_time = sum(timed(plain.update_map_batch, *sweep)[0] for sweep in readings)
+    stored_time = 0.0
+    checkpoint_times, flushed = [], []
+    for i, sweep in enumerate(readings, 1):
+        stored_time += timed(store.map.update_map_batch, *sweep)[0]
+        if i % SWEEPS_PER_CHECKPOINT == 0:
+            checkpoint_time, nbytes = timed(store.checkpoint)
+            checkpoint_times.append(checkpoint_time)
+            flushed.append(nbytes)
+
+    # Flushing or saving the whole grid instead
+    for sweep in readings[:SWEEPS_PER_CHECKPOINT]:
+        store.map.update_map_batch(*sweep)
+    store.dirty[:] = False
+    full_flush_time, _ = timed(store.cells.flush)
+    save_path = os.path.join(directory, "grid.npy")
+    save_time, _ = timed(np.save, save_path, np.asarray(store.cells))
+    store.close()
+
+    # Getting the map back after a restart
+    expected = store.cells[SIZE // 2, SIZE // 2]
+    reopen_time, reopened = timed(lambda: map_store.MapStore(path).cells[SIZE // 2, SIZE // 2])
+    load_time, _ = timed(np.load, save_path)
+    rebuild = mapping.OccupancyGridMap(SIZE, SIZE, None, representation, dtype)
+    rebuild_time = sum(timed(rebuild.update_map_batch, *sweep)[0] for sweep in readings)
+    assert reopened == expected
+
+    name = representation + (f" {dtype}" if dtype else "")
+    print(f"\n{name}: {store.cells.nbytes / 2**20:.1f} MB of cells, file created in {create_time * 1000:.1f} ms")
+    print(f"  update, {len(readings)} sweeps:   {plain_time * 1000:7.1f} ms in memory, "
+          f"{stored_time * 1000:7.1f} ms memory-mapped with dirty tracking")
+    print(f"  checkpoint every {SWEEPS_PER_CHECKPOINT} sweeps: {np.mean(checkpoint_times) * 1000:6.2f} ms mean, "
+          f"{max(checkpoint_times) * 1000:6.2f} ms max, {np.mean(flushed) / 1024:.0f} KB flushed")
+    print(f"  whole grid instead:      {full_flush_time * 1000:6.2f} ms memmap.flush(), {save_time * 1000:6.1f} ms np.save()")
+    print(f"  after a restart:         {reopen_time * 1000:6.2f} ms reopen + first read, {load_time * 1000:6.1f} ms np.load(), "
+          f"{rebuild_time * 1000:6.1f} ms replaying {len(readings)} sweeps")
+
+if __name__ == "__main__":
+    print(f"{SIZE} x {SIZE} map, {RAYS} rays per sweep")
+    with tempfile.TemporaryDirectory() as directory:
+        bench(directory, "log_odds", "int8")
+        bench(directory, "log_odds", "float32")
+        bench(directory, "probability")
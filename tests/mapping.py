@@ -3,36 +3,262 @@
 import numpy as np
 import config as c
 import math
+import map_render
+
+# Probability steps for one reading: the cell where the ray ends is more likely
+# occupied, the cells it passed through are more likely free.
+HIT_INCREMENT = 0.2
+FREE_DECREMENT = 0.1
+MAX_RANGE = 4  # Meters; readings beyond the sensor's effective range are ignored
+
+REPRESENTATIONS = ("probability", "log_odds")
+LOG_ODDS_DTYPES = {"int8": np.int8, "float32": np.float32}
+
+def log_odds(probability):
+    """Converts a probability to log-odds."""
+    return math.log(probability / (1 - probability))
+
+def ray_ends(positions, distances, headings, cell_size):
+    """
+    Converts a batch of readings to ray start and end cells.
+
+    Cells are counted from the robot's starting cell, with the same truncating
+    conversion as update_map. Out-of-range readings are left out.
+
+    Returns:
+        (x0, y0, x1, y1): int64 arrays of start and end cell coordinates.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    distances = np.asarray(distances, dtype=np.float64).reshape(-1)
+    headings = np.radians(np.asarray(headings, dtype=np.float64).reshape(-1))
+
+    valid = np.isfinite(distances) & (distances <= MAX_RANGE)
+    positions, distances, headings = positions[valid], distances[valid], headings[valid]
+
+    x0 = np.trunc(positions[:, 0] / cell_size).astype(np.int64)
+    y0 = np.trunc(positions[:, 1] / cell_size).astype(np.int64)
+    x1 = np.trunc((positions[:, 0] + distances * np.cos(headings)) / cell_size).astype(np.int64)
+    y1 = np.trunc((positions[:, 1] + distances * np.sin(headings)) / cell_size).astype(np.int64)
+    return x0, y0, x1, y1
+
+def ray_cells(x0, y0, x1, y1):
+    """
+    Lists the cells a batch of rays pass through, from the start cell up to but
+    not including the end cell.
+
+    Every ray is walked one cell at a time along its major axis, all rays side by
+    side.
+
+    Returns:
+        (xs, ys): int64 arrays of cell coordinates.
+    """
+    dx, dy = x1 - x0, y1 - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    total = int(steps.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    ray = np.repeat(np.arange(steps.size), steps)
+    starts = np.cumsum(steps) - steps
+    t = np.arange(total) - np.repeat(starts, steps)
+    fraction = t / steps[ray]
+    xs = x0[ray] + np.rint(fraction * dx[ray]).astype(np.int64)
+    ys = y0[ray] + np.rint(fraction * dy[ray]).astype(np.int64)
+    return xs, ys
+
+def sum_changes(hits, free, hit, miss):
+    """
+    Sums the change for each touched cell.
+
+    Works on the touched cells only, so the cost follows the number of ray cells
+    rather than the size of the map.
+
+    Args:
+        hits: int64 keys of the cells where rays ended.
+        free: int64 keys of the cells rays passed through.
+        hit: Change for each ray ending in a cell.
+        miss: Change for each ray passing through a cell.
+
+    Returns:
+        (touched, change): the sorted unique cell keys and their summed change.
+    """
+    cells = np.concatenate((hits, free))
+    steps = np.concatenate((np.full(hits.size, hit), np.full(free.size, miss)))
+    touched, which = np.unique(cells, return_inverse=True)
+    return touched, np.bincount(which, weights=steps, minlength=touched.size)
 
 class OccupancyGridMap:
-    def __init__(self):
-        grid_size_x = c.MAP_SETTINGS["GRID_SIZE_X"]
-        grid_size_y = c.MAP_SETTINGS["GRID_SIZE_Y"]
-        self.grid = np.full((grid_size_x, grid_size_y), 0.5)  # Initialize all cells to 0.5 (unknown)
-        self.cell_size = c.MAP_SETTINGS["CELL_SIZE"]
+    """
+    A 2D occupancy grid centred on the robot's starting point.
+
+    In the default "probability" representation each cell holds a float64
+    probability nudged by fixed steps. In the "log_odds" representation each cell
+    holds the log-odds of being occupied as int8 (quantized, 8x smaller) or
+    float32 (2x smaller); updates are plain additions of the sensor model's hit
+    and miss log-odds, clamped so cells never saturate. Probabilities are then
+    only worked out when `grid` is read, and cached until the next update.
+    """
+
+    def __init__(self, grid_size_x=None, grid_size_y=None, cell_size=None, representation=None, dtype=None, cells=None):
+        """
+        Args:
+            grid_size_x, grid_size_y, cell_size, representation, dtype: Override the
+                MAP_SETTINGS defaults.
+            cells: Existing cell storage to use instead of allocating a new grid, such
+                as the numpy.memmap from map_store. Its shape sets the grid size.
+        """
+        grid_size_x = grid_size_x or c.MAP_SETTINGS["GRID_SIZE_X"]
+        grid_size_y = grid_size_y or c.MAP_SETTINGS["GRID_SIZE_Y"]
+        self.shape = cells.shape if cells is not None else (grid_size_x, grid_size_y)
+        self.cell_size = cell_size or c.MAP_SETTINGS["CELL_SIZE"]
+        self._load_model(representation, dtype)
+        self.store = None  # A map_store.MapStore told which cells change, if the map is saved
+
+        if self.representation == "probability":
+            self._grid = np.full(self.shape, 0.5) if cells is None else cells  # Initialize all cells to 0.5 (unknown)
+        else:
+            self.log_odds = np.zeros(self.shape, dtype=self.dtype) if cells is None else cells  # 0 = unknown
+            self._probability = None
+
+    @property
+    def cells(self):
+        """The stored cells: probabilities or log-odds, depending on the representation."""
+        return self._grid if self.representation == "probability" else self.log_odds
+
+    def _load_model(self, representation, dtype):
+        """Sets up the cell storage type and the sensor model for a representation."""
+        self.representation = representation or c.MAP_SETTINGS["REPRESENTATION"]
+        if self.representation not in REPRESENTATIONS:
+            raise ValueError(f"Unknown map representation '{self.representation}', expected one of {REPRESENTATIONS}")
+
+        if self.representation == "probability":
+            self.dtype, self.unknown = np.float64, 0.5
+            self.hit, self.miss, self.clamp = HIT_INCREMENT, -FREE_DECREMENT, (0.0, 1.0)
+            return
+
+        # --- Log-odds sensor model ---
+        model = c.MAP_SETTINGS["LOG_ODDS"]
+        dtype = dtype or model["DTYPE"]
+        if dtype not in LOG_ODDS_DTYPES:
+            raise ValueError(f"Unknown log-odds dtype '{dtype}', expected one of {tuple(LOG_ODDS_DTYPES)}")
+        self.dtype, self.unknown = LOG_ODDS_DTYPES[dtype], 0
+        # Log-odds are stored in units of `resolution`: 1.0 for float32, the
+        # quantization step for int8.
+        self.resolution = model["INT8_RESOLUTION"] if dtype == "int8" else 1.0
+        self.hit = log_odds(model["P_HIT"]) / self.resolution
+        self.miss = log_odds(model["P_MISS"]) / self.resolution
+        self.clamp = (model["CLAMP_MIN"] / self.resolution, model["CLAMP_MAX"] / self.resolution)
+        if dtype == "int8":
+            self.hit, self.miss = round(self.hit), round(self.miss)
+            self.clamp = (round(self.clamp[0]), round(self.clamp[1]))
+            if self.hit == 0 or self.miss == 0 or not -128 <= self.clamp[0] < self.clamp[1] <= 127:
+                raise ValueError("Log-odds sensor model does not fit int8 at INT8_RESOLUTION")
+
+    def _to_probability(self, cells):
+        """Converts stored log-odds cells to float32 probabilities."""
+        odds = np.exp(cells.astype(np.float32) * np.float32(self.resolution))
+        return 1 - 1 / (1 + odds)
+
+    def _apply(self, flat, touched, change):
+        """Adds summed changes to the given cells of a flat storage array, clamped."""
+        updated = np.clip(flat[touched] + change, *self.clamp)
+        flat[touched] = np.rint(updated) if flat.dtype == np.int8 else updated
+
+    @property
+    def grid(self):
+        """The occupancy probability of every cell, indexed [x, y].
+
+        In the log-odds representation this is a read-only float32 copy that is
+        rebuilt on the first read after an update.
+        """
+        if self.representation == "probability":
+            return self._grid
+        if self._probability is None:
+            self._probability = self._to_probability(self.log_odds)
+            self._probability.flags.writeable = False
+        return self._probability
+
+    def cell_index(self, position):
+        """Returns the grid index (i, j) of the cell holding a position in meters."""
+        return (int(position[0] / self.cell_size) + self.shape[0] // 2,
+                int(position[1] / self.cell_size) + self.shape[1] // 2)
 
     def update_map(self, position, distance, heading):
         """Updates the occupancy grid based on sensor readings."""
-        if distance is None or distance > 4:
+        if distance is None or distance > MAX_RANGE:
             return  # Ignore readings beyond the sensor's effective range
+        if self.representation == "log_odds":
+            self.update_map_batch([position], [distance], [heading])
+            return
 
         # Convert robot's position to grid coordinates
-        grid_x = int(position[0] / self.cell_size) + self.grid.shape[0] // 2
-        grid_y = int(position[1] / self.cell_size) + self.grid.shape[1] // 2
+        grid_x = int(position[0] / self.cell_size) + self.shape[0] // 2
+        grid_y = int(position[1] / self.cell_size) + self.shape[1] // 2
 
         # Convert the obstacle's position to grid coordinates
-        obstacle_x = int((position[0] + distance * math.cos(math.radians(heading))) / self.cell_size) + self.grid.shape[0] // 2
-        obstacle_y = int((position[1] + distance * math.sin(math.radians(heading))) / self.cell_size) + self.grid.shape[1] // 2
+        obstacle_x = int((position[0] + distance * math.cos(math.radians(heading))) / self.cell_size) + self.shape[0] // 2
+        obstacle_y = int((position[1] + distance * math.sin(math.radians(heading))) / self.cell_size) + self.shape[1] // 2
 
         # Update the cells in the grid
-        if 0 <= obstacle_x < self.grid.shape[0] and 0 <= obstacle_y < self.grid.shape[1]:
+        if 0 <= obstacle_x < self.shape[0] and 0 <= obstacle_y < self.shape[1]:
+            if self.store is not None:
+                self.store.mark_rows(min(grid_x, obstacle_x), max(grid_x, obstacle_x))
+
             # Increase the probability of the obstacle cell
-            self.grid[obstacle_x, obstacle_y] = min(1.0, self.grid[obstacle_x, obstacle_y] + 0.2)
+            self._grid[obstacle_x, obstacle_y] = min(1.0, self._grid[obstacle_x, obstacle_y] + HIT_INCREMENT)
 
             # Decrease the probability of cells between the robot and the obstacle
             for x, y in self.bresenham_line(grid_x, grid_y, obstacle_x, obstacle_y):
-                if 0 <= x < self.grid.shape[0] and 0 <= y < self.grid.shape[1]:
-                    self.grid[x, y] = max(0.0, self.grid[x, y] - 0.1)
+                if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]:
+                    self._grid[x, y] = max(0.0, self._grid[x, y] - FREE_DECREMENT)
+
+    def update_map_batch(self, positions, distances, headings):
+        """Updates the grid with a whole batch of readings at once.
+
+        The rays are traced together with NumPy instead of one cell at a time, so a
+        full sweep of hundreds of readings fits in a single control tick. Each cell
+        gets +HIT_INCREMENT for every ray ending in it and -FREE_DECREMENT for every
+        ray passing through it, then the grid is clipped to [0, 1] once (or the
+        sensor model's hit and miss log-odds, clipped to its limits). Unlike
+        update_map, the end cell of a ray is not also counted as free.
+
+        Args:
+            positions: (N, 2) array of robot (x, y) positions in meters.
+            distances: (N,) array of measured distances in meters (NaN = no reading).
+            headings: (N,) array of headings in degrees.
+        """
+        free, hits = self.trace_rays(positions, distances, headings)
+        if hits.size == 0:
+            return
+        if self.representation == "log_odds":
+            self._probability = None
+        touched, change = sum_changes(hits, free, self.hit, self.miss)
+        self._apply(self.cells.reshape(-1), touched, change)
+        if self.store is not None:
+            self.store.mark_cells(touched)
+
+    def trace_rays(self, positions, distances, headings):
+        """
+        Traces a batch of rays through the grid.
+
+        Returns:
+            (free, hits): flat grid indices of the cells each ray passed through, and
+            of the cells where rays ended. Out-of-range readings and rays ending
+            outside the grid are left out, as in update_map.
+        """
+        size_x, size_y = self.shape
+        x0, y0, x1, y1 = ray_ends(positions, distances, headings, self.cell_size)
+        x0, x1 = x0 + size_x // 2, x1 + size_x // 2
+        y0, y1 = y0 + size_y // 2, y1 + size_y // 2
+
+        inside = (x1 >= 0) & (x1 < size_x) & (y1 >= 0) & (y1 < size_y)
+        x0, y0, x1, y1 = x0[inside], y0[inside], x1[inside], y1[inside]
+        hits = x1 * size_y + y1
+
+        xs, ys = ray_cells(x0, y0, x1, y1)
+        inside = (xs >= 0) & (xs < size_x) & (ys >= 0) & (ys < size_y)
+        free = xs[inside] * size_y + ys[inside]
+        return free, hits
 
     def bresenham_line(self, x0, y0, x1, y1):
         """Generates a sequence of points along a line using Bresenham's algorithm."""
@@ -59,20 +285,126 @@ class OccupancyGridMap:
 
     def display_map(self, robot_position=None):
         """Displays the map in the console, optionally with the robot's position."""
-        print(" " + "-" * (self.grid.shape[1] * 2 + 1) + " ")
-
-        for i in range(self.grid.shape[0] - 1, -1, -1):  # Iterate rows in reverse order
-            line = "|"
-            for j in range(self.grid.shape[1]):
-                cell = self.grid[i, j]
-                if robot_position and i == int(robot_position[0] / self.cell_size) + self.grid.shape[0] // 2 and j == int(robot_position[1] / self.cell_size) + self.grid.shape[1] // 2:
-                    char = "R"  # Robot's position
-                elif cell > c.MAP_SETTINGS["OBSTACLE_THRESHOLD"]:
-                    char = "X"  # Obstacle
-                elif cell < 1 - c.MAP_SETTINGS["OBSTACLE_THRESHOLD"]:
-                    char = " "  # Free
-                else:
-                    char = "?"  # Unknown
-                line += f" {char}"
-            print(line + " |")
-        print(" " + "-" * (self.grid.shape[1] * 2 + 1) + " ")
\ No newline at end of file
+        print(map_render.render_text(self, robot_position))
+
+# Cell and chunk coordinates are packed into one int64 key as x * KEY_SPAN + y, so
+# NumPy can sort and group them. Good for maps up to a billion cells across.
+KEY_SPAN = 2**32
+
+def pack_keys(xs, ys):
+    return xs * KEY_SPAN + (ys + KEY_SPAN // 2)
+
+def unpack_keys(keys):
+    return keys // KEY_SPAN, keys % KEY_SPAN - KEY_SPAN // 2
+
+class ChunkedOccupancyGridMap(OccupancyGridMap):
+    """
+    An occupancy grid that grows as the robot explores.
+
+    Cells live in fixed-size square chunks kept in a dictionary keyed by chunk
+    coordinates (cx, cy). A chunk is only allocated when a reading first touches
+    it, so memory follows the area actually explored rather than its bounding
+    box, and no reading is dropped for falling off the edge of the map.
+
+    Offers the same update_map / update_map_batch / display_map / grid surface as
+    OccupancyGridMap, in either representation. `grid` is a read-only copy of the
+    explored bounding box, with `origin` giving the cell of grid[0, 0] (the
+    starting cell is (0, 0)). Every reading goes through the batch ray tracer, so
+    a ray's end cell is not also counted as free.
+    """
+
+    def __init__(self, chunk_size=None, cell_size=None, representation=None, dtype=None):
+        self.chunk_size = chunk_size or c.MAP_SETTINGS["CHUNK_SIZE"]
+        self.cell_size = cell_size or c.MAP_SETTINGS["CELL_SIZE"]
+        self._load_model(representation, dtype)
+        self.chunks = {}
+        self._probability = None
+
+    # --- Layout ---
+
+    def _chunk_bounds(self):
+        """Returns the lowest and highest chunk coordinates in use."""
+        if not self.chunks:
+            return (0, 0), (0, 0)
+        cxs, cys = zip(*self.chunks)
+        return (min(cxs), min(cys)), (max(cxs), max(cys))
+
+    @property
+    def origin(self):
+        """The cell coordinates of grid[0, 0]."""
+        (cx, cy), _ = self._chunk_bounds()
+        return cx * self.chunk_size, cy * self.chunk_size
+
+    @property
+    def shape(self):
+        """The size in cells of the explored bounding box."""
+        (cx0, cy0), (cx1, cy1) = self._chunk_bounds()
+        return (cx1 - cx0 + 1) * self.chunk_size, (cy1 - cy0 + 1) * self.chunk_size
+
+    @property
+    def nbytes(self):
+        """Memory used by the allocated chunks."""
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def cell_index(self, position):
+        origin_x, origin_y = self.origin
+        return (int(position[0] / self.cell_size) - origin_x,
+                int(position[1] / self.cell_size) - origin_y)
+
+    # --- Reading ---
+
+    @property
+    def grid(self):
+        """The occupancy probability of the explored bounding box, indexed [x, y].
+
+        A read-only copy, rebuilt on the first read after an update. Cells in chunks
+        that were never allocated read as 0.5 (unknown).
+        """
+        if self._probability is None:
+            (cx0, cy0), _ = self._chunk_bounds()
+            size = self.chunk_size
+            grid = np.full(self.shape, 0.5, dtype=np.float64 if self.representation == "probability" else np.float32)
+            for (cx, cy), chunk in self.chunks.items():
+                x, y = (cx - cx0) * size, (cy - cy0) * size
+                grid[x:x + size, y:y + size] = chunk if self.representation == "probability" else self._to_probability(chunk)
+            grid.flags.writeable = False
+            self._probability = grid
+        return self._probability
+
+    # --- Updating ---
+
+    def update_map(self, position, distance, heading):
+        """Updates the map based on one sensor reading."""
+        if distance is None or distance > MAX_RANGE:
+            return  # Ignore readings beyond the sensor's effective range
+        self.update_map_batch([position], [distance], [heading])
+
+    def update_map_batch(self, positions, distances, headings):
+        """Updates the map with a whole batch of readings at once, allocating chunks as needed.
+
+        Args:
+            positions: (N, 2) array of robot (x, y) positions in meters.
+            distances: (N,) array of measured distances in meters (NaN = no reading).
+            headings: (N,) array of headings in degrees.
+        """
+        x0, y0, x1, y1 = ray_ends(positions, distances, headings, self.cell_size)
+        if x1.size == 0:
+            return
+        xs, ys = ray_cells(x0, y0, x1, y1)
+        touched, change = sum_changes(pack_keys(x1, y1), pack_keys(xs, ys), self.hit, self.miss)
+        self._probability = None
+
+        # Group the touched cells by chunk and apply each group to its chunk
+        xs, ys = unpack_keys(touched)
+        size = self.chunk_size
+        cxs, cys = xs // size, ys // size
+        order = np.argsort(pack_keys(cxs, cys), kind="stable")
+        xs, ys, cxs, cys, change = xs[order], ys[order], cxs[order], cys[order], change[order]
+        splits = np.flatnonzero((np.diff(cxs) != 0) | (np.diff(cys) != 0)) + 1
+        for start, end in zip(np.concatenate(([0], splits)), np.concatenate((splits, [xs.size]))):
+            key = (int(cxs[start]), int(cys[start]))
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = np.full((size, size), self.unknown, dtype=self.dtype)
+            local = (xs[start:end] - key[0] * size) * size + (ys[start:end] - key[1] * size)
+            self._apply(chunk.reshape(-1), local, change[start:end])
@@ -0,0 +1,73 @@
+# mapping_bench.py
+# Compares the per-cell update_map loop with the vectorized update_map_batch on a
+# full 360-ray sweep, at several grid sizes. Each grid covers the same 8 x 8 m
+# area, so bigger grids mean finer cells and longer rays. Then compares memory and
+# update time of the probability and log-odds representations.
+# Runs anywhere - no robot hardware needed.
+
+import time
+import numpy as np
+import mapping
+
+GRID_SIZES = [100, 500, 2000]
+AREA = 8.0  # Meters per side
+RAYS = 360
+REPEATS = 3
+
+def make_sweep(rng):
+    """A full turn of readings from a robot near the middle of the map."""
+    positions = np.tile(rng.uniform(-0.5, 0.5, size=2), (RAYS, 1))
+    distances = rng.uniform(0.3, 3.9, size=RAYS)
+    headings = np.linspace(0, 360, RAYS, endpoint=False)
+    return positions, distances, headings
+
+def bench_loop(size, sweep):
+    grid_map = mapping.OccupancyGridMap(size, size, AREA / size)
+    positions, distances, headings = sweep
+    start = time.perf_counter()
+    for position, distance, heading in zip(positions, distances, headings):
+        grid_map.update_map(position, distance, heading)
+    return time.perf_counter() - start, grid_map
+
+def bench_batch(size, sweep):
+    grid_map = mapping.OccupancyGridMap(size, size, AREA / size)
+    start = time.perf_counter()
+    grid_map.update_map_batch(*sweep)
+    return time.perf_counter() - start, grid_map
+
+def bench_representation(size, sweep, representation, dtype=None):
+    grid_map = mapping.OccupancyGridMap(size, size, AREA / size, representation, dtype)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        grid_map.update_map_batch(*sweep)
+    update_time = (time.perf_counter() - start) / REPEATS
+    start = time.perf_counter()
+    grid_map.grid
+    return grid_map.cells.nbytes, update_time, time.perf_counter() - start, grid_map
+
+def agreement(loop_map, batch_map):
+    """Fraction of touched cells that both methods classify the same way."""
+    touched = (loop_map.grid != 0.5) | (batch_map.grid != 0.5)
+    same = np.sign(loop_map.grid - 0.5) == np.sign(batch_map.grid - 0.5)
+    return same[touched].mean()
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    sweep = make_sweep(rng)
+    print(f"{RAYS} rays per sweep, best of {REPEATS}\n")
+    print(f"{'grid':>11} | {'cell':>6} | {'loop':>10} | {'batch':>10} | {'speed-up':>8} | {'agree':>6}")
+    for size in GRID_SIZES:
+        loop_time, loop_map = min((bench_loop(size, sweep) for _ in range(REPEATS)), key=lambda r: r[0])
+        batch_time, batch_map = min((bench_batch(size, sweep) for _ in range(REPEATS)), key=lambda r: r[0])
+        print(f"{size:>4} x {size:<4} | {AREA / size * 100:4.1f}cm | {loop_time * 1000:7.1f} ms | "
+              f"{batch_time * 1000:7.2f} ms | {loop_time / batch_time:7.0f}x | {agreement(loop_map, batch_map):5.1%}")
+
+    print(f"\n{'representation':<17} | {'grid':>11} | {'storage':>9} | {'sweep':>8} | {'first read':>10} | {'agree':>6}")
+    for size in GRID_SIZES:
+        base = None
+        for representation, dtype in (("probability", None), ("log_odds", "float32"), ("log_odds", "int8")):
+            nbytes, update_time, read_time, grid_map = bench_representation(size, sweep, representation, dtype)
+            base = base or grid_map
+            name = representation + (f" {dtype}" if dtype else "")
+            print(f"{name:<17} | {size:>4} x {size:<4} | {nbytes / 2**20:6.2f} MB | {update_time * 1000:5.2f} ms | "
+                  f"{read_time * 1000:7.2f} ms | {agreement(base, grid_map):5.1%}")
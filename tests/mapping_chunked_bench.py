@@ -0,0 +1,105 @@
+# mapping_chunked_bench.py
+# Checks that ChunkedOccupancyGridMap keeps every reading however far the robot
+# wanders and matches OccupancyGridMap where both can see, then compares the
+# memory of the chunked map with a dense grid covering the same bounding box.
+# Runs anywhere - no robot hardware needed.
+
+import math
+import time
+import numpy as np
+import mapping
+
+CELL_SIZE = 0.05
+RAYS = 36  # Readings per sweep
+
+def wander(rng, steps, step_length=0.25, turn=0.6):
+    """A random walk: yields a pose (x, y, heading in radians) per step."""
+    x = y = heading = 0.0
+    for _ in range(steps):
+        heading += rng.normal(0, turn)
+        x += step_length * math.cos(heading)
+        y += step_length * math.sin(heading)
+        yield x, y, heading
+
+def corridor(steps, step_length=0.25):
+    """A straight walk down a long diagonal corridor: a big bounding box, little area."""
+    for i in range(steps):
+        yield i * step_length * math.sqrt(0.5), i * step_length * math.sqrt(0.5), math.pi / 4
+
+def sweep(rng, x, y):
+    """A full turn of readings from one pose."""
+    positions = np.tile((x, y), (RAYS, 1))
+    distances = rng.uniform(0.3, 3.9, size=RAYS)
+    headings = np.linspace(0, 360, RAYS, endpoint=False)
+    return positions, distances, headings
+
+# --- Checks ---
+
+def check_far_reading():
+    grid_map = mapping.ChunkedOccupancyGridMap(cell_size=CELL_SIZE)
+    grid_map.update_map((250.0, -180.0), 1.0, 90)
+    i, j = grid_map.cell_index((250.0, -179.0))
+    assert grid_map.grid[i, j] > 0.5, "reading 300 m from the start was dropped"
+    assert len(grid_map.chunks) <= 2, "chunks allocated away from the reading"
+
+def check_matches_dense(representation):
+    """Readings that stay inside a dense grid must give exactly the same cells."""
+    rng = np.random.default_rng(1)
+    dense = mapping.OccupancyGridMap(400, 400, CELL_SIZE, representation)
+    chunked = mapping.ChunkedOccupancyGridMap(64, CELL_SIZE, representation)
+    for x, y, _ in wander(rng, 200, step_length=0.05):
+        readings = sweep(rng, x, y)
+        dense.update_map_batch(*readings)
+        chunked.update_map_batch(*readings)
+    origin_x, origin_y = chunked.origin
+    offset_x, offset_y = origin_x + dense.shape[0] // 2, origin_y + dense.shape[1] // 2
+    region = dense.grid[offset_x:offset_x + chunked.shape[0], offset_y:offset_y + chunked.shape[1]]
+    assert np.array_equal(region, chunked.grid), f"{representation}: chunked map differs from dense map"
+    assert (dense.grid != 0.5).sum() == (chunked.grid != 0.5).sum(), f"{representation}: cells outside the chunks"
+
+def check_unbounded_wander():
+    """A long wander: nothing dropped, and no chunk allocated without a reading in it."""
+    rng = np.random.default_rng(2)
+    dense = mapping.OccupancyGridMap(100, 100, CELL_SIZE, "log_odds", "int8")  # The default 5 x 5 m map
+    chunked = mapping.ChunkedOccupancyGridMap(64, CELL_SIZE, "log_odds", "int8")
+    hits = 0
+    for x, y, _ in wander(rng, 2000):
+        readings = sweep(rng, x, y)
+        dense.update_map_batch(*readings)
+        chunked.update_map_batch(*readings)
+        hits += len(readings[1])
+        assert chunked.grid[chunked.cell_index((x, y))] <= 0.5, "robot's own cell marked occupied"
+    for key, chunk in chunked.chunks.items():
+        assert (chunk != 0).any(), f"chunk {key} allocated but never updated"
+    width = chunked.shape[0] * CELL_SIZE
+    print(f"  wandered over {width:.0f} m; dense 5 m map touched {(dense.grid != 0.5).sum()} cells, "
+          f"chunked map {(chunked.grid != 0.5).sum()} cells in {len(chunked.chunks)} chunks")
+
+# --- Memory Benchmark ---
+
+def bench_memory(name, poses, chunk_size, rng):
+    grid_map = mapping.ChunkedOccupancyGridMap(chunk_size, CELL_SIZE, "log_odds", "int8")
+    start = time.perf_counter()
+    count = 0
+    for x, y, _ in poses:
+        grid_map.update_map_batch(*sweep(rng, x, y))
+        count += 1
+    elapsed = time.perf_counter() - start
+    dense_bytes = grid_map.shape[0] * grid_map.shape[1] * np.dtype(grid_map.dtype).itemsize
+    print(f"{name:<9} | {chunk_size:>5} | {grid_map.shape[0] * CELL_SIZE:4.0f} x {grid_map.shape[1] * CELL_SIZE:<4.0f}m | "
+          f"{len(grid_map.chunks):>6} | {grid_map.nbytes / 2**20:7.2f} MB | {dense_bytes / 2**20:8.2f} MB | "
+          f"{dense_bytes / grid_map.nbytes:5.1f}x | {elapsed / count * 1000:5.2f} ms")
+
+if __name__ == "__main__":
+    check_far_reading()
+    for representation in mapping.REPRESENTATIONS:
+        check_matches_dense(representation)
+    check_unbounded_wander()
+    print("All checks passed\n")
+
+    print(f"int8 log-odds, {CELL_SIZE * 100:.0f} cm cells, {RAYS} rays per sweep\n")
+    print(f"{'walk':<9} | {'chunk':>5} | {'bounding box':>12} | {'chunks':>6} | {'chunked':>10} | "
+          f"{'dense box':>11} | {'saving':>6} | {'sweep':>8}")
+    for chunk_size in (32, 64, 128):
+        bench_memory("wander", wander(np.random.default_rng(3), 4000), chunk_size, np.random.default_rng(4))
+        bench_memory("corridor", corridor(400), chunk_size, np.random.default_rng(4))
@@ -1,37 +1,204 @@
 # movement.py
 
-import time
-from adafruit_pca9685 import PCA9685
+import threading
+from contextlib import nullcontext
+import numpy as np
+from hal import clock as hal_clock
 import config as c
+import pca_frame as pf
+
+# Ramp resolution, kept at the 5% steps the blocking ramp always used.
+RAMP_STEP = 0.05
+# How often the blocking helpers tick the ramps while a movement is running.
+RAMP_TICK = 0.01
+# Speed changes kept per motor for wheel_speeds(); a few minutes of driving.
+SPEED_LOG_LENGTH = 4096
+
+class RampScheduler:
+    """Advances the speed ramps of several motors together off a monotonic clock.
+
+    Motors are given a target speed with set_target() and move towards it a little
+    on every call to tick(), so the control loop never blocks while the wheels
+    accelerate and every motor ramps at the same time.
+    """
+
+    def __init__(self, clock=hal_clock.monotonic, frame=None):
+        self.clock = clock
+        self.frame = frame  # PCAFrame to batch each tick's channel writes into
+        self.ramps = {}  # motor -> (start_speed, target_speed, start_time, ramp_time)
+
+    def set_target(self, motor, speed, ramp_time=c.MOVEMENT_SETTINGS["RAMP_TIME"]):
+        """Starts ramping a motor from its current speed to a new target speed.
+
+        Args:
+            motor: The Motor to ramp.
+            speed: Target speed from -1.0 (full backward) to 1.0 (full forward).
+            ramp_time: Time in seconds the whole change takes, as in Motor.set_speed.
+        """
+        if not -1.0 <= speed <= 1.0:
+            raise ValueError("Speed must be between -1.0 and 1.0")
+
+        if ramp_time <= 0 or speed == motor.current_speed:
+            self.ramps.pop(motor, None)
+            motor.apply_speed(speed)
+            return
+
+        self.ramps[motor] = (motor.current_speed, speed, self.clock(), ramp_time)
+
+    def cancel(self, motor):
+        """Drops any ramp in progress for a motor, leaving it at its current speed."""
+        self.ramps.pop(motor, None)
+
+    def is_ramping(self, motor=None):
+        """Returns True if the given motor (or any motor when None) is still ramping."""
+        if motor is None:
+            return bool(self.ramps)
+        return motor in self.ramps
+
+    def tick(self, now=None):
+        """Moves every ramping motor to the speed it should have at time `now`."""
+        if not self.ramps:
+            return
+        if now is None:
+            now = self.clock()
+
+        with self.frame if self.frame is not None else nullcontext():
+            for motor, (start_speed, target_speed, start_time, ramp_time) in list(self.ramps.items()):
+                elapsed = now - start_time
+                # Match the blocking ramp: ramp_time covers the whole change, however large.
+                if elapsed >= ramp_time:
+                    motor.apply_speed(target_speed)
+                    self.ramps.pop(motor, None)  # halt() may have cleared it from another thread
+                else:
+                    speed = start_speed + (target_speed - start_speed) * elapsed / ramp_time
+                    speed = round(speed / RAMP_STEP) * RAMP_STEP
+                    if speed != motor.current_speed:  # Only touch the PCA when the step changes
+                        motor.apply_speed(speed)
+
+    def wait(self, duration, sleep=hal_clock.sleep):
+        """Keeps ticking the ramps for `duration` seconds.
+
+        This is what the blocking Movement helpers use in place of time.sleep, so
+        both motors still ramp together even in the old blocking call style.
+        """
+        end_time = self.clock() + duration
+        while True:
+            self.tick()
+            remaining = end_time - self.clock()
+            if remaining <= 0:
+                break
+            sleep(min(remaining, RAMP_TICK))
+
+    def finish(self, sleep=hal_clock.sleep):
+        """Keeps ticking until every ramp in progress has reached its target."""
+        while self.ramps:
+            self.tick()
+            sleep(RAMP_TICK)
+
+class SpeedLog:
+    """
+    The last `capacity` (time, speed) changes of a motor, in preallocated NumPy arrays.
+
+    Each change is written twice, at slot and slot + capacity, so the newest
+    `capacity` changes are always one contiguous, time-ordered view: lookups are a
+    searchsorted on that view, with no array built per call. Appends come from
+    whichever thread sets the speed (the safety reflex halts from callbacks), so
+    both sides take a short lock.
+    """
+
+    def __init__(self, capacity=SPEED_LOG_LENGTH):
+        self.capacity = capacity
+        self.times = np.zeros(2 * capacity)
+        self.speeds = np.zeros(2 * capacity)
+        self.written = 0
+        self._lock = threading.Lock()
+        self.append(float("-inf"), 0.0)  # Stopped since forever
+
+    def append(self, time, speed):
+        with self._lock:
+            slot = self.written % self.capacity
+            self.times[slot] = self.times[slot + self.capacity] = time
+            self.speeds[slot] = self.speeds[slot + self.capacity] = speed
+            self.written += 1
+
+    def _window(self):
+        """The slice of the arrays holding the kept changes, oldest first. Call with the lock held."""
+        if self.written <= self.capacity:
+            return slice(0, self.written)
+        start = self.written % self.capacity
+        return slice(start, start + self.capacity)
+
+    def speeds_at(self, times):
+        """The speed in force at each of `times`."""
+        with self._lock:
+            window = self._window()
+            changed, speeds = self.times[window], self.speeds[window]
+            return speeds[np.searchsorted(changed, times, side="right") - 1]
+
+    def changes_since(self, seen):
+        """
+        Copies of the (times, speeds) of the changes after the first `seen`, and the new count.
+
+        Counting changes rather than comparing times keeps changes with equal timestamps apart.
+        """
+        with self._lock:
+            window = self._window()
+            first = window.stop - min(self.written - seen, window.stop - window.start)
+            return self.times[first:window.stop].copy(), self.speeds[first:window.stop].copy(), self.written
 
 class Motor:
-    def __init__(self, pca, forward_channel, backward_channel, name="Unnamed Motor"):
+    def __init__(self, pca, forward_channel, backward_channel, name="Unnamed Motor", scheduler=None):
         self.pca = pca
+        self.frame = pf.get_frame(pca)
         self.forward_channel = forward_channel
         self.backward_channel = backward_channel
         self.current_speed = 0.0
         self.name = name
+        self.scheduler = scheduler
+        self.speed_log = SpeedLog()  # (time, speed) of each change
+
+    def apply_speed(self, speed):
+        """Writes a speed straight to the motor driver channels without ramping."""
+        with self.frame:  # Both channels go out together, unchanged ones are skipped
+            if speed >= 0:
+                self.frame.set(self.forward_channel, int(speed * 65535))
+                self.frame.set(self.backward_channel, 0)
+            else:
+                self.frame.set(self.forward_channel, 0)
+                self.frame.set(self.backward_channel, int(-speed * 65535))
+        self.current_speed = speed
+        self.speed_log.append(hal_clock.monotonic(), speed)
+
+    def speeds_at(self, times):
+        """Returns the speed (-1.0 to 1.0) the motor was set to at each of `times`."""
+        return self.speed_log.speeds_at(times)
+
+    def set_target(self, speed, ramp_time=c.MOVEMENT_SETTINGS["RAMP_TIME"]):
+        """Starts a non-blocking ramp to `speed` on the motor's RampScheduler."""
+        if self.scheduler is None:
+            raise RuntimeError(f"{self.name} has no RampScheduler")
+        self.scheduler.set_target(self, speed, ramp_time)
 
     def set_speed(self, speed, ramp_time=c.MOVEMENT_SETTINGS["RAMP_TIME"]):
-        """Sets the motor speed with optional ramp-up/ramp-down."""
+        """Sets the motor speed with optional ramp-up/ramp-down.
+
+        This blocks until the ramp is complete. Use set_target() with a RampScheduler
+        to ramp without blocking.
+        """
         if not -1.0 <= speed <= 1.0:
             raise ValueError("Speed must be between -1.0 and 1.0")
+        if self.scheduler is not None:
+            self.scheduler.cancel(self)
 
         target_speed = int(speed * 100)  # Convert to integer percentage
         current_speed = int(self.current_speed * 100)
         step = 5 if target_speed > current_speed else -5
 
         for intermediate_speed in range(current_speed, target_speed + step, step):
-            s = intermediate_speed / 100.0
-            if s >= 0:
-                self.pca.channels[self.forward_channel].duty_cycle = int(s * 65535)
-                self.pca.channels[self.backward_channel].duty_cycle = 0
-            else:
-                self.pca.channels[self.forward_channel].duty_cycle = 0
-                self.pca.channels[self.backward_channel].duty_cycle = int(-s * 65535)
+            self.apply_speed(intermediate_speed / 100.0)
 
             sleep_time = ramp_time / abs(target_speed - current_speed) * abs(step) if abs(target_speed - current_speed) > 0 else 0
-            time.sleep(sleep_time)
+            hal_clock.sleep(sleep_time)
 
         self.current_speed = speed
 
@@ -40,45 +207,77 @@ class Motor:
         self.set_speed(0)
 
 class Movement:
-    def __init__(self, pca):
+    def __init__(self, pca, clock=hal_clock.monotonic):
         self.pca = pca
-        self.motor_right = Motor(pca, c.MOTOR_DRIVER_PINS["RIGHT_FORWARD"], c.MOTOR_DRIVER_PINS["RIGHT_BACKWARD"], "Right Motor")
-        self.motor_left = Motor(pca, c.MOTOR_DRIVER_PINS["LEFT_FORWARD"], c.MOTOR_DRIVER_PINS["LEFT_BACKWARD"], "Left Motor")
+        self.ramp = RampScheduler(clock, pf.get_frame(pca))
+        self.motor_right = Motor(pca, c.MOTOR_DRIVER_PINS["RIGHT_FORWARD"], c.MOTOR_DRIVER_PINS["RIGHT_BACKWARD"], "Right Motor", self.ramp)
+        self.motor_left = Motor(pca, c.MOTOR_DRIVER_PINS["LEFT_FORWARD"], c.MOTOR_DRIVER_PINS["LEFT_BACKWARD"], "Left Motor", self.ramp)
+
+    # --- Non-blocking Control ---
+
+    def drive(self, right_speed, left_speed, ramp_time=c.MOVEMENT_SETTINGS["RAMP_TIME"]):
+        """Starts ramping both motors towards new speeds and returns immediately.
+
+        Call update() once per control loop tick to advance the ramps.
+        """
+        self.motor_right.set_target(right_speed, ramp_time)
+        self.motor_left.set_target(left_speed, ramp_time)
+
+    def update(self, now=None):
+        """Advances any motor ramps in progress. Call this once per control loop tick."""
+        self.ramp.tick(now)
+
+    def is_ramping(self):
+        """Returns True while either motor is still ramping to its target."""
+        return self.ramp.is_ramping()
+
+    def is_driving_forward(self):
+        """Returns True if the wheels are moving the robot forward (not turning in place or reversing)."""
+        return self.motor_right.current_speed + self.motor_left.current_speed > 0
+
+    def wheel_speeds(self, times):
+        """Returns the commanded (right, left) wheel speeds in m/s at each of `times`, for dead reckoning."""
+        scale = c.DEAD_RECKONING["MAX_WHEEL_SPEED"]
+        return self.motor_right.speeds_at(times) * scale, self.motor_left.speeds_at(times) * scale
+
+    # --- Blocking Movements ---
+
+    def _run(self, right_speed, left_speed, duration):
+        """Ramps both motors together, holds for `duration`, then stops them."""
+        self.drive(right_speed, left_speed)
+        self.ramp.finish()
+        self.ramp.wait(duration)
+        self.stop_all_motors()
 
     def move_forward(self, duration=c.MOVEMENT_SETTINGS["MOVE_DURATION"], speed=c.MOVEMENT_SETTINGS["FORWARD_SPEED"]):
         """Moves the robot forward."""
         print(f"Moving Forward at speed {speed} for {duration} seconds")
-        self.motor_right.set_speed(speed)
-        self.motor_left.set_speed(speed)
-        time.sleep(duration)
-        self.stop_all_motors()
+        self._run(speed, speed, duration)
 
     def move_backward(self, duration=c.MOVEMENT_SETTINGS["MOVE_DURATION"], speed=c.MOVEMENT_SETTINGS["FORWARD_SPEED"]):
         """Moves the robot backward."""
         print(f"Moving Backward at speed {speed} for {duration} seconds")
-        self.motor_right.set_speed(-speed)
-        self.motor_left.set_speed(-speed)
-        time.sleep(duration)
-        self.stop_all_motors()
+        self._run(-speed, -speed, duration)
 
     def turn_left_in_place(self, duration=c.MOVEMENT_SETTINGS["TURN_DURATION"], speed=c.MOVEMENT_SETTINGS["TURN_SPEED"]):
         """Turns the robot left in place."""
         print(f"Turning Left in Place at speed {speed} for {duration} seconds")
-        self.motor_right.set_speed(speed)
-        self.motor_left.set_speed(-speed)
-        time.sleep(duration)
-        self.stop_all_motors()
+        self._run(speed, -speed, duration)
 
     def turn_right_in_place(self, duration=c.MOVEMENT_SETTINGS["TURN_DURATION"], speed=c.MOVEMENT_SETTINGS["TURN_SPEED"]):
         """Turns the robot right in place."""
         print(f"Turning Right in Place at speed {speed} for {duration} seconds")
-        self.motor_right.set_speed(-speed)
-        self.motor_left.set_speed(speed)
-        time.sleep(duration)
-        self.stop_all_motors()
+        self._run(-speed, speed, duration)
 
     def stop_all_motors(self):
         """Stops both motors."""
         print("Stopping all motors")
-        self.motor_right.stop()
-        self.motor_left.stop()
\ No newline at end of file
+        self.drive(0, 0)
+        self.ramp.finish()
+
+    def halt(self):
+        """Stops both motors at once, without ramping. Safe to call from a GPIO callback thread."""
+        with self.ramp.frame:
+            for motor in (self.motor_right, self.motor_left):
+                self.ramp.cancel(motor)
+                motor.apply_speed(0.0)
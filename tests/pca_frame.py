@@ -0,0 +1,156 @@
+# pca_frame.py
+
+import threading
+
+# PCA9685 registers: each channel has ON_L, ON_H, OFF_L, OFF_H starting at LED0_ON_L.
+LED0_ON_L = 0x06
+REGISTERS_PER_CHANNEL = 4
+NUM_CHANNELS = 16
+
+# Unchanged channels with a known value are re-sent to join two runs into one write
+# when the gap is at most this many channels (4 extra bytes beats a new transaction).
+MAX_BRIDGE_GAP = 1
+
+def pwm_registers(duty_cycle):
+    """
+    Converts a 16-bit duty cycle to the channel's four register bytes.
+
+    Copies adafruit-circuitpython-pca9685 3.4.16's PWMChannel.duty_cycle setter:
+    0xFFFF sets the full-on bit, values below 0x10 set the full-off bit, and the
+    rest keep their top 12 bits.
+
+    Returns:
+        bytes ON_L, ON_H, OFF_L, OFF_H.
+    """
+    if not 0 <= duty_cycle <= 0xFFFF:
+        raise ValueError(f"Duty cycle must be between 0 and 65535, got {duty_cycle}")
+    if duty_cycle == 0xFFFF:
+        on, off = 0x1000, 0  # Full on
+    elif duty_cycle < 0x0010:
+        on, off = 0, 0x1000  # Full off
+    else:
+        on, off = 0, duty_cycle >> 4  # The PCA9685 is 12-bit
+    return bytes((on & 0xFF, on >> 8, off & 0xFF, off >> 8))
+
+class PCAFrame:
+    """Collects PCA9685 channel changes and sends them in as few I2C writes as possible.
+
+    Inside a `with frame:` block, set() only records the new duty cycle. When the
+    outermost block exits, channels whose value really changed are grouped into runs
+    of neighbouring channels and each run goes out as one auto-increment write
+    starting at that channel's LED_ON_L register. Outside a block, set() commits
+    straight away (still skipping unchanged channels).
+
+    All writes to a PCA should go through its shared frame (see get_frame) so the
+    record of what was last sent stays true; call invalidate() if something else
+    has written to the chip.
+    """
+
+    def __init__(self, pca, i2c_device=None):
+        self.pca = pca
+        # Without an I2C device (e.g. a fake PCA) changes fall back to per-channel writes
+        self.device = i2c_device or getattr(pca, "i2c_device", None)
+        self.sent = [None] * NUM_CHANNELS  # Last duty cycle sent to each channel
+        self.pending = {}
+        self.depth = 0
+        self.lock = threading.RLock()
+
+        # Traffic counters
+        self.transactions = 0
+        self.bytes_written = 0
+        self.skipped = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.depth -= 1
+            if self.depth == 0:
+                self.commit()
+        finally:
+            self.lock.release()
+
+    def set(self, channel, duty_cycle):
+        """Queues a new duty cycle (0-65535) for a channel."""
+        if not 0 <= channel < NUM_CHANNELS:
+            raise ValueError(f"Invalid PCA9685 channel {channel}")
+        with self:
+            self.pending[channel] = int(duty_cycle)
+
+    def invalidate(self, channel=None):
+        """Forgets what was last sent, so the next set() always writes."""
+        with self.lock:
+            if channel is None:
+                self.sent = [None] * NUM_CHANNELS
+            else:
+                self.sent[channel] = None
+
+    def record_sent(self, channel, duty_cycle):
+        """Notes that something else wrote `duty_cycle` to a channel, dropping any pending change to it."""
+        with self.lock:
+            self.pending.pop(channel, None)
+            self.sent[channel] = duty_cycle
+
+    def commit(self):
+        """Sends every pending change that differs from what the chip already has."""
+        with self.lock:
+            changed = {}
+            for channel, duty_cycle in self.pending.items():
+                if self.sent[channel] == duty_cycle:
+                    self.skipped += 1
+                else:
+                    changed[channel] = duty_cycle
+            self.pending.clear()
+            if not changed:
+                return
+
+            if self.device is None:
+                for channel, duty_cycle in changed.items():
+                    self.pca.channels[channel].duty_cycle = duty_cycle
+                    self.sent[channel] = duty_cycle
+                    self.transactions += 1
+                    self.bytes_written += 1 + REGISTERS_PER_CHANNEL
+                return
+
+            for first, values in self._runs(changed):
+                buffer = bytearray([LED0_ON_L + first * REGISTERS_PER_CHANNEL])
+                for duty_cycle in values:
+                    buffer += pwm_registers(duty_cycle)
+                with self.device:
+                    self.device.write(buffer)
+                for offset, duty_cycle in enumerate(values):
+                    self.sent[first + offset] = duty_cycle
+                self.transactions += 1
+                self.bytes_written += len(buffer)
+
+    def _runs(self, changed):
+        """Groups changed channels into (first_channel, [duty_cycles]) runs of neighbours."""
+        runs = []
+        first = None
+        values = []
+        for channel in sorted(changed):
+            if first is not None:
+                gap = range(first + len(values), channel)
+                if len(gap) <= MAX_BRIDGE_GAP and all(self.sent[g] is not None for g in gap):
+                    values.extend(self.sent[g] for g in gap)
+                    values.append(changed[channel])
+                    continue
+                runs.append((first, values))
+            first = channel
+            values = [changed[channel]]
+        runs.append((first, values))
+        return runs
+
+# One shared frame per PCA9685, so every module sees the same record of sent values.
+_frames = {}
+
+def get_frame(pca):
+    """Returns the shared PCAFrame for a PCA9685 instance, creating it if needed."""
+    frame = _frames.get(id(pca))
+    if frame is None or frame.pca is not pca:
+        frame = PCAFrame(pca)
+        _frames[id(pca)] = frame
+    return frame
@@ -0,0 +1,143 @@
+# pca_frame_bench.py
+# Counts PCA9685 I2C traffic for LED colours, a motor ramp and arm moves, writing
+# channel by channel (the old way) and through a PCAFrame, on a recording fake I2C
+# bus. Also checks both ways leave the chip's registers in the same state, and that
+# the register bytes match adafruit_pca9685's.
+# Runs anywhere - no robot hardware needed.
+
+import config as c
+import movement as m
+import rgb_led as led
+import servo_control as sc
+import pca_frame as pf
+
+class RecordingI2CDevice:
+    """Records every write and keeps an image of the PCA9685's registers."""
+
+    def __init__(self):
+        self.writes = []
+        self.registers = bytearray(256)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer):
+        self.writes.append(bytes(buffer))
+        register = buffer[0]
+        self.registers[register:register + len(buffer) - 1] = buffer[1:]
+
+    def traffic(self):
+        return len(self.writes), sum(len(w) for w in self.writes)
+
+class FakeChannel:
+    """Writes its four registers in one transaction, like adafruit_pca9685's PWMChannel."""
+
+    def __init__(self, device, index):
+        self.device = device
+        self.index = index
+        self._duty_cycle = 0
+
+    @property
+    def duty_cycle(self):
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        self._duty_cycle = value
+        register = pf.LED0_ON_L + self.index * pf.REGISTERS_PER_CHANNEL
+        with self.device:
+            self.device.write(bytes([register]) + pf.pwm_registers(value))
+
+class FakePCA:
+    def __init__(self):
+        self.i2c_device = RecordingI2CDevice()
+        self.channels = [FakeChannel(self.i2c_device, i) for i in range(pf.NUM_CHANNELS)]
+
+class StepClock:
+    """A fake monotonic clock the benchmark advances by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# --- Old, channel-by-channel versions ---
+
+def leds_per_channel(pca):
+    for red, green, blue in c.LED_COLORS.values():
+        pca.channels[c.RGB_LED_PINS["RED"]].duty_cycle = red
+        pca.channels[c.RGB_LED_PINS["GREEN"]].duty_cycle = green
+        pca.channels[c.RGB_LED_PINS["BLUE"]].duty_cycle = blue
+
+def ramp_per_channel(pca):
+    # What Motor.set_speed did: 5% steps, both channels of each motor every step
+    for target in (0.5, 0.0):
+        start = 0 if target else 50
+        stop = int(target * 100)
+        step = 5 if stop > start else -5
+        for motor_pins in (("RIGHT_FORWARD", "RIGHT_BACKWARD"), ("LEFT_FORWARD", "LEFT_BACKWARD")):
+            forward, backward = (c.MOTOR_DRIVER_PINS[name] for name in motor_pins)
+            for percent in range(start, stop + step, step):
+                pca.channels[forward].duty_cycle = int(percent / 100 * 65535)
+                pca.channels[backward].duty_cycle = 0
+
+def arms_per_channel(pca):
+    for angle in (c.SERVO_ANGLES["LHS_UP"], c.SERVO_ANGLES["LHS_DOWN"]) * 3:
+        for name in ("LHS", "RHS"):
+            limits = c.SERVO_PULSE_WIDTHS[name]
+            pulse = int(angle / 180 * (limits["MAX"] - limits["MIN"]) + limits["MIN"])
+            pulse = max(min(pulse, limits["MAX"]), limits["MIN"])
+            pca.channels[c.SERVO_PINS[name]].duty_cycle = int(pulse / 20000 * 65535)
+
+# --- PCAFrame versions ---
+
+def leds_framed(pca):
+    rgb = led.RGBLed(pca)
+    for color in c.LED_COLORS.values():
+        rgb.set_color(*color)
+
+def ramp_framed(pca):
+    clock = StepClock()
+    movement = m.Movement(pca, clock=clock)
+    for target in (0.5, 0.0):
+        movement.drive(target, target)
+        while movement.is_ramping():
+            clock.now += 0.01
+            movement.update()
+
+def arms_framed(pca):
+    for angle in (c.SERVO_ANGLES["LHS_UP"], c.SERVO_ANGLES["LHS_DOWN"]) * 3:
+        sc.move_both_arms(pca, angle)
+
+SCENARIOS = [
+    ("LED colour cycle", leds_per_channel, leds_framed),
+    ("Motor ramp 0 -> 0.5 -> 0", ramp_per_channel, ramp_framed),
+    ("Arms up/down x3", arms_per_channel, arms_framed),
+]
+
+# Duty cycles and the (ON, OFF) register values adafruit_pca9685 3.4.16 writes for them
+ADAFRUIT_REGISTERS = [(0, (0, 0x1000)), (0x000F, (0, 0x1000)), (0x0010, (0, 0x001)), (0x001F, (0, 0x001)),
+                      (0x7FFF, (0, 0x7FF)), (0xFFFE, (0, 0xFFF)), (0xFFFF, (0x1000, 0))]
+
+if __name__ == "__main__":
+    for duty_cycle, (on, off) in ADAFRUIT_REGISTERS:
+        expected = bytes((on & 0xFF, on >> 8, off & 0xFF, off >> 8))
+        assert pf.pwm_registers(duty_cycle) == expected, f"{duty_cycle:#06x}: not adafruit_pca9685's registers"
+
+    results = []
+    for name, old, new in SCENARIOS:
+        old_pca, new_pca = FakePCA(), FakePCA()
+        old(old_pca)
+        new(new_pca)
+        assert old_pca.i2c_device.registers == new_pca.i2c_device.registers, f"{name}: register state differs"
+        results.append((name, old_pca.i2c_device.traffic(), new_pca.i2c_device.traffic()))
+
+    print(f"{'scenario':<26} | {'per-channel':>18} | {'PCAFrame':>18} | {'reduction':>9}")
+    for name, (old_tx, old_bytes), (new_tx, new_bytes) in results:
+        print(f"{name:<26} | {old_tx:4d} tx {old_bytes:6d} B | {new_tx:4d} tx {new_bytes:6d} B | "
+              f"{old_tx / new_tx:7.1f}x")
+    print("\nFinal register state matches in every scenario.")
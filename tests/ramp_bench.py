@@ -0,0 +1,75 @@
+# ramp_bench.py
+# Benchmarks control loop latency while the motors ramp, using a fake PCA9685.
+# Compares the blocking Motor.set_speed ramp with the non-blocking RampScheduler.
+# Times everything on hal.clock, as Movement does, so it also runs under
+# GISMO_HAL=sim (in virtual time). Runs anywhere - no robot hardware needed.
+
+from hal import clock
+import config as c
+import movement as m
+
+LOOP_PERIOD = 0.01  # 100 Hz control loop
+TARGET_SPEED = 0.5
+
+class FakeChannel:
+    def __init__(self):
+        self.duty_cycle = 0
+
+class FakePCA:
+    """Stands in for the PCA9685 and counts channel writes."""
+
+    def __init__(self):
+        self.channels = [FakeChannel() for _ in range(16)]
+
+def report(name, latencies, ramp_done_time):
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) >= 100 else latencies[-1]
+    print(f"{name}:")
+    print(f"  loop passes:       {len(latencies)}")
+    print(f"  mean loop latency: {mean * 1000:.2f} ms")
+    print(f"  p99 loop latency:  {p99 * 1000:.2f} ms")
+    print(f"  max loop latency:  {latencies[-1] * 1000:.2f} ms")
+    print(f"  both motors at speed after {ramp_done_time:.3f} s")
+
+def bench_blocking():
+    """Each loop pass that changes speed blocks for the full ramp of each motor in turn."""
+    movement = m.Movement(FakePCA())
+    latencies = []
+    start = clock.monotonic()
+    ramp_done_time = None
+
+    while ramp_done_time is None or clock.monotonic() - start < ramp_done_time + 0.1:
+        pass_start = clock.monotonic()
+        if movement.motor_left.current_speed != TARGET_SPEED:
+            movement.motor_right.set_speed(TARGET_SPEED)
+            movement.motor_left.set_speed(TARGET_SPEED)
+            ramp_done_time = clock.monotonic() - start
+        latencies.append(clock.monotonic() - pass_start)
+        clock.sleep(LOOP_PERIOD)
+
+    report("Blocking Motor.set_speed", latencies, ramp_done_time)
+
+def bench_scheduler():
+    """The ramp is advanced a little on every loop pass, both motors together."""
+    movement = m.Movement(FakePCA())
+    latencies = []
+    start = clock.monotonic()
+    ramp_done_time = None
+    movement.drive(TARGET_SPEED, TARGET_SPEED)
+
+    while ramp_done_time is None or clock.monotonic() - start < ramp_done_time + 0.1:
+        pass_start = clock.monotonic()
+        movement.update()
+        if ramp_done_time is None and not movement.is_ramping():
+            ramp_done_time = clock.monotonic() - start
+        latencies.append(clock.monotonic() - pass_start)
+        clock.sleep(LOOP_PERIOD)
+
+    report("RampScheduler", latencies, ramp_done_time)
+
+if __name__ == "__main__":
+    print(f"Ramping 0 -> {TARGET_SPEED} with RAMP_TIME = {c.MOVEMENT_SETTINGS['RAMP_TIME']} s\n")
+    bench_blocking()
+    print()
+    bench_scheduler()
@@ -0,0 +1,273 @@
+# ranging.py
+
+import threading
+import time
+import config as c
+from hal import GPIO
+from hal import clock as hal_clock
+
+SPEED_OF_SOUND_HALF = 17150  # cm/s, halved for the round trip
+
+# --- Blocking Measurement ---
+
+def measure_distance(trigger_pin, echo_pin, gpio=None, timeout=0.02, clock=hal_clock):
+    """
+    Measures one distance by busy-waiting on the echo pin (the original method).
+
+    Returns:
+        The measured distance in centimeters, or NO_READING on timeout.
+    """
+    gpio = gpio or GPIO
+    gpio.output(trigger_pin, gpio.LOW)
+    clock.sleep(2e-6)  # 2 microseconds
+    gpio.output(trigger_pin, gpio.HIGH)
+    clock.sleep(10e-6)  # 10 microseconds
+    gpio.output(trigger_pin, gpio.LOW)
+
+    pulse_start_time = clock.time()
+    timeout_start_time = clock.time()
+    while gpio.input(echo_pin) == 0:
+        pulse_start_time = clock.time()
+        if clock.time() - timeout_start_time > timeout:  # Timeout for echo start
+            return c.ULTRASONIC["NO_READING"]
+
+    pulse_end_time = clock.time()
+    timeout_start_time = clock.time()
+    while gpio.input(echo_pin) == 1:
+        pulse_end_time = clock.time()
+        if clock.time() - timeout_start_time > timeout:  # Timeout for echo end
+            return c.ULTRASONIC["NO_READING"]
+
+    return round((pulse_end_time - pulse_start_time) * SPEED_OF_SOUND_HALF, 2)
+
+# --- Background Ranging Service ---
+
+def pulse_distance(pulse):
+    """
+    Converts an echo pulse (seconds) to centimeters.
+
+    With nothing in range the HC-SR04 holds the echo high for about 38 ms, far past
+    MAX_DISTANCE; that is NO_READING, not a distance.
+    """
+    distance = round(pulse * SPEED_OF_SOUND_HALF, 2)
+    if distance > c.ULTRASONIC["MAX_DISTANCE"]:
+        return c.ULTRASONIC["NO_READING"]
+    return distance
+
+class UltrasonicRanger:
+    """Pings the HC-SR04 on a background thread and publishes the latest distance.
+
+    Echo timing comes from GPIO edge callbacks instead of polling GPIO.input, so the
+    thread sleeps while it waits and get_distance() is just a read of the last result.
+    """
+
+    def __init__(self, trigger_pin=c.SENSOR_PINS["ULTRASONIC_TRIGGER"], echo_pin=c.SENSOR_PINS["ULTRASONIC_ECHO"],
+                 gpio=None, rate=c.ULTRASONIC["RATE"], echo_timeout=c.ULTRASONIC["ECHO_TIMEOUT"],
+                 clock=hal_clock.perf_counter):
+        self.trigger_pin = trigger_pin
+        self.echo_pin = echo_pin
+        self.gpio = gpio or GPIO
+        self.period = 1.0 / rate
+        self.echo_timeout = echo_timeout
+        self.clock = clock
+
+        # (distance_cm, timestamp) - replaced as a whole so readers never see half an update
+        self.latest = (c.ULTRASONIC["NO_READING"], 0.0)
+        self.pings = 0
+        self.timeouts = 0
+        self.listeners = []  # Called with each new distance, on the ranging thread
+
+        self._echo_start = None
+        self._pulse = None
+        self._echo_done = threading.Event()
+        self._scheduled = False
+        self._waiting = False  # A scheduled ping is out and its echo not yet published
+        self._waiting_lock = threading.Lock()  # The echo callback and poll() race to publish it
+        self._running = False
+        self._thread = None
+
+    def start(self, scheduled=False):
+        """
+        Sets up the pins and starts the background ranging thread.
+
+        Args:
+            scheduled: Start no thread; something else (a scheduler.Scheduler task) calls poll() at the rate.
+        """
+        self.gpio.setup(self.trigger_pin, self.gpio.OUT)
+        self.gpio.setup(self.echo_pin, self.gpio.IN)
+        self.gpio.output(self.trigger_pin, self.gpio.LOW)
+        self.gpio.add_event_detect(self.echo_pin, self.gpio.BOTH, callback=self._on_echo_edge)
+
+        self._running = True
+        self._scheduled = scheduled
+        if scheduled:
+            return
+        self._thread = threading.Thread(target=self._run, name="ultrasonic-ranger", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the ranging thread and removes the edge callback."""
+        self._running = False
+        self._echo_done.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.gpio.remove_event_detect(self.echo_pin)
+
+    def get_distance(self, max_age=c.ULTRASONIC["MAX_AGE"]):
+        """
+        Returns the latest distance in centimeters without blocking.
+
+        Returns NO_READING if the last ping failed or the reading is older than `max_age`.
+        """
+        distance, timestamp = self.latest
+        if self.clock() - timestamp > max_age:
+            return c.ULTRASONIC["NO_READING"]
+        return distance
+
+    def get_reading(self):
+        """Returns the latest (distance_cm, timestamp) pair."""
+        return self.latest
+
+    def _on_echo_edge(self, channel):
+        """GPIO callback: timestamps the rising and falling edges of the echo pulse.
+
+        The first edge after a trigger is the rising one and the next is the falling
+        one. Going by order rather than GPIO.input() avoids misreading a short pulse
+        that has already ended by the time the callback runs.
+        """
+        now = self.clock()
+        if self._echo_start is None:
+            self._echo_start = now
+        elif self._pulse is None:
+            self._pulse = now - self._echo_start
+            self._echo_done.set()
+            if self._scheduled and self._claim():
+                self._publish(pulse_distance(self._pulse))
+
+    def poll(self, deadline=None, dt=None):
+        """
+        Scheduled ranging: publishes a timeout for the last ping if its echo never came,
+        then sends the next one. The echo callback publishes the distance when it arrives.
+        Takes a scheduler.Scheduler task's (deadline, dt), which it doesn't need.
+        """
+        if not self._running:
+            return
+        if self._claim():
+            self.timeouts += 1
+            self._publish(c.ULTRASONIC["NO_READING"])
+        self._waiting = True
+        self._trigger()
+
+    def _claim(self):
+        """Takes the outstanding scheduled ping, so only one of the echo and the timeout publishes it."""
+        with self._waiting_lock:
+            waiting, self._waiting = self._waiting, False
+        return waiting
+
+    def _trigger(self):
+        self._echo_start = None
+        self._pulse = None
+        self._echo_done.clear()
+
+        self.gpio.output(self.trigger_pin, self.gpio.HIGH)
+        hal_clock.sleep(10e-6)  # 10 microseconds
+        self.gpio.output(self.trigger_pin, self.gpio.LOW)
+        self.pings += 1
+
+    def _ping(self):
+        """Sends one trigger pulse and waits (sleeping, not spinning) for its echo."""
+        self._trigger()
+        if not self._echo_done.wait(self.echo_timeout) or self._pulse is None:
+            self.timeouts += 1
+            return c.ULTRASONIC["NO_READING"]
+        return pulse_distance(self._pulse)
+
+    def _run(self):
+        next_ping = self.clock()
+        while self._running:
+            self._publish(self._ping())
+
+            # Keep a steady ping rate; the gap also lets stray echoes die away
+            next_ping += self.period
+            delay = next_ping - self.clock()
+            if delay > 0:
+                hal_clock.sleep(delay)
+            else:
+                next_ping = self.clock()
+
+    def _publish(self, distance):
+        self.latest = (distance, self.clock())
+        for listener in self.listeners:
+            listener(distance)
+
+# --- Simulated Echo ---
+
+class SimulatedEchoGPIO:
+    """A stand-in for RPi.GPIO with an HC-SR04 that sees a settable distance.
+
+    After each trigger pulse the echo pin goes high for the time sound would take to
+    reach `distance` and back. input() answers from that timing (for the busy-wait
+    path) and edge callbacks are fired from a timer thread (for UltrasonicRanger).
+    """
+
+    BCM = "BCM"
+    IN = "IN"
+    OUT = "OUT"
+    LOW = 0
+    HIGH = 1
+    BOTH = "BOTH"
+
+    ECHO_DELAY = 0.0005  # The HC-SR04 sends its burst ~0.5 ms after the trigger
+
+    def __init__(self, trigger_pin, echo_pin, distance=50.0, clock=time.perf_counter):
+        self.trigger_pin = trigger_pin
+        self.echo_pin = echo_pin
+        self.distance = distance
+        self.clock = clock
+        self.callbacks = {}
+        self._trigger_level = self.LOW
+        self._echo_window = (0.0, 0.0)
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, direction):
+        pass
+
+    def output(self, pin, value):
+        if pin == self.trigger_pin:
+            if self._trigger_level == self.HIGH and value == self.LOW:
+                self._fire_echo()
+            self._trigger_level = value
+
+    def input(self, pin):
+        if pin != self.echo_pin:
+            return self.LOW
+        start, end = self._echo_window
+        return self.HIGH if start <= self.clock() < end else self.LOW
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def cleanup(self):
+        self.callbacks.clear()
+
+    def _fire_echo(self):
+        start = self.clock() + self.ECHO_DELAY
+        end = start + self.distance / SPEED_OF_SOUND_HALF
+        self._echo_window = (start, end)
+
+        callback = self.callbacks.get(self.echo_pin)
+        if callback is not None:
+            threading.Thread(target=self._echo_edges, args=(callback, start, end), daemon=True).start()
+
+    def _echo_edges(self, callback, start, end):
+        for edge_time in (start, end):
+            delay = edge_time - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+            callback(self.echo_pin)
@@ -0,0 +1,69 @@
+# ranging_bench.py
+# Compares the busy-wait HC-SR04 measurement with the edge-callback UltrasonicRanger
+# against a simulated echo: timing error, CPU cost and the cost of get_distance().
+# Runs anywhere - no robot hardware needed.
+
+import time
+import config as c
+import ranging
+
+TRIGGER_PIN = c.SENSOR_PINS["ULTRASONIC_TRIGGER"]
+ECHO_PIN = c.SENSOR_PINS["ULTRASONIC_ECHO"]
+DISTANCES = [10.0, 50.0, 150.0, 300.0]
+RUN_TIME = 2.0  # Seconds per distance
+
+def summarize(errors):
+    errors = [abs(e) for e in errors]
+    return sum(errors) / len(errors), max(errors)
+
+def bench_busy_wait(distance):
+    """The old get_distance(): ping, spin on GPIO.input, sleep out the loop period."""
+    gpio = ranging.SimulatedEchoGPIO(TRIGGER_PIN, ECHO_PIN, distance)
+    period = 1.0 / c.ULTRASONIC["RATE"]
+    errors = []
+    call_times = []
+    cpu_start = time.process_time()
+    end = time.monotonic() + RUN_TIME
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        measured = ranging.measure_distance(TRIGGER_PIN, ECHO_PIN, gpio, timeout=c.ULTRASONIC["ECHO_TIMEOUT"], clock=time)
+        call_times.append(time.perf_counter() - start)
+        errors.append(measured - distance)
+        time.sleep(period)
+    cpu = time.process_time() - cpu_start
+    return errors, cpu, sum(call_times) / len(call_times)
+
+def bench_ranger(distance):
+    """UltrasonicRanger pinging in the background while the caller polls get_distance()."""
+    gpio = ranging.SimulatedEchoGPIO(TRIGGER_PIN, ECHO_PIN, distance)
+    ranger = ranging.UltrasonicRanger(TRIGGER_PIN, ECHO_PIN, gpio=gpio)
+    errors = []
+    call_times = []
+    cpu_start = time.process_time()
+    ranger.start()
+    time.sleep(0.2)  # Let the first readings arrive
+    end = time.monotonic() + RUN_TIME
+    last_timestamp = None
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        measured = ranger.get_distance()
+        call_times.append(time.perf_counter() - start)
+        _, timestamp = ranger.get_reading()
+        if timestamp != last_timestamp:
+            errors.append(measured - distance)
+            last_timestamp = timestamp
+        time.sleep(0.01)
+    ranger.stop()
+    cpu = time.process_time() - cpu_start
+    return errors, cpu, sum(call_times) / len(call_times)
+
+if __name__ == "__main__":
+    print(f"{RUN_TIME:.0f} s per distance at {c.ULTRASONIC['RATE']} pings/s "
+          "(CPU includes the simulator's own threads)\n")
+    print(f"{'distance':>9} | {'method':<12} | {'mean err':>8} | {'max err':>8} | {'CPU %':>6} | {'get_distance()':>14}")
+    for distance in DISTANCES:
+        for name, bench in (("busy-wait", bench_busy_wait), ("edge ranger", bench_ranger)):
+            errors, cpu, call_time = bench(distance)
+            mean_error, max_error = summarize(errors)
+            print(f"{distance:7.0f}cm | {name:<12} | {mean_error:6.2f}cm | {max_error:6.2f}cm | "
+                  f"{cpu / RUN_TIME * 100:5.1f}% | {call_time * 1e6:11.1f} us")
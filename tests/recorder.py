@@ -0,0 +1,430 @@
+# recorder.py
+
+import struct
+import threading
+import time
+from array import array
+import numpy as np
+import config as c
+import imu_sampler as imu
+
+# --- Log Layout ---
+# A header naming every channel and its fields, then a sequence of blocks. Each
+# block starts with BLOCK: its kind, payload length, time span and a bitmask of
+# the channels in it.
+#
+#   DATA blocks hold up to BLOCK_RECORDS records, stored by column: for each
+#   channel present, its id and record count, then all the timestamps (float64),
+#   then each field's values. Reading a channel is one np.frombuffer per column.
+#
+#   INDX blocks come after every INDEX_EVERY data blocks and list the offset, time
+#   span and channel mask of each data block since the previous index, plus that
+#   index's offset. close() writes a TRAILER pointing at the last index, so a
+#   reader walks the index chain instead of the file. A log cut short by a crash
+#   has no trailer; the reader then steps over the block headers instead, and
+#   keeps every complete block.
+
+MAGIC = b"GISMOLOG"
+VERSION = 1
+HEADER = struct.Struct("<8sHH")  # magic, version, channel count
+CHANNEL = struct.Struct("<16sB")  # name, field count
+FIELD = struct.Struct("<16sc")  # name, array typecode
+BLOCK = struct.Struct("<4sIddI")  # kind, payload length, first time, last time, channel mask
+CHANNEL_BLOCK = struct.Struct("<HI")  # channel id, record count
+INDEX_START = struct.Struct("<q")  # offset of the previous index block, -1 for the first
+INDEX_ENTRY = struct.Struct("<QddI")  # data block offset, first time, last time, channel mask
+TRAILER = struct.Struct("<8sq")  # end magic, offset of the last index block
+TRAILER_MAGIC = b"GISMOEND"
+DATA, INDEX = b"DATA", b"INDX"
+
+# Channels as (name, ((field, array typecode), ...)). Sensor readings are logged
+# once per control loop pass, motor speeds whenever they change, and IMU samples
+# in the batches DeadReckoning integrates. An edge sensor that failed to read is -1.
+CHANNELS = (
+    ("distance", (("cm", "f"),)),
+    ("edges", (("left", "b"), ("right", "b"))),
+    ("touch", (("touched", "B"),)),
+    ("sound", (("detected", "B"),)),
+    ("right_motor", (("speed", "d"),)),
+    ("left_motor", (("speed", "d"),)),
+    ("imu", tuple((name, "f") for name in imu.COLUMNS[1:])),
+    ("gyro_bias", (("x", "d"), ("y", "d"), ("z", "d"))),
+)
+
+# --- Recording ---
+
+class Recorder:
+    """
+    Appends timestamped sensor and actuator records to a binary log.
+
+    record() only appends to in-memory columns; a block is packed and written when
+    BLOCK_RECORDS have built up, so the cost of a control loop pass is a few list
+    appends plus, every few hundred passes, one write of a few kilobytes.
+    """
+
+    def __init__(self, path=c.RECORDER["PATH"], channels=CHANNELS, block_records=c.RECORDER["BLOCK_RECORDS"],
+                 index_every=c.RECORDER["INDEX_EVERY"]):
+        if len(channels) > 32:
+            raise ValueError("A log holds at most 32 channels")
+        self.path = path
+        self.channels = channels
+        self.ids = {name: i for i, (name, _) in enumerate(channels)}
+        self.block_records = block_records
+        self.index_every = index_every
+        self.file = open(path, "wb")
+        self.file.write(self._header())
+        self._new_columns()
+
+        self.index = []  # INDEX_ENTRY tuples for the data blocks since the last index
+        self.last_index = -1
+        self.motor_changes = {}  # Motor -> speed changes already recorded (the first, stopped since forever, never is)
+
+        self.records = 0
+        self.blocks = 0
+        self.bytes_written = self.file.tell()
+        self.flush_time = 0.0
+        self.max_flush_time = 0.0
+        self._lock = threading.Lock()
+
+    def _header(self):
+        parts = [HEADER.pack(MAGIC, VERSION, len(self.channels))]
+        for name, fields in self.channels:
+            parts.append(CHANNEL.pack(name.encode(), len(fields)))
+            parts.extend(FIELD.pack(field.encode(), typecode.encode()) for field, typecode in fields)
+        return b"".join(parts)
+
+    def _new_columns(self):
+        self.times = [array("d") for _ in self.channels]
+        self.columns = [[array(typecode) for _, typecode in fields] for _, fields in self.channels]
+        self.pending = 0
+
+    # --- Records ---
+
+    def record(self, channel, now, *values):
+        """Appends one record: a channel name, its time and one value per field."""
+        i = self.ids[channel]
+        with self._lock:
+            self.times[i].append(now)
+            for column, value in zip(self.columns[i], values):
+                column.append(value)
+            self.pending += 1
+            self.records += 1
+            if self.pending >= self.block_records:
+                self._write_block()
+
+    def record_batch(self, channel, times, columns):
+        """Appends a batch of records: (n,) times and one (n,) array per field."""
+        i = self.ids[channel]
+        with self._lock:
+            self.times[i].extend(np.asarray(times, dtype=float).tolist())
+            for column, values in zip(self.columns[i], columns):
+                column.extend(np.asarray(values).astype(column.typecode).tolist())
+            self.pending += len(times)
+            self.records += len(times)
+            if self.pending >= self.block_records:
+                self._write_block()
+
+    def record_sensors(self, now, distance, edges, touched=False, sound=False):
+        """Records one control loop pass's sensor readings."""
+        left, right = (-1 if edge is None else edge for edge in edges)
+        self.record("distance", now, distance)
+        self.record("edges", now, left, right)
+        self.record("touch", now, touched)
+        self.record("sound", now, sound)
+
+    def record_motors(self, movement):
+        """Records the motor speed changes logged by each Motor since the last call."""
+        for name, motor in (("right_motor", movement.motor_right), ("left_motor", movement.motor_left)):
+            # A copy taken under the log's lock: the safety reflex can set speeds from another thread
+            times, speeds, self.motor_changes[motor] = motor.speed_log.changes_since(self.motor_changes.get(motor, 1))
+            if len(times):
+                self.record_batch(name, times, (speeds,))
+
+    def record_imu(self, samples):
+        """Records a batch of decoded IMU samples (columns as in imu_sampler.COLUMNS)."""
+        if len(samples):
+            self.record_batch("imu", samples[:, imu.TIME], samples[:, imu.AX:].T)
+
+    # --- Blocks ---
+
+    def flush(self):
+        """Writes any buffered records as a block and flushes the file."""
+        with self._lock:
+            if self.pending:
+                self._write_block()
+            self.file.flush()
+
+    def _write_block(self):
+        start_time = time.perf_counter()
+        parts = []
+        mask = 0
+        first, last = float("inf"), float("-inf")
+        for i, times in enumerate(self.times):
+            if not times:
+                continue
+            mask |= 1 << i
+            first, last = min(first, times[0]), max(last, times[-1])  # Each channel is recorded in time order
+            parts.append(CHANNEL_BLOCK.pack(i, len(times)))
+            parts.append(times.tobytes())
+            parts.extend(column.tobytes() for column in self.columns[i])
+        payload = b"".join(parts)
+
+        offset = self.file.tell()
+        self.file.write(BLOCK.pack(DATA, len(payload), first, last, mask) + payload)
+        self.index.append((offset, first, last, mask))
+        self.blocks += 1
+        self._new_columns()
+        if len(self.index) >= self.index_every:
+            self._write_index()
+
+        self.bytes_written = self.file.tell()
+        elapsed = time.perf_counter() - start_time
+        self.flush_time += elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+
+    def _write_index(self):
+        if not self.index:
+            return
+        payload = INDEX_START.pack(self.last_index) + b"".join(INDEX_ENTRY.pack(*entry) for entry in self.index)
+        first = min(entry[1] for entry in self.index)
+        last = max(entry[2] for entry in self.index)
+        mask = 0
+        for entry in self.index:
+            mask |= entry[3]
+        self.last_index = self.file.tell()
+        self.file.write(BLOCK.pack(INDEX, len(payload), first, last, mask) + payload)
+        self.index = []
+
+    def close(self):
+        """Writes the remaining records, the last index and the trailer, and closes the log."""
+        with self._lock:
+            if self.file.closed:
+                return
+            if self.pending:
+                self._write_block()
+            self._write_index()
+            self.file.write(TRAILER.pack(TRAILER_MAGIC, self.last_index))
+            self.bytes_written = self.file.tell()
+            self.file.close()
+
+# --- Reading ---
+
+class LogReader:
+    """Reads a log written by Recorder, a channel at a time."""
+
+    def __init__(self, path=c.RECORDER["PATH"]):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.channels, self.header_size = self._read_header()
+        self.ids = {name: i for i, (name, _) in enumerate(self.channels)}
+        self.blocks = self._find_blocks()  # (offset, first time, last time, channel mask) per data block
+
+    def _read_header(self):
+        data = self.data
+        if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a Gismo log")
+        _, version, count = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"{self.path} is log version {version}, expected {VERSION}")
+        offset = HEADER.size
+        channels = []
+        for _ in range(count):
+            name, field_count = CHANNEL.unpack_from(data, offset)
+            offset += CHANNEL.size
+            fields = []
+            for _ in range(field_count):
+                field, typecode = FIELD.unpack_from(data, offset)
+                offset += FIELD.size
+                fields.append((field.rstrip(b"\0").decode(), typecode.decode()))
+            channels.append((name.rstrip(b"\0").decode(), tuple(fields)))
+        return tuple(channels), offset
+
+    def _find_blocks(self):
+        """The data blocks, from the index chain if the log was closed cleanly, else by scanning."""
+        data = self.data
+        if len(data) >= self.header_size + TRAILER.size:
+            end_magic, index_offset = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+            if end_magic == TRAILER_MAGIC:
+                blocks = []
+                while index_offset >= 0:
+                    _, length, _, _, _ = BLOCK.unpack_from(data, index_offset)
+                    start = index_offset + BLOCK.size
+                    entries = [INDEX_ENTRY.unpack_from(data, start + INDEX_START.size + i * INDEX_ENTRY.size)
+                               for i in range((length - INDEX_START.size) // INDEX_ENTRY.size)]
+                    blocks[:0] = entries
+                    index_offset, = INDEX_START.unpack_from(data, start)
+                return blocks
+
+        blocks = []
+        offset = self.header_size
+        while offset + BLOCK.size <= len(data):
+            kind, length, first, last, mask = BLOCK.unpack_from(data, offset)
+            if kind not in (DATA, INDEX) or offset + BLOCK.size + length > len(data):
+                break  # A block cut short
+            if kind == DATA:
+                blocks.append((offset, first, last, mask))
+            offset += BLOCK.size + length
+        return blocks
+
+    def duration(self):
+        """(first, last) record times in the log."""
+        if not self.blocks:
+            return 0.0, 0.0
+        return min(block[1] for block in self.blocks), max(block[2] for block in self.blocks)
+
+    def read(self, channel, start=float("-inf"), end=float("inf")):
+        """
+        Returns a channel's records from `start` to `end` (seconds, inclusive).
+
+        Returns:
+            A dict of NumPy arrays: "time", then one per field.
+        """
+        i = self.ids[channel]
+        fields = self.channels[i][1]
+        times, columns = [], [[] for _ in fields]
+        for offset, first, last, mask in self.blocks:
+            if not mask & (1 << i) or last < start or first > end:
+                continue
+            block_times, block_columns = self._read_block(offset, i, fields)
+            times.append(block_times)
+            for column, values in zip(columns, block_columns):
+                column.append(values)
+
+        result = {"time": np.concatenate(times) if times else np.empty(0)}
+        for (field, typecode), column in zip(fields, columns):
+            result[field] = np.concatenate(column) if column else np.empty(0, dtype=typecode)
+        # Records are in time order within a channel, so the range is one slice
+        first = np.searchsorted(result["time"], start, side="left")
+        last = np.searchsorted(result["time"], end, side="right")
+        return {name: values[first:last] for name, values in result.items()}
+
+    def _read_block(self, offset, channel_id, fields):
+        data = self.data
+        _, length, _, _, _ = BLOCK.unpack_from(data, offset)
+        position = offset + BLOCK.size
+        end = position + length
+        while position < end:
+            i, count = CHANNEL_BLOCK.unpack_from(data, position)
+            position += CHANNEL_BLOCK.size
+            channel_fields = self.channels[i][1]
+            if i != channel_id:
+                position += count * (8 + sum(np.dtype(typecode).itemsize for _, typecode in channel_fields))
+                continue
+            times = np.frombuffer(data, dtype=np.float64, count=count, offset=position)
+            position += count * 8
+            columns = []
+            for _, typecode in fields:
+                columns.append(np.frombuffer(data, dtype=typecode, count=count, offset=position))
+                position += count * np.dtype(typecode).itemsize
+            return times, columns
+        raise ValueError(f"{self.path}: channel {channel_id} missing from the block at {offset}")
+
+# --- Replay ---
+
+class Replay:
+    """
+    Plays a log back through the same calls the control loop makes, so
+    DeadReckoning, OccupancyGridMap and the wander logic can run offline.
+
+    The replay keeps its own time, which moves forward through ticks() (one step
+    per recorded control loop pass) or sleep(). The sensor calls return the latest
+    reading recorded at or before that time. With a `speed` the replay is paced to
+    that multiple of real time; with speed=None it runs as fast as it can.
+    """
+
+    def __init__(self, path=c.RECORDER["PATH"], speed=c.RECORDER["REPLAY_SPEED"]):
+        self.reader = LogReader(path)
+        self.speed = speed
+        self.channels = {name: self.reader.read(name) for name, _ in self.reader.channels}
+        self.now = self.reader.duration()[0]
+        self.imu_cursor = 0
+        self._real_start = None
+        self._replay_start = None
+
+    # --- Time ---
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance_to(self.now + seconds)
+
+    def advance_to(self, when):
+        """Moves the replay time forward to `when`, waiting as needed to keep to the replay speed."""
+        self.now = max(self.now, when)
+        if self.speed is None:
+            return
+        if self._real_start is None:
+            self._real_start, self._replay_start = time.perf_counter(), self.now
+            return
+        delay = (self.now - self._replay_start) / self.speed - (time.perf_counter() - self._real_start)
+        if delay > 0:
+            time.sleep(delay)
+
+    def ticks(self):
+        """Yields the time of each recorded control loop pass, moving the replay there first."""
+        for now in self.channels["distance"]["time"].tolist():
+            self.advance_to(now)
+            yield now
+
+    # --- Sensors ---
+
+    def _latest(self, channel):
+        records = self.channels[channel]
+        i = np.searchsorted(records["time"], self.now, side="right") - 1
+        return None if i < 0 else i
+
+    def get_distance(self):
+        i = self._latest("distance")
+        return 999.99 if i is None else float(self.channels["distance"]["cm"][i])
+
+    def read_edge_sensors(self):
+        i = self._latest("edges")
+        if i is None:
+            return None, None
+        edges = self.channels["edges"]
+        return tuple(None if edge < 0 else int(edge) for edge in (edges["left"][i], edges["right"][i]))
+
+    def is_touched(self):
+        i = self._latest("touch")
+        return i is not None and bool(self.channels["touch"]["touched"][i])
+
+    def is_sound_detected(self):
+        i = self._latest("sound")
+        return i is not None and bool(self.channels["sound"]["detected"][i])
+
+    # --- Dead Reckoning ---
+
+    def read_new(self):
+        """The IMU samples recorded up to the replay time since the last call, as IMUSampler.read_new() returns them."""
+        records = self.channels["imu"]
+        end = np.searchsorted(records["time"], self.now, side="right")
+        samples = np.empty((end - self.imu_cursor, len(imu.COLUMNS)))
+        for column, name in enumerate(imu.COLUMNS):
+            samples[:, column] = records[name][self.imu_cursor:end]
+        self.imu_cursor = end
+        return samples
+
+    def wheel_speeds(self, times):
+        """The recorded (right, left) wheel speeds in m/s at each of `times`, as Movement.wheel_speeds() gives them."""
+        scale = c.DEAD_RECKONING["MAX_WHEEL_SPEED"]
+        speeds = []
+        for channel in ("right_motor", "left_motor"):
+            records = self.channels[channel]
+            i = np.searchsorted(records["time"], times, side="right") - 1
+            if len(i) == 0 or not len(records["speed"]):
+                speeds.append(np.zeros(len(times)))
+                continue
+            speeds.append(np.where(i >= 0, records["speed"][np.maximum(i, 0)], 0.0) * scale)
+        return tuple(speeds)
+
+    def attach(self, dead_reckoning):
+        """Makes a DeadReckoning take its IMU samples, gyro bias and wheel speeds from the replay."""
+        dead_reckoning.sampler = self
+        if dead_reckoning.movement is not None:
+            dead_reckoning.movement = self
+        biases = self.channels["gyro_bias"]
+        if len(biases["time"]):
+            dead_reckoning.gyro_biases = (biases["x"][0], biases["y"][0], biases["z"][0])
+            dead_reckoning.gyro_bias = float(biases["z"][0])
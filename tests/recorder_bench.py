@@ -0,0 +1,184 @@
+# recorder_bench.py
+# Records a simulated wander run with recorder.Recorder, then replays the log
+# through DeadReckoning, an OccupancyGridMap and the wander decisions, and checks
+# the replay reproduces the live run: the same decision every pass and the same
+# pose to within the log's float32 rounding of the IMU samples. Reports the
+# recording cost per control loop pass, the log size, and how fast the replay
+# runs paced at 100x real time and unpaced. Runs anywhere - no robot hardware needed.
+#
+# Usage: python recorder_bench.py [virtual_seconds]
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time as real_time
+import numpy as np
+import hal
+
+hal.use("sim")
+
+import config as c
+import robot as rc
+import movement as m
+import dead_reckoning as dr
+import mapping
+import recorder as rec
+
+TICK_BUDGET = 200e-6  # Seconds of recording per control loop pass, on this machine
+
+def decide(distance, left_edge, right_edge, since_turn):
+    """The sim_run.py wander decision for one pass."""
+    if distance < c.MOVEMENT_SETTINGS["OBSTACLE_DISTANCE"]:
+        return "obstacle"
+    if left_edge == 1:
+        return "left edge"
+    if right_edge == 1:
+        return "right edge"
+    if since_turn > 5:
+        return "turn"
+    return "forward"
+
+def record(path, virtual_seconds):
+    """Runs the wander loop on the simulator, recording it. Returns the per-pass decisions, poses and recording times."""
+    clock = hal.clock
+    random.seed(c.SIMULATION["SEED"])
+    recording = rec.Recorder(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        movement = m.Movement(rc.pca)
+        dead_reckoning = dr.DeadReckoning(movement=movement, recorder=recording)
+        dead_reckoning.start_sampler()
+
+        decisions, poses, record_times = [], [], []
+        start = clock.monotonic()
+        last_turn = start
+        while clock.monotonic() - start < virtual_seconds:
+            now = clock.monotonic()
+            dead_reckoning.update()
+            distance = rc.get_distance()
+            edges = rc.read_edge_sensors()
+
+            began = real_time.perf_counter()
+            recording.record_sensors(now, distance, edges)
+            recording.record_motors(movement)
+            record_times.append(real_time.perf_counter() - began)
+
+            decision = decide(distance, *edges, now - last_turn)
+            decisions.append(decision)
+            poses.append((*dead_reckoning.get_position(), dead_reckoning.get_heading()))
+            if decision == "obstacle":
+                movement.stop_all_motors()
+                random.choice([movement.turn_left_in_place, movement.turn_right_in_place])()
+            elif decision == "left edge":
+                movement.turn_right_in_place()
+            elif decision == "right edge":
+                movement.turn_left_in_place()
+            elif decision == "turn":
+                random.choice([movement.turn_left_in_place, movement.turn_right_in_place])()
+                last_turn = now
+            else:
+                movement.move_forward()
+            clock.sleep(0.1)
+
+        recording.record_motors(movement)
+        dead_reckoning.stop_sampler()
+    recording.close()
+    return decisions, np.array(poses), np.array(record_times), recording
+
+def replay(path, speed):
+    """Replays a log through DeadReckoning, mapping and the wander decisions."""
+    replay = rec.Replay(path, speed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        dead_reckoning = dr.DeadReckoning(movement=replay)
+    replay.attach(dead_reckoning)
+    grid_map = mapping.OccupancyGridMap()
+
+    decisions, poses = [], []
+    start = real_time.perf_counter()
+    last_turn = None
+    for now in replay.ticks():
+        last_turn = now if last_turn is None else last_turn
+        dead_reckoning.update()
+        distance = replay.get_distance()
+        left_edge, right_edge = replay.read_edge_sensors()
+        grid_map.update_map(dead_reckoning.get_position(), distance / 100, dead_reckoning.get_heading())
+        decision = decide(distance, left_edge, right_edge, now - last_turn)
+        if decision == "turn":
+            last_turn = now
+        decisions.append(decision)
+        poses.append((*dead_reckoning.get_position(), dead_reckoning.get_heading()))
+    return decisions, np.array(poses), real_time.perf_counter() - start, replay
+
+def concurrent_motor_changes(directory):
+    """record_motors() on one thread while another sets speeds, as the safety reflex does from callbacks."""
+    movement = m.Movement(hal.create_pca())
+    recording = rec.Recorder(os.path.join(directory, "concurrent.log"))
+    stop = threading.Event()
+    changes = [0]
+
+    def halter():
+        speed = 0.0
+        while not stop.is_set():
+            speed = 0.5 - speed
+            movement.motor_right.apply_speed(speed)
+            changes[0] += 1
+
+    thread = threading.Thread(target=halter)
+    thread.start()
+    end = real_time.perf_counter() + 0.5
+    while real_time.perf_counter() < end:
+        recording.record_motors(movement)
+    stop.set()
+    thread.join()
+    recording.record_motors(movement)
+    recording.close()
+    recorded = len(rec.LogReader(recording.path).read("right_motor")["time"])
+    print(f"Concurrent speed changes: {changes[0]} made, {recorded} recorded")
+    assert recorded == changes[0]
+
+if __name__ == "__main__":
+    virtual_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 120.0
+    directory = tempfile.mkdtemp()
+    c.GYRO_CALIBRATION["PATH"] = os.path.join(directory, "gyro.json")
+    path = os.path.join(directory, "run.log")
+
+    live_decisions, live_poses, record_times, recording = record(path, virtual_seconds)
+    size = os.path.getsize(path)
+    print(f"Recorded {virtual_seconds:.0f} s: {len(live_decisions)} passes, {recording.records} records "
+          f"in {recording.blocks} blocks, {size / 1024:.1f} KiB ({size / virtual_seconds:.0f} bytes/s)")
+    print(f"Recording per pass: median {np.median(record_times) * 1e6:.1f} us, "
+          f"max {record_times.max() * 1e6:.1f} us; block writes: max {recording.max_flush_time * 1e6:.0f} us")
+
+    reader = rec.LogReader(path)
+    first, last = reader.duration()
+    window = reader.read("imu", first + 10, first + 11)
+    assert len(window["time"]) and window["time"][0] >= first + 10 and window["time"][-1] <= first + 11
+
+    for speed in (c.RECORDER["REPLAY_SPEED"], None):
+        decisions, poses, elapsed, _ = replay(path, speed)
+        position_error = np.hypot(*(poses[:, :2] - live_poses[:, :2]).T).max()
+        heading_error = np.abs(poses[:, 2] - live_poses[:, 2]).max()
+        label = f"{speed:.0f}x" if speed else "unpaced"
+        print(f"Replay {label:>8}: {elapsed:.2f} s ({(last - first) / elapsed:.0f}x real time), "
+              f"max pose difference {position_error * 1000:.3f} mm, {heading_error:.4f} deg")
+        assert decisions == live_decisions
+        assert position_error < 1e-3 and heading_error < 0.1
+
+    # A log cut short by a crash: no trailer, the last block incomplete
+    with open(path, "rb") as f:
+        data = f.read()
+    truncated = os.path.join(directory, "truncated.log")
+    with open(truncated, "wb") as f:
+        f.write(data[:len(data) * 2 // 3])
+    partial = rec.LogReader(truncated)
+    print(f"Truncated log: {len(partial.blocks)} of {len(reader.blocks)} blocks readable")
+    assert 0 < len(partial.blocks) < len(reader.blocks)
+
+    assert np.median(record_times) < TICK_BUDGET
+
+    concurrent_motor_changes(directory)
@@ -1,11 +1,13 @@
 # rgb_led.py
 
-import time
+from hal import clock as time
 import config as c
+import pca_frame as pf
 
 class RGBLed:  # Define the class at the top level of the module
     def __init__(self, pca):
         self.pca = pca
+        self.frame = pf.get_frame(pca)
         self.colors = {
             "RED": c.LED_COLORS["RED"],
             "GREEN": c.LED_COLORS["GREEN"],
@@ -19,9 +21,10 @@ class RGBLed:  # Define the class at the top level of the module
 
     def set_color(self, red, green, blue):
         """Sets the color of the RGB LED."""
-        self.pca.channels[c.RGB_LED_PINS["RED"]].duty_cycle = red
-        self.pca.channels[c.RGB_LED_PINS["GREEN"]].duty_cycle = green
-        self.pca.channels[c.RGB_LED_PINS["BLUE"]].duty_cycle = blue
+        with self.frame:  # One I2C write for all three channels
+            self.frame.set(c.RGB_LED_PINS["RED"], red)
+            self.frame.set(c.RGB_LED_PINS["GREEN"], green)
+            self.frame.set(c.RGB_LED_PINS["BLUE"], blue)
 
     def test(self):
         """Tests the RGB LED with different colors."""
@@ -1,10 +1,7 @@
 # robot.py
 
-import time
-import board
-import busio
-import RPi.GPIO as GPIO
-from adafruit_pca9685 import PCA9685
+import hal
+from hal import GPIO
 import movement as m
 import config as c  # Import the config module
 import rgb_led as led
@@ -14,76 +11,116 @@ import sound_sensor as s
 import display as d
 import servo_control as s
 import dead_reckoning as dr
+import ranging
+import gpio_events
+import safety as sf
 
 # --- Initialization ---
 
-# Initialize I2C bus
-i2c = busio.I2C(board.SCL, board.SDA)
-
-# Create a PCA9685 instance
-pca = PCA9685(i2c)
-
-# Set the PWM frequency
-pca.frequency = c.PCA_FREQUENCY
-
-# Initialize GPIO for Ultrasonic Sensor and Edge Sensors
-GPIO.setmode(GPIO.BCM)
+# The PCA9685 is created by initialize_pca(), not at import time, so that the
+# HAL backend (real or simulated) can be chosen first.
+pca = None
 
 def initialize_pca():
     """Initializes the PCA9685 object."""
     global pca
-    # Initialize I2C bus
-    i2c = busio.I2C(board.SCL, board.SDA)
+    pca = hal.create_pca(c.PCA_FREQUENCY)
 
-    # Create a PCA9685 object
-    pca = PCA9685(i2c)
+# --- Ultrasonic Sensor Function ---
 
-    # Set the PWM frequency to 60Hz
-    pca.frequency = c.PCA_FREQUENCY
+# Background ranging service, started by start_ranging()
+ranger = None
 
-# --- Ultrasonic Sensor Function ---
+def start_ranging(scheduled=False):
+    """
+    Starts pinging the HC-SR04 on a background thread so get_distance() never blocks.
+
+    With `scheduled` there is no thread: a scheduler.Scheduler task calls ranger.poll() at ULTRASONIC["RATE"].
+    """
+    global ranger
+    ranger = ranging.UltrasonicRanger(gpio=GPIO)
+    ranger.start(scheduled)
+    return ranger
 
 def get_distance():
     """
     Measures the distance using the HC-SR04 ultrasonic sensor.
 
+    If start_ranging() has been called this returns the latest background reading
+    straight away; otherwise it takes a (blocking) measurement.
+
     Returns:
         The measured distance in centimeters. Returns 999.99 if measurement fails.
     """
+    if ranger is not None:
+        return ranger.get_distance()
+
     try:
         GPIO.setup(c.SENSOR_PINS["ULTRASONIC_TRIGGER"], GPIO.OUT)
         GPIO.setup(c.SENSOR_PINS["ULTRASONIC_ECHO"], GPIO.IN)
+        return ranging.measure_distance(c.SENSOR_PINS["ULTRASONIC_TRIGGER"], c.SENSOR_PINS["ULTRASONIC_ECHO"], GPIO)
+
+    except Exception as e:
+        print(f"Error reading distance: {e}")
+        return 999.99 # Return a default large distance to indicate an error
 
-        GPIO.output(c.SENSOR_PINS["ULTRASONIC_TRIGGER"], GPIO.LOW)
-        time.sleep(2e-6)  # 2 microseconds
-        GPIO.output(c.SENSOR_PINS["ULTRASONIC_TRIGGER"], GPIO.HIGH)
-        time.sleep(10e-6) # 10 microseconds
-        GPIO.output(c.SENSOR_PINS["ULTRASONIC_TRIGGER"], GPIO.LOW)
+# --- Event-Driven Inputs ---
 
-        pulse_start_time = time.time()
-        timeout_start_time = time.time()
+# Inputs watched with GPIO edge callbacks, started by start_inputs()
+inputs = None
 
-        while GPIO.input(c.SENSOR_PINS["ULTRASONIC_ECHO"]) == 0:
-            pulse_start_time = time.time()
-            if time.time() - timeout_start_time > 0.02: # 20ms timeout for echo start
-                return 999.99
+INPUT_PINS = {
+    "left_edge": "LEFT_EDGE_SENSOR",
+    "right_edge": "RIGHT_EDGE_SENSOR",
+    "touch": "TOUCH_SENSOR",
+    "sound": "SOUND_SENSOR",
+}
 
-        pulse_end_time = time.time()
-        timeout_start_time = time.time()
-        while GPIO.input(c.SENSOR_PINS["ULTRASONIC_ECHO"]) == 1:
-            pulse_end_time = time.time()
-            if time.time() - timeout_start_time > 0.02: # 20ms timeout for echo end
-                return 999.99
+# Edges that stopped the motors since read_edge_sensors() last looked
+edge_halts = {"left_edge": False, "right_edge": False}
 
-        pulse_duration = pulse_end_time - pulse_start_time
-        distance = pulse_duration * 17150  # Speed of sound in cm/s
-        distance = round(distance, 2)
+def start_inputs():
+    """
+    Watches the edge, touch and sound sensors with edge callbacks instead of polling.
 
-        return distance
+    touch_sensor.is_touched() and sound_sensor.is_sound_detected() then also report
+    a touch or sound that came and went since their last call.
+    """
+    global inputs
+    inputs = gpio_events.start()
+    for name, pin_name in INPUT_PINS.items():
+        inputs.add(name, c.SENSOR_PINS[pin_name], c.GPIO_EVENTS["DEBOUNCE"][name])
+    return inputs
 
-    except Exception as e:
-        print(f"Error reading distance: {e}")
-        return 999.99 # Return a default large distance to indicate an error
+# --- Safety Reflex ---
+
+# Stops the motors on an edge or close obstacle, started by start_safety()
+safety = None
+
+def start_safety(movement):
+    """
+    Starts the safety reflex: an edge sensor going off the table, or an obstacle
+    closer than SAFETY["OBSTACLE_DISTANCE"], stops the motors at once if the robot
+    is driving forward, whatever the control loop is in the middle of.
+
+    Starts the event-driven inputs if they aren't running; call start_ranging()
+    first for the obstacle check to see each new reading. read_edge_sensors()
+    reports an edge that stopped the motors even if the sensor is back on the table.
+    """
+    global safety
+    if inputs is None:
+        start_inputs()
+    safety = sf.SafetyMonitor(pca, movement)
+    safety.watch_edges(inputs)
+    if ranger is not None:
+        safety.watch_ranger(ranger)
+    safety.on_trip(_note_edge_stop)
+    safety.start()
+    return safety
+
+def _note_edge_stop(stop):
+    if stop.reason in edge_halts:
+        edge_halts[stop.reason] = True
 
 # --- Edge Sensor Functions ---
 
@@ -100,6 +137,13 @@ def read_edge_sensors():
         A tuple containing the left and right sensor values (0 or 1).
         Returns (None, None) on error
     """
+    if inputs is not None:
+        values = []
+        for name in ("left_edge", "right_edge"):
+            halted, edge_halts[name] = edge_halts[name], False
+            values.append(int(inputs.is_active(name) or halted))
+        return tuple(values)
+
     try:
         left_sensor_value = GPIO.input(c.SENSOR_PINS["LEFT_EDGE_SENSOR"])
         right_sensor_value = GPIO.input(c.SENSOR_PINS["RIGHT_EDGE_SENSOR"])
@@ -120,6 +164,11 @@ def cleanup(pca, rgb_led_instance):
     else:
         print("Warning: Movement object not found. Motors may not have stopped.")
 
+    if safety is not None:
+        safety.stop()
+    if ranger is not None:
+        ranger.stop()
+
     rgb_led_instance.set_color(*c.LED_COLORS["OFF"])
     d.clear_display()
     pca.deinit()
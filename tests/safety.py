@@ -0,0 +1,290 @@
+# safety.py
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+import hal
+from hal import GPIO, clock as hal_clock
+import config as c
+import pca_frame as pf
+
+# --- Safety Reflex ---
+# The control loop only reacts to an edge once its current action is over, and an
+# action can be a blocking move or a tune, so the robot could drive off the table
+# while it waited. The SafetyMonitor lives outside the loop and stops the motors
+# itself:
+#   - edge sensor callbacks (gpio_events hooks) and each new ultrasonic reading
+#     (UltrasonicRanger listeners) stop them the moment they fire;
+#   - a watchdog thread, at real-time priority where the OS allows it, re-reads the
+#     edge pins and the last distance RATE times a second and stops the motors
+#     again if anything has set them driving forward towards the danger.
+#
+# A stop zeroes every motor channel with direct PCA9685 register writes, one per run
+# of neighbouring channels, that wait until they are on the chip. The ramps and
+# the loop's blocking moves are skipped. Only forward driving is stopped. Turning
+# in place and reversing are how the robot gets away, so they are left alone.
+#
+# Each stop's trigger-to-stopped latency goes into a histogram, checked against
+# LATENCY_BOUND.
+
+SETTINGS = c.SAFETY
+MOTOR_CHANNELS = tuple(sorted(c.MOTOR_DRIVER_PINS.values()))
+EDGE_PINS = {"left_edge": c.SENSOR_PINS["LEFT_EDGE_SENSOR"], "right_edge": c.SENSOR_PINS["RIGHT_EDGE_SENSOR"]}
+
+class SafetyStop:
+    """One reflex stop: what triggered it, and when."""
+
+    __slots__ = ("reason", "source", "triggered", "stopped")
+
+    def __init__(self, reason, source, triggered, stopped):
+        self.reason = reason  # "left_edge", "right_edge" or "obstacle"
+        self.source = source  # "callback", "ranger" or "watchdog"
+        self.triggered = triggered  # Monitor clock seconds
+        self.stopped = stopped
+
+    @property
+    def latency(self):
+        return self.stopped - self.triggered
+
+    def __repr__(self):
+        return f"SafetyStop({self.reason!r} by {self.source}, {self.latency * 1e3:.3f} ms)"
+
+def stop_buffers(channels=MOTOR_CHANNELS):
+    """The PCA9685 writes that zero `channels`: one auto-increment write per run of neighbouring channels."""
+    runs = []
+    for channel in sorted(channels):
+        if runs and channel == runs[-1][-1] + 1:
+            runs[-1].append(channel)
+        else:
+            runs.append([channel])
+    return [bytes([pf.LED0_ON_L + run[0] * pf.REGISTERS_PER_CHANNEL]) + pf.pwm_registers(0) * len(run)
+            for run in runs]
+
+class SafetyMonitor:
+    """Stops the motors on an edge or a close obstacle, independently of the control loop."""
+
+    def __init__(self, pca, movement=None, gpio=GPIO, clock=hal_clock.monotonic, rate=SETTINGS["RATE"],
+                 obstacle_distance=SETTINGS["OBSTACLE_DISTANCE"], edge_pins=EDGE_PINS, threaded=None):
+        """
+        Args:
+            pca: The PCA9685 the motors are on.
+            movement: The Movement driving them, if any; its ramps are cancelled on a stop.
+            gpio: RPi.GPIO or a stand-in, for the watchdog's edge pin reads.
+            clock: Seconds; must be the clock of the InputManager whose events trigger stops.
+            rate: Watchdog checks per second.
+            obstacle_distance: cm; a reading closer than this while driving forward stops the motors.
+            edge_pins: Edge input name -> BCM pin, the pin reading HIGH off the table.
+            threaded: Run the watchdog on a thread (the default on real hardware) or
+                off the simulated clock's physics steps (the default on the simulator).
+        """
+        self.pca = pca
+        self.movement = movement
+        self.frame = pf.get_frame(pca)
+        self.device = self.frame.device
+        self.buffers = stop_buffers()
+        self.gpio = gpio
+        self.clock = clock
+        self.period = 1.0 / rate
+        self.obstacle_distance = obstacle_distance
+        self.edge_pins = dict(edge_pins)
+        self.threaded = threaded
+        self.distance = c.ULTRASONIC["NO_READING"]  # Latest ranger reading, cm
+        self.hooks = []
+        self.lock = threading.Lock()  # One stop at a time
+
+        self.next_check = None
+        self.checks = 0
+        self.realtime = False  # Whether the watchdog thread got a real-time priority
+        self._running = False
+        self._thread = None
+        self._listening = False
+        self._switch_interval = None
+
+        # --- Latency ---
+        self.bins = np.array(SETTINGS["HISTOGRAM_BINS"])
+        self.histogram = np.zeros(len(self.bins) + 1, dtype=np.int64)  # The last bin is everything over the top edge
+        self.latencies = deque(maxlen=SETTINGS["LATENCY_SAMPLES"])
+        self.max_latency = 0.0
+        self.trips = {}  # (reason, source) -> stops
+        self.last_stop = None
+
+    # --- Triggers ---
+
+    def watch_edges(self, inputs):
+        """Stops the motors from the InputManager's callback when an edge sensor goes off the table."""
+        for name in self.edge_pins:
+            inputs.on_active(name, self._on_edge)
+
+    def watch_ranger(self, ranger):
+        """Checks each new UltrasonicRanger reading on the ranging thread as it arrives."""
+        ranger.listeners.append(self.on_distance)
+
+    def on_trip(self, hook):
+        """Calls hook(SafetyStop) after every stop, on whichever thread made it."""
+        self.hooks.append(hook)
+
+    def _on_edge(self, event):
+        if self.is_driving_forward():
+            self.trip(event.name, "callback", event.time)
+
+    def on_distance(self, distance):
+        """Takes a new distance reading (cm), stopping the motors if it is too close to drive on."""
+        self.distance = distance
+        if distance < self.obstacle_distance and self.is_driving_forward():
+            self.trip("obstacle", "ranger", self.clock())
+
+    def is_driving_forward(self):
+        """True if the motor channels, as last sent to the PCA9685, move the robot forward."""
+        sent = self.frame.sent
+        pins = c.MOTOR_DRIVER_PINS
+        right = (sent[pins["RIGHT_FORWARD"]] or 0) - (sent[pins["RIGHT_BACKWARD"]] or 0)
+        left = (sent[pins["LEFT_FORWARD"]] or 0) - (sent[pins["LEFT_BACKWARD"]] or 0)
+        return right + left > 0
+
+    # --- Stopping ---
+
+    def trip(self, reason, source, triggered):
+        """
+        Zeroes the motor channels on the PCA9685 and records how long it took.
+
+        Args:
+            reason: What was detected.
+            source: What noticed it.
+            triggered: When it was detected, monitor clock seconds.
+
+        Returns:
+            The SafetyStop, or None if the motors were already stopped.
+        """
+        with self.lock:
+            # Holding the frame keeps other writers off the motor channels until the
+            # frame's record matches the chip; it is only ever held for one commit
+            with self.frame:
+                if not self.is_driving_forward():
+                    return None  # Another trigger got there first
+                self.emergency_stop()
+                stopped = self.clock()
+                for channel in MOTOR_CHANNELS:
+                    self.frame.record_sent(channel, 0)
+                if self.movement is not None:
+                    self.movement.halt()  # Cancels the ramps; the channels already read 0, so nothing is sent
+            stop = SafetyStop(reason, source, triggered, stopped)
+            self._record(stop)
+        for hook in self.hooks:
+            hook(stop)
+        return stop
+
+    def emergency_stop(self):
+        """Writes 0 to every motor channel straight to the chip, bypassing ramps and frames."""
+        if self.device is None:
+            for channel in MOTOR_CHANNELS:
+                self.pca.channels[channel].duty_cycle = 0
+            return
+        write_now = getattr(self.device, "write_now", None)
+        if write_now is not None:
+            write_now(*self.buffers)  # Waits for the bus rather than joining the coalesced writes
+            return
+        for buffer in self.buffers:
+            with self.device:
+                self.device.write(buffer)
+
+    # --- Watchdog ---
+
+    def check(self, now=None):
+        """Stops the motors if they are driving forward with an edge sensor off the table or an obstacle close."""
+        if not self._running:
+            return
+        if now is None:
+            now = self.clock()
+        if self.next_check is None:
+            self.next_check = now
+        if now < self.next_check:
+            return
+        self.next_check += self.period
+        if self.next_check <= now:
+            self.next_check = now + self.period  # Fell behind; skip the missed checks
+        self.checks += 1
+        if not self.is_driving_forward():
+            return
+        for name, pin in self.edge_pins.items():
+            if self.gpio.input(pin) == self.gpio.HIGH:
+                self.trip(name, "watchdog", now)
+                return
+        if self.distance < self.obstacle_distance:
+            self.trip("obstacle", "watchdog", now)
+
+    def start(self):
+        """Starts the watchdog."""
+        self._running = True
+        self.next_check = None
+        threaded = self.threaded if self.threaded is not None else not hal.is_simulated()
+        if not threaded:
+            hal.backend().clock.on_advance(self.check)
+            self._listening = True
+            return
+        # A thread waiting for the GIL can otherwise wait a whole 5 ms switch interval
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, SETTINGS["SWITCH_INTERVAL"]))
+        self._thread = threading.Thread(target=self._run, name="safety-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the watchdog. The edge and ranger triggers stay in place."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            sys.setswitchinterval(self._switch_interval)
+        elif self._listening:
+            hal.backend().clock.listeners.remove(self.check)
+            self._listening = False
+
+    def _run(self):
+        self._raise_priority()
+        while self._running:
+            self.check()
+            delay = self.next_check - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _raise_priority(self):
+        """Puts the calling thread on the SCHED_FIFO real-time policy, if the OS lets us."""
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(SETTINGS["PRIORITY"]))
+            self.realtime = True
+        except (AttributeError, OSError) as e:
+            print(f"Safety watchdog running at normal priority: {e}")
+
+    # --- Metrics ---
+
+    def _record(self, stop):
+        latency = stop.latency
+        self.histogram[np.searchsorted(self.bins, latency)] += 1
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+        key = (stop.reason, stop.source)
+        self.trips[key] = self.trips.get(key, 0) + 1
+        self.last_stop = stop
+
+    def latency_report(self):
+        """Stops, median, 99th percentile and maximum trigger-to-stop latency in seconds, and stops over the bound."""
+        values = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"count": int(self.histogram.sum()), "median": float(np.median(values)),
+                "p99": float(np.percentile(values, 99)), "max": self.max_latency,
+                "over_bound": int(np.count_nonzero(values > SETTINGS["LATENCY_BOUND"]))}
+
+    def print_report(self):
+        report = self.latency_report()
+        print(f"Safety stops: {report['count']}, trigger to stop median {report['median'] * 1e3:.3f} ms, "
+              f"99th percentile {report['p99'] * 1e3:.3f} ms, max {report['max'] * 1e3:.3f} ms "
+              f"(bound {SETTINGS['LATENCY_BOUND'] * 1e3:.1f} ms)")
+        largest = max(1, self.histogram.max())
+        for i, count in enumerate(self.histogram):
+            label = f"<= {self.bins[i] * 1e3:6.2f} ms" if i < len(self.bins) else f" > {self.bins[-1] * 1e3:6.2f} ms"
+            print(f"  {label} {count:6d} {'#' * int(round(40 * count / largest))}")
+        for (reason, source), count in sorted(self.trips.items()):
+            print(f"  {reason} by {source}: {count}")
+        if self._thread is not None or self.realtime:
+            print(f"  watchdog: {self.checks} checks, {'real-time' if self.realtime else 'normal'} priority")
@@ -0,0 +1,298 @@
+# safety_bench.py
+# Checks the safety reflex (safety.SafetyMonitor) stops the motors within
+# SAFETY["LATENCY_BOUND"] of an edge or obstacle trigger, two ways:
+#   - real threads: a control loop driving forward and ramping, the IMU and the
+#     display all on a simulated PCA9685 and bus slowed down to 400 kHz, while
+#     another thread flips the simulated edge pins and reports close obstacles.
+#     Trigger to stopped is timed at the chip, in real time, and the bus log
+#     shows whether each stop only waited for the transaction already under way.
+#     The worst case here also carries this host's timer slack, which is printed.
+#   - virtual time: the wander loop on the simulated robot, with blocking moves
+#     and blocking tunes played while it drives, with and without the reflex.
+#     This is deterministic, so every stop is held to the bound.
+# Runs anywhere - no robot hardware needed.
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+import hal
+
+hal.use("sim")
+
+import config as c
+import hal_sim
+import i2c_bus
+import imu_sampler as imu
+import robot as rc
+import movement as m
+import gpio_events
+import safety
+
+BOUND = c.SAFETY["LATENCY_BOUND"]
+TRIGGERS = 60
+BYTE_TIME = 9 / 400e3  # 8 bits and an ack at 400 kHz
+WANDER_TIME = 120.0  # Virtual seconds
+TUNE_LENGTH = 2.0  # Seconds a blocking tune holds up the wander loop
+
+# --- Real Threads ---
+
+class ThreadedGPIO(hal_sim.SimGPIO):
+    """SimGPIO whose reads don't move virtual time, for use from real threads."""
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+class BusLog:
+    """What went on the emulated bus and when, and how late each emulated transfer finished."""
+
+    def __init__(self):
+        self.transactions = []  # (start, name), real seconds
+        self.overshoots = []  # How much longer than the bus time each transfer took, seconds
+
+    def transfer(self, name, nbytes):
+        """Blocks for as long as `nbytes` (plus the address byte) take on the bus, as the I2C driver's ioctl does."""
+        start = time.monotonic()
+        self.transactions.append((start, name))
+        duration = (nbytes + 1) * BYTE_TIME
+        time.sleep(duration)
+        self.overshoots.append(time.monotonic() - start - duration)
+
+class SlowDevice:
+    """An I2CDevice that takes as long as the real bus."""
+
+    def __init__(self, device, log, name, on_write=None, tags=None):
+        self.device = device
+        self.log = log
+        self.name = name
+        self.on_write = on_write
+        self.tags = tags or {}  # Buffers to log under another name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def write(self, buffer, start=0, end=None):
+        buffer = bytes(buffer[start:end])
+        self.log.transfer(self.tags.get(buffer, self.name), len(buffer))
+        self.device.write(buffer)
+        if self.on_write is not None:
+            self.on_write()
+
+class SlowSMBus:
+    def __init__(self, bus, log):
+        self.bus = bus
+        self.log = log
+
+    def read_i2c_block_data(self, address, register, length):
+        self.log.transfer("imu", 1 + length)
+        return self.bus.read_i2c_block_data(address, register, length)
+
+class TimedMonitor(safety.SafetyMonitor):
+    """Notes when each stop is handed to the bus."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = []
+
+    def emergency_stop(self):
+        self.submitted.append(time.monotonic())
+        super().emergency_stop()
+
+class ChipWatch:
+    """Times each trigger to the moment every motor channel on the chip reads 0."""
+
+    def __init__(self, pca):
+        self.pca = pca
+        self.triggered = None
+        self.latencies = []
+
+    def trigger(self):
+        self.triggered = time.monotonic()
+
+    def on_write(self):
+        if self.triggered is not None and not any(self.pca.duty(channel) for channel in safety.MOTOR_CHANNELS):
+            self.latencies.append(time.monotonic() - self.triggered)
+            self.triggered = None
+
+def queue_jumped(log, submitted):
+    """
+    True if, for every stop, nothing but motor writes started on the bus between the
+    stop being handed to it and the stop going out: it only waited for the
+    transaction already in progress.
+    """
+    for handed in submitted:
+        following = [name for start, name in log.transactions if start >= handed]
+        if "stop" not in following or set(following[:following.index("stop")]) - {"pca9685"}:
+            return False
+    return True
+
+def periodic(rate, action, stop):
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        action()
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+def threaded_run():
+    """Triggers the reflex TRIGGERS times against a busy bus; returns the monitor, bus log and chip-side latencies."""
+    gpio = ThreadedGPIO(hal.backend().clock)
+    log = BusLog()
+    manager = i2c_bus.BusManager()
+    priorities = c.I2C_BUS["PRIORITIES"]
+    pca = hal_sim.SimPCA9685()
+    watch = ChipWatch(pca)
+    tags = {buffer: "stop" for buffer in safety.stop_buffers()[:1]}
+    pca.i2c_device = manager.device(SlowDevice(pca.i2c_device, log, "pca9685", watch.on_write, tags),
+                                    c.PCA_I2C_ADDRESS, "pca9685", priorities["MOTORS"], coalesce=True)
+    mpu = hal_sim.SimMPU6050(hal.backend().world)
+    mpu.bus = manager.smbus(SlowSMBus(mpu.bus, log), mpu.address, "imu", priorities["IMU"])
+    panel = hal_sim.SimSSD1306(c.DISPLAY["WIDTH"], c.DISPLAY["HEIGHT"], c.DISPLAY["I2C_ADDRESS"])
+    display = manager.device(SlowDevice(panel.i2c_device, log, "display"), c.DISPLAY["I2C_ADDRESS"], "display",
+                             priorities["DISPLAY"], max_write=c.I2C_BUS["DISPLAY_MAX_WRITE"])
+    frame = bytes([0x40]) + bytes(c.DISPLAY["WIDTH"] * c.DISPLAY["HEIGHT"] // 8)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        movement = m.Movement(pca, clock=time.monotonic)
+    inputs = gpio_events.InputManager(gpio, time.monotonic)
+    for name, pin in safety.EDGE_PINS.items():
+        inputs.add(name, pin, c.GPIO_EVENTS["DEBOUNCE"][name])
+    monitor = TimedMonitor(pca, movement, gpio=gpio, clock=time.monotonic, threaded=True)
+    monitor.watch_edges(inputs)
+
+    def control_loop():
+        # Knows nothing of the reflex: drives on whenever it sees no edge
+        on_edge = any(gpio.input(pin) for pin in safety.EDGE_PINS.values())
+        if not on_edge and not movement.is_driving_forward() and not movement.is_ramping():
+            movement.drive(c.MOVEMENT_SETTINGS["FORWARD_SPEED"], c.MOVEMENT_SETTINGS["FORWARD_SPEED"], ramp_time=0.05)
+        movement.update()
+
+    def push_display():
+        display.write(bytes([0x00, 0x21, 0, 127, 0x22, 0, 7]))
+        display.write(frame)
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=periodic, args=(rate, action, stop), daemon=True)
+               for rate, action in ((100, control_loop), (200, lambda: imu.read_burst(mpu)), (10, push_display))]
+    with contextlib.redirect_stdout(io.StringIO()):
+        monitor.start()
+    for thread in threads:
+        thread.start()
+
+    rng = random.Random(c.SIMULATION["SEED"])
+    for i in range(TRIGGERS):
+        while not monitor.is_driving_forward():
+            time.sleep(0.001)
+        time.sleep(rng.uniform(0.02, 0.1))
+        if i % 3 == 2:
+            # A close reading from the ranger; the loop drives on, so the watchdog stops it again
+            watch.trigger()
+            monitor.on_distance(5.0)
+            time.sleep(0.05)
+            monitor.on_distance(100.0)
+        else:
+            pin = list(safety.EDGE_PINS.values())[i % 2]
+            watch.trigger()
+            gpio.set_input(pin, 1)  # Fires the edge callback on this thread, as RPi.GPIO's event thread would
+            time.sleep(0.05)
+            gpio.set_input(pin, 0)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    monitor.stop()
+    manager.flush()
+    return monitor, log, np.array(watch.latencies)
+
+# --- Virtual Time ---
+
+class EdgeWatch:
+    """Times each edge detection to the moment the wheels stop, in virtual time."""
+
+    def __init__(self, backend):
+        self.world, self.gpio = backend.world, backend.gpio
+        self.pins = list(safety.EDGE_PINS.values())
+        self.triggered = None
+        self.latencies = []
+        backend.clock.on_advance(self.step)
+
+    def step(self, now):
+        on_edge = any(self.gpio.levels.get(pin) for pin in self.pins)
+        if on_edge and self.triggered is None and self.world.v > 0:
+            self.triggered = now
+        elif self.triggered is not None and self.world.v <= 0:
+            self.latencies.append(now - self.triggered)
+            self.triggered = None
+
+def wander(backend, movement):
+    """The main_0.35.py edge and wander decisions, sometimes driving on through a blocking tune."""
+    clock = hal.clock
+    world = backend.world
+    world.x = world.y = world.heading = 0.0
+    world.falls = 0
+    watch = EdgeWatch(backend)
+    speed = c.MOVEMENT_SETTINGS["FORWARD_SPEED"]
+    start = clock.monotonic()
+    while clock.monotonic() - start < WANDER_TIME:
+        left_edge, right_edge = rc.read_edge_sensors()
+        if left_edge == 1:
+            movement.turn_right_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 3)
+        elif right_edge == 1:
+            movement.turn_left_in_place(duration=c.MOVEMENT_SETTINGS["TURN_DURATION"] * 3)
+        elif random.random() < 0.3:
+            movement.drive(speed, speed, ramp_time=0)
+            clock.sleep(TUNE_LENGTH)  # A tune played to the end before the loop looks again
+            movement.stop_all_motors()
+        else:
+            movement.move_forward(duration=1.0)
+        clock.sleep(0.1)
+    backend.clock.listeners.remove(watch.step)
+    return world.falls, np.array(watch.latencies)
+
+if __name__ == "__main__":
+    monitor, log, chip_latencies = threaded_run()
+    overshoots = np.array(log.overshoots)
+    print(f"Real threads, bus at 400 kHz, {TRIGGERS} triggers while driving forward:")
+    print(f"  trigger to motors stopped on the chip: median {np.median(chip_latencies) * 1e3:.3f} ms, "
+          f"99th percentile {np.percentile(chip_latencies, 99) * 1e3:.3f} ms, max {chip_latencies.max() * 1e3:.3f} ms "
+          f"over {len(chip_latencies)} stops")
+    print(f"  this host's sleep overshoot on the emulated bus transfers: median {np.median(overshoots) * 1e3:.3f} ms, "
+          f"max {overshoots.max() * 1e3:.3f} ms")
+    jumped = queue_jumped(log, monitor.submitted)
+    print(f"  every stop went out next after the transaction in progress: {jumped}")
+    monitor.print_report()
+
+    backend = hal.backend()
+    random.seed(c.SIMULATION["SEED"])
+    c.GYRO_CALIBRATION["PATH"] = os.path.join(tempfile.mkdtemp(), "gyro.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        movement = m.Movement(rc.pca)
+        unsafe = wander(backend, movement)
+        rc.start_safety(movement)
+        safe = wander(backend, movement)
+
+    print(f"\nWandering for {WANDER_TIME:.0f} virtual seconds near the table edge:")
+    for name, (falls, latencies) in (("loop only", unsafe), ("with reflex", safe)):
+        print(f"  {name}: {falls} falls, edge to wheels stopped median {np.median(latencies) * 1000:.1f} ms, "
+              f"max {latencies.max() * 1000:.1f} ms over {len(latencies)} edges")
+    rc.safety.print_report()
+
+    # Real threads: every trigger stopped the motors, each stop only waited for the
+    # transaction already on the bus, and typical stops are well inside the bound.
+    # The maximum here is set by this host's timer slack, not the reflex.
+    assert len(chip_latencies) == TRIGGERS and jumped
+    assert np.median(chip_latencies) <= BOUND / 2
+    # Virtual time is deterministic, so the bound holds for every stop
+    assert safe[0] == 0 and safe[1].max() <= BOUND
+    assert rc.safety.latency_report()["over_bound"] == 0
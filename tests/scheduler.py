@@ -0,0 +1,205 @@
+# scheduler.py
+
+from collections import deque
+import numpy as np
+import hal
+from hal import clock as hal_clock
+import config as c
+
+# --- Fixed-Rate Scheduler ---
+# main_0.35.py slept a fixed 0.1 s after each pass, however long the pass took, so
+# its rate depended on what the pass did. The Scheduler runs each registered task
+# on its own grid of absolute deadlines (start + k * period on the monotonic clock)
+# in one thread:
+#
+#   - the task with the earliest deadline runs next (the faster task on a tie);
+#   - the loop sleeps until that deadline, then, on real hardware, polls the clock
+#     for the last SPIN seconds, because time.sleep() can wake late;
+#   - a task is passed its deadline and the time since its previous deadline, so
+#     anything integrating over time gets a steady dt, not the time the loop
+#     happened to wake up;
+#   - a task that finishes past its next deadline has overrun; if it is more than a
+#     whole period behind, the missed deadlines are skipped (and counted) rather than
+#     run back to back.
+#
+# Each task keeps its start jitter (start - deadline) and execution time for the
+# percentiles, and its longest gap between runs. A task that hasn't run for
+# STARVATION_PERIODS of its periods is starving; starving() lists them and the
+# report marks them.
+
+SETTINGS = c.SCHEDULER
+
+class Task:
+    """A function run at a fixed rate by a Scheduler, with its timing statistics."""
+
+    def __init__(self, name, function, rate, window=SETTINGS["STATS_WINDOW"]):
+        """
+        Args:
+            name: For the report.
+            function: Called as function(deadline, dt): the deadline it was due at and
+                the seconds since its previous deadline (one period unless some were skipped).
+            rate: Runs per second.
+        """
+        self.name = name
+        self.function = function
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.deadline = None  # Next time it is due
+        self.last_deadline = None
+        self.first_run = None
+        self.last_run = None  # When it last started
+
+        # --- Statistics ---
+        self.runs = 0
+        self.overruns = 0  # Runs that ended after the next deadline
+        self.skipped = 0  # Deadlines dropped to catch up
+        self.busy = 0.0  # Total execution seconds
+        self.max_gap = 0.0  # Longest time between the starts of two runs
+        self.jitter = deque(maxlen=window)  # Start minus deadline, seconds
+        self.exec_times = deque(maxlen=window)
+
+    def run(self, now, clock):
+        """Runs the task for the deadline that has come due; returns when it finished."""
+        deadline = self.deadline
+        dt = deadline - self.last_deadline if self.last_deadline is not None else self.period
+        if self.last_run is not None:
+            self.max_gap = max(self.max_gap, now - self.last_run)
+        else:
+            self.first_run = now
+        self.last_run = now
+        self.function(deadline, dt)
+        end = clock()
+
+        self.runs += 1
+        self.busy += end - now
+        self.jitter.append(now - deadline)
+        self.exec_times.append(end - now)
+        self.last_deadline = deadline
+        self.deadline = deadline + self.period
+        if end > self.deadline:
+            self.overruns += 1
+            behind = int((end - self.deadline) / self.period)
+            if behind:
+                self.skipped += behind
+                self.deadline += behind * self.period
+        return end
+
+    def achieved_rate(self):
+        """Runs per second between the first run and the last."""
+        if self.runs < 2 or self.last_run == self.first_run:
+            return 0.0
+        return (self.runs - 1) / (self.last_run - self.first_run)
+
+    def is_starving(self, now, periods=SETTINGS["STARVATION_PERIODS"]):
+        """True if the task has been due for more than `periods` of its periods without running."""
+        since = now - (self.last_run if self.last_run is not None else self.deadline)
+        return since > periods * self.period
+
+class Scheduler:
+    """Runs tasks at fixed rates on absolute monotonic deadlines, in the calling thread."""
+
+    def __init__(self, clock=hal_clock.monotonic, sleep=hal_clock.sleep, spin=None):
+        """
+        Args:
+            clock: Monotonic seconds.
+            sleep: Sleeps for the given seconds.
+            spin: Seconds before a deadline to poll the clock instead of sleeping. Defaults to
+                SPIN on real hardware and 0 on the simulator, whose clock only moves when slept.
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.spin = spin if spin is not None else (0.0 if hal.is_simulated() else SETTINGS["SPIN"])
+        self.tasks = []
+        self.started = None
+        self.running = False
+
+    def add(self, name, function, rate):
+        """Registers function(deadline, dt) to run `rate` times a second. Returns the Task."""
+        task = Task(name, function, rate)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.period)  # Faster tasks first on a tie
+        if self.started is not None:
+            task.deadline = self.clock()
+        return task
+
+    def start(self, now=None):
+        """Puts every task's first deadline at `now` (default: the clock's time)."""
+        self.started = self.clock() if now is None else now
+        for task in self.tasks:
+            task.deadline = self.started
+            task.last_deadline = None
+
+    def next_task(self):
+        """The task with the earliest deadline."""
+        return min(self.tasks, key=lambda t: t.deadline)
+
+    def step(self):
+        """Waits for the next deadline and runs the task due at it. Returns the Task."""
+        if self.started is None:
+            self.start()
+        task = self.next_task()
+        self.wait_until(task.deadline)
+        task.run(self.clock(), self.clock)
+        return task
+
+    def wait_until(self, deadline):
+        delay = deadline - self.clock() - self.spin
+        if delay > 0:
+            self.sleep(delay)
+        while self.clock() < deadline:
+            if self.spin == 0:
+                self.sleep(deadline - self.clock())
+        return self.clock()
+
+    def run(self, duration=None):
+        """Runs the tasks until stop() is called or `duration` seconds have passed."""
+        if self.started is None:
+            self.start()
+        self.running = True
+        end = self.clock() + duration if duration is not None else None
+        while self.running and (end is None or self.next_task().deadline < end):
+            self.step()
+        self.running = False
+
+    def stop(self):
+        """Makes run() return once the current task finishes. Safe to call from a task."""
+        self.running = False
+
+    # --- Statistics ---
+
+    def starving(self, now=None):
+        """The tasks that haven't run for STARVATION_PERIODS of their periods."""
+        now = self.clock() if now is None else now
+        return [task for task in self.tasks if task.is_starving(now)]
+
+    def report(self, now=None):
+        """Per-task timing since start(), as a list of dicts, fastest task first."""
+        now = self.clock() if now is None else now
+        elapsed = max(now - self.started, 1e-9) if self.started is not None else 1e-9
+        rows = []
+        for task in self.tasks:
+            jitter = np.array(task.jitter) if task.jitter else np.zeros(1)
+            exec_times = np.array(task.exec_times) if task.exec_times else np.zeros(1)
+            rows.append({
+                "task": task.name, "rate": task.rate, "achieved": task.achieved_rate(), "runs": task.runs,
+                "overruns": task.overruns, "skipped": task.skipped,
+                "jitter_p50": float(np.median(jitter)), "jitter_p99": float(np.percentile(jitter, 99)),
+                "jitter_max": float(jitter.max()),
+                "exec_p50": float(np.median(exec_times)), "exec_p99": float(np.percentile(exec_times, 99)),
+                "exec_max": float(exec_times.max()), "utilization": task.busy / elapsed,
+                "max_gap": task.max_gap, "starving": task.is_starving(now)
+                or task.max_gap > SETTINGS["STARVATION_PERIODS"] * task.period,
+            })
+        return rows
+
+    def print_report(self, now=None):
+        rows = self.report(now)
+        print(f"Scheduler: {len(rows)} tasks, {sum(r['utilization'] for r in rows) * 100:.1f}% busy")
+        print(f"  {'task':10} {'Hz':>5} {'got':>7} {'overrun':>7} {'skipped':>7} {'jitter p50/p99/max ms':>22} "
+              f"{'exec p50/p99/max ms':>20} {'max gap':>8}")
+        for r in rows:
+            jitter = f"{r['jitter_p50'] * 1e3:.2f}/{r['jitter_p99'] * 1e3:.2f}/{r['jitter_max'] * 1e3:.2f}"
+            exec_times = f"{r['exec_p50'] * 1e3:.2f}/{r['exec_p99'] * 1e3:.2f}/{r['exec_max'] * 1e3:.2f}"
+            flag = "  STARVING" if r["starving"] else ""
+            print(f"  {r['task']:10} {r['rate']:5g} {r['achieved']:7.1f} {r['overruns']:7d} {r['skipped']:7d} "
+                  f"{jitter:>22} {exec_times:>20} {r['max_gap'] * 1e3:6.1f}ms{flag}")
@@ -0,0 +1,131 @@
+# scheduler_bench.py
+# Compares the main_0.35.py loop (do everything, then time.sleep(0.1)) with the
+# fixed-rate Scheduler running IMU 200 Hz, ranging 20 Hz, behaviors 50 Hz and
+# display 10 Hz tasks, each costing a set time per run. The display task here is a
+# small partial update.
+#
+# The comparison runs in virtual time, where each task's cost is the only thing
+# that moves the clock, so the results are exact and are asserted: the old loop's
+# rate and its IMU dt swing with whatever the pass did, while every scheduled task
+# gets its declared rate and the IMU task a constant dt. A second virtual run gives
+# the display a 30 ms push, about a full frame, which starves the IMU task, and
+# checks that the report marks it - the reason main_0.35.py leaves the display on
+# the animation engine's own thread. Last, the same tasks run on the real clock
+# with busy-wait costs to show this host's jitter; only the achieved rates are
+# checked there, as time.sleep() on a loaded or virtualized host can wake many
+# milliseconds late.
+# Runs anywhere - no robot hardware needed.
+
+import time
+import numpy as np
+import config as c
+import scheduler as sch
+
+RATES = dict(c.SCHEDULER["RATES"], DISPLAY=10)
+COSTS = {"IMU": 0.0003, "RANGING": 0.0001, "BEHAVIORS": 0.001, "DISPLAY": 0.004}  # Seconds per run
+DURATION = 10.0
+OLD_LOOP_PAUSE = 0.1
+REACTION_EVERY = 3.0  # The old loop runs a blocking reaction (a move and a tune) this often...
+REACTION_TIME = 1.5  # ...for this long
+REAL_DURATION = 3.0
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+def old_loop(clock):
+    """The main_0.35.py pattern. Returns the times the IMU was read."""
+    imu_reads = []
+    next_reaction = REACTION_EVERY
+    while clock() < DURATION:
+        imu_reads.append(clock())
+        for cost in COSTS.values():
+            clock.sleep(cost)
+        if clock() >= next_reaction:
+            clock.sleep(REACTION_TIME)
+            next_reaction += REACTION_EVERY
+        clock.sleep(OLD_LOOP_PAUSE)
+    return np.array(imu_reads)
+
+def scheduled(clock, costs, duration, virtual=True, spin=0.0):
+    """The same tasks on a Scheduler. Returns it and the dt each IMU run was given."""
+    loop = sch.Scheduler(clock=clock, sleep=clock.sleep, spin=spin)
+    imu_dts = []
+
+    def task(name):
+        cost = costs[name]
+
+        def run(deadline, dt):
+            if name == "IMU":
+                imu_dts.append(dt)
+            if virtual:
+                clock.sleep(cost)
+            else:
+                busy(cost)
+        return run
+
+    for name in RATES:
+        loop.add(name.lower(), task(name), RATES[name])
+    loop.run(duration)
+    return loop, np.array(imu_dts)
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class RealClock:
+    def __call__(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+def run():
+    # --- Old loop, virtual time ---
+    reads = old_loop(VirtualClock())
+    gaps = np.diff(reads)
+    print(f"main_0.35.py loop: {len(reads) / DURATION:.1f} passes/s, IMU dt "
+          f"{gaps.min() * 1e3:.0f} to {gaps.max() * 1e3:.0f} ms (std {gaps.std() * 1e3:.0f} ms)")
+
+    # --- Scheduler, virtual time ---
+    clock = VirtualClock()
+    loop, imu_dts = scheduled(clock, COSTS, DURATION)
+    print("Scheduler, virtual time:")
+    loop.print_report()
+    rows = {row["task"]: row for row in loop.report()}
+    for name, rate in RATES.items():
+        row = rows[name.lower()]
+        assert abs(row["achieved"] - rate) / rate < 0.01, f"{name} ran at {row['achieved']:.1f} Hz, not {rate}"
+        # A run can end past its next deadline when it had to wait for a slower task, but none is dropped
+        assert row["skipped"] == 0 and not row["starving"], f"{name} missed deadlines or starved"
+        assert row["jitter_max"] <= sum(COSTS.values()) + 1e-9, f"{name} started later than one pass of work"
+    assert np.allclose(imu_dts, 1.0 / RATES["IMU"]), "the IMU task's dt wasn't constant"
+    print(f"  IMU dt: {imu_dts.min() * 1e3:.3f} to {imu_dts.max() * 1e3:.3f} ms over {len(imu_dts)} runs")
+    assert gaps.max() > 10 * gaps.min(), "the old loop's rate was expected to swing"
+
+    # --- Starvation ---
+    clock = VirtualClock()
+    loop, imu_dts = scheduled(clock, dict(COSTS, DISPLAY=0.030), 2.0)
+    print("Scheduler, 30 ms display push:")
+    loop.print_report()
+    rows = {row["task"]: row for row in loop.report()}
+    assert rows["imu"]["starving"] and rows["imu"]["skipped"] > 0, "the IMU task should show as starving"
+    assert not rows["ranging"]["starving"], "ranging has time to spare"
+    assert imu_dts.max() > 1.0 / RATES["IMU"], "skipped IMU deadlines should show in its dt"
+
+    # --- Real clock ---
+    loop, imu_dts = scheduled(RealClock(), COSTS, REAL_DURATION, virtual=False, spin=c.SCHEDULER["SPIN"])
+    print(f"Scheduler, real clock ({REAL_DURATION:.0f} s):")
+    loop.print_report()
+    for row in loop.report():
+        assert abs(row["achieved"] - row["rate"]) / row["rate"] < 0.1, f"{row['task']} ran at {row['achieved']:.1f} Hz"
+
+if __name__ == "__main__":
+    run()
@@ -1,8 +1,8 @@
 # servo_control.py
 
-import time
-from adafruit_pca9685 import PCA9685
+from hal import clock as time
 import config as c
+import pca_frame as pf
 
 # Global variables to track servo angles (initialize to defaults)
 current_angle_lhs = c.SERVO_ANGLES["LHS_UP"]  # Access from dictionary
@@ -53,7 +53,7 @@ def set_servo_angle(pca, channel, angle):
 
     # Ensure the pulse width is within the valid range
     pulse = max(min(pulse, max_pulse), min_pulse)
-    pca.channels[channel].duty_cycle = int(pulse / 20000 * 65535)  # Convert pulse width to duty cycle
+    pf.get_frame(pca).set(channel, int(pulse / 20000 * 65535))  # Convert pulse width to duty cycle
 
     # Update the current angle variable
     if channel == c.SERVO_PINS["LHS"]:
@@ -79,18 +79,21 @@ def waggle_arms(pca, num_waggles=2, waggle_delay=0.1):
 
     for _ in range(num_waggles):
         # Move arms to opposite positions
-        set_servo_angle(pca, c.SERVO_PINS["LHS"], c.SERVO_ANGLES["LHS_UP"])
-        set_servo_angle(pca, c.SERVO_PINS["RHS"], c.SERVO_ANGLES["RHS_DOWN"])
+        with pf.get_frame(pca):
+            set_servo_angle(pca, c.SERVO_PINS["LHS"], c.SERVO_ANGLES["LHS_UP"])
+            set_servo_angle(pca, c.SERVO_PINS["RHS"], c.SERVO_ANGLES["RHS_DOWN"])
         time.sleep(waggle_delay)
 
         # Move arms to opposite positions
-        set_servo_angle(pca, c.SERVO_PINS["LHS"], c.SERVO_ANGLES["LHS_DOWN"])
-        set_servo_angle(pca, c.SERVO_PINS["RHS"], c.SERVO_ANGLES["RHS_UP"])
+        with pf.get_frame(pca):
+            set_servo_angle(pca, c.SERVO_PINS["LHS"], c.SERVO_ANGLES["LHS_DOWN"])
+            set_servo_angle(pca, c.SERVO_PINS["RHS"], c.SERVO_ANGLES["RHS_UP"])
         time.sleep(waggle_delay)
 
     # Return arms to their initial positions after waggling
-    set_servo_angle(pca, c.SERVO_PINS["LHS"], current_angle_lhs)
-    set_servo_angle(pca, c.SERVO_PINS["RHS"], current_angle_rhs)
+    with pf.get_frame(pca):
+        set_servo_angle(pca, c.SERVO_PINS["LHS"], current_angle_lhs)
+        set_servo_angle(pca, c.SERVO_PINS["RHS"], current_angle_rhs)
 
 def move_servo_to_angle(pca, servo_channel, angle):
     """Moves the specified servo to the given angle."""
@@ -98,8 +101,9 @@ def move_servo_to_angle(pca, servo_channel, angle):
 
 def move_both_arms(pca, angle):
     """Moves both LHS and RHS servos to the specified angle."""
-    set_servo_angle(pca, c.SERVO_PINS["LHS"], angle)
-    set_servo_angle(pca, c.SERVO_PINS["RHS"], angle)
+    with pf.get_frame(pca):  # Both arms in one I2C write
+        set_servo_angle(pca, c.SERVO_PINS["LHS"], angle)
+        set_servo_angle(pca, c.SERVO_PINS["RHS"], angle)
 
 def raise_arms(pca):
     """Raises both lifting arms."""
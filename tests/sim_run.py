@@ -0,0 +1,104 @@
+# sim_run.py
+# Runs the wander loop, dead reckoning and mapping on the simulated HAL backend in
+# virtual time, then reports how much faster than real time it ran and how well
+# the robot did. Last it checks that the scheduled UltrasonicRanger (as
+# main_0.35.py runs it) reads what the world says is in front of the robot,
+# including nothing. Runs anywhere - no robot hardware needed.
+#
+# Usage: python sim_run.py [virtual_seconds]
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time as real_time
+import hal
+
+hal.use("sim")
+
+import config as c
+import robot as rc
+import movement as m
+import dead_reckoning as dr
+import mapping
+import scheduler as sch
+
+def run(virtual_seconds):
+    world = hal.backend().world
+    clock = hal.clock
+    random.seed(c.SIMULATION["SEED"])
+    c.GYRO_CALIBRATION["PATH"] = os.path.join(tempfile.mkdtemp(), "gyro.json")  # Calibrate afresh, leave no cache behind
+
+    rc.initialize_pca()
+    rc.initialize_edge_sensors()
+    movement = m.Movement(rc.pca)
+    dead_reckoning = dr.DeadReckoning(movement=movement)
+    dead_reckoning.start_sampler()
+    grid_map = mapping.OccupancyGridMap()
+
+    stats = {"passes": 0, "edges": 0, "obstacles": 0}
+    real_start = real_time.perf_counter()
+    start = clock.monotonic()
+    last_turn = start
+
+    while clock.monotonic() - start < virtual_seconds:
+        dead_reckoning.update()
+        distance = rc.get_distance()
+        left_edge, right_edge = rc.read_edge_sensors()
+        grid_map.update_map(dead_reckoning.get_position(), distance / 100, dead_reckoning.get_heading())
+        stats["passes"] += 1
+
+        # The same decisions as the main_0.35.py loop, minus the sound/touch/display extras
+        if distance < c.MOVEMENT_SETTINGS["OBSTACLE_DISTANCE"]:
+            stats["obstacles"] += 1
+            movement.stop_all_motors()
+            random.choice([movement.turn_left_in_place, movement.turn_right_in_place])()
+        elif left_edge == 1:
+            stats["edges"] += 1
+            movement.turn_right_in_place()
+        elif right_edge == 1:
+            stats["edges"] += 1
+            movement.turn_left_in_place()
+        elif clock.monotonic() - last_turn > 5:
+            random.choice([movement.turn_left_in_place, movement.turn_right_in_place])()
+            last_turn = clock.monotonic()
+        else:
+            movement.move_forward()
+
+        clock.sleep(0.1)
+
+    real_elapsed = real_time.perf_counter() - real_start
+    virtual_elapsed = clock.monotonic() - start
+    dr_x, dr_y = dead_reckoning.get_position()
+
+    print(f"\nVirtual time:      {virtual_elapsed:.1f} s in {real_elapsed:.2f} s real "
+          f"({virtual_elapsed / real_elapsed:.0f}x real time)")
+    print(f"Loop passes:       {stats['passes']}")
+    print(f"Edge reactions:    {stats['edges']}, obstacle reactions: {stats['obstacles']}")
+    print(f"Falls off table:   {world.falls}")
+    print(f"Distance driven:   {world.distance_travelled:.2f} m")
+    print(f"True heading:      {math.degrees(world.heading):.1f} deg, dead reckoning: {dead_reckoning.get_heading():.1f} deg")
+    print(f"Dead reckoning at: ({dr_x:.2f}, {dr_y:.2f}) m, true pose ({world.x:.2f}, {world.y:.2f}) m")
+    print(f"Map cells touched: {int((grid_map.grid != 0.5).sum())}")
+
+def check_scheduled_ranger(headings=12, seconds_each=0.5):
+    """Polls the ranger from a Scheduler at each heading and compares its readings with the world's."""
+    world = hal.backend().world
+    ranger = rc.start_ranging(scheduled=True)
+    loop = sch.Scheduler()
+    loop.add("ranging", ranger.poll, c.ULTRASONIC["RATE"])
+    wrong = 0
+    for i in range(headings):
+        world.heading = 2 * math.pi * i / headings
+        loop.run(seconds_each)
+        expected = world.ultrasonic_distance()
+        expected = c.ULTRASONIC["NO_READING"] if expected is None else expected
+        wrong += abs(ranger.get_distance() - expected) > 0.5
+    ranger.stop()
+    print(f"Scheduled ranger:  {headings - wrong} of {headings} headings read as the world says")
+    assert wrong == 0, "the scheduled ranger disagreed with the simulated world"
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 60.0)
+    check_scheduled_ranger()
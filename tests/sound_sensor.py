@@ -1,7 +1,8 @@
 # sound_sensor.py
 
-import RPi.GPIO as GPIO
+from hal import GPIO
 import config as c
+import gpio_events
 
 def initialize_sound_sensor():
     """Initializes the sound sensor GPIO pin."""
@@ -14,4 +15,7 @@ def is_sound_detected():
     Returns:
         True if sound is detected, False otherwise.
     """
+    inputs = gpio_events.watching("sound")
+    if inputs is not None:
+        return inputs.triggered("sound")  # Also catches one that came and went since the last call
     return GPIO.input(c.SENSOR_PINS["SOUND_SENSOR"]) == GPIO.HIGH  # Access from SENSOR_PINS
\ No newline at end of file
@@ -0,0 +1,269 @@
+# state_estimation.py
+
+import abc
+import math
+import numpy as np
+import config as c
+import filters
+
+# --- State Estimation ---
+# Estimators turn batches of IMU samples (and, when known, the wheel speeds the
+# motors were commanded to) into a pose. They all share one interface:
+#
+#   update(times, rates, ax, ay, wheels=None)
+#       times   (n,) sample times in seconds
+#       rates   (n,) yaw rate in deg/s, bias-corrected
+#       ax, ay  (n,) forward and leftward acceleration in m/s^2, body frame
+#       wheels  optional (right, left) pair of (n,) wheel speeds in m/s
+#
+# and expose `position` (x, y) in meters, `heading` in degrees and `velocity`
+# (vx, vy) in m/s. Pick one with create(name); DeadReckoning uses
+# config.DEAD_RECKONING["ESTIMATOR"].
+
+SETTINGS = c.DEAD_RECKONING
+
+class Estimator(abc.ABC):
+    """Common state and helpers; subclasses implement update()."""
+
+    name = None
+
+    def __init__(self):
+        self.position = (0.0, 0.0)
+        self.heading = 0.0
+        self.velocity = (0.0, 0.0)
+        self.last_time = None
+        self.samples = 0
+
+    @abc.abstractmethod
+    def update(self, times, rates, ax, ay, wheels=None):
+        """Takes a batch of samples (see the interface above) and moves the pose on to the last one."""
+
+    def _steps(self, times):
+        """Time steps for a batch; the very first sample has nothing before it."""
+        previous = times[0] if self.last_time is None else self.last_time
+        self.last_time = times[-1]
+        self.samples += len(times)
+        return np.diff(times, prepend=previous)
+
+def previous_and(values, first):
+    """values shifted one along, with `first` in front: each sample's predecessor."""
+    shifted = np.empty_like(values)
+    shifted[0] = first
+    shifted[1:] = values[:-1]
+    return shifted
+
+def trapezoid_heading(heading, last_rate, rates, dt):
+    """Headings (deg) at each sample from the trapezoidal integral of the yaw rate."""
+    return heading + np.cumsum((previous_and(rates, last_rate) + rates) / 2 * dt)
+
+class Integrator(Estimator):
+    """
+    Integrates the IMU alone, as DeadReckoning always has: trapezoidal heading, and
+    body acceleration rotated into the world frame and integrated twice. Wheel
+    speeds are ignored, so position drifts with any accelerometer error.
+    """
+
+    name = "integrator"
+
+    def __init__(self):
+        super().__init__()
+        self.last_rate = None
+        self.last_accel = None  # World-frame acceleration at the last sample
+
+    def update(self, times, rates, ax, ay, wheels=None):
+        if len(times) == 0:
+            return
+        dt = self._steps(times)
+        headings = trapezoid_heading(self.heading, rates[0] if self.last_rate is None else self.last_rate, rates, dt)
+
+        theta = np.radians(headings)
+        cos_h, sin_h = np.cos(theta), np.sin(theta)
+        world_ax = ax * cos_h - ay * sin_h
+        world_ay = ax * sin_h + ay * cos_h
+        last_ax, last_ay = (world_ax[0], world_ay[0]) if self.last_accel is None else self.last_accel
+
+        vx0, vy0 = self.velocity
+        vx = vx0 + np.cumsum((previous_and(world_ax, last_ax) + world_ax) / 2 * dt)
+        vy = vy0 + np.cumsum((previous_and(world_ay, last_ay) + world_ay) / 2 * dt)
+        dx = np.sum((previous_and(vx, vx0) + vx) / 2 * dt)
+        dy = np.sum((previous_and(vy, vy0) + vy) / 2 * dt)
+
+        self.heading = float(headings[-1])
+        self.velocity = (float(vx[-1]), float(vy[-1]))
+        self.position = (self.position[0] + float(dx), self.position[1] + float(dy))
+        self.last_rate = rates[-1]
+        self.last_accel = (world_ax[-1], world_ay[-1])
+
+class ComplementaryFilter(Estimator):
+    """
+    Heading from the gyro; forward speed from the accelerometer blended with the
+    wheel speeds.
+
+    The accelerometer tracks quick speed changes and the wheels hold the long-term
+    speed, blended with time constant `tau`: speed = blend(speed + ax * dt, wheel
+    speed). The robot is taken to move only along its heading, so the sideways
+    accelerometer reading isn't integrated. Without wheel speeds the speed is the
+    integrated forward acceleration.
+    """
+
+    name = "complementary"
+
+    def __init__(self, tau=SETTINGS["COMPLEMENTARY_TAU"]):
+        super().__init__()
+        self.tau = tau
+        self.speed = 0.0
+        self.last_rate = None
+
+    def update(self, times, rates, ax, ay, wheels=None):
+        if len(times) == 0:
+            return
+        dt = self._steps(times)
+        headings = trapezoid_heading(self.heading, rates[0] if self.last_rate is None else self.last_rate, rates, dt)
+
+        if wheels is None:
+            speeds = self.speed + np.cumsum(ax * dt)
+        else:
+            # speed[k] = a * (speed[k-1] + ax[k] dt) + (1 - a) * wheel[k], an EMA of a shifted input
+            step = max(float(np.mean(dt)), 1e-6)
+            a = self.tau / (self.tau + step)
+            wheel_speed = (wheels[0] + wheels[1]) / 2
+            blend = filters.ExponentialMovingAverage(1 - a)
+            blend.value = self.speed
+            speeds = blend.process((a * ax * dt + (1 - a) * wheel_speed) / (1 - a))
+
+        theta = np.radians(headings)
+        distance = (previous_and(speeds, self.speed) + speeds) / 2 * dt
+        dx = float(np.sum(distance * np.cos(theta)))
+        dy = float(np.sum(distance * np.sin(theta)))
+
+        self.heading = float(headings[-1])
+        self.speed = float(speeds[-1])
+        last_theta = theta[-1]
+        self.velocity = (self.speed * math.cos(last_theta), self.speed * math.sin(last_theta))
+        self.position = (self.position[0] + dx, self.position[1] + dy)
+        self.last_rate = rates[-1]
+
+class ExtendedKalmanFilter(Estimator):
+    """
+    An EKF over [x, y, heading, speed, yaw rate] for a differential-drive robot.
+
+    Each IMU sample predicts the state forward with the forward acceleration as the
+    control input, then corrects it with scalar measurement updates: the gyro's
+    yaw rate, the sideways (centripetal) acceleration speed * yaw rate, and, when
+    given, the commanded wheel speeds as noisy measurements of speed and yaw rate.
+    Updating one scalar at a time needs no matrix inverse, and every matrix and
+    work vector is allocated once, so a step allocates no arrays.
+    """
+
+    name = "ekf"
+    X, Y, THETA, SPEED, RATE = range(5)
+
+    def __init__(self, settings=SETTINGS["EKF"], wheel_base=SETTINGS["WHEEL_BASE"]):
+        super().__init__()
+        self.wheel_base = wheel_base
+        self.state = np.zeros(5)
+        self.P = np.diag(np.array(settings["INITIAL_VARIANCE"], dtype=float))
+        self.Q = np.diag(np.array(settings["PROCESS_NOISE"], dtype=float) ** 2)
+        self.r_gyro = math.radians(settings["GYRO_NOISE"]) ** 2
+        self.r_accel = settings["ACCEL_NOISE"] ** 2
+        self.r_wheel_speed = settings["WHEEL_SPEED_NOISE"] ** 2
+        self.r_wheel_rate = settings["WHEEL_RATE_NOISE"] ** 2
+
+        # Work space, allocated once
+        self.F = np.eye(5)
+        self.F_T = self.F.T  # A view, so it follows F
+        self.FP = np.empty((5, 5))
+        self.Q_dt = np.empty((5, 5))
+        self.Q_dt_step = None  # The dt Q_dt was worked out for; samples come at a fixed rate
+        self.P_columns = [self.P[:, i] for i in range(5)]  # Views, so they follow P
+        self.PH = np.empty(5)
+        self.K = np.empty(5)
+        self.K_column = self.K[:, None]
+        self.KPH = np.empty((5, 5))
+        self.P_speed_rate = self.P[:, self.SPEED:self.RATE + 1]
+        self.H_speed_rate = np.empty(2)
+        self.correction = np.empty(5)
+
+    def update(self, times, rates, ax, ay, wheels=None):
+        if len(times) == 0:
+            return
+        dt = self._steps(times)
+        steps, forward, sideways = dt.tolist(), ax.tolist(), ay.tolist()
+
+        # The gyro and wheel yaw rates measure the same state, so they go in as one
+        # measurement: their inverse-variance weighted mean
+        gyro = np.radians(rates)
+        if wheels is None:
+            rate, rate_variance = gyro.tolist(), self.r_gyro
+        else:
+            right, left = wheels
+            wheel_speed = ((right + left) / 2).tolist()
+            weight = self.r_wheel_rate / (self.r_gyro + self.r_wheel_rate)
+            rate = (weight * gyro + (1 - weight) * (right - left) / self.wheel_base).tolist()
+            rate_variance = self.r_gyro * weight
+
+        for i, step in enumerate(steps):
+            if step > 0:
+                self._predict(step, forward[i])
+            self._update_state(self.RATE, rate[i], rate_variance)
+            self._update_centripetal(sideways[i])
+            if wheels is not None:
+                self._update_state(self.SPEED, wheel_speed[i], self.r_wheel_speed)
+
+        x, y, theta, speed, _ = self.state.tolist()
+        self.position = (x, y)
+        self.heading = math.degrees(theta)
+        self.velocity = (speed * math.cos(theta), speed * math.sin(theta))
+
+    def _predict(self, dt, accel):
+        state, F = self.state, self.F
+        _, _, theta, speed, rate = state.tolist()
+        cos_t, sin_t = math.cos(theta), math.sin(theta)
+        state[self.X] += speed * cos_t * dt
+        state[self.Y] += speed * sin_t * dt
+        state[self.THETA] += rate * dt
+        state[self.SPEED] += accel * dt
+
+        # Jacobian of the motion model
+        F[0, 2] = -speed * sin_t * dt
+        F[0, 3] = cos_t * dt
+        F[1, 2] = speed * cos_t * dt
+        F[1, 3] = sin_t * dt
+        F[2, 4] = dt
+
+        np.matmul(F, self.P, out=self.FP)
+        np.matmul(self.FP, self.F_T, out=self.P)
+        if dt != self.Q_dt_step:
+            np.multiply(self.Q, dt, out=self.Q_dt)
+            self.Q_dt_step = dt
+        self.P += self.Q_dt
+
+    def _correct(self, innovation, variance):
+        """Applies a scalar measurement, given P H^T in self.PH and H P H^T + R as `variance`."""
+        np.multiply(self.PH, 1.0 / variance, out=self.K)
+        np.multiply(self.K, innovation, out=self.correction)
+        self.state += self.correction
+        np.multiply(self.K_column, self.PH, out=self.KPH)  # The outer product K (P H^T)^T
+        self.P -= self.KPH
+
+    def _update_state(self, index, measurement, variance):
+        """A direct measurement of one state variable: P H^T is just a column of P."""
+        self.PH[:] = self.P_columns[index]
+        self._correct(measurement - self.state[index], self.PH[index] + variance)
+
+    def _update_centripetal(self, sideways):
+        """The sideways acceleration, speed * yaw rate."""
+        _, _, _, speed, rate = self.state.tolist()
+        H = self.H_speed_rate  # The non-zero part of H: d/d(speed), d/d(rate)
+        H[0], H[1] = rate, speed
+        np.matmul(self.P_speed_rate, H, out=self.PH)
+        variance = rate * self.PH[self.SPEED] + speed * self.PH[self.RATE] + self.r_accel
+        self._correct(sideways - speed * rate, variance)
+
+ESTIMATORS = {estimator.name: estimator for estimator in (Integrator, ComplementaryFilter, ExtendedKalmanFilter)}
+
+def create(name=SETTINGS["ESTIMATOR"], **kwargs):
+    """Creates an estimator by name: "integrator", "complementary" or "ekf"."""
+    if name not in ESTIMATORS:
+        raise ValueError(f"Unknown estimator '{name}', expected one of {tuple(ESTIMATORS)}")
+    return ESTIMATORS[name](**kwargs)
@@ -0,0 +1,134 @@
+# state_estimation_bench.py
+# Records an IMU and wheel-command trace from the simulated robot driving around,
+# with its true pose, then replays the trace offline through each state estimator:
+# pose error along the way and the time each update takes.
+# Runs anywhere - no robot hardware needed.
+#
+# Usage: python state_estimation_bench.py [trace.npz]
+#   With a path, the trace is recorded there on the first run and replayed from it after.
+
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+import time as real_time
+import numpy as np
+import hal
+
+hal.use("sim")
+
+import config as c
+import robot as rc
+import movement as m
+import imu_sampler as imu
+import filters
+import state_estimation as se
+
+RECORD_TIME = 60.0  # Virtual seconds of driving
+BATCH = 20  # Samples per update: the control loop reading the sampler at 10 Hz
+# A Pi Zero 2W runs this kind of call-heavy Python and NumPy roughly 10-15 times slower than a desktop
+PI_ZERO_SLOWDOWN = 15
+BUDGET = 1e-3  # Seconds per EKF step (one IMU sample) on the Pi, checked against the median step
+
+def record(path):
+    """Drives the simulated robot like main_0.35.py and saves the sampler's trace and the true pose."""
+    backend = hal.backend()
+    world, clock = backend.world, backend.clock
+    random.seed(c.SIMULATION["SEED"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        rc.initialize_pca()
+        rc.initialize_edge_sensors()
+        movement = m.Movement(rc.pca)
+    mpu = hal.create_mpu()
+    sampler = imu.IMUSampler(mpu, capacity=int(RECORD_TIME * c.IMU_SAMPLER["RATE"] * 1.1))
+
+    # The true pose at every sample, following the robot through the falls the world resets
+    truth = []
+    pose = [0.0, 0.0, clock.now]
+
+    def follow(now):
+        dt, pose[2] = now - pose[2], now
+        pose[0] += world.v * math.cos(world.heading) * dt
+        pose[1] += world.v * math.sin(world.heading) * dt
+
+    clock.on_advance(follow)
+    sample = sampler.sample
+
+    def sample_with_truth(now=None):
+        sample(now)
+        truth.append((pose[0], pose[1], math.degrees(world.heading)))
+
+    sampler.sample = sample_with_truth
+    sampler.start()
+    start = clock.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while clock.monotonic() - start < RECORD_TIME:
+            left_edge, right_edge = rc.read_edge_sensors()
+            if left_edge or right_edge:
+                movement.move_backward()
+                movement.turn_right_in_place(duration=0.6)
+            else:
+                random.choice([movement.move_forward, movement.move_forward, movement.turn_left_in_place,
+                               movement.turn_right_in_place])()
+            clock.sleep(0.1)
+    sampler.stop()
+
+    samples = sampler.read_new()
+    right, left = movement.wheel_speeds(samples[:, imu.TIME])
+    truth = np.array(truth[:len(samples)])
+    bias_z = c.SIMULATION["GYRO_BIAS"][2]  # What gyro calibration would find
+    np.savez(path, times=samples[:, imu.TIME], rates=samples[:, imu.GZ] - bias_z, ax=samples[:, imu.AX],
+             ay=samples[:, imu.AY], right=right, left=left, true_x=truth[:, 0], true_y=truth[:, 1],
+             true_heading=truth[:, 2] - truth[0, 2], distance=world.distance_travelled)
+
+def replay(trace, estimator, wheels=True, batch_size=BATCH):
+    """Feeds the trace to an estimator in control-loop batches; returns errors and update times."""
+    gyro_filter = filters.MovingAverage(c.DEAD_RECKONING["GYRO_FILTER_WINDOW"])
+    position_errors, heading_errors, update_times = [], [], []
+    origin_x, origin_y = trace["true_x"][0], trace["true_y"][0]
+    for start in range(0, len(trace["times"]), batch_size):
+        batch = slice(start, start + batch_size)
+        rates = gyro_filter.process(trace["rates"][batch])
+        wheel_speeds = (trace["right"][batch], trace["left"][batch]) if wheels else None
+        begin = real_time.perf_counter()
+        estimator.update(trace["times"][batch], rates, trace["ax"][batch], trace["ay"][batch], wheel_speeds)
+        update_times.append(real_time.perf_counter() - begin)
+
+        end = min(start + batch_size, len(trace["times"])) - 1
+        x, y = estimator.position
+        position_errors.append(math.hypot(x - (trace["true_x"][end] - origin_x), y - (trace["true_y"][end] - origin_y)))
+        heading_errors.append(abs((estimator.heading - trace["true_heading"][end] + 180) % 360 - 180))
+    return np.array(position_errors), np.array(heading_errors), np.array(update_times)
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.mkdtemp(), "trace.npz")
+    if not os.path.exists(path):
+        record(path)
+    trace = dict(np.load(path))
+    samples = len(trace["times"])
+    print(f"Trace: {samples} samples over {trace['times'][-1] - trace['times'][0]:.0f} s, "
+          f"{float(trace['distance']):.1f} m driven; updates of {BATCH} samples\n")
+
+    print(f"{'estimator':28} {'position err':>18} {'heading err':>18} {'per update':>11} {'per sample':>11}")
+    print(f"{'':28} {'mean':>8} {'final':>9} {'mean':>8} {'final':>9}")
+    results = {}
+    for name, wheels in (("integrator", False), ("complementary", True), ("ekf", True), ("ekf", False)):
+        position, heading, times = replay(trace, se.create(name), wheels)
+        label = f"{name}{' + wheel commands' if wheels else ''}"
+        results[label] = position, times
+        print(f"{label:28} {position.mean():6.3f} m {position[-1]:7.3f} m {heading.mean():6.2f} deg "
+              f"{heading[-1]:5.2f} deg {np.median(times) * 1e6:8.0f} us {times.sum() / samples * 1e6:8.1f} us")
+
+    # One sample per update: the latency of a single EKF step, predict and corrections
+    ekf_position = results["ekf + wheel commands"][0]
+    _, _, step_times = replay(trace, se.create("ekf"), batch_size=1)
+    typical, worst = np.median(step_times), np.percentile(step_times, 99)
+    print(f"\nEKF step: median {typical * 1e6:.0f} us, 99th percentile {worst * 1e6:.0f} us here; "
+          f"about {typical * PI_ZERO_SLOWDOWN * 1e3:.2f} ms on a Pi Zero 2W (budget {BUDGET * 1e3:.0f} ms)")
+    # Reported, not asserted: the extrapolation scales this host's timing, which varies run to run
+    if typical * PI_ZERO_SLOWDOWN >= BUDGET:
+        print("  (over budget if this host's timing is representative)")
+    assert ekf_position.mean() < results["integrator"][0].mean()
@@ -1,7 +1,8 @@
 # touch_sensor.py
 
-import RPi.GPIO as GPIO
+from hal import GPIO
 import config as c
+import gpio_events
 
 def initialize_touch_sensor():
     """Initializes the touch sensor GPIO pin."""
@@ -14,4 +15,7 @@ def is_touched():
     Returns:
         True if touched, False otherwise.
     """
+    inputs = gpio_events.watching("touch")
+    if inputs is not None:
+        return inputs.triggered("touch")  # Also catches one that came and went since the last call
     return GPIO.input(c.SENSOR_PINS["TOUCH_SENSOR"]) == GPIO.HIGH
\ No newline at end of file
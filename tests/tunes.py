@@ -0,0 +1,123 @@
+# tunes.py
+
+import re
+from array import array
+from functools import lru_cache
+import config as c
+
+# --- Compiled Tunes ---
+# A tune is compiled once into two flat arrays - frequency (Hz, 0 = rest) and
+# duration (seconds) per step, with the pauses between notes already in place -
+# plus the start offset of every step. Playing it is then just walking the arrays
+# against deadlines taken from the offsets, so no per-note work or timing drift
+# builds up over a long tune.
+
+class CompiledTune:
+    def __init__(self, frequencies, durations, name=None):
+        self.name = name
+        self.frequencies = array("f", frequencies)
+        self.durations = array("f", durations)
+        self.offsets = array("d", [0.0] * len(self.durations))
+        total = 0.0
+        for index, duration in enumerate(self.durations):
+            self.offsets[index] = total
+            total += duration
+        self.duration = total
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def steps(self):
+        """Yields (frequency, start offset, duration) for every step."""
+        return zip(self.frequencies, self.offsets, self.durations)
+
+    def scaled(self, tempo):
+        """Returns a copy played `tempo` times as fast."""
+        return CompiledTune(self.frequencies, [duration / tempo for duration in self.durations], self.name)
+
+def compile_tune(notes, gap=c.TUNES["NOTE_GAP"], tempo=1.0, name=None):
+    """
+    Compiles (frequency, duration) notes, adding `gap` seconds of silence after each.
+
+    Compiled tunes are cached, so compiling the same notes again is a lookup.
+    """
+    if isinstance(notes, CompiledTune):
+        return notes if tempo == 1.0 else notes.scaled(tempo)
+    return _compile(tuple(notes), gap, tempo, name)
+
+@lru_cache(maxsize=c.TUNES["CACHE_SIZE"])
+def _compile(notes, gap, tempo, name):
+    frequencies = []
+    durations = []
+    for frequency, duration in notes:
+        frequencies.append(frequency)
+        durations.append(duration / tempo)
+        if gap > 0:
+            frequencies.append(0)
+            durations.append(gap / tempo)
+    return CompiledTune(frequencies, durations, name)
+
+# --- RTTTL ---
+# Ring Tone Text Transfer Language: "name:d=4,o=5,b=120:8c6,8p,4e.,..." - a name,
+# the default duration, octave and beats per minute, then the notes as
+# [duration]letter[#][.][octave][.] with "p" for a pause.
+
+NOTE_SEMITONES = {"c": -9, "d": -7, "e": -5, "f": -4, "g": -2, "a": 0, "b": 2, "h": 2}
+RTTTL_NOTE = re.compile(r"^(\d*)([a-hp])(#?)(\.?)(\d?)(\.?)$")
+
+def note_frequency(letter, sharp, octave):
+    """Equal-tempered frequency of a note, with A4 = 440 Hz."""
+    semitones = NOTE_SEMITONES[letter] + (1 if sharp else 0) + (octave - 4) * 12
+    return 440.0 * 2 ** (semitones / 12)
+
+@lru_cache(maxsize=c.TUNES["CACHE_SIZE"])
+def parse_rtttl(text, tempo=1.0, gap=c.TUNES["NOTE_GAP"]):
+    """
+    Compiles an RTTTL string. Parsed tunes are cached, so each string is parsed once.
+
+    Args:
+        text: The RTTTL tune.
+        tempo: Speed factor on top of the tune's own beats per minute.
+        gap: Seconds of silence cut from the end of each note, so repeated notes
+            stay separate without changing the tune's timing.
+
+    Raises:
+        ValueError: If the string isn't valid RTTTL.
+    """
+    try:
+        name, defaults, body = (part.strip() for part in text.split(":"))
+    except ValueError:
+        raise ValueError("RTTTL needs three ':'-separated parts: name, defaults and notes") from None
+
+    settings = {"d": 4, "o": 6, "b": 63}  # The RTTTL specification's defaults
+    for setting in filter(None, defaults.replace(" ", "").split(",")):
+        key, _, value = setting.partition("=")
+        settings[key.lower()] = int(value)
+    whole_note = 4 * 60.0 / settings["b"] / tempo
+
+    frequencies = []
+    durations = []
+    for token in filter(None, body.replace(" ", "").lower().split(",")):
+        match = RTTTL_NOTE.match(token)
+        if match is None:
+            raise ValueError(f"Bad RTTTL note '{token}' in '{name}'")
+        length, letter, sharp, dot, octave, trailing_dot = match.groups()
+        duration = whole_note / int(length or settings["d"])
+        if dot or trailing_dot:
+            duration *= 1.5
+
+        if letter == "p":
+            frequencies.append(0)
+            durations.append(duration)
+            continue
+        frequencies.append(note_frequency(letter, sharp, int(octave or settings["o"])))
+        note_gap = min(gap, duration / 2)
+        durations.append(duration - note_gap)
+        if note_gap > 0:
+            frequencies.append(0)
+            durations.append(note_gap)
+    return CompiledTune(frequencies, durations, name)
+
+# Some tunes in RTTTL
+RTTTL_IMPERIAL_MARCH = "ImperialMarch:d=4,o=5,b=100:a,a,a,8f.,16c6,a,8f.,16c6,2a,e6,e6,e6,8f.6,16c6,g#,8f.,16c6,2a"
+RTTTL_HAPPY_BIRTHDAY = "HappyBirthday:d=4,o=5,b=125:8c,8c,d,c,f,2e,8c,8c,d,c,g,2f,8c,8c,c6,a,f,e,d,8a#,8a#,a,f,g,2f"
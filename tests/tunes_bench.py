@@ -0,0 +1,93 @@
+# tunes_bench.py
+# Measures compiled tunes: what parsing and compiling cost the first time and on
+# repeat plays, how much memory a compiled tune takes compared with a list of
+# tuples, and how far note starts drift over a long tune when each note sleeps
+# for its own duration versus when notes are scheduled against absolute deadlines.
+# Runs anywhere - no robot hardware needed.
+
+import sys
+import time
+import hal
+
+hal.use("sim")
+
+import buzzer as b
+import tunes
+
+class TimingBuzzer:
+    """Stands in for the Buzzer and timestamps every note start in real time."""
+
+    def __init__(self):
+        self.starts = []
+
+    def start_tone(self, frequency):
+        self.starts.append(time.perf_counter())
+
+    def stop_tone(self):
+        self.starts.append(time.perf_counter())
+
+    def close(self):
+        pass
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def list_bytes(notes):
+    return sys.getsizeof(notes) + sum(sys.getsizeof(note) + sum(sys.getsizeof(x) for x in note) for note in notes)
+
+def tune_bytes(tune):
+    return sum(sys.getsizeof(a) for a in (tune.frequencies, tune.durations, tune.offsets))
+
+if __name__ == "__main__":
+    # --- Parse Cost ---
+    march = tunes.RTTTL_IMPERIAL_MARCH
+    uncached = per_call(lambda: tunes.parse_rtttl.__wrapped__(march), 2000)
+    cached = per_call(lambda: tunes.parse_rtttl(march), 2000)
+    assert tunes.parse_rtttl(march) is tunes.parse_rtttl(march)
+    compile_uncached = per_call(lambda: tunes._compile.__wrapped__(tuple(b.TUNE_IMPERIAL_MARCH), b.NOTE_GAP, 1.0, None), 2000)
+    compile_cached = per_call(lambda: tunes.compile_tune(b.TUNE_IMPERIAL_MARCH, b.NOTE_GAP), 2000)
+    print(f"RTTTL parse:        {uncached * 1e6:7.1f} us first time, {cached * 1e6:5.2f} us cached")
+    print(f"Compile note list:  {compile_uncached * 1e6:7.1f} us first time, {compile_cached * 1e6:5.2f} us cached")
+
+    # --- Memory ---
+    long_tune = b.TUNE_HAPPY_BIRTHDAY * 20
+    compiled = tunes.compile_tune(long_tune, 0.0)
+    print(f"{len(long_tune)} notes:          {list_bytes(long_tune)} B as tuples, {tune_bytes(compiled)} B compiled\n")
+
+    # --- Tempo ---
+    fast = compiled.scaled(2.0)
+    assert abs(fast.duration - compiled.duration / 2) < 1e-3
+
+    # --- Drift ---
+    # 400 short steps: every sleep overshoots a little, and sleeping for each
+    # note's own duration adds the overshoots up along the tune
+    notes = [(440 + 10 * (i % 12), 0.004) for i in range(200)]
+    tune = tunes.compile_tune(notes, 0.001)
+
+    relative = TimingBuzzer()
+    begin = time.perf_counter()
+    for frequency, duration in zip(tune.frequencies, tune.durations):
+        relative.start_tone(frequency)
+        time.sleep(duration)
+    relative_drift = [s - begin - offset for s, offset in zip(relative.starts, tune.offsets)]
+
+    absolute = TimingBuzzer()
+    sequencer = b.TuneSequencer(absolute, clock=time.perf_counter)
+    sequencer.start()
+    sequencer.play(tune)
+    give_up = time.perf_counter() + 5.0
+    while sequencer.is_playing() or sequencer.played == 0:
+        assert time.perf_counter() < give_up, "sequencer never finished the tune"
+        time.sleep(0.01)
+    sequencer.stop()
+    begin = absolute.starts[0]
+    absolute_drift = [s - begin - offset for s, offset in zip(absolute.starts, tune.offsets)]
+
+    print(f"Drift over a {tune.duration:.1f} s tune of {len(tune)} steps:")
+    print(f"  sleep per note:      last note {relative_drift[-1] * 1000:6.2f} ms late")
+    print(f"  absolute deadlines:  last note {absolute_drift[-1] * 1000:6.2f} ms late, "
+          f"worst {max(absolute_drift) * 1000:.2f} ms")
+    assert absolute_drift[-1] < relative_drift[-1]